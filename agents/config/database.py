@@ -148,7 +148,7 @@ SCHEMA_INFO = {
         "columns": {
             "id": "uuid - Primary key",
             "template_text": "text - Template content",
-            "template_embedding": "vector - Vector embedding (currently unused)",
+            "template_embedding": "vector(1024) - Vector embedding (filled by agents/knowledge/principle_index.py)",
             "occurrence_count": "int4 - Usage count",
             "confidence_score": "float8 - Confidence score (0-1)",
             "domain_tag": "text - Legal domain tag",
@@ -1,6 +1,7 @@
 """
-Open WebUI Client with Multi-Model Rotation
-Unified interface for connecting to Open WebUI API with fallback/rotation support.
+Open WebUI Client with Multi-Model Routing
+Unified interface for connecting to Open WebUI API; model choice is delegated to the
+health-aware LLM router (agents/core/llm_router.py).
 """
 
 from openai import OpenAI
@@ -8,13 +9,12 @@ from typing import List, Dict, Any, Optional
 from agents.config.settings import settings
 from langchain_openai import ChatOpenAI
 import logging
-import itertools
 
 logger = logging.getLogger(__name__)
 
 
 class OpenWebUIClient:
-    """Client for interacting with Open WebUI API with Round-Robin model rotation"""
+    """Client for interacting with Open WebUI API with health-aware model routing"""
     
     def __init__(self):
         """Initialize Open WebUI client"""
@@ -22,9 +22,6 @@ class OpenWebUIClient:
         models_str = settings.openwebui_models or settings.openwebui_model
         self.models_list = [m.strip() for m in models_str.split(",") if m.strip()]
         
-        # Iterator for round-robin rotation
-        self._model_cycler = itertools.cycle(self.models_list)
-        
         self.client = OpenAI(
             base_url=settings.openwebui_api_url,
             api_key=settings.openwebui_api_key or "not-needed"
@@ -34,17 +31,23 @@ class OpenWebUIClient:
     
     @property
     def current_model(self) -> str:
-        """Get the next model in the rotation"""
-        return next(self._model_cycler)
+        """Get the model the router would pick for the next request"""
+        from agents.core.llm_router import get_llm_router
+        return get_llm_router().select().model
 
     def get_langchain_client(self, temperature: float = 0.7, json_mode: bool = False, streaming: bool = False, model_name: Optional[str] = None) -> ChatOpenAI:
         """
-        Returns a LangChain ChatOpenAI instance with the currently rotated model (or specific model).
+        Returns a LangChain ChatOpenAI instance with the routed model (or specific model).
         """
-        model = model_name if model_name else self.current_model
+        from agents.core.llm_router import get_llm_router, RouterCallbackHandler
+        router = get_llm_router()
+        endpoint = router.get_endpoint(model_name) if model_name else router.select()
+        model = model_name if model_name else endpoint.model
         logger.info(f"LangChain Request using model: {model} (streaming={streaming})")
         
         kwargs = {"temperature": temperature}
+        if endpoint is not None:
+            kwargs["callbacks"] = [RouterCallbackHandler(router, endpoint)]
         if json_mode:
             kwargs["model_kwargs"] = {"response_format": {"type": "json_object"}}
             
@@ -71,9 +74,12 @@ class OpenWebUIClient:
         tools: Optional[List[Dict[str, Any]]] = None,
         tool_choice: Optional[str] = None
     ) -> Any:
-        """Generate chat completion using raw OpenAI-compatible client (with rotation)"""
+        """Generate chat completion using raw OpenAI-compatible client (with routing)"""
+        from agents.core.llm_router import get_llm_router
+        router = get_llm_router()
         try:
-            model = self.current_model
+            endpoint = router.select()
+            model = endpoint.model
             logger.info(f"Raw Request using model: {model}")
             
             params = {
@@ -89,18 +95,19 @@ class OpenWebUIClient:
             if tool_choice:
                 params["tool_choice"] = tool_choice
             
-            response = self.client.chat.completions.create(**params)
+            with router.track(endpoint):
+                response = self.client.chat.completions.create(**params)
+                
+                if stream:
+                    full_response = ""
+                    for chunk in response:
+                        if chunk.choices[0].delta.content:
+                            full_response += chunk.choices[0].delta.content
+                    return full_response
             
-            if stream:
-                full_response = ""
-                for chunk in response:
-                    if chunk.choices[0].delta.content:
-                        full_response += chunk.choices[0].delta.content
-                return full_response
-            else:
-                if tools:
-                    return response.choices[0].message
-                return response.choices[0].message.content
+            if tools:
+                return response.choices[0].message
+            return response.choices[0].message.content
                 
         except Exception as e:
             logger.error(f"Error in Open WebUI rotation completion: {e}")
@@ -118,6 +125,19 @@ class OpenWebUIClient:
             logger.error(f"Embedding failure: {e}")
             raise
 
+    def generate_embeddings(self, texts: List[str]) -> List[List[float]]:
+        """Generate embeddings for several texts in one multi-input request"""
+        try:
+            response = self.client.embeddings.create(
+                model=settings.openwebui_embedding_model,
+                input=texts
+            )
+            # The API may return items out of order; `index` maps them back
+            return [item.embedding for item in sorted(response.data, key=lambda item: item.index)]
+        except Exception as e:
+            logger.error(f"Batch embedding failure ({len(texts)} texts): {e}")
+            raise
+
 # Global client instance
 openwebui_client = OpenWebUIClient()
 
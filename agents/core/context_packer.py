@@ -0,0 +1,335 @@
+"""
+📦 Token-Budgeted Context Packer
+
+Builds the research / facts context injected into long prompts (Council, Drafter, HCF)
+under a per-node token budget instead of pasting everything.
+
+Architecture:
+- Token counting with a local tokenizer (tiktoken, TOKENIZER_ENCODING, default cl100k_base);
+  falls back to a character-based estimate when the encoding file is not available
+- Passages are taken in rank order (relevance_score / similarity, then search order)
+- Overlapping chunks and neighbor expansions are dropped when most of their
+  word shingles are already in the packed context
+- The last passage that does not fit is truncated to the remaining budget
+- JSON (facts, strategy) is packed by dropping whole keys / list items, so it stays valid
+- Packed-token counts are recorded per node (get_packing_stats, /api/health)
+
+Usage:
+    packed = pack_passages(results, node="council_research", render=lambda i, r, text: f"[{i}] {text}")
+    prompt = PROMPT.format(research=packed.text)
+"""
+
+import json
+import logging
+import os
+import re
+import threading
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, List, Optional, Sequence, Set
+
+logger = logging.getLogger(__name__)
+
+# Default budgets (tokens) per node; override with CONTEXT_BUDGET_<NODE>=<tokens>
+# Research budgets stay at or below what the nodes sent before packing
+# (council: 5 × 500 chars, drafter: 3 × 300 chars, ~2 chars/token for Arabic)
+DEFAULT_NODE_BUDGETS: Dict[str, int] = {
+    "council_facts": 1000,
+    "council_research": 1200,
+    "drafter_plan_research": 450,
+    "drafter_section_strategy": 1000,
+    "drafter_section_research": 450,
+    "hcf_context": 8000,
+}
+
+SHINGLE_SIZE = 8
+OVERLAP_THRESHOLD = 0.8
+MIN_TRUNCATED_TOKENS = 64
+
+
+# =============================================================================
+# TOKENIZER
+# =============================================================================
+
+_encoding = None
+_encoding_loaded = False
+_encoding_lock = threading.Lock()
+
+
+def _get_encoding():
+    global _encoding, _encoding_loaded
+    if not _encoding_loaded:
+        with _encoding_lock:
+            if not _encoding_loaded:
+                try:
+                    import tiktoken
+                    _encoding = tiktoken.get_encoding(os.getenv("TOKENIZER_ENCODING", "cl100k_base"))
+                except Exception as e:
+                    logger.warning(f"⚠️ Tokenizer unavailable, using character estimate: {e}")
+                    _encoding = None
+                _encoding_loaded = True
+    return _encoding
+
+
+def _estimate_tokens(text: str) -> int:
+    # BPE vocabularies average ~4 chars/token for Latin text and ~2 for Arabic
+    ascii_chars = sum(1 for ch in text if ord(ch) < 128)
+    return (ascii_chars + 3) // 4 + (len(text) - ascii_chars + 1) // 2
+
+
+def count_tokens(text: str) -> int:
+    """Token count of text with the local tokenizer."""
+    if not text:
+        return 0
+    encoding = _get_encoding()
+    if encoding is not None:
+        return len(encoding.encode(text, disallowed_special=()))
+    return _estimate_tokens(text)
+
+
+def truncate_to_tokens(text: str, max_tokens: int) -> str:
+    """Cut text to at most max_tokens tokens."""
+    if max_tokens <= 0 or not text:
+        return ""
+    encoding = _get_encoding()
+    if encoding is not None:
+        tokens = encoding.encode(text, disallowed_special=())
+        return text if len(tokens) <= max_tokens else encoding.decode(tokens[:max_tokens])
+    if _estimate_tokens(text) <= max_tokens:
+        return text
+    lo, hi = 0, len(text)
+    while lo < hi:
+        mid = (lo + hi + 1) // 2
+        if _estimate_tokens(text[:mid]) <= max_tokens:
+            lo = mid
+        else:
+            hi = mid - 1
+    return text[:lo]
+
+
+# =============================================================================
+# PACKING
+# =============================================================================
+
+@dataclass
+class PackedContext:
+    """Result of packing passages into a budget."""
+    text: str
+    tokens: int
+    budget: int
+    included: int = 0
+    duplicates: int = 0
+    dropped: int = 0
+    truncated: bool = False
+
+
+@dataclass
+class NodePackingStats:
+    calls: int = 0
+    total_tokens: int = 0
+    max_tokens: int = 0
+    last_tokens: int = 0
+    duplicates: int = 0
+    dropped: int = 0
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "calls": self.calls,
+            "avg_tokens": round(self.total_tokens / self.calls) if self.calls else 0,
+            "max_tokens": self.max_tokens,
+            "last_tokens": self.last_tokens,
+            "duplicates_removed": self.duplicates,
+            "passages_dropped": self.dropped,
+        }
+
+
+_stats: Dict[str, NodePackingStats] = {}
+_stats_lock = threading.Lock()
+
+
+def get_node_budget(node: str) -> int:
+    """Token budget for a node (env CONTEXT_BUDGET_<NODE> overrides the default)."""
+    override = os.getenv(f"CONTEXT_BUDGET_{node.upper()}")
+    if override:
+        return int(override)
+    return DEFAULT_NODE_BUDGETS.get(node, 2000)
+
+
+def _record(node: str, packed: PackedContext):
+    with _stats_lock:
+        stats = _stats.setdefault(node, NodePackingStats())
+        stats.calls += 1
+        stats.total_tokens += packed.tokens
+        stats.max_tokens = max(stats.max_tokens, packed.tokens)
+        stats.last_tokens = packed.tokens
+        stats.duplicates += packed.duplicates
+        stats.dropped += packed.dropped
+    logger.info(
+        f"📦 Context packed for {node}: {packed.tokens}/{packed.budget} tokens, "
+        f"{packed.included} passages ({packed.duplicates} duplicates, {packed.dropped} dropped)"
+    )
+
+
+def get_packing_stats() -> Dict[str, Any]:
+    """Packed-token statistics per node."""
+    with _stats_lock:
+        return {node: s.to_dict() for node, s in _stats.items()}
+
+
+def _shingles(text: str) -> Set[int]:
+    words = re.findall(r"\w+", text.lower())
+    if len(words) < SHINGLE_SIZE:
+        return {hash(" ".join(words))} if words else set()
+    return {hash(" ".join(words[i:i + SHINGLE_SIZE])) for i in range(len(words) - SHINGLE_SIZE + 1)}
+
+
+def _rank_key(indexed: Any) -> Any:
+    position, passage = indexed
+    score = passage.get("relevance_score")
+    if score is None:
+        score = passage.get("similarity", passage.get("similarity_score"))
+    # Scored passages first by score; unscored keep their search order after them
+    return (0, -float(score), position) if isinstance(score, (int, float)) else (1, 0.0, position)
+
+
+def _default_render(index: int, passage: Dict[str, Any], text: str) -> str:
+    return f"[{index}] {text}"
+
+
+def pack_passages(
+    passages: Sequence[Dict[str, Any]],
+    node: str,
+    budget: Optional[int] = None,
+    render: Callable[[int, Dict[str, Any], str], str] = _default_render,
+    separator: str = "\n\n",
+    max_passage_tokens: Optional[int] = None,
+    empty_text: str = ""
+) -> PackedContext:
+    """
+    Select the highest-ranked, non-overlapping passages that fit the node's budget.
+
+    Args:
+        passages: Search results (dicts with "content")
+        node: Name used for the budget lookup and statistics
+        budget: Explicit budget (defaults to get_node_budget(node))
+        render: Formats one passage: (1-based index, passage, possibly truncated text)
+        max_passage_tokens: Optional cap on a single passage
+        empty_text: Returned when nothing could be packed
+    """
+    budget = budget if budget is not None else get_node_budget(node)
+    ranked = [p for _, p in sorted(enumerate(passages), key=_rank_key)]
+
+    parts: List[str] = []
+    seen_ids: Set[Any] = set()
+    seen_shingles: Set[int] = set()
+    used = 0
+    packed = PackedContext(text="", tokens=0, budget=budget)
+    separator_tokens = count_tokens(separator)
+
+    for position, passage in enumerate(ranked):
+        content = str(passage.get("content") or "").strip()
+        passage_id = passage.get("id")
+        if not content:
+            continue
+        if passage_id is not None and passage_id in seen_ids:
+            packed.duplicates += 1
+            continue
+
+        shingles = _shingles(content)
+        if shingles and len(shingles & seen_shingles) / len(shingles) >= OVERLAP_THRESHOLD:
+            packed.duplicates += 1
+            continue
+
+        if max_passage_tokens:
+            content = truncate_to_tokens(content, max_passage_tokens)
+
+        remaining = budget - used - (separator_tokens if parts else 0)
+        rendered = render(len(parts) + 1, passage, content)
+        cost = count_tokens(rendered)
+        if cost > remaining:
+            overhead = cost - count_tokens(content)
+            room = remaining - overhead
+            if room >= MIN_TRUNCATED_TOKENS:
+                rendered = render(len(parts) + 1, passage, truncate_to_tokens(content, room))
+                parts.append(rendered)
+                used += count_tokens(rendered) + (separator_tokens if len(parts) > 1 else 0)
+                packed.truncated = True
+                position += 1
+            packed.dropped += len(ranked) - position
+            break
+
+        parts.append(rendered)
+        used += cost + (separator_tokens if len(parts) > 1 else 0)
+        if passage_id is not None:
+            seen_ids.add(passage_id)
+        seen_shingles |= shingles
+
+    packed.text = separator.join(parts) if parts else empty_text
+    packed.tokens = count_tokens(packed.text)
+    packed.included = len(parts)
+    _record(node, packed)
+    return packed
+
+
+def _dumps(data: Any) -> str:
+    return json.dumps(data, ensure_ascii=False, separators=(",", ":"), default=str)
+
+
+def _fit_json(value: Any, budget: int) -> Any:
+    """
+    Largest leading part of value whose compact JSON fits the budget.
+
+    Keys and list items are kept whole, in order; only the first one that does not
+    fit is shrunk (recursively, a string is cut). Returns None if nothing fits.
+    """
+    if count_tokens(_dumps(value)) <= budget:
+        return value
+    if isinstance(value, str):
+        cut = truncate_to_tokens(value, budget - 2)
+        while cut and count_tokens(_dumps(cut)) > budget:
+            cut = cut[:-max(1, len(cut) // 10)]
+        return cut or None
+    if not isinstance(value, (dict, list)):
+        return None
+
+    is_dict = isinstance(value, dict)
+    kept: Any = {} if is_dict else []
+    for key, item in (value.items() if is_dict else enumerate(value)):
+        trial = {**kept, key: item} if is_dict else kept + [item]
+        if count_tokens(_dumps(trial)) <= budget:
+            kept = trial
+            continue
+        placeholder = {**kept, key: None} if is_dict else kept + [None]
+        room = budget - count_tokens(_dumps(placeholder)) + count_tokens("null")
+        if room >= MIN_TRUNCATED_TOKENS:
+            fitted = _fit_json(item, room)
+            if fitted:
+                kept = {**kept, key: fitted} if is_dict else kept + [fitted]
+        break
+
+    # Token counts are not exactly additive across JSON boundaries
+    while kept and count_tokens(_dumps(kept)) > budget:
+        if is_dict:
+            kept.pop(next(reversed(kept)))
+        else:
+            kept.pop()
+    return kept or None
+
+
+def pack_json(data: Any, node: str, budget: Optional[int] = None) -> PackedContext:
+    """
+    Compact JSON of data within the node's budget (no indentation: ~30% fewer tokens).
+    Whole keys / items are dropped from the end, so the result is always valid JSON.
+    """
+    budget = budget if budget is not None else get_node_budget(node)
+    full = _dumps(data)
+    fitted = _fit_json(data, budget)
+    text = _dumps(fitted if fitted is not None else ({} if isinstance(data, dict) else []))
+    packed = PackedContext(
+        text=text,
+        tokens=count_tokens(text),
+        budget=budget,
+        included=1 if fitted is not None else 0,
+        truncated=text != full,
+    )
+    _record(node, packed)
+    return packed
@@ -9,6 +9,12 @@ Architecture:
 - Maintain active context (articles, laws, topics)
 - Provide context for query enrichment
 
+Incremental mode:
+- message_entities() runs once per message when it is persisted
+  (stored in ai_chat_messages.metadata.entities)
+- fold_message() adds that one message to the running session context
+  (ai_chat_sessions.conversation_context), so a new turn never re-scans history
+
 Author: Legal AI System
 Created: 2026-02-06
 """
@@ -68,6 +74,21 @@ class ConversationContext:
             "confidence": self.confidence,
             "extracted_at": self.extracted_at.isoformat() if self.extracted_at else None
         }
+    
+    @classmethod
+    def from_dict(cls, data: Optional[Dict[str, Any]]) -> "ConversationContext":
+        """Inverse of to_dict (blackboard segment / ai_chat_sessions.conversation_context)."""
+        data = data or {}
+        extracted_at = data.get("extracted_at")
+        return cls(
+            active_articles=list(data.get("active_articles") or []),
+            active_laws=list(data.get("active_laws") or []),
+            active_topics=list(data.get("active_topics") or []),
+            last_entity_type=data.get("last_entity_type"),
+            query_history=list(data.get("query_history") or []),
+            confidence=data.get("confidence", 0.0),
+            extracted_at=datetime.fromisoformat(extracted_at) if extracted_at else None
+        )
 
 
 @dataclass  
@@ -156,6 +177,12 @@ class ConversationStateManager:
         "contract", "company", "insurance", "bankruptcy", "ownership", "possession"
     }
     
+    # Active context caps (most recently mentioned entities are kept)
+    MAX_ARTICLES = 10
+    MAX_LAWS = 5
+    MAX_TOPICS = 5
+    MAX_QUERIES = 5
+    
     # Arabic numeral conversion
     ARABIC_TO_WESTERN = str.maketrans('٠١٢٣٤٥٦٧٨٩', '0123456789')
     
@@ -295,6 +322,28 @@ class ConversationStateManager:
             return message.get('role', '').lower() in ('user', 'human')
         return False
     
+    def message_entities(self, text: str) -> Dict[str, List]:
+        """
+        Entities of one message, computed once when the message is persisted.
+        
+        Returns:
+            Dict with 'articles', 'laws', 'topics' keys (JSON-serializable)
+        """
+        return self._extract_all_entities(text)
+    
+    def _entities_of(self, message: Any, content: str) -> Dict[str, List]:
+        """Precomputed entities stored with the message, or a fresh extraction."""
+        if isinstance(message, BaseMessage):
+            stored = message.additional_kwargs.get("entities")
+        elif isinstance(message, dict):
+            stored = message.get("entities") or (message.get("metadata") or {}).get("entities")
+        else:
+            stored = None
+        
+        if isinstance(stored, dict):
+            return {key: list(stored.get(key) or []) for key in ("articles", "laws", "topics")}
+        return self._extract_all_entities(content)
+    
     # =========================================================================
     # CONTEXT EXTRACTION
     # =========================================================================
@@ -353,8 +402,8 @@ class ConversationStateManager:
             if self._is_user_message(message):
                 user_queries.append(content)
             
-            # Extract entities
-            entities = self._extract_all_entities(content)
+            # Extract entities (stored with the message when available)
+            entities = self._entities_of(message, content)
             
             # Add to aggregates (no weighting for now, just presence)
             if entities['articles']:
@@ -378,27 +427,17 @@ class ConversationStateManager:
             all_laws.extend(current_entities['laws'])
             all_topics.extend(current_entities['topics'])
         
-        # Deduplicate while preserving order (most recent first)
-        active_articles = list(dict.fromkeys(reversed(all_articles)))[:10]
-        active_laws = list(dict.fromkeys(reversed(all_laws)))[:5]
-        active_topics = list(dict.fromkeys(reversed(all_topics)))[:5]
-        
-        # Reverse back to chronological order
-        active_articles.reverse()
-        active_laws.reverse()
-        active_topics.reverse()
-        
-        # Calculate confidence based on entity richness
-        total_entities = len(active_articles) + len(active_laws) + len(active_topics)
-        confidence = min(1.0, total_entities / 5) if total_entities > 0 else 0.0
+        active_articles = self._keep_recent(all_articles, self.MAX_ARTICLES)
+        active_laws = self._keep_recent(all_laws, self.MAX_LAWS)
+        active_topics = self._keep_recent(all_topics, self.MAX_TOPICS)
         
         context = ConversationContext(
             active_articles=active_articles,
             active_laws=active_laws,
             active_topics=active_topics,
             last_entity_type=last_entity_type,
-            query_history=user_queries[-5:],  # Keep last 5 queries
-            confidence=confidence,
+            query_history=user_queries[-self.MAX_QUERIES:],
+            confidence=self._confidence(active_articles, active_laws, active_topics),
             extracted_at=datetime.now()
         )
         
@@ -406,6 +445,71 @@ class ConversationStateManager:
         
         return context
     
+    @staticmethod
+    def _keep_recent(items: List[Any], cap: int) -> List[Any]:
+        """Deduplicate keeping the `cap` most recently mentioned, in chronological order."""
+        recent = list(dict.fromkeys(reversed(items)))[:cap]
+        recent.reverse()
+        return recent
+    
+    @staticmethod
+    def _confidence(articles: List[int], laws: List[str], topics: List[str]) -> float:
+        """Confidence based on entity richness."""
+        total_entities = len(articles) + len(laws) + len(topics)
+        return min(1.0, total_entities / 5) if total_entities > 0 else 0.0
+    
+    def fold_message(
+        self,
+        context: Optional[ConversationContext],
+        content: str,
+        is_user: bool,
+        entities: Optional[Dict[str, List]] = None
+    ) -> ConversationContext:
+        """
+        Add one message to a running context (incremental extract_context_from_history).
+        
+        Same caps and recency rules as the history scan, but the window is the
+        whole session: an entity stays active until newer ones push it out.
+        
+        Args:
+            context: Running session context (None for a new session)
+            content: Message text
+            is_user: Whether the message is from the user
+            entities: Output of message_entities() if already computed
+            
+        Returns:
+            New ConversationContext (the input is not modified)
+        """
+        context = context or ConversationContext()
+        if entities is None:
+            entities = self._extract_all_entities(content)
+        
+        last_entity_type = context.last_entity_type
+        if entities.get('articles'):
+            last_entity_type = 'article'
+        if entities.get('laws'):
+            last_entity_type = 'law'
+        if entities.get('topics') and last_entity_type is None:
+            last_entity_type = 'topic'
+        
+        query_history = list(context.query_history)
+        if is_user and content:
+            query_history = (query_history + [content])[-self.MAX_QUERIES:]
+        
+        active_articles = self._keep_recent(context.active_articles + list(entities.get('articles') or []), self.MAX_ARTICLES)
+        active_laws = self._keep_recent(context.active_laws + list(entities.get('laws') or []), self.MAX_LAWS)
+        active_topics = self._keep_recent(context.active_topics + list(entities.get('topics') or []), self.MAX_TOPICS)
+        
+        return ConversationContext(
+            active_articles=active_articles,
+            active_laws=active_laws,
+            active_topics=active_topics,
+            last_entity_type=last_entity_type,
+            query_history=query_history,
+            confidence=self._confidence(active_articles, active_laws, active_topics),
+            extracted_at=datetime.now()
+        )
+    
     # =========================================================================
     # CONTEXT PERSISTENCE (For Blackboard Integration)
     # =========================================================================
@@ -463,15 +567,7 @@ class ConversationStateManager:
             if not ctx_data:
                 return None
             
-            return ConversationContext(
-                active_articles=ctx_data.get("active_articles", []),
-                active_laws=ctx_data.get("active_laws", []),
-                active_topics=ctx_data.get("active_topics", []),
-                last_entity_type=ctx_data.get("last_entity_type"),
-                query_history=ctx_data.get("query_history", []),
-                confidence=ctx_data.get("confidence", 0.0),
-                extracted_at=datetime.fromisoformat(ctx_data["extracted_at"]) if ctx_data.get("extracted_at") else None
-            )
+            return ConversationContext.from_dict(ctx_data)
         except Exception as e:
             logger.warning(f"Failed to load context from blackboard: {e}")
             return None
@@ -2,6 +2,7 @@ from langchain_openai import ChatOpenAI, OpenAIEmbeddings
 from agents.config.settings import settings
 import logging
 from typing import Optional, Dict, Any
+from agents.core.llm_router import get_llm_router, RouterCallbackHandler, CAPABILITY_JSON
 
 logger = logging.getLogger(__name__)
 
@@ -10,6 +11,7 @@ def get_llm(
     streaming: bool = True,
     json_mode: bool = False,
     model_name: Optional[str] = None,
+    capability: Optional[str] = None,
     **kwargs: Any
 ):
     """
@@ -21,10 +23,24 @@ def get_llm(
     - If model is OpenSource (Qwen/Llama) via OpenWebUI, avoids 'response_format' (often unsupported)
       and relies on Prompt Engineering (handled by LangChain's PydanticOutputParser usually, 
       but here we ensure the API call doesn't crash).
+    
+    Routing:
+    - Without model_name the model is picked by the health-aware LLM router
+      (agents/core/llm_router.py); capability="lite" prefers the cheap classification
+      model and json_mode prefers endpoints with native JSON support.
+    - The router tracks latency/errors through a callback on the returned LLM.
     """
     try:
         # Determine Model
-        target_model = model_name or settings.openwebui_model
+        router = get_llm_router()
+        if model_name:
+            endpoint = router.get_endpoint(model_name)
+        else:
+            endpoint = router.select(capability or (CAPABILITY_JSON if json_mode else None))
+        target_model = model_name or endpoint.model
+        
+        if endpoint is not None:
+            kwargs["callbacks"] = [*(kwargs.get("callbacks") or []), RouterCallbackHandler(router, endpoint)]
         
         # Determine JSON Args
         model_kwargs = kwargs.get("model_kwargs", {})
@@ -0,0 +1,325 @@
+"""
+🧠 LLM Response Cache
+
+Caches answers of deterministic (temperature=0) LLM calls so repeat questions don't
+pay for the same completion twice.
+
+Architecture:
+- Exact mode: SHA-256 of (call site, model, cache version, full prompt) → response
+- Semantic mode (classification call sites only): cosine similarity between the
+  embedding of the user query and cached query embeddings, restricted to entries
+  whose prompt is otherwise identical (same "scope")
+- Per-call-site opt-in via CACHE_POLICIES (TTL + whether semantic matching is allowed)
+- LRU eviction + per-entry TTL, per-call-site hit/miss statistics
+
+Usage:
+    response = await cached_ainvoke(
+        llm, messages,
+        call_site="gatekeeper_classification",
+        semantic_text=user_input
+    )
+    intent = response.content
+"""
+
+import hashlib
+import logging
+import os
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Sequence
+
+import numpy as np
+from langchain_core.messages import AIMessage
+
+logger = logging.getLogger(__name__)
+
+
+# =============================================================================
+# POLICIES
+# =============================================================================
+
+@dataclass(frozen=True)
+class CachePolicy:
+    """How one call site may use the cache."""
+    ttl_seconds: float
+    semantic: bool = False
+
+
+# Only call sites listed here are cached (opt-in).
+CACHE_POLICIES: Dict[str, CachePolicy] = {
+    "gatekeeper_classification": CachePolicy(ttl_seconds=24 * 3600, semantic=True),
+    "complexity_classification": CachePolicy(ttl_seconds=24 * 3600, semantic=True),
+    "scout_keywords": CachePolicy(ttl_seconds=6 * 3600),
+    "research_planning": CachePolicy(ttl_seconds=6 * 3600),
+}
+
+
+# =============================================================================
+# DATA STRUCTURES
+# =============================================================================
+
+@dataclass
+class ResponseEntry:
+    """One cached completion."""
+    content: str
+    call_site: str
+    scope: str
+    expires_at: float
+    embedding: Optional[np.ndarray] = None
+
+    def is_expired(self, now: float) -> bool:
+        return now >= self.expires_at
+
+
+@dataclass
+class CallSiteStats:
+    exact_hits: int = 0
+    semantic_hits: int = 0
+    misses: int = 0
+    stores: int = 0
+
+    @property
+    def hit_rate(self) -> float:
+        total = self.exact_hits + self.semantic_hits + self.misses
+        return (self.exact_hits + self.semantic_hits) / total if total else 0.0
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "exact_hits": self.exact_hits,
+            "semantic_hits": self.semantic_hits,
+            "misses": self.misses,
+            "stores": self.stores,
+            "hit_rate": round(self.hit_rate, 3),
+        }
+
+
+def _serialize_messages(messages: Sequence[Any]) -> str:
+    parts = []
+    for m in messages:
+        role = getattr(m, "type", None) or (m.get("role") if isinstance(m, dict) else "")
+        content = getattr(m, "content", None) if not isinstance(m, dict) else m.get("content")
+        parts.append(f"{role}\x1f{content}")
+    return "\x1e".join(parts)
+
+
+def _sha256(*parts: str) -> str:
+    return hashlib.sha256("\x1d".join(parts).encode("utf-8")).hexdigest()
+
+
+# =============================================================================
+# RESPONSE CACHE
+# =============================================================================
+
+class LLMResponseCache:
+    """
+    In-memory LRU cache of LLM completions with exact and semantic lookup.
+
+    Keys always include the model name and LLM_CACHE_VERSION, so switching models
+    or bumping the version (e.g. after a prompt change) never serves stale answers.
+    """
+
+    def __init__(
+        self,
+        max_size: int = 2000,
+        similarity_threshold: float = 0.95,
+        version: str = "1",
+        embed_fn: Optional[Callable[[str], Awaitable[List[float]]]] = None,
+        enabled: bool = True
+    ):
+        self.max_size = max_size
+        self.similarity_threshold = similarity_threshold
+        self.version = version
+        self.enabled = enabled
+        self._embed_fn = embed_fn
+        self._entries: "OrderedDict[str, ResponseEntry]" = OrderedDict()
+        self._lock = threading.RLock()
+        self._stats: Dict[str, CallSiteStats] = {}
+
+    # =========================================================================
+    # KEYS
+    # =========================================================================
+
+    def make_key(self, call_site: str, model: str, prompt: str) -> str:
+        return _sha256(call_site, model, self.version, prompt)
+
+    def make_scope(self, call_site: str, model: str, prompt: str, semantic_text: str) -> str:
+        """Prompt with the user query blanked out: semantic matches must share it."""
+        return _sha256(call_site, model, self.version, prompt.replace(semantic_text, "\x00"))
+
+    # =========================================================================
+    # LOOKUP / STORE
+    # =========================================================================
+
+    def get_exact(self, key: str) -> Optional[str]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            if entry.is_expired(time.monotonic()):
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return entry.content
+
+    def get_semantic(self, scope: str, embedding: np.ndarray) -> Optional[str]:
+        """Best cached answer in the same scope with cosine ≥ similarity_threshold."""
+        with self._lock:
+            now = time.monotonic()
+            best_key, best_score = None, self.similarity_threshold
+            for key, entry in self._entries.items():
+                if entry.scope != scope or entry.embedding is None or entry.is_expired(now):
+                    continue
+                score = float(np.dot(entry.embedding, embedding))
+                if score >= best_score:
+                    best_key, best_score = key, score
+            if best_key is None:
+                return None
+            self._entries.move_to_end(best_key)
+            return self._entries[best_key].content
+
+    def store(
+        self,
+        key: str,
+        content: str,
+        call_site: str,
+        scope: str,
+        ttl_seconds: float,
+        embedding: Optional[np.ndarray] = None
+    ):
+        with self._lock:
+            self._entries[key] = ResponseEntry(
+                content=content,
+                call_site=call_site,
+                scope=scope,
+                expires_at=time.monotonic() + ttl_seconds,
+                embedding=embedding,
+            )
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+            self._site_stats(call_site).stores += 1
+
+    async def embed(self, text: str) -> Optional[np.ndarray]:
+        """Normalized query embedding, or None if embeddings are unavailable."""
+        try:
+            if self._embed_fn is None:
+                from agents.core.llm_factory import get_embeddings
+                self._embed_fn = get_embeddings().aembed_query
+            vector = np.asarray(await self._embed_fn(text), dtype=np.float32)
+            norm = float(np.linalg.norm(vector))
+            return vector / norm if norm else None
+        except Exception as e:
+            logger.warning(f"⚠️ LLM cache embedding failed, semantic lookup skipped: {e}")
+            return None
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    # =========================================================================
+    # STATS
+    # =========================================================================
+
+    def _site_stats(self, call_site: str) -> CallSiteStats:
+        return self._stats.setdefault(call_site, CallSiteStats())
+
+    def record(self, call_site: str, outcome: str):
+        with self._lock:
+            stats = self._site_stats(call_site)
+            setattr(stats, outcome, getattr(stats, outcome) + 1)
+
+    def get_stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "enabled": self.enabled,
+                "size": len(self._entries),
+                "max_size": self.max_size,
+                "version": self.version,
+                "call_sites": {site: s.to_dict() for site, s in self._stats.items()},
+            }
+
+
+# =============================================================================
+# CACHED INVOCATION
+# =============================================================================
+
+async def cached_ainvoke(
+    llm: Any,
+    messages: Sequence[Any],
+    call_site: str,
+    semantic_text: Optional[str] = None,
+    accept: Optional[Callable[[str], bool]] = None,
+    cache: Optional[LLMResponseCache] = None,
+    **invoke_kwargs: Any
+) -> Any:
+    """
+    llm.ainvoke(messages) behind the response cache.
+
+    Args:
+        call_site: Policy name in CACHE_POLICIES; unknown call sites are not cached
+        semantic_text: The user query inside the prompt (enables semantic lookup
+                       when the call site's policy allows it)
+        accept: Optional validator; responses it rejects are returned but not cached
+
+    Returns:
+        The LLM message (an AIMessage rebuilt from the cached text on a hit)
+    """
+    cache = cache or get_llm_response_cache()
+    policy = CACHE_POLICIES.get(call_site)
+    if policy is None or not cache.enabled:
+        return await llm.ainvoke(messages, **invoke_kwargs)
+
+    model = getattr(llm, "model_name", None) or getattr(llm, "model", None) or "unknown"
+    prompt = _serialize_messages(messages)
+    key = cache.make_key(call_site, model, prompt)
+
+    content = cache.get_exact(key)
+    if content is not None:
+        cache.record(call_site, "exact_hits")
+        logger.info(f"🧠 LLM cache hit (exact): {call_site}")
+        return AIMessage(content=content)
+
+    scope, embedding = key, None
+    if policy.semantic and semantic_text:
+        scope = cache.make_scope(call_site, model, prompt, semantic_text)
+        embedding = await cache.embed(semantic_text)
+        if embedding is not None:
+            content = cache.get_semantic(scope, embedding)
+            if content is not None:
+                cache.record(call_site, "semantic_hits")
+                logger.info(f"🧠 LLM cache hit (semantic): {call_site}")
+                return AIMessage(content=content)
+
+    cache.record(call_site, "misses")
+    response = await llm.ainvoke(messages, **invoke_kwargs)
+
+    text = getattr(response, "content", None)
+    if isinstance(text, str) and text.strip() and (accept is None or accept(text)):
+        cache.store(key, text, call_site, scope, policy.ttl_seconds, embedding)
+    return response
+
+
+# =============================================================================
+# GLOBAL INSTANCE
+# =============================================================================
+
+_response_cache: Optional[LLMResponseCache] = None
+_cache_lock = threading.Lock()
+
+
+def get_llm_response_cache() -> LLMResponseCache:
+    """Get or create the LLM response cache singleton."""
+    global _response_cache
+    if _response_cache is None:
+        with _cache_lock:
+            if _response_cache is None:
+                _response_cache = LLMResponseCache(
+                    max_size=int(os.getenv("LLM_CACHE_MAX_SIZE", 2000)),
+                    similarity_threshold=float(os.getenv("LLM_CACHE_SIMILARITY", 0.95)),
+                    version=os.getenv("LLM_CACHE_VERSION", "1"),
+                    enabled=os.getenv("LLM_CACHE_ENABLED", "true").lower() != "false",
+                )
+                logger.info("🏗️ Initialized LLM response cache")
+    return _response_cache
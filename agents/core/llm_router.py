@@ -0,0 +1,290 @@
+"""
+🔀 Health-Aware LLM Router
+
+Chooses which backend model serves each LLM call instead of a blind round-robin.
+
+Architecture:
+- Every configured model (OPENWEBUI_MODELS / OPENWEBUI_MODEL / LITE_MODEL_NAME) is an endpoint
+- Per endpoint: EWMA latency, outstanding requests, consecutive failures
+- Selection: power-of-two-choices on (ewma_latency × (outstanding + 1))
+- Ejection after repeated failures, then a single half-open probe before recovery
+- Capability routing: "json" (native response_format) and "lite" (cheap classification model)
+
+Outcomes are reported through a LangChain callback (RouterCallbackHandler) attached by
+llm_factory.get_llm, or through LLMRouter.track() for raw OpenAI client calls.
+"""
+
+import logging
+import os
+import random
+import threading
+import time
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional, Set
+from uuid import UUID
+
+from langchain_core.callbacks import BaseCallbackHandler
+
+from agents.config.settings import settings
+
+logger = logging.getLogger(__name__)
+
+CAPABILITY_JSON = "json"
+CAPABILITY_LITE = "lite"
+
+
+@dataclass
+class Endpoint:
+    """Routing state for one backend model."""
+    model: str
+    capabilities: Set[str] = field(default_factory=set)
+    pooled: bool = True                  # False: serves only requests for its "lite" capability
+    ewma_latency: Optional[float] = None
+    outstanding: int = 0
+    consecutive_failures: int = 0
+    ejected_until: float = 0.0
+    probe_started: float = 0.0
+    requests: int = 0
+    errors: int = 0
+    ejections: int = 0
+
+    def score(self, default_latency: float) -> float:
+        latency = self.ewma_latency if self.ewma_latency is not None else default_latency
+        return latency * (self.outstanding + 1)
+
+    def to_dict(self, now: float) -> Dict[str, Any]:
+        if self.ejected_until > now:
+            state = "ejected"
+        elif self.ejected_until:
+            state = "half-open"
+        else:
+            state = "healthy"
+        return {
+            "model": self.model,
+            "capabilities": sorted(self.capabilities),
+            "pooled": self.pooled,
+            "state": state,
+            "ewma_latency_ms": round(self.ewma_latency * 1000, 1) if self.ewma_latency is not None else None,
+            "outstanding": self.outstanding,
+            "requests": self.requests,
+            "errors": self.errors,
+            "ejections": self.ejections,
+        }
+
+
+class LLMRouter:
+    """
+    Latency- and error-aware endpoint selection.
+
+    Usage:
+        router = get_llm_router()
+        endpoint = router.select(capability="lite")
+        with router.track(endpoint):
+            ...  # call endpoint.model
+    """
+
+    def __init__(
+        self,
+        endpoints: List[Endpoint],
+        ewma_alpha: float = 0.3,
+        failure_threshold: int = 3,
+        ejection_seconds: float = 30.0
+    ):
+        if not endpoints:
+            raise ValueError("LLMRouter requires at least one endpoint")
+        self.endpoints = {e.model: e for e in endpoints}
+        self.ewma_alpha = ewma_alpha
+        self.failure_threshold = failure_threshold
+        self.ejection_seconds = ejection_seconds
+        self._lock = threading.Lock()
+        self._rng = random.Random()
+
+    # =========================================================================
+    # SELECTION
+    # =========================================================================
+
+    def select(self, capability: Optional[str] = None) -> Endpoint:
+        """
+        Pick an endpoint for one request.
+
+        Endpoints with the capability are preferred; if none is available the
+        whole pool is used (e.g. JSON then relies on the prompt, "lite" on the main model).
+        A lite model configured outside the main pool is only used for "lite" requests.
+        """
+        with self._lock:
+            now = time.monotonic()
+            pool = [e for e in self.endpoints.values() if e.pooled] or list(self.endpoints.values())
+            if capability:
+                eligible = self.endpoints.values() if capability == CAPABILITY_LITE else pool
+                candidates = self._available([e for e in eligible if capability in e.capabilities], now)
+            else:
+                candidates = []
+            if not candidates:
+                candidates = self._available(pool, now)
+            if not candidates:
+                # Everything is ejected: least-recently-ejected endpoint is the best bet
+                candidates = [min(pool, key=lambda e: e.ejected_until)]
+
+            if len(candidates) == 1:
+                chosen = candidates[0]
+            else:
+                # Power of two choices
+                a, b = self._rng.sample(candidates, 2)
+                default = self._default_latency()
+                chosen = a if a.score(default) <= b.score(default) else b
+
+            if chosen.ejected_until and chosen.ejected_until <= now:
+                chosen.probe_started = now
+            return chosen
+
+    def _available(self, endpoints: List[Endpoint], now: float) -> List[Endpoint]:
+        available = []
+        for e in endpoints:
+            if e.ejected_until > now:
+                continue
+            if e.ejected_until and now - e.probe_started < self.ejection_seconds:
+                continue  # Half-open: one probe at a time (slot expires if never used)
+            available.append(e)
+        return available
+
+    def _default_latency(self) -> float:
+        known = [e.ewma_latency for e in self.endpoints.values() if e.ewma_latency is not None]
+        return sum(known) / len(known) if known else 1.0
+
+    def get_endpoint(self, model: str) -> Optional[Endpoint]:
+        return self.endpoints.get(model)
+
+    # =========================================================================
+    # OUTCOME TRACKING
+    # =========================================================================
+
+    def on_start(self, endpoint: Endpoint):
+        with self._lock:
+            endpoint.outstanding += 1
+            endpoint.requests += 1
+
+    def on_success(self, endpoint: Endpoint, latency: float):
+        with self._lock:
+            endpoint.outstanding = max(0, endpoint.outstanding - 1)
+            if endpoint.ewma_latency is None:
+                endpoint.ewma_latency = latency
+            else:
+                endpoint.ewma_latency = self.ewma_alpha * latency + (1 - self.ewma_alpha) * endpoint.ewma_latency
+            if endpoint.ejected_until:
+                logger.info(f"✅ LLM endpoint recovered: {endpoint.model}")
+            endpoint.consecutive_failures = 0
+            endpoint.ejected_until = 0.0
+            endpoint.probe_started = 0.0
+
+    def on_failure(self, endpoint: Endpoint, error: Optional[BaseException] = None):
+        with self._lock:
+            endpoint.outstanding = max(0, endpoint.outstanding - 1)
+            endpoint.errors += 1
+            endpoint.consecutive_failures += 1
+            if endpoint.ejected_until or endpoint.consecutive_failures >= self.failure_threshold:
+                endpoint.ejected_until = time.monotonic() + self.ejection_seconds
+                endpoint.ejections += 1
+                logger.warning(
+                    f"⚠️ Ejecting LLM endpoint {endpoint.model} for {self.ejection_seconds}s "
+                    f"after {endpoint.consecutive_failures} failures: {error}"
+                )
+            endpoint.probe_started = 0.0
+
+    @contextmanager
+    def track(self, endpoint: Endpoint):
+        """Track a raw (non-LangChain) call against an endpoint."""
+        self.on_start(endpoint)
+        start = time.perf_counter()
+        try:
+            yield endpoint
+        except BaseException as e:
+            self.on_failure(endpoint, e)
+            raise
+        self.on_success(endpoint, time.perf_counter() - start)
+
+    def get_stats(self) -> Dict[str, Any]:
+        with self._lock:
+            now = time.monotonic()
+            return {"endpoints": [e.to_dict(now) for e in self.endpoints.values()]}
+
+
+class RouterCallbackHandler(BaseCallbackHandler):
+    """Feeds LangChain run outcomes back into the router (one handler per LLM instance)."""
+
+    def __init__(self, router: LLMRouter, endpoint: Endpoint):
+        self.router = router
+        self.endpoint = endpoint
+        self._started: Dict[UUID, float] = {}
+
+    def _start(self, run_id: UUID):
+        self._started[run_id] = time.perf_counter()
+        self.router.on_start(self.endpoint)
+
+    def on_chat_model_start(self, serialized: Dict[str, Any], messages: List[Any], *, run_id: UUID, **kwargs: Any):
+        self._start(run_id)
+
+    def on_llm_start(self, serialized: Dict[str, Any], prompts: List[str], *, run_id: UUID, **kwargs: Any):
+        self._start(run_id)
+
+    def on_llm_end(self, response: Any, *, run_id: UUID, **kwargs: Any):
+        started = self._started.pop(run_id, None)
+        if started is not None:
+            self.router.on_success(self.endpoint, time.perf_counter() - started)
+
+    def on_llm_error(self, error: BaseException, *, run_id: UUID, **kwargs: Any):
+        if self._started.pop(run_id, None) is not None:
+            self.router.on_failure(self.endpoint, error)
+
+
+# =============================================================================
+# CONFIGURATION
+# =============================================================================
+
+def _is_native_json_model(model: str) -> bool:
+    return "gpt-" in model or "o1-" in model
+
+
+def build_endpoints() -> List[Endpoint]:
+    """
+    Build endpoints from settings.
+
+    - OPENWEBUI_MODELS (or OPENWEBUI_MODEL): main pool
+    - LITE_MODEL_NAME: "lite" endpoint, only when explicitly configured or already in the pool;
+      outside the pool it serves "lite" requests only
+    - LLM_JSON_MODELS: extra models that accept response_format=json_object
+    """
+    models_str = settings.openwebui_models or settings.openwebui_model
+    models = [m.strip() for m in models_str.split(",") if m.strip()]
+    json_models = {m.strip() for m in os.getenv("LLM_JSON_MODELS", "").split(",") if m.strip()}
+
+    endpoints: Dict[str, Endpoint] = {}
+    for model in models:
+        caps = {CAPABILITY_JSON} if (_is_native_json_model(model) or model in json_models) else set()
+        endpoints[model] = Endpoint(model=model, capabilities=caps)
+
+    lite = settings.lite_model_name
+    if lite and (lite in endpoints or os.getenv("LITE_MODEL_NAME")):
+        endpoint = endpoints.setdefault(lite, Endpoint(model=lite, pooled=False))
+        endpoint.capabilities.add(CAPABILITY_LITE)
+        if _is_native_json_model(lite) or lite in json_models:
+            endpoint.capabilities.add(CAPABILITY_JSON)
+
+    return list(endpoints.values())
+
+
+_router: Optional[LLMRouter] = None
+
+
+def get_llm_router() -> LLMRouter:
+    """Get or create the LLM router singleton."""
+    global _router
+    if _router is None:
+        _router = LLMRouter(
+            build_endpoints(),
+            ewma_alpha=float(os.getenv("LLM_ROUTER_EWMA_ALPHA", 0.3)),
+            failure_threshold=int(os.getenv("LLM_ROUTER_FAILURE_THRESHOLD", 3)),
+            ejection_seconds=float(os.getenv("LLM_ROUTER_EJECTION_SECONDS", 30)),
+        )
+        logger.info(f"🔀 LLM router initialized with {list(_router.endpoints)}")
+    return _router
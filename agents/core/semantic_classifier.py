@@ -10,6 +10,7 @@ import re
 import logging
 from typing import Dict, Any
 from langchain_core.messages import SystemMessage
+from agents.core.llm_response_cache import cached_ainvoke
 
 logger = logging.getLogger(__name__)
 
@@ -200,7 +201,12 @@ async def _classify_complexity_semantic(
     
     try:
         response = await asyncio.wait_for(
-            llm.ainvoke([SystemMessage(content=prompt)]),
+            cached_ainvoke(
+                llm, [SystemMessage(content=prompt)],
+                call_site="complexity_classification",
+                semantic_text=query,
+                accept=lambda text: '"complexity"' in text
+            ),
             timeout=5  # Fast classification (5s max)
         )
         
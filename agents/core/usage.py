@@ -56,6 +56,10 @@ class UsageManager:
                 "p_words": total_words
             }).execute()
             
+            # 3. Keep the cached subscription snapshot in step with the counter
+            from api.cache.subscription_cache import get_subscription_cache
+            await get_subscription_cache().apply_delta(lawyer_id, "words_used_this_month", total_words)
+            
             logger.info(f"📉 Tracked usage for {lawyer_id}: {total_words} words ({request_type})")
             
         except Exception as e:
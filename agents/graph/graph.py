@@ -7,6 +7,7 @@ from .nodes.drafter_v2 import drafter_v2_node  # ✅ V2: Structured + Validated
 from .nodes.judge import judge_node
 from .nodes.deep_research import deep_research_node
 from .nodes.gatekeeper import gatekeeper_node, fast_track_node
+from .nodes.article_lookup import article_lookup_node
 from .subgraphs.admin_ops import admin_ops_node
 from .nodes.reflector import reflect_node
 from ..tools.legal_blackboard_tool import LegalBlackboardTool
@@ -26,11 +27,21 @@ def route_gatekeeper_output(state: AgentState):
     
     if next_agent == "fast_track":
         return "fast_track"
+    elif next_agent == "article_lookup":
+        return "article_lookup"
     elif next_agent == "admin_ops":
         return "admin_ops"
     # Default to Judge for everything else
     return "judge"
 
+def route_article_lookup_output(state: AgentState):
+    """
+    Article fast path answered -> END, otherwise (law / article not found) -> Judge.
+    """
+    if state.get("next_agent") == "end":
+        return END
+    return "judge"
+
 def route_judge_output(state: AgentState):
     """
     Determines where to go after the General Counsel (Judge) speaks.
@@ -154,6 +165,7 @@ def define_graph():
     # --- Nodes ---
     workflow.add_node("gatekeeper", gatekeeper_node)
     workflow.add_node("fast_track", fast_track_node)
+    workflow.add_node("article_lookup", article_lookup_node) # ⚡ Deterministic article retrieval
     workflow.add_node("judge", judge_node)
     workflow.add_node("admin_ops", admin_ops_node)
     workflow.add_node("deep_research", deep_research_node) # The Scout
@@ -165,12 +177,13 @@ def define_graph():
     # 0. Entry Point: Gatekeeper
     workflow.set_entry_point("gatekeeper")
     
-    # 1. From Gatekeeper -> (Fast Track | Judge)
+    # 1. From Gatekeeper -> (Fast Track | Article Lookup | Judge)
     workflow.add_conditional_edges(
         "gatekeeper",
         route_gatekeeper_output,
         {
             "fast_track": "fast_track",
+            "article_lookup": "article_lookup",
             "judge": "judge",
             "admin_ops": "admin_ops"
         }
@@ -179,6 +192,16 @@ def define_graph():
     # 1.a Fast Track -> END
     workflow.add_edge("fast_track", END)
     
+    # 1.b Article Lookup -> (END | Judge)
+    workflow.add_conditional_edges(
+        "article_lookup",
+        route_article_lookup_output,
+        {
+            "judge": "judge",
+            END: END
+        }
+    )
+    
     # 2. From Judge -> (Reflect | Admin | Council | End)
     workflow.add_conditional_edges(
         "judge",
@@ -0,0 +1,160 @@
+"""
+⚡ Article Fast Path
+مسار مباشر لطلبات نص المادة: "ما نص المادة 368 من نظام المعاملات المدنية"
+
+For these requests the article numbers and the law are fully determined by the
+citation regexes plus LawIdentifierTool, so the gatekeeper LLM, judge,
+investigator, research planning, scout and sniper are all skipped:
+
+1. detect_article_request(): regex only, runs in the gatekeeper before the LLM.
+   It accepts pure lookups only: besides the article reference and the law
+   name, the request may contain only request / filler words. "اشرح المادة 77"
+   or "هل تنطبق المادة 77 على ..." still take the full route.
+2. article_lookup_node(): resolves the law (high confidence only) and seeks
+   (source_id, article_no) (agents/knowledge/article_index.py). It then reads
+   the N±1 neighbours in one round trip
+   (agents/knowledge/chunk_neighborhood.py) and answers with the source text,
+   flagged VERIFIED_SOURCE as in the HCF protocol.
+
+Any miss (law not resolved, any requested article not indexed) hands over to
+the judge: a partial answer is never flagged VERIFIED_SOURCE.
+"""
+
+import asyncio
+import logging
+import os
+import re
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional
+
+from agents.knowledge.article_index import get_article_index
+from agents.knowledge.chunk_neighborhood import get_neighborhood_fetcher
+from agents.utils.legal_patterns import ordinal_to_number, parse_article_number
+from ..state import AgentState
+
+logger = logging.getLogger(__name__)
+
+# LawIdentifierTool confidence needed to answer without the research pipeline
+LAW_CONFIDENCE = float(os.getenv("ARTICLE_FAST_PATH_CONFIDENCE", 0.85))
+MAX_ARTICLES = 10
+
+# Words a pure "show me the text" request may contain
+REQUEST_WORDS = {
+    "ما", "ماذا", "هو", "هي", "نص", "النص", "اعرض", "أعرض", "اعطني", "أعطني", "هات", "اذكر", "أذكر",
+    "اريد", "أريد", "ابغى", "أبغى", "ممكن", "لو", "سمحت", "فضلك", "تقول", "يقول", "نصت", "عليه",
+    "المادة", "مادة", "الماده", "ماده", "المواد", "رقم", "من", "في", "حسب", "وفق", "وفقا", "وفقاً",
+    "نظام", "النظام", "قانون", "القانون", "إلى", "الى", "حتى", "و", "عن", "بعد",
+    "what", "does", "say", "show", "text", "of", "the", "article", "articles", "in", "to", "law",
+}
+
+
+def _search_tool():
+    """The research node's HybridSearchTool (citation patterns + LawIdentifierTool and its cache)"""
+    from .deep_research import hybrid_search
+    return hybrid_search
+
+
+@dataclass
+class ArticleRequest:
+    articles: List[int]
+    law_query: str
+
+
+def detect_article_request(text: str) -> Optional[ArticleRequest]:
+    """Article number(s) + one law name and nothing else to reason about, or None"""
+    # The law-name pattern stops at whitespace / "،" / "." only: drop a trailing "؟"
+    text = (text or "").strip().rstrip("؟?!. ")
+    if not text:
+        return None
+    entities = _search_tool()._extract_legal_entities(text)
+    articles = list(entities.get("articles") or [])
+    if not articles:
+        spelled = parse_article_number(text)
+        articles = [spelled] if spelled else []
+    laws = entities.get("laws") or []
+    if not articles or len(articles) > MAX_ARTICLES or len(laws) != 1:
+        return None
+
+    residual = text.replace(laws[0], " ")
+    for token in re.findall(r"[\w\u0600-\u06FF]+", residual):
+        if token.isdigit() or token.lower() in REQUEST_WORDS:
+            continue
+        if ordinal_to_number(token[1:] if token.startswith("و") else token):
+            continue
+        return None
+    return ArticleRequest(articles=articles, law_query=laws[0])
+
+
+def _format_response(law_title: str, chunks: List[Dict[str, Any]], neighbors: List[Dict[str, Any]]) -> str:
+    parts = [f"📜 **{law_title}**"]
+    for chunk in chunks:
+        heading = chunk.get("hierarchy_path") or f"المادة {chunk.get('article_no')}"
+        parts.append(f"**{heading}**\n{(chunk.get('content') or '').strip()}")
+
+    if neighbors:
+        context = [
+            f"- {c.get('hierarchy_path') or 'مادة مجاورة'}: {(c.get('content') or '').strip()[:400]}"
+            for c in neighbors
+        ]
+        parts.append("📎 **المواد المجاورة:**\n" + "\n".join(context))
+
+    parts.append("✅ النص منقول حرفياً من المصدر الرسمي المخزن.")
+    return "\n\n".join(parts)
+
+
+def _fallback(reason: str) -> Dict[str, Any]:
+    logger.info(f"↪️ Article fast path declined ({reason}) -> Judge")
+    return {"intent": "LEGAL_TASK", "next_agent": "judge"}
+
+
+async def article_lookup_node(state: AgentState) -> Dict[str, Any]:
+    """Deterministic article retrieval (no LLM calls)"""
+    user_input = state.get("input", "").strip()
+    request = detect_article_request(user_input)
+    if request is None:
+        return _fallback("not a pure article request")
+
+    user_context = (state.get("context") or {}).get("user_context", {})
+    try:
+        law_result = await asyncio.to_thread(
+            _search_tool().law_identifier.run,
+            law_query=request.law_query,
+            country_id=user_context.get("country_id"),
+            min_confidence=LAW_CONFIDENCE
+        )
+        if not law_result.success:
+            return _fallback(f"law '{request.law_query}' not resolved")
+        law = law_result.data["best_match"]
+
+        chunks = await asyncio.to_thread(get_article_index().lookup, law["source_id"], request.articles)
+        found = sorted({c.get("article_no") for c in chunks if c.get("article_no") is not None})
+        missing = [n for n in request.articles if n not in found]
+        if missing:
+            return _fallback(f"articles {missing} not indexed")
+
+        ids = {c["id"] for c in chunks}
+        windows = await asyncio.to_thread(get_neighborhood_fetcher().windows, list(ids))
+    except Exception as e:
+        logger.warning(f"⚠️ Article fast path failed: {e}")
+        return _fallback("lookup error")
+
+    neighbors = {c["id"]: c for window in windows for c in window if c["id"] not in ids}
+    neighbors = sorted(neighbors.values(), key=lambda c: c.get("sequence_number") or 0)
+
+    logger.info(
+        f"⚡ Article fast path: {law['official_title']} {request.articles} "
+        f"({len(chunks)} chunks, {len(neighbors)} neighbours)"
+    )
+    return {
+        "intent": "ARTICLE_LOOKUP",
+        "next_agent": "end",
+        "conversation_stage": "COMPLETED",
+        "research_results": chunks + neighbors,
+        "final_response": _format_response(law["official_title"], chunks, neighbors),
+        "hcf_details": {
+            "selected_path": "DIRECT",
+            "verification_status": "VERIFIED_SOURCE",
+            "confidence_score": law.get("confidence"),
+            "citations": [f"المادة {n}" for n in found] + [law["official_title"]]
+        }
+    }
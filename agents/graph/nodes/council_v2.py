@@ -19,6 +19,7 @@ from langchain_core.messages import SystemMessage
 from ..state import AgentState
 from ...prompts.council_v2_prompts import COUNCIL_V2_COT_PROMPT
 from agents.core.llm_factory import get_llm
+from agents.core.context_packer import PackedContext, pack_passages, pack_json
 from ...tools.legal_blackboard_tool import LegalBlackboardTool
 
 logger = logging.getLogger(__name__)
@@ -69,13 +70,15 @@ async def council_v2_node(state: AgentState) -> Dict[str, Any]:
         original_request = state.get("input", "")
         facts = {"user_request": original_request}
     
-    # Format research results
-    research_text = _format_research(research)
-    facts_text = json.dumps(facts, ensure_ascii=False, indent=2)
+    # Format research results (token-budgeted: keeps the prompt well inside COUNCIL_TIMEOUT)
+    research_packed = _format_research(research)
+    facts_packed = pack_json(facts, node="council_facts")
+    research_text = research_packed.text
+    facts_text = facts_packed.text
     
     logger.info(f"📊 Context prepared:")
-    logger.info(f"  • Facts: {len(facts_text)} chars")
-    logger.info(f"  • Research: {len(research_text)} chars")
+    logger.info(f"  • Facts: {facts_packed.tokens} tokens")
+    logger.info(f"  • Research: {research_packed.tokens} tokens ({research_packed.included} passages)")
     
     # 5. Execute CoT Analysis
     logger.info("🧠 Invoking Council V2 with Chain-of-Thought...")
@@ -195,27 +198,29 @@ async def council_v2_node(state: AgentState) -> Dict[str, Any]:
     }
 
 
-def _format_research(research: Dict) -> str:
-    """تنسيق نتائج البحث بشكل قابل للقراءة"""
+def _format_research(research: Dict) -> PackedContext:
+    """تنسيق نتائج البحث بشكل قابل للقراءة ضمن ميزانية التوكنز"""
     
     if not research or not research.get("results"):
-        return "لا تتوفر نتائج بحث قانوني."
+        return pack_passages([], node="council_research", empty_text="لا تتوفر نتائج بحث قانوني.")
     
-    formatted = []
-    
-    for i, result in enumerate(research.get("results", [])[:5], 1):
-        content = result.get("content", "")[:500]
+    def render(i: int, result: Dict, content: str) -> str:
         source_info = result.get("hierarchy_path", "مصدر غير محدد")
-        
-        formatted.append(f"""
+        return f"""
 ### [{i}] {source_info}
 
-{content}...
+{content}
 
 ---
-""")
+"""
     
-    return "\n".join(formatted)
+    return pack_passages(
+        research.get("results", []),
+        node="council_research",
+        render=render,
+        separator="\n",
+        max_passage_tokens=250
+    )
 
 
 # ==================== EXPORT ====================
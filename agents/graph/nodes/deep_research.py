@@ -6,9 +6,12 @@ from datetime import datetime
 from langchain_core.messages import SystemMessage, HumanMessage
 from ..state import AgentState
 from ...tools.hybrid_search_tool import HybridSearchTool
-from ...tools.fetch_tools import GetRelatedDocumentTool, FlexibleSearchTool
+from ...tools.fetch_tools import GetRelatedDocumentTool
+from ...tools.lookup_tools import LookupPrincipleTool
 from ...config.database import db
 from agents.core.llm_factory import get_llm
+from agents.core.llm_response_cache import cached_ainvoke
+from agents.core.context_packer import pack_passages
 import logging
 
 from ...tools.legal_blackboard_tool import LegalBlackboardTool
@@ -28,7 +31,7 @@ logger = logging.getLogger(__name__)
 hybrid_search = HybridSearchTool()
 blackboard = LegalBlackboardTool()
 doc_tool = GetRelatedDocumentTool()
-principle_search = FlexibleSearchTool()
+principle_search = LookupPrincipleTool()
 
 # ✅ Phase 1: Initialize context managers
 context_state_manager = ConversationStateManager(max_history_messages=5)
@@ -221,8 +224,12 @@ async def deep_research_node(state: AgentState) -> Dict[str, Any]:
         # ✅ FIX: HCF PROTOCOL (Honor Constraint Framework)
         # Replaces simple summary with 3-Phase Verification Loop
         
-        # 1. Prepare Context (Full Chapter)
-        full_context_str = str(results) # Current Context Window is large enough (128k+)
+        # 1. Prepare Context (ranked, de-duplicated, token-budgeted)
+        full_context_str = pack_passages(
+            results,
+            node="hcf_context",
+            render=lambda i, r, text: f"[{i}] ({r.get('hierarchy_path') or r.get('source') or 'مصدر غير محدد'})\n{text}"
+        ).text
         
         # 2. Prepare Prompt
         # We use temperature=0.3 to allow "Divergent Generation" (Phase 1)
@@ -349,11 +356,16 @@ async def _execute_search_logic(state, facts, query) -> Dict[str, Any]:
     enriched_query_obj = None
     
     try:
-        # Extract conversation context from history
-        conversation_context = context_state_manager.extract_context_from_history(
-            chat_history=chat_history,
-            current_query=query
-        )
+        # Running session context (ChatService folds each message in when saving it,
+        # including this query); a history scan only when it is not available
+        session_context = state.get("context", {}).get("conversation_context")
+        if session_context:
+            conversation_context = ConversationContext.from_dict(session_context)
+        else:
+            conversation_context = context_state_manager.extract_context_from_history(
+                chat_history=chat_history,
+                current_query=query
+            )
         
         # Check if query is ambiguous and needs enrichment
         if context_enrichment_layer.is_ambiguous(query):
@@ -374,9 +386,9 @@ async def _execute_search_logic(state, facts, query) -> Dict[str, Any]:
             if enriched_query_obj.requires_clarification and enriched_query_obj.confidence < 0.4:
                 logger.warning(f"⚠️ Low confidence enrichment - may need user clarification")
         
-        # Save context to blackboard for persistence
+        # Save context to blackboard for persistence (already stored on the session otherwise)
         session_id = state.get("session_id") or "unknown_session"
-        if not conversation_context.is_empty():
+        if not session_context and not conversation_context.is_empty():
             context_state_manager.save_context_to_blackboard(
                 context=conversation_context,
                 session_id=session_id,
@@ -391,7 +403,7 @@ async def _execute_search_logic(state, facts, query) -> Dict[str, Any]:
     # =========================================================================
     # 1. Plan Queries (Keyword Extraction)
     # =========================================================================
-    llm = get_llm(temperature=0.3, json_mode=False)
+    llm = get_llm(temperature=0.0, json_mode=False)
     
     # Format inputs
     facts_list = facts.get("structured_facts", {}) if isinstance(facts, dict) else {}
@@ -417,7 +429,11 @@ async def _execute_search_logic(state, facts, query) -> Dict[str, Any]:
     final_country_id = None
     
     try:
-        response = await llm.ainvoke([SystemMessage(content=prompt)])
+        response = await cached_ainvoke(
+            llm, [SystemMessage(content=prompt)],
+            call_site="research_planning",
+            accept=lambda text: '"queries"' in text
+        )
         content = response.content.strip()
         
         # Robust JSON Extraction
@@ -485,7 +501,21 @@ async def _execute_search_logic(state, facts, query) -> Dict[str, Any]:
     seen_ids = set(r.get("id") for r in flat_results)
     
     # Only expand the TOP 3 most relevant results to save tokens/time
-    for item in flat_results[:3]: 
+    top_results = flat_results[:3]
+    
+    # Fetch every neighbourhood in one round trip; read_tool then reads them from the LRU
+    expand_ids = [
+        item.get("id") for item in top_results
+        if item.get("id") and (item.get("metadata") or {}).get("sequence_number") is not None
+    ]
+    if expand_ids:
+        from ...knowledge.chunk_neighborhood import get_neighborhood_fetcher
+        try:
+            await asyncio.to_thread(get_neighborhood_fetcher().windows, expand_ids)
+        except Exception as e:
+            logger.warning(f"⚠️ Batched neighbourhood prefetch failed: {e}")
+    
+    for item in top_results: 
         item_id = item.get("id")
         meta = item.get("metadata", {}) or {}
         
@@ -506,24 +536,30 @@ async def _execute_search_logic(state, facts, query) -> Dict[str, Any]:
                      item["metadata"]["context_type"] = "neighborhood_n1_p1"
                      logger.info(f"📖 Auto-Expanded Doc {item_id}: Loaded Neighborhood (Prev/Next)")
 
-    # 4. Legal Principles (Flexible Search) - Keep this enrichment
+    # 4. Legal Principles (thought_templates vector index) - Keep this enrichment
     # We use the generated queries from step 1 for this, as they might catch principles
-    async def run_principle_search(q):
-        res = principle_search.run(query=q, tables=["thought_templates"], limit=2, method="any")
-        return res.data if res.success else []
-
-    p_tasks = [run_principle_search(q) for q in queries[:2]]
-    p_results_list = await asyncio.gather(*p_tasks)
+    # One batched embedding request, parallel vector lookups, deduplicated by id
+    try:
+        principles = await principle_search.search_many(queries[:2], limit=2)
+    except Exception as e:
+        logger.warning(f"⚠️ Principle search failed: {e}")
+        principles = []
     
-    for sublist in p_results_list:
-        for item in sublist:
-            if isinstance(item, dict):
-                 item["metadata"]["type"] = "principle"
-                 item["content"] = f"__LEGAL_PRINCIPLE__:\n{item['content']}"
-                 identifier = item["content"][:50]
-                 if identifier not in seen_ids:
-                     flat_results.append(item)
-                     seen_ids.add(identifier)
+    for principle in principles:
+        item = {
+            "id": principle["id"],
+            "content": f"__LEGAL_PRINCIPLE__:\n{principle.get('principle_text') or ''}",
+            "metadata": {
+                "type": "principle",
+                "principle_type": principle.get("type"),
+                "confidence": principle.get("confidence"),
+                "similarity": principle.get("similarity")
+            }
+        }
+        identifier = item["content"][:50]
+        if identifier not in seen_ids:
+            flat_results.append(item)
+            seen_ids.add(identifier)
 
     # 5. Format Output for Blackboard
     return {
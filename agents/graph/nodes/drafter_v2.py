@@ -18,6 +18,7 @@ from langchain_core.messages import SystemMessage
 
 from .. state import AgentState
 from agents.core.llm_factory import get_llm
+from agents.core.context_packer import pack_passages, pack_json
 from ...tools.legal_blackboard_tool import LegalBlackboardTool
 
 logger = logging.getLogger(__name__)
@@ -263,9 +264,13 @@ async def drafter_v2_node(state: AgentState) -> Dict[str, Any]:
     research = current_board.get("research_data", {})
     
     facts_text = json.dumps(facts, ensure_ascii=False, indent=2)
-    research_text = _format_research(research)
+    research_text = _format_research(research, node="drafter_plan_research")
     strategy_text = json.dumps(strategy, ensure_ascii=False, indent=2)
     
+    # Section calls repeat strategy + research for every section: pack them once, smaller
+    section_strategy = pack_json(strategy, node="drafter_section_strategy").text
+    section_research = _format_research(research, node="drafter_section_research")
+    
     # Prepare lawyer context
     user_context = state.get("context", {}).get("user_context", {})
     lawyer_name = user_context.get("full_name", "المحامي")
@@ -288,8 +293,8 @@ async def drafter_v2_node(state: AgentState) -> Dict[str, Any]:
     
     sections_content = await _write_sections(
         plan.get("sections", []),
-        strategy_text,
-        research_text,
+        section_strategy,
+        section_research,
         lawyer_name,
         user_country_id
     )
@@ -537,19 +542,18 @@ def _extract_json_from_response(content: str) -> str:
     return content
 
 
-def _format_research(research: Dict) -> str:
-    """Format research"""
+def _format_research(research: Dict, node: str) -> str:
+    """Format research (token-budgeted per node)"""
     
     if not research or not research.get("results"):
         return "لا تتوفر نتائج بحث."
     
-    formatted = []
-    
-    for i, r in enumerate(research.get("results", [])[:3], 1):
-        content = r.get("content", "")[:300]
-        formatted.append(f"[{i}] {content}...")
-    
-    return "\n\n".join(formatted)
+    return pack_passages(
+        research.get("results", []),
+        node=node,
+        max_passage_tokens=150,
+        empty_text="لا تتوفر نتائج بحث."
+    ).text
 
 
 # ==================== EXPORT ====================
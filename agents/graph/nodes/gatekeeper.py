@@ -3,7 +3,9 @@ import logging
 from typing import Dict, Any
 from langchain_core.messages import SystemMessage, HumanMessage
 from agents.core.llm_factory import get_llm
+from agents.core.llm_response_cache import cached_ainvoke
 from ..state import AgentState
+from .article_lookup import detect_article_request
 
 # Configure logging
 logger = logging.getLogger(__name__)
@@ -44,24 +46,32 @@ Rules:
 - If unsure between Admin Action and Query, prefer ACTION (Safety checks handle it later).
 """
 
+VALID_INTENTS = ("ADMIN_ACTION", "ADMIN_QUERY", "LEGAL_QUERY", "GREETING", "COMPLEX")
+
 async def _classify_with_llm(user_input: str) -> str:
     """Use Fast LLM to classify intent."""
     try:
-        # Use temperature=0 for consistent classification
-        llm = get_llm(temperature=0.0, json_mode=False)
+        # Use temperature=0 for consistent classification (cheap "lite" endpoint when configured)
+        llm = get_llm(temperature=0.0, json_mode=False, capability="lite")
         
         messages = [
             SystemMessage(content=GATEKEEPER_SYSTEM_PROMPT),
             HumanMessage(content=user_input)
         ]
         
-        # Tags for observability
-        response = await llm.ainvoke(messages, config={"tags": ["gatekeeper_classification"]})
+        # Tags for observability; repeat / near-duplicate questions are served from the response cache
+        response = await cached_ainvoke(
+            llm, messages,
+            call_site="gatekeeper_classification",
+            semantic_text=user_input,
+            # Odd outputs are still mapped below, but never cached
+            accept=lambda text: text.strip().upper() in VALID_INTENTS,
+            config={"tags": ["gatekeeper_classification"]}
+        )
         intent = response.content.strip().upper()
         
         # Validation
-        valid_intents = ["ADMIN_ACTION", "ADMIN_QUERY", "LEGAL_QUERY", "GREETING", "COMPLEX"]
-        if intent not in valid_intents:
+        if intent not in VALID_INTENTS:
             # Fallback for weird LLM outputs
             if "ADMIN" in intent: return "ADMIN_QUERY"
             if "LEGAL" in intent: return "LEGAL_QUERY"
@@ -87,12 +97,23 @@ async def gatekeeper_node(state: AgentState) -> Dict[str, Any]:
             logger.info("⚡ Gatekeeper: GREETING detected (Regex) -> Fast Track")
             return {"intent": "GREETING", "next_agent": "fast_track"}
 
-    # 2. Semantic Analysis (The Red Pill Solution)
+    # 2. Deterministic Article Lookup ("ما نص المادة 368 من نظام ...") -> no LLM at all
+    try:
+        is_article_request = detect_article_request(user_input) is not None
+    except Exception as e:
+        # Only a shortcut: never let it block the semantic classification
+        logger.warning(f"⚠️ Article fast path detection failed: {e}")
+        is_article_request = False
+    if is_article_request:
+        logger.info("⚡ Gatekeeper: Article lookup detected (Regex) -> Article Fast Path")
+        return {"intent": "ARTICLE_LOOKUP", "next_agent": "article_lookup"}
+
+    # 3. Semantic Analysis (The Red Pill Solution)
     # No more rigid regex lists. We ask the brain.
     intent = await _classify_with_llm(user_input)
     logger.info(f"🧠 Gatekeeper Semantic Classification: {intent}")
 
-    # 3. Routing Logic
+    # 4. Routing Logic
     if intent == "ADMIN_ACTION":
         # Direct route to Admin Ops (The "Adaptive Admin Agent" will handle extraction)
         return {
@@ -183,8 +183,8 @@ async def judge_node(state: AgentState) -> Dict[str, Any]:
     try:
         # ✅ PHASE 1 FIX: Use Semantic Classification Instead of Keywords
         
-        # 1. Get LLM for classification
-        llm = get_llm(temperature=0.0, json_mode=True)
+        # 1. Get LLM for classification (cheap "lite" endpoint when configured)
+        llm = get_llm(temperature=0.0, json_mode=True, capability="lite")
         
         # 2. Determine complexity using hybrid approach
         complexity = await determine_complexity_hybrid(
@@ -0,0 +1,525 @@
+"""
+Local ANN Index (IVF, memory-mapped)
+فهرس متجهات محلي تقريبي لتسريع البحث الدلالي بدلاً من استدعاء match_documents_v2 عبر HTTP
+
+- One partition per country_id: a country-filtered search only scans that country
+- IVF: vectors are clustered (spherical k-means) and stored sorted by list; a query
+  scans the ANN_NPROBE closest lists
+- Files are plain .npy opened with mmap, so every worker process shares the same pages
+- Each change writes a new generation directory and swaps CURRENT atomically;
+  readers notice the new generation and re-map it
+- refresh() appends re-embedded chunks (document_chunks.embedded_at) to a small
+  delta segment and tombstones their old vectors; the partition is rebuilt when
+  the delta grows past ANN_DELTA_REBUILD_RATIO
+- Deleted chunks are dropped when a partition is rebuilt (only ids still in
+  document_chunks are kept); until then search callers drop them when loading rows
+
+Usage:
+    python -m agents.knowledge.ann_index build
+    python -m agents.knowledge.ann_index refresh
+"""
+import asyncio
+import fcntl
+import json
+import logging
+import os
+import shutil
+import time
+from contextlib import contextmanager
+from datetime import datetime, timezone
+from typing import Any, Callable, Dict, Iterable, List, Optional, Set, Tuple
+
+import numpy as np
+
+from agents.config.settings import TableNames
+
+logger = logging.getLogger(__name__)
+
+ANN_INDEX_DIR = os.getenv("ANN_INDEX_DIR", "data/ann_index")
+DEFAULT_NPROBE = int(os.getenv("ANN_NPROBE", 16))
+DELTA_REBUILD_RATIO = float(os.getenv("ANN_DELTA_REBUILD_RATIO", 0.1))
+REFRESH_INTERVAL = int(os.getenv("ANN_REFRESH_SECONDS", 300))
+NO_COUNTRY = "_none"
+RELOAD_CHECK_SECONDS = 1.0
+_ID_DTYPE = "<U36"
+
+
+def _normalize(vectors: np.ndarray) -> np.ndarray:
+    vectors = np.asarray(vectors, dtype=np.float32)
+    norms = np.linalg.norm(vectors, axis=-1, keepdims=True)
+    return vectors / np.maximum(norms, 1e-12)
+
+
+def parse_embedding(value: Any) -> Optional[np.ndarray]:
+    """PostgREST returns pgvector columns as '[0.1,0.2,...]' strings"""
+    if value is None:
+        return None
+    if isinstance(value, str):
+        value = json.loads(value)
+    return np.asarray(value, dtype=np.float32)
+
+
+def spherical_kmeans(vectors: np.ndarray, nlist: int, iterations: int = 10,
+                     sample_size: int = 50_000, seed: int = 0) -> np.ndarray:
+    """Centroids on the unit sphere (cosine k-means), trained on a sample"""
+    rng = np.random.default_rng(seed)
+    sample = vectors if len(vectors) <= sample_size else vectors[rng.choice(len(vectors), sample_size, replace=False)]
+    centroids = sample[rng.choice(len(sample), nlist, replace=False)].copy()
+    for _ in range(iterations):
+        assign = np.argmax(sample @ centroids.T, axis=1)
+        sums = np.zeros_like(centroids)
+        np.add.at(sums, assign, sample)
+        empty = np.bincount(assign, minlength=nlist) == 0
+        # Empty lists are re-seeded from random points
+        sums[empty] = sample[rng.choice(len(sample), int(empty.sum()))]
+        centroids = _normalize(sums)
+    return centroids
+
+
+def _assign(vectors: np.ndarray, centroids: np.ndarray, block: int = 65_536) -> np.ndarray:
+    return np.concatenate([
+        np.argmax(vectors[i:i + block] @ centroids.T, axis=1) for i in range(0, len(vectors), block)
+    ]) if len(vectors) else np.zeros(0, dtype=np.int64)
+
+
+def default_nlist(count: int) -> int:
+    """~4·√n lists of at least 64 vectors; small partitions are scanned exactly"""
+    if count < 2048:
+        return 1
+    return int(min(4 * np.sqrt(count), count // 64))
+
+
+# =============================================================================
+# PARTITION (one country, one generation)
+# =============================================================================
+
+class IVFPartition:
+    """Read side of one partition generation (all arrays memory-mapped)"""
+
+    FILES = ("centroids", "offsets", "vectors", "ids", "delta_vectors", "delta_ids", "tombstones")
+
+    def __init__(self, path: str):
+        self.path = path
+        arrays = {name: np.load(os.path.join(path, f"{name}.npy"), mmap_mode="r") for name in self.FILES}
+        self.centroids = np.asarray(arrays["centroids"], dtype=np.float32)
+        self.offsets = np.asarray(arrays["offsets"])
+        self.vectors = arrays["vectors"]
+        self.ids = arrays["ids"]
+        self.delta_vectors = arrays["delta_vectors"]
+        self.delta_ids = arrays["delta_ids"]
+        self.tombstones = set(arrays["tombstones"].tolist())
+
+    @property
+    def size(self) -> int:
+        return len(self.ids) - len(self.tombstones) + len(self.delta_ids)
+
+    def search(self, query: np.ndarray, k: int, nprobe: int) -> List[Tuple[str, float]]:
+        nlist = len(self.centroids)
+        lists = np.arange(nlist) if nprobe >= nlist else np.argpartition(-(self.centroids @ query), nprobe)[:nprobe]
+
+        candidates, positions = [], []
+        for lst in lists:
+            start, end = int(self.offsets[lst]), int(self.offsets[lst + 1])
+            if end > start:
+                candidates.append(np.asarray(self.vectors[start:end], dtype=np.float32) @ query)
+                positions.append(np.arange(start, end))
+
+        hits: List[Tuple[str, float]] = []
+        if candidates:
+            scores, index = np.concatenate(candidates), np.concatenate(positions)
+            take = min(len(scores), k + len(self.tombstones))
+            top = np.argpartition(-scores, take - 1)[:take]
+            hits.extend(
+                (str(self.ids[index[i]]), float(scores[i])) for i in top
+                if str(self.ids[index[i]]) not in self.tombstones
+            )
+
+        if len(self.delta_ids):
+            scores = np.asarray(self.delta_vectors, dtype=np.float32) @ query
+            top = np.argsort(-scores)[:k]
+            hits.extend((str(self.delta_ids[i]), float(scores[i])) for i in top)
+
+        hits.sort(key=lambda hit: hit[1], reverse=True)
+        return hits[:k]
+
+
+def _current_generation(partition_dir: str) -> Optional[str]:
+    try:
+        with open(os.path.join(partition_dir, "CURRENT")) as f:
+            return os.path.join(partition_dir, f.read().strip())
+    except FileNotFoundError:
+        return None
+
+
+def _publish(partition_dir: str, arrays: Dict[str, np.ndarray], reuse_from: Optional[str] = None):
+    """Write a new generation and point CURRENT at it (readers never see a half-written index)"""
+    generation = f"gen-{time.time_ns()}"
+    path = os.path.join(partition_dir, generation)
+    os.makedirs(path)
+    for name in IVFPartition.FILES:
+        target = os.path.join(path, f"{name}.npy")
+        if name in arrays:
+            np.save(target, arrays[name])
+        else:
+            # Unchanged base files are hard-linked, not copied
+            os.link(os.path.join(reuse_from, f"{name}.npy"), target)
+
+    pointer = os.path.join(partition_dir, "CURRENT.tmp")
+    with open(pointer, "w") as f:
+        f.write(generation)
+    os.replace(pointer, os.path.join(partition_dir, "CURRENT"))
+
+    # Keep the previous generation for readers that have not re-mapped yet
+    generations = sorted(d for d in os.listdir(partition_dir) if d.startswith("gen-"))
+    for old in generations[:-2]:
+        shutil.rmtree(os.path.join(partition_dir, old), ignore_errors=True)
+
+
+def build_partition(partition_dir: str, ids: List[str], vectors: np.ndarray,
+                    nlist: Optional[int] = None, seed: int = 0):
+    """Cluster and write a full partition"""
+    os.makedirs(partition_dir, exist_ok=True)
+    vectors = _normalize(vectors)
+    dim = vectors.shape[1] if len(vectors) else 0
+    nlist = max(1, min(nlist or default_nlist(len(vectors)), max(1, len(vectors))))
+
+    if nlist > 1:
+        centroids = spherical_kmeans(vectors, nlist, seed=seed)
+        assign = _assign(vectors, centroids)
+    else:
+        # A single list is scanned exactly; its centroid is never compared
+        centroids = np.zeros((1, dim), dtype=np.float32)
+        assign = np.zeros(len(vectors), dtype=np.int64)
+    order = np.argsort(assign, kind="stable")
+    offsets = np.concatenate([[0], np.cumsum(np.bincount(assign, minlength=nlist))]).astype(np.int64)
+
+    _publish(partition_dir, {
+        "centroids": centroids.astype(np.float32),
+        "offsets": offsets,
+        "vectors": vectors[order].astype(np.float16),
+        "ids": np.asarray(ids, dtype=_ID_DTYPE)[order],
+        "delta_vectors": np.zeros((0, dim), dtype=np.float16),
+        "delta_ids": np.zeros(0, dtype=_ID_DTYPE),
+        "tombstones": np.zeros(0, dtype=_ID_DTYPE)
+    })
+
+
+def update_partition(partition_dir: str, ids: List[str], vectors: np.ndarray,
+                     rebuild_ratio: float = DELTA_REBUILD_RATIO,
+                     live_ids: Optional[Callable[[], Set[str]]] = None) -> str:
+    """
+    Add / replace vectors in a partition.
+
+    Returns "delta" or "rebuild" (when the delta would exceed rebuild_ratio of the base).
+    live_ids (only called on rebuild) returns the ids still in the DB; other ids are dropped.
+    """
+    current = _current_generation(partition_dir)
+    if current is None:
+        build_partition(partition_dir, ids, vectors)
+        return "rebuild"
+
+    part = IVFPartition(current)
+    new_ids = np.asarray(ids, dtype=_ID_DTYPE)
+    keep = ~np.isin(part.delta_ids, new_ids)
+    delta_ids = np.concatenate([np.asarray(part.delta_ids)[keep], new_ids])
+    delta_vectors = np.concatenate([np.asarray(part.delta_vectors)[keep], _normalize(vectors).astype(np.float16)])
+    tombstones = np.union1d(np.asarray(sorted(part.tombstones), dtype=_ID_DTYPE),
+                            new_ids[np.isin(new_ids, part.ids)])
+
+    if len(delta_ids) > max(256, rebuild_ratio * len(part.ids)):
+        alive = ~np.isin(part.ids, tombstones)
+        delta_alive = np.ones(len(delta_ids), dtype=bool)
+        if live_ids is not None:
+            live = np.asarray(sorted(live_ids()), dtype=_ID_DTYPE)
+            alive &= np.isin(part.ids, live)
+            delta_alive = np.isin(delta_ids, live)
+        build_partition(
+            partition_dir,
+            np.concatenate([np.asarray(part.ids)[alive], delta_ids[delta_alive]]).tolist(),
+            np.concatenate([np.asarray(part.vectors, dtype=np.float32)[alive],
+                            delta_vectors[delta_alive].astype(np.float32)])
+        )
+        return "rebuild"
+
+    _publish(partition_dir, {
+        "delta_vectors": delta_vectors,
+        "delta_ids": delta_ids,
+        "tombstones": tombstones.astype(_ID_DTYPE)
+    }, reuse_from=current)
+    return "delta"
+
+
+# =============================================================================
+# INDEX (all partitions)
+# =============================================================================
+
+class LocalANNIndex:
+    """Query side: maps the current generation of every partition and follows updates"""
+
+    def __init__(self, root: str = ANN_INDEX_DIR, nprobe: int = DEFAULT_NPROBE):
+        self.root = root
+        self.nprobe = nprobe
+        self._partitions: Dict[str, IVFPartition] = {}
+        self._checked_at = 0.0
+
+    @property
+    def available(self) -> bool:
+        self._reload()
+        return bool(self._partitions)
+
+    def _reload(self, force: bool = False):
+        now = time.monotonic()
+        if not force and now - self._checked_at < RELOAD_CHECK_SECONDS:
+            return
+        self._checked_at = now
+        if not os.path.isdir(self.root):
+            self._partitions = {}
+            return
+        # Partition directories (the builder's .lock / state.json live beside them)
+        names = {name for name in os.listdir(self.root) if os.path.isdir(os.path.join(self.root, name))}
+        for name in list(self._partitions):
+            if name not in names:
+                # Partition removed by a full build
+                del self._partitions[name]
+        for name in names:
+            current = _current_generation(os.path.join(self.root, name))
+            loaded = self._partitions.get(name)
+            if current and (loaded is None or loaded.path != current):
+                try:
+                    self._partitions[name] = IVFPartition(current)
+                    logger.info(f"🗺️ ANN partition {name}: mapped {os.path.basename(current)}")
+                except FileNotFoundError:
+                    # Generation swapped while mapping; picked up on the next check
+                    pass
+
+    def search(self, query_vector: Iterable[float], k: int = 10, country_id: Optional[str] = None,
+               threshold: float = 0.0, nprobe: Optional[int] = None) -> List[Tuple[str, float]]:
+        """Top-k (chunk_id, cosine similarity), restricted to one country when given"""
+        self._reload()
+        query = _normalize(np.asarray(list(query_vector), dtype=np.float32))
+        names = [str(country_id)] if country_id else list(self._partitions)
+
+        hits: List[Tuple[str, float]] = []
+        for name in names:
+            partition = self._partitions.get(name)
+            if partition is not None:
+                hits.extend(partition.search(query, k, nprobe or self.nprobe))
+        hits.sort(key=lambda hit: hit[1], reverse=True)
+        return [hit for hit in hits[:k] if hit[1] > threshold]
+
+    def get_stats(self) -> Dict[str, Any]:
+        self._reload()
+        return {
+            "root": self.root,
+            "nprobe": self.nprobe,
+            "partitions": {name: {"vectors": p.size, "lists": len(p.centroids), "delta": len(p.delta_ids)}
+                           for name, p in self._partitions.items()}
+        }
+
+
+# =============================================================================
+# BUILDER (document_chunks → partitions)
+# =============================================================================
+
+@contextmanager
+def _writer_lock(root: str):
+    """Only one process (worker or job) writes the index at a time; others skip"""
+    os.makedirs(root, exist_ok=True)
+    with open(os.path.join(root, ".lock"), "w") as handle:
+        try:
+            fcntl.flock(handle, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
+            yield False
+            return
+        try:
+            yield True
+        finally:
+            fcntl.flock(handle, fcntl.LOCK_UN)
+
+
+class ANNIndexBuilder:
+    """Builds / refreshes the local index from document_chunks embeddings"""
+
+    PAGE_SIZE = 1000
+
+    def __init__(self, db: Any = None, root: str = ANN_INDEX_DIR, refresh_interval: int = REFRESH_INTERVAL):
+        self._db = db
+        self.root = root
+        self.refresh_interval = refresh_interval
+        self._refresher: Optional[asyncio.Task] = None
+
+    @property
+    def db(self):
+        if self._db is None:
+            from agents.config.database import get_supabase_client
+            self._db = get_supabase_client()
+        return self._db
+
+    def _state_path(self) -> str:
+        return os.path.join(self.root, "state.json")
+
+    def _load_state(self) -> Dict[str, Any]:
+        try:
+            with open(self._state_path()) as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return {}
+
+    def _save_state(self, state: Dict[str, Any]):
+        tmp = self._state_path() + ".tmp"
+        with open(tmp, "w") as f:
+            json.dump(state, f)
+        os.replace(tmp, self._state_path())
+
+    async def _fetch_page(self, after_id: Optional[str], since: Optional[str]) -> List[Dict[str, Any]]:
+        query = self.db.table(TableNames.DOCUMENT_CHUNKS).select("id, country_id, embedding, embedded_at") \
+            .not_.is_("embedding", "null")
+        if since:
+            query = query.gt("embedded_at", since)
+        if after_id:
+            query = query.gt("id", after_id)
+        result = await asyncio.to_thread(query.order("id").limit(self.PAGE_SIZE).execute)
+        return result.data or []
+
+    def _live_ids(self, partition: str) -> Set[str]:
+        """Ids of the embedded chunks of one partition (sync: runs inside update_partition)"""
+        ids: Set[str] = set()
+        after_id = None
+        while True:
+            query = self.db.table(TableNames.DOCUMENT_CHUNKS).select("id").not_.is_("embedding", "null")
+            if partition == NO_COUNTRY:
+                query = query.is_("country_id", "null")
+            else:
+                query = query.eq("country_id", partition)
+            if after_id:
+                query = query.gt("id", after_id)
+            rows = query.order("id").limit(self.PAGE_SIZE).execute().data or []
+            ids.update(row["id"] for row in rows)
+            if len(rows) < self.PAGE_SIZE:
+                return ids
+            after_id = rows[-1]["id"]
+
+    async def _collect(self, since: Optional[str] = None) -> Dict[str, Tuple[List[str], List[np.ndarray]]]:
+        partitions: Dict[str, Tuple[List[str], List[np.ndarray]]] = {}
+        after_id = None
+        while True:
+            rows = await self._fetch_page(after_id, since)
+            for row in rows:
+                vector = parse_embedding(row.get("embedding"))
+                if vector is None:
+                    continue
+                ids, vectors = partitions.setdefault(str(row.get("country_id") or NO_COUNTRY), ([], []))
+                ids.append(row["id"])
+                vectors.append(vector)
+            if len(rows) < self.PAGE_SIZE:
+                return partitions
+            after_id = rows[-1]["id"]
+
+    async def build(self) -> Dict[str, int]:
+        """Full rebuild of every partition"""
+        with _writer_lock(self.root) as acquired:
+            if not acquired:
+                logger.info("ANN index is being written by another process; skipping build")
+                return {}
+            return await self._build_locked()
+
+    async def refresh(self) -> Dict[str, str]:
+        """Apply chunks embedded since the last build / refresh"""
+        with _writer_lock(self.root) as acquired:
+            if not acquired:
+                return {}
+            state = self._load_state()
+            if not state.get("synced_at"):
+                logger.info("ANN index has no build yet; running a full build")
+                return {name: "rebuild" for name in await self._build_locked()}
+            started = datetime.now(timezone.utc).isoformat()
+            partitions = await self._collect(since=state["synced_at"])
+            results = {}
+            for name, (ids, vectors) in partitions.items():
+                results[name] = await asyncio.to_thread(
+                    update_partition, os.path.join(self.root, name), ids, np.stack(vectors),
+                    live_ids=lambda name=name: self._live_ids(name)
+                )
+            self._save_state({"synced_at": started})
+            if results:
+                logger.info(f"🗺️ ANN index refreshed: {results}")
+            return results
+
+    async def _build_locked(self) -> Dict[str, int]:
+        started = datetime.now(timezone.utc).isoformat()
+        partitions = await self._collect()
+        for name, (ids, vectors) in partitions.items():
+            await asyncio.to_thread(build_partition, os.path.join(self.root, name), ids, np.stack(vectors))
+            logger.info(f"🗺️ ANN partition {name}: built with {len(ids)} vectors")
+        # Countries whose chunks were all deleted
+        if os.path.isdir(self.root):
+            for name in os.listdir(self.root):
+                path = os.path.join(self.root, name)
+                if name not in partitions and os.path.isfile(os.path.join(path, "CURRENT")):
+                    shutil.rmtree(path, ignore_errors=True)
+                    logger.info(f"🗺️ ANN partition {name}: removed (no chunks left)")
+        self._save_state({"synced_at": started})
+        return {name: len(ids) for name, (ids, _) in partitions.items()}
+
+    async def _refresh_loop(self):
+        while True:
+            try:
+                await self.refresh()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.warning(f"ANN index refresh failed: {e}")
+            await asyncio.sleep(self.refresh_interval)
+
+    def start_refresher(self):
+        """Periodic refresh (called from startup when the local backend is enabled)"""
+        if self._refresher is None or self._refresher.done():
+            self._refresher = asyncio.create_task(self._refresh_loop())
+            logger.info(f"🔄 ANN index refresher started (every {self.refresh_interval}s)")
+
+    async def stop_refresher(self):
+        if self._refresher and not self._refresher.done():
+            self._refresher.cancel()
+            try:
+                await self._refresher
+            except asyncio.CancelledError:
+                pass
+        self._refresher = None
+
+
+# Global instances
+_ann_index: Optional[LocalANNIndex] = None
+_ann_builder: Optional[ANNIndexBuilder] = None
+
+
+def get_ann_index() -> LocalANNIndex:
+    """Get the process-wide local ANN index"""
+    global _ann_index
+    if _ann_index is None:
+        _ann_index = LocalANNIndex()
+    return _ann_index
+
+
+def get_ann_builder() -> ANNIndexBuilder:
+    """Get the process-wide index builder (refresh loop)"""
+    global _ann_builder
+    if _ann_builder is None:
+        _ann_builder = ANNIndexBuilder()
+    return _ann_builder
+
+
+async def _main(argv: List[str]):
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Build or refresh the local ANN index")
+    parser.add_argument("command", choices=["build", "refresh"])
+    args = parser.parse_args(argv)
+
+    builder = ANNIndexBuilder()
+    print(await (builder.build() if args.command == "build" else builder.refresh()))
+
+
+if __name__ == "__main__":
+    import sys
+    logging.basicConfig(level=logging.INFO)
+    asyncio.run(_main(sys.argv[1:]))
@@ -0,0 +1,115 @@
+"""
+Article Number Index
+البحث المباشر عن مادة في نظام محدد عبر الفهرس (source_id, article_no)
+
+- document_chunks.article_no is written at ingestion time by the re-chunker
+  (agents/knowledge/reindexer.py). Digit and spelled-out headings are both
+  parsed ("المادة الثامنة والستون بعد الثلاثمائة" → 368).
+- lookup(source_id, numbers) is one index seek instead of a text search over
+  number variants. It uses migrations/20260221_article_number_index.sql.
+- backfill() fills article_no for chunks ingested before the column existed.
+
+Usage:
+    python -m agents.knowledge.article_index backfill
+"""
+import asyncio
+import logging
+from typing import Any, Dict, Iterable, List, Optional
+
+from agents.config.settings import TableNames
+from agents.knowledge.reindexer import chunk_article_number
+
+logger = logging.getLogger(__name__)
+
+CHUNK_COLUMNS = "id, content, source_id, source_title, sequence_number, hierarchy_path, keywords, article_no"
+
+# Upper bound on the rows one lookup returns (a range of long articles)
+MAX_LOOKUP_ROWS = 100
+
+
+class ArticleIndex:
+    """Article lookups by (source_id, article_no)"""
+
+    def __init__(self, db: Any = None):
+        self._db = db
+
+    @property
+    def db(self):
+        if self._db is None:
+            from agents.config.database import db
+            self._db = db.client
+        return self._db
+
+    def lookup(self, source_id: str, article_numbers: Iterable[int],
+               columns: str = CHUNK_COLUMNS) -> List[Dict[str, Any]]:
+        """Chunks of the given articles of one law, ordered by article then reading order"""
+        numbers = sorted({int(n) for n in article_numbers})
+        if not source_id or not numbers:
+            return []
+        result = (
+            self.db.table(TableNames.DOCUMENT_CHUNKS)
+            .select(columns)
+            .eq("source_id", source_id)
+            .in_("article_no", numbers)
+            .order("article_no")
+            .order("sequence_number")
+            .limit(MAX_LOOKUP_ROWS)
+            .execute()
+        )
+        return result.data or []
+
+    async def backfill(self, batch_size: int = 500) -> Dict[str, int]:
+        """Parse article_no for every chunk (keyset pages) and write the changed ones in bulk"""
+        stats = {"scanned": 0, "updated": 0}
+        after_id: Optional[str] = None
+        while True:
+            query = self.db.table(TableNames.DOCUMENT_CHUNKS).select("id, content, hierarchy_path, article_no")
+            if after_id:
+                query = query.gt("id", after_id)
+            page = (await asyncio.to_thread(query.order("id").limit(batch_size).execute)).data or []
+            if not page:
+                break
+
+            rows = []
+            for chunk in page:
+                number = chunk_article_number(chunk.get("content"), chunk.get("hierarchy_path"))
+                if number != chunk.get("article_no"):
+                    rows.append({"id": chunk["id"], "article_no": number})
+            if rows:
+                await asyncio.to_thread(self.db.rpc("bulk_update_chunk_articles", {"p_rows": rows}).execute)
+
+            stats["scanned"] += len(page)
+            stats["updated"] += len(rows)
+            after_id = page[-1]["id"]
+
+        logger.info(f"🔢 Article number backfill: {stats}")
+        return stats
+
+
+# ===== Singleton Instance =====
+_index: Optional[ArticleIndex] = None
+
+
+def get_article_index() -> ArticleIndex:
+    """الحصول على فهرس أرقام المواد (Singleton)"""
+    global _index
+    if _index is None:
+        _index = ArticleIndex()
+    return _index
+
+
+async def _main(argv: List[str]):
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Fill document_chunks.article_no for existing chunks")
+    parser.add_argument("command", choices=["backfill"])
+    parser.add_argument("--batch-size", type=int, default=500)
+    args = parser.parse_args(argv)
+
+    print(await ArticleIndex().backfill(args.batch_size))
+
+
+if __name__ == "__main__":
+    import sys
+    logging.basicConfig(level=logging.INFO)
+    asyncio.run(_main(sys.argv[1:]))
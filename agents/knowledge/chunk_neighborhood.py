@@ -0,0 +1,165 @@
+"""
+Chunk Neighborhood Fetcher
+جلب الصفحات المجاورة (N-1, N, N+1) لعدة نتائج في استعلام واحد
+
+- windows(anchors) returns the N-radius .. N+radius chunks around every anchor
+  through one fetch_chunk_windows RPC (migrations/20260219_chunk_neighborhoods.sql).
+- An anchor is a chunk id, or a (source_id, sequence_number) pair.
+- Hot chunks are kept in an in-process LRU with a TTL. A window that is fully
+  cached costs no round trip. Positions past either end of a source are cached
+  as missing, so a window at a boundary does not trigger a refetch.
+- The TTL bounds staleness after re-chunking (agents/knowledge/reindexer.py).
+"""
+
+import logging
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Sequence, Tuple, Union
+
+logger = logging.getLogger(__name__)
+
+Anchor = Union[str, Tuple[str, int]]
+
+CACHE_SIZE = int(os.getenv("CHUNK_CACHE_SIZE", 4096))
+CACHE_TTL_SECONDS = float(os.getenv("CHUNK_CACHE_TTL_SECONDS", 600))
+
+# Marks a position known not to exist (before page 1 / after the last page)
+_MISSING = object()
+
+
+class ChunkNeighborhoodFetcher:
+    """Batched N±radius window fetch with an LRU of hot chunks"""
+
+    def __init__(self, db: Any = None, max_size: int = CACHE_SIZE, ttl_seconds: float = CACHE_TTL_SECONDS):
+        self._db = db
+        self.max_size = max_size
+        self.ttl_seconds = ttl_seconds
+        # (source_id, sequence_number) -> (expires_at, chunk | _MISSING)
+        self._chunks: "OrderedDict[Tuple[str, int], Tuple[float, Any]]" = OrderedDict()
+        # chunk id -> (source_id, sequence_number)
+        self._positions: Dict[str, Tuple[str, int]] = {}
+        self._lock = threading.Lock()
+        self.stats = {"hits": 0, "misses": 0, "round_trips": 0}
+
+    @property
+    def db(self):
+        if self._db is None:
+            from agents.config.database import db
+            self._db = db.client
+        return self._db
+
+    # ---------- cache ----------
+
+    def _get(self, key: Tuple[str, int]) -> Any:
+        """Chunk, _MISSING, or None when not cached"""
+        entry = self._chunks.get(key)
+        if entry is None:
+            return None
+        if entry[0] < time.monotonic():
+            del self._chunks[key]
+            if entry[1] is not _MISSING:
+                self._positions.pop(str(entry[1]["id"]), None)
+            return None
+        self._chunks.move_to_end(key)
+        return entry[1]
+
+    def _put(self, key: Tuple[str, int], value: Any):
+        self._chunks[key] = (time.monotonic() + self.ttl_seconds, value)
+        self._chunks.move_to_end(key)
+        if value is not _MISSING:
+            self._positions[str(value["id"])] = key
+        while len(self._chunks) > self.max_size:
+            (_, old) = self._chunks.popitem(last=False)[1]
+            if old is not _MISSING:
+                self._positions.pop(str(old["id"]), None)
+
+    def _cached_window(self, center: Tuple[str, int], radius: int) -> Optional[List[Dict[str, Any]]]:
+        source_id, seq = center
+        window = []
+        for position in range(seq - radius, seq + radius + 1):
+            value = self._get((source_id, position))
+            if value is None:
+                return None
+            if value is not _MISSING:
+                window.append(value)
+        return window
+
+    def invalidate_source(self, source_id: str):
+        """Drop every cached chunk of a source (e.g. after re-chunking)"""
+        with self._lock:
+            for key in [k for k in self._chunks if k[0] == source_id]:
+                _, value = self._chunks.pop(key)
+                if value is not _MISSING:
+                    self._positions.pop(str(value["id"]), None)
+
+    # ---------- fetch ----------
+
+    def _fetch(self, anchors: List[Dict[str, Any]], radius: int) -> List[Dict[str, Any]]:
+        self.stats["round_trips"] += 1
+        result = self.db.rpc("fetch_chunk_windows", {"p_anchors": anchors, "p_radius": radius}).execute()
+        return result.data or []
+
+    def windows(self, anchors: Sequence[Anchor], radius: int = 1) -> List[List[Dict[str, Any]]]:
+        """
+        Neighbourhood of every anchor, ordered by sequence_number
+
+        Returns one list per anchor (same order). An unknown anchor gives an empty list.
+        """
+        results: List[Optional[List[Dict[str, Any]]]] = [None] * len(anchors)
+        pending: List[int] = []
+
+        with self._lock:
+            for i, anchor in enumerate(anchors):
+                center = self._positions.get(anchor) if isinstance(anchor, str) else (str(anchor[0]), int(anchor[1]))
+                cached = self._cached_window(center, radius) if center else None
+                if cached is None:
+                    pending.append(i)
+                else:
+                    results[i] = cached
+            self.stats["hits"] += len(anchors) - len(pending)
+            self.stats["misses"] += len(pending)
+
+        if pending:
+            request = [
+                {"chunk_id": anchors[i]} if isinstance(anchors[i], str)
+                else {"source_id": str(anchors[i][0]), "sequence_number": int(anchors[i][1])}
+                for i in pending
+            ]
+            rows = self._fetch(request, radius)
+
+            fetched: Dict[int, List[Dict[str, Any]]] = {j: [] for j in range(len(pending))}
+            centers: Dict[int, Tuple[str, int]] = {}
+            for row in rows:
+                j = row["anchor_index"]
+                chunk = {k: row.get(k) for k in ("id", "source_id", "sequence_number", "content", "ai_summary", "hierarchy_path")}
+                fetched[j].append(chunk)
+                centers[j] = (str(row["source_id"]), row["center_sequence"])
+
+            with self._lock:
+                for j, i in enumerate(pending):
+                    window = sorted(fetched[j], key=lambda c: c["sequence_number"])
+                    results[i] = window
+                    if j not in centers:
+                        continue
+                    source_id, seq = centers[j]
+                    present = {c["sequence_number"]: c for c in window}
+                    for position in range(seq - radius, seq + radius + 1):
+                        self._put((source_id, position), present.get(position, _MISSING))
+
+            logger.info(f"📖 Fetched {len(pending)} chunk neighbourhoods in one round trip ({len(rows)} rows)")
+
+        return [r or [] for r in results]
+
+
+# ===== Singleton Instance =====
+_fetcher: Optional[ChunkNeighborhoodFetcher] = None
+
+
+def get_neighborhood_fetcher() -> ChunkNeighborhoodFetcher:
+    """الحصول على جالب الصفحات المجاورة (Singleton)"""
+    global _fetcher
+    if _fetcher is None:
+        _fetcher = ChunkNeighborhoodFetcher()
+    return _fetcher
@@ -61,16 +61,17 @@ class EmbeddingGenerator:
         if not texts:
             return []
         
+        if any(not text or not text.strip() for text in texts):
+            raise ValueError("Text cannot be empty")
+
         all_embeddings = []
-        
+
         try:
-            for i, text in enumerate(texts):
-                embedding = self.create_embedding(text)
-                all_embeddings.append(embedding)
-                
-                if (i + 1) % 10 == 0:
-                    logger.debug(f"✅ Processed {i + 1}/{len(texts)} texts")
-            
+            for start in range(0, len(texts), batch_size):
+                batch = texts[start:start + batch_size]
+                all_embeddings.extend(self.client.generate_embeddings(batch))
+                logger.debug(f"✅ Processed {len(all_embeddings)}/{len(texts)} texts")
+
             logger.info(f"✅ Generated {len(all_embeddings)} embeddings")
             return all_embeddings
             
@@ -0,0 +1,280 @@
+"""
+Bulk Embedding Ingestion
+إعادة فهرسة document_chunks بطلبات embeddings مجمّعة ومتوازية
+
+- Texts are grouped into multi-input embedding requests (EMBEDDING_BATCH_SIZE)
+- Up to EMBEDDING_CONCURRENCY batches are in flight, paced by EMBEDDING_RPS
+- Chunks whose embedding_hash matches sha256(model + content) are skipped
+- Vectors are written back in bulk (bulk_update_chunk_embeddings RPC)
+- process_flagged() re-indexes legal_sources rows flagged by mark_source_for_reindexing()
+
+Usage:
+    python -m agents.knowledge.ingestion --flagged
+    python -m agents.knowledge.ingestion --source <source_id>
+    python -m agents.knowledge.ingestion --all
+"""
+import asyncio
+import hashlib
+import logging
+import os
+import time
+from dataclasses import dataclass, asdict
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+from agents.config.settings import settings, TableNames
+from agents.utils.resiliency import ResiliencyManager
+
+logger = logging.getLogger(__name__)
+
+EmbedFn = Callable[[List[str]], Awaitable[List[List[float]]]]
+
+DEFAULT_BATCH_SIZE = int(os.getenv("EMBEDDING_BATCH_SIZE", 64))
+DEFAULT_CONCURRENCY = int(os.getenv("EMBEDDING_CONCURRENCY", 4))
+DEFAULT_RPS = float(os.getenv("EMBEDDING_RPS", 8))
+WRITE_BATCH_SIZE = int(os.getenv("EMBEDDING_WRITE_BATCH_SIZE", 500))
+PAGE_SIZE = 1000
+
+
+def embedding_hash(content: str, model: str) -> str:
+    """Hash of what produced a vector: the same text with another model must be re-embedded"""
+    return hashlib.sha256(f"{model}\x1e{content}".encode("utf-8")).hexdigest()
+
+
+def openai_embed_fn(client: Any = None, model: Optional[str] = None) -> EmbedFn:
+    """Multi-input embedding call on an OpenAI-compatible client (sync client → thread)"""
+    if client is None:
+        from agents.config.openwebui import openwebui_client
+        client = openwebui_client.client
+    model = model or settings.openwebui_embedding_model
+
+    def _create(texts: List[str]) -> List[List[float]]:
+        response = client.embeddings.create(model=model, input=texts)
+        return [item.embedding for item in sorted(response.data, key=lambda item: item.index)]
+
+    async def embed(texts: List[str]) -> List[List[float]]:
+        return await asyncio.to_thread(_create, texts)
+
+    return embed
+
+
+class RateLimiter:
+    """Spaces request starts at most `rate` per second (0 = unlimited)"""
+
+    def __init__(self, rate: float):
+        self.interval = 1.0 / rate if rate > 0 else 0.0
+        self._next = 0.0
+        self._lock = asyncio.Lock()
+
+    async def acquire(self):
+        if not self.interval:
+            return
+        async with self._lock:
+            now = time.monotonic()
+            wait = self._next - now
+            self._next = max(now, self._next) + self.interval
+        if wait > 0:
+            await asyncio.sleep(wait)
+
+
+@dataclass
+class IngestionStats:
+    scanned: int = 0
+    embedded: int = 0
+    skipped: int = 0
+    failed: int = 0
+    requests: int = 0
+    elapsed: float = 0.0
+
+    @property
+    def chunks_per_second(self) -> float:
+        return self.embedded / self.elapsed if self.elapsed else 0.0
+
+    def merge(self, other: "IngestionStats"):
+        for field in ("scanned", "embedded", "skipped", "failed", "requests", "elapsed"):
+            setattr(self, field, getattr(self, field) + getattr(other, field))
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {**asdict(self), "chunks_per_second": round(self.chunks_per_second, 1)}
+
+
+class EmbeddingIngestionEngine:
+    """Embeds document_chunks in concurrent multi-input batches and writes them back in bulk"""
+
+    def __init__(
+        self,
+        db: Any = None,
+        embed_fn: Optional[EmbedFn] = None,
+        model: Optional[str] = None,
+        batch_size: int = DEFAULT_BATCH_SIZE,
+        concurrency: int = DEFAULT_CONCURRENCY,
+        requests_per_second: float = DEFAULT_RPS,
+        write_batch_size: int = WRITE_BATCH_SIZE,
+        max_attempts: int = 3
+    ):
+        self._db = db
+        self.model = model or settings.openwebui_embedding_model
+        self.embed_fn = embed_fn or openai_embed_fn(model=self.model)
+        self.batch_size = max(1, batch_size)
+        self.concurrency = max(1, concurrency)
+        self.limiter = RateLimiter(requests_per_second)
+        self.write_batch_size = max(1, write_batch_size)
+        self.max_attempts = max_attempts
+
+    @property
+    def db(self):
+        if self._db is None:
+            from agents.config.database import get_supabase_client
+            self._db = get_supabase_client()
+        return self._db
+
+    # ----- persistence (sync client → thread) -----
+
+    async def _run(self, query):
+        return await asyncio.to_thread(query.execute)
+
+    async def _fetch_chunks(self, source_id: Optional[str], after_id: Optional[str], limit: int) -> List[Dict[str, Any]]:
+        """One keyset page of chunks (ordered by id)"""
+        query = self.db.table(TableNames.DOCUMENT_CHUNKS).select("id, content, embedding_hash")
+        if source_id:
+            query = query.eq("source_id", source_id)
+        if after_id:
+            query = query.gt("id", after_id)
+        result = await self._run(query.order("id").limit(limit))
+        return result.data or []
+
+    async def _write_embeddings(self, rows: List[Dict[str, Any]]):
+        await self._run(self.db.rpc("bulk_update_chunk_embeddings", {"p_rows": rows}))
+
+    async def _fetch_flagged_sources(self) -> List[str]:
+        result = await self._run(
+            self.db.table(TableNames.LEGAL_SOURCES).select("id").eq("needs_reindexing", True)
+        )
+        return [row["id"] for row in (result.data or [])]
+
+    async def _clear_flag(self, source_id: str):
+        await self._run(
+            self.db.table(TableNames.LEGAL_SOURCES).update({"needs_reindexing": False}).eq("id", source_id)
+        )
+
+    # ----- embedding -----
+
+    async def _embed_batch(self, semaphore: asyncio.Semaphore, batch: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        texts = [row["content"] for row in batch]
+
+        async def call():
+            await self.limiter.acquire()
+            vectors = await self.embed_fn(texts)
+            if len(vectors) != len(texts):
+                raise ValueError(f"Embedding count mismatch: sent {len(texts)}, got {len(vectors)}")
+            return vectors
+
+        async with semaphore:
+            vectors = await ResiliencyManager.run_with_retries(call, max_attempts=self.max_attempts)
+        return [
+            {"id": row["id"], "embedding": vector, "embedding_hash": row["_hash"]}
+            for row, vector in zip(batch, vectors)
+        ]
+
+    async def ingest(self, rows: List[Dict[str, Any]]) -> IngestionStats:
+        """
+        Embed rows ({"id", "content", "embedding_hash"}) whose content changed.
+
+        Failed batches are counted, not raised, so one bad batch does not stop a re-index.
+        """
+        stats = IngestionStats(scanned=len(rows))
+        started = time.perf_counter()
+
+        pending = []
+        for row in rows:
+            content = row.get("content") or ""
+            if not content.strip():
+                stats.skipped += 1
+                continue
+            digest = embedding_hash(content, self.model)
+            if row.get("embedding_hash") == digest:
+                stats.skipped += 1
+                continue
+            pending.append({"id": row["id"], "content": content, "_hash": digest})
+
+        semaphore = asyncio.Semaphore(self.concurrency)
+        batches = [pending[i:i + self.batch_size] for i in range(0, len(pending), self.batch_size)]
+        tasks = [asyncio.ensure_future(self._embed_batch(semaphore, batch)) for batch in batches]
+        stats.requests = len(tasks)
+
+        buffer: List[Dict[str, Any]] = []
+        try:
+            # Write back as batches finish, while the remaining ones are still in flight
+            for task in asyncio.as_completed(tasks):
+                try:
+                    buffer.extend(await task)
+                except Exception as e:
+                    logger.error(f"❌ Embedding batch failed: {e}")
+                    continue
+                if len(buffer) >= self.write_batch_size:
+                    await self._write_embeddings(buffer[:self.write_batch_size])
+                    stats.embedded += self.write_batch_size
+                    buffer = buffer[self.write_batch_size:]
+            if buffer:
+                await self._write_embeddings(buffer)
+                stats.embedded += len(buffer)
+        finally:
+            for task in tasks:
+                task.cancel()
+
+        stats.failed = len(pending) - stats.embedded
+        stats.elapsed = time.perf_counter() - started
+        return stats
+
+    async def reindex(self, source_id: Optional[str] = None, page_size: int = PAGE_SIZE) -> IngestionStats:
+        """Re-embed every changed chunk of one source (or of the whole table)"""
+        total = IngestionStats()
+        after_id = None
+        while True:
+            rows = await self._fetch_chunks(source_id, after_id, page_size)
+            if not rows:
+                break
+            total.merge(await self.ingest(rows))
+            logger.info(
+                f"🧮 Re-index {source_id or 'all'}: {total.embedded} embedded, "
+                f"{total.skipped} unchanged, {total.failed} failed ({total.chunks_per_second:.1f} chunks/s)"
+            )
+            if len(rows) < page_size:
+                break
+            after_id = rows[-1]["id"]
+        return total
+
+    async def process_flagged(self) -> Dict[str, IngestionStats]:
+        """Re-index sources flagged by mark_source_for_reindexing(); clear the flag on success"""
+        results = {}
+        for source_id in await self._fetch_flagged_sources():
+            stats = await self.reindex(source_id)
+            if stats.failed == 0:
+                await self._clear_flag(source_id)
+            else:
+                logger.warning(f"⚠️ Source {source_id} keeps needs_reindexing: {stats.failed} chunks failed")
+            results[source_id] = stats
+        return results
+
+
+async def _main(argv: List[str]):
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Re-embed document_chunks in batches")
+    group = parser.add_mutually_exclusive_group(required=True)
+    group.add_argument("--flagged", action="store_true", help="sources with needs_reindexing = true")
+    group.add_argument("--source", help="a single legal_sources id")
+    group.add_argument("--all", action="store_true", help="every chunk")
+    args = parser.parse_args(argv)
+
+    engine = EmbeddingIngestionEngine()
+    if args.flagged:
+        for source_id, stats in (await engine.process_flagged()).items():
+            print(source_id, stats.to_dict())
+    else:
+        print((await engine.reindex(args.source)).to_dict())
+
+
+if __name__ == "__main__":
+    import sys
+    logging.basicConfig(level=logging.INFO)
+    asyncio.run(_main(sys.argv[1:]))
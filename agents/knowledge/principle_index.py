@@ -0,0 +1,62 @@
+"""
+Principle Embedding Index
+تضمين المبادئ القانونية (thought_templates) للبحث الدلالي
+
+- Reuses EmbeddingIngestionEngine: multi-input batches, concurrency, rate limit,
+  and the sha256(model + text) skip check, applied to template_text
+- Vectors are written back in bulk (bulk_update_template_embeddings RPC)
+- Queried by match_thought_templates (migrations/20260220_thought_template_embeddings.sql)
+
+Usage:
+    python -m agents.knowledge.principle_index backfill
+"""
+import asyncio
+import logging
+from typing import Any, Dict, List, Optional
+
+from agents.config.settings import TableNames
+from agents.knowledge.ingestion import EmbeddingIngestionEngine, IngestionStats
+
+logger = logging.getLogger(__name__)
+
+
+class TemplateEmbeddingEngine(EmbeddingIngestionEngine):
+    """Embeds thought_templates.template_text into template_embedding"""
+
+    async def _fetch_chunks(self, source_id: Optional[str], after_id: Optional[str], limit: int) -> List[Dict[str, Any]]:
+        """One keyset page of templates (source_id is not used: templates have no source)"""
+        query = self.db.table(TableNames.THOUGHT_TEMPLATES).select("id, template_text, embedding_hash")
+        if after_id:
+            query = query.gt("id", after_id)
+        result = await self._run(query.order("id").limit(limit))
+        return [
+            {"id": row["id"], "content": row.get("template_text"), "embedding_hash": row.get("embedding_hash")}
+            for row in (result.data or [])
+        ]
+
+    async def _write_embeddings(self, rows: List[Dict[str, Any]]):
+        await self._run(self.db.rpc("bulk_update_template_embeddings", {"p_rows": rows}))
+
+    async def backfill(self) -> IngestionStats:
+        """Embed every template whose text (or the embedding model) changed"""
+        stats = await self.reindex()
+        logger.info(f"🧭 Principle backfill: {stats.to_dict()}")
+        return stats
+
+
+async def _main(argv: List[str]):
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Embed thought_templates for vector principle search")
+    parser.add_argument("command", choices=["backfill"])
+    args = parser.parse_args(argv)
+
+    engine = TemplateEmbeddingEngine()
+    if args.command == "backfill":
+        print((await engine.backfill()).to_dict())
+
+
+if __name__ == "__main__":
+    import sys
+    logging.basicConfig(level=logging.INFO)
+    asyncio.run(_main(sys.argv[1:]))
@@ -0,0 +1,144 @@
+"""
+Quantized Embeddings
+تمثيلات مضغوطة للمتجهات (half / int8 / binary) للبحث على مرحلتين
+
+- First stage ranks candidates on a compact copy of the vectors
+- Second stage rescores those candidates with the full float32 vectors
+- The SQL side (match_documents_quantized, 20260217 migration) does the same with
+  pgvector halfvec / bit columns; the numpy versions here mirror it for the
+  recall benchmark and for choosing candidate_multiplier
+- QuantizedBackfill fills the compact columns for rows embedded before the migration
+
+Usage:
+    python -m agents.knowledge.quantization backfill
+"""
+import asyncio
+import logging
+import os
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+FIRST_STAGES = ("binary", "half", "int8")
+DEFAULT_FIRST_STAGE = os.getenv("VECTOR_FIRST_STAGE", "binary")
+DEFAULT_CANDIDATE_MULTIPLIER = int(os.getenv("VECTOR_CANDIDATE_MULTIPLIER", 8))
+
+# Bits set in every byte value (popcount lookup for packed binary codes)
+_POPCOUNT = np.array([bin(i).count("1") for i in range(256)], dtype=np.uint8)
+
+
+def binary_quantize(vectors: np.ndarray) -> np.ndarray:
+    """1 bit per dimension (x > 0), packed 8 per byte — same rule as pgvector binary_quantize()"""
+    return np.packbits(np.asarray(vectors) > 0, axis=-1)
+
+
+def hamming_distance(query_bits: np.ndarray, bits: np.ndarray) -> np.ndarray:
+    return _POPCOUNT[np.bitwise_xor(bits, query_bits)].sum(axis=-1, dtype=np.int32)
+
+
+def int8_quantize(vectors: np.ndarray) -> Tuple[np.ndarray, float]:
+    """Symmetric scalar quantization of unit vectors; returns (codes, scale)"""
+    vectors = np.asarray(vectors, dtype=np.float32)
+    scale = float(np.abs(vectors).max()) / 127.0 or 1.0
+    return np.clip(np.round(vectors / scale), -127, 127).astype(np.int8), scale
+
+
+def _unit(vectors: np.ndarray) -> np.ndarray:
+    vectors = np.asarray(vectors, dtype=np.float32)
+    return vectors / np.maximum(np.linalg.norm(vectors, axis=-1, keepdims=True), 1e-12)
+
+
+class CompactIndex:
+    """In-memory two-stage search over one compact representation (benchmark / reference)"""
+
+    def __init__(self, vectors: np.ndarray, first_stage: str = DEFAULT_FIRST_STAGE):
+        if first_stage not in FIRST_STAGES:
+            raise ValueError(f"first_stage must be one of {FIRST_STAGES}")
+        self.first_stage = first_stage
+        self.full = _unit(vectors)
+        if first_stage == "binary":
+            self.codes = binary_quantize(self.full)
+        elif first_stage == "half":
+            self.codes = self.full.astype(np.float16)
+        else:
+            self.codes, self.scale = int8_quantize(self.full)
+
+    @property
+    def bytes_per_vector(self) -> int:
+        return int(self.codes.nbytes // max(1, len(self.codes)))
+
+    def _first_stage_scores(self, query: np.ndarray) -> np.ndarray:
+        """Higher is better"""
+        if self.first_stage == "binary":
+            return -hamming_distance(binary_quantize(query), self.codes)
+        if self.first_stage == "half":
+            return self.codes.astype(np.float32) @ query
+        return self.codes.astype(np.int32) @ np.round(query / self.scale).astype(np.int32)
+
+    def search(self, query: np.ndarray, k: int,
+               candidate_multiplier: int = DEFAULT_CANDIDATE_MULTIPLIER,
+               rescore: bool = True) -> List[Tuple[int, float]]:
+        query = _unit(query)
+        scores = self._first_stage_scores(query)
+        take = min(len(scores), max(k, k * candidate_multiplier))
+        candidates = np.argpartition(-scores, take - 1)[:take]
+        if rescore:
+            exact = self.full[candidates] @ query
+            order = np.argsort(-exact)[:k]
+            return [(int(candidates[i]), float(exact[i])) for i in order]
+        order = np.argsort(-scores[candidates])[:k]
+        return [(int(candidates[i]), float(scores[candidates[i]])) for i in order]
+
+
+class QuantizedBackfill:
+    """Fills embedding_half / embedding_bin for rows embedded before the migration"""
+
+    def __init__(self, db: Any = None, batch_size: int = 2000):
+        self._db = db
+        self.batch_size = batch_size
+
+    @property
+    def db(self):
+        if self._db is None:
+            from agents.config.database import get_supabase_client
+            self._db = get_supabase_client()
+        return self._db
+
+    async def _run_batch(self) -> int:
+        result = await asyncio.to_thread(
+            self.db.rpc("backfill_quantized_embeddings", {"p_batch_size": self.batch_size}).execute
+        )
+        return result.data if isinstance(result.data, int) else 0
+
+    async def run(self, max_batches: Optional[int] = None) -> Dict[str, int]:
+        """Run batches until nothing is left (each batch is its own short transaction)"""
+        total, batches = 0, 0
+        while max_batches is None or batches < max_batches:
+            updated = await self._run_batch()
+            batches += 1
+            total += updated
+            if updated:
+                logger.info(f"🗜️ Quantized backfill: {total} rows so far")
+            if updated < self.batch_size:
+                break
+        logger.info(f"✅ Quantized backfill finished: {total} rows in {batches} batches")
+        return {"rows": total, "batches": batches}
+
+
+async def _main(argv: List[str]):
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Quantized embedding maintenance")
+    parser.add_argument("command", choices=["backfill"])
+    parser.add_argument("--batch-size", type=int, default=2000)
+    args = parser.parse_args(argv)
+
+    print(await QuantizedBackfill(batch_size=args.batch_size).run())
+
+
+if __name__ == "__main__":
+    import sys
+    logging.basicConfig(level=logging.INFO)
+    asyncio.run(_main(sys.argv[1:]))
@@ -0,0 +1,335 @@
+"""
+Incremental (diff-aware) Re-indexing
+إعادة فهرسة المصدر القانوني بعد تعديله: تقطيع حسب المواد، ومقارنة بالأجزاء الحالية،
+وإعادة توليد embeddings للأجزاء المتغيرة فقط
+
+- full_content_md is split on article headings (the ARTICLE_PATTERNS HybridSearchTool uses,
+  plus spelled-out headings such as "المادة الأولى")
+- Each chunk carries its article number (article_no), so article lookups are an index seek
+- New chunks are aligned with the existing document_chunks by content hash (difflib),
+  so inserting one article does not mark every following chunk as changed
+- Unchanged chunks keep their row and embedding; only their sequence_number moves
+- Changed / new chunks are written by apply_source_rechunk() and re-embedded
+  through EmbeddingIngestionEngine
+- sequence_number stays contiguous (1..N), which ReadDocumentTool._fetch_neighbors relies on
+
+Usage:
+    python -m agents.knowledge.reindexer              # sources flagged needs_reindexing
+    python -m agents.knowledge.reindexer --source <id>
+"""
+import asyncio
+import difflib
+import hashlib
+import logging
+import os
+import re
+import uuid
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional
+
+from agents.config.settings import TableNames
+from agents.knowledge.chunk_neighborhood import get_neighborhood_fetcher
+from agents.knowledge.ingestion import PAGE_SIZE, EmbeddingIngestionEngine, IngestionStats
+from agents.utils.legal_patterns import ARTICLE_PATTERNS, SPELLED_ARTICLE_PATTERN, parse_article_number
+
+logger = logging.getLogger(__name__)
+
+MAX_CHUNK_WORDS = 1500
+
+# Heading words that start a new article. Citation forms in ARTICLE_PATTERNS
+# (المواد / م.77 / Sec.) appear inside article bodies and must not split.
+_HEADING_WORDS = ("المادة", "مادة", "الماده", "ماده", "Article", "Art")
+_HIERARCHY_LEVELS = ("كتاب", "باب", "قسم", "فصل", "فرع")
+_HIERARCHY_HEADING = re.compile(r"^[\s#*\-]*((?:ال)?(" + "|".join(_HIERARCHY_LEVELS) + r")\b[^\n]{0,80})$", re.MULTILINE)
+
+# Headings only: the pattern must open the line (optionally after markdown markers)
+_ARTICLE_HEADING = re.compile(
+    r"^[ \t#*\-]*(?:" + "|".join([*dict.fromkeys(p for p in ARTICLE_PATTERNS if p.startswith(_HEADING_WORDS)),
+                                   SPELLED_ARTICLE_PATTERN]) + ")",
+    re.MULTILINE | re.IGNORECASE
+)
+
+
+@dataclass
+class SourceChunk:
+    sequence_number: int
+    content: str
+    hierarchy_path: str
+    article_no: Optional[int] = None
+
+    @property
+    def content_hash(self) -> str:
+        return content_hash(self.content)
+
+    @property
+    def word_count(self) -> int:
+        return len(self.content.split())
+
+
+def content_hash(text: str) -> str:
+    return hashlib.sha256(text.strip().encode("utf-8")).hexdigest()
+
+
+def _split_long(text: str, max_words: int) -> List[str]:
+    """An article longer than max_words: split between paragraphs, then between words."""
+    pieces, current, count = [], [], 0
+    for paragraph in (p.strip() for p in re.split(r"\n\s*\n", text) if p.strip()):
+        words = paragraph.split()
+        if len(words) > max_words:
+            if current:
+                pieces.append("\n\n".join(current))
+                current, count = [], 0
+            pieces.extend(" ".join(words[i:i + max_words]) for i in range(0, len(words), max_words))
+            continue
+        if count + len(words) > max_words and current:
+            pieces.append("\n\n".join(current))
+            current, count = [], 0
+        current.append(paragraph)
+        count += len(words)
+    if current:
+        pieces.append("\n\n".join(current))
+    return pieces
+
+
+def _article_label(unit: str, heading: re.Match) -> str:
+    label = heading.group(0)
+    if not any(ch.isdigit() for ch in label):
+        # Spelled-out heading: the pattern stops after the first number word,
+        # the label runs to the end of the heading line (or its ":" / "-")
+        line_end = unit.find("\n", heading.start())
+        line = unit[heading.start():line_end if line_end != -1 else len(unit)]
+        label = re.split(r"[:\-–]", line)[0][:80]
+    return label.strip().strip("#*- ")
+
+
+def chunk_article_number(content: str, hierarchy_path: Optional[str] = None) -> Optional[int]:
+    """Article number of a stored chunk: the article in its hierarchy_path, else the heading at its top"""
+    for segment in reversed(re.split(r"\s*[/>]\s*", hierarchy_path or "")):
+        number = parse_article_number(segment)
+        if number is not None:
+            return number
+    heading = _ARTICLE_HEADING.search((content or "")[:600])
+    return parse_article_number(_article_label(content, heading)) if heading else None
+
+
+def split_articles(content: str, max_words: int = MAX_CHUNK_WORDS) -> List[SourceChunk]:
+    """
+    Split a legal source into one chunk per article (the preamble is its own chunk).
+
+    كتاب/باب/فصل headings right above an article belong to that article's chunk;
+    hierarchy_path carries the enclosing headings and the article heading.
+    """
+    content = content or ""
+    starts = []
+    for match in _ARTICLE_HEADING.finditer(content):
+        start = match.start()
+        # Pull the باب/فصل headings directly above the article into its chunk
+        while True:
+            previous = content.rfind("\n", 0, max(0, start - 1)) + 1
+            line = content[previous:start].strip()
+            if previous >= start or (line and not _HIERARCHY_HEADING.fullmatch(line)):
+                break
+            start = previous
+        starts.append(start)
+    if not starts or starts[0] > 0:
+        starts.insert(0, 0)
+    bounds = list(zip(starts, starts[1:] + [len(content)]))
+
+    chunks: List[SourceChunk] = []
+    hierarchy: List[tuple] = []
+    for begin, end in bounds:
+        unit = content[begin:end].strip()
+        if not unit:
+            continue
+
+        heading = _ARTICLE_HEADING.search(unit)
+        for match in _HIERARCHY_HEADING.finditer(unit, 0, heading.start() if heading else len(unit)):
+            # A new باب closes the current فصل / فرع, a new فصل closes the فرع, ...
+            level = _HIERARCHY_LEVELS.index(match.group(2))
+            hierarchy = [(lvl, h) for lvl, h in hierarchy if lvl < level] + [(level, match.group(1).strip())]
+
+        article = _article_label(unit, heading) if heading else ""
+        article_no = parse_article_number(article)
+        path = " / ".join([h for _, h in hierarchy] + ([article] if article else []))
+        for piece in _split_long(unit, max_words):
+            chunks.append(SourceChunk(len(chunks) + 1, piece, path, article_no))
+    return chunks
+
+
+@dataclass
+class RechunkPlan:
+    """Row operations that turn the existing chunks into the new ones"""
+    rows: List[Dict[str, Any]] = field(default_factory=list)   # apply_source_rechunk payload
+    delete_ids: List[str] = field(default_factory=list)
+    to_embed: List[Dict[str, Any]] = field(default_factory=list)
+    unchanged: int = 0
+
+    @property
+    def changed(self) -> int:
+        return len(self.to_embed)
+
+
+def plan_rechunk(existing: List[Dict[str, Any]], chunks: List[SourceChunk]) -> RechunkPlan:
+    """
+    Align existing rows (ordered by sequence_number) with the new chunks by content hash.
+
+    - equal   → keep the row (and its embedding); renumber / re-path if needed
+    - replace → reuse old rows for new content; extra new chunks are inserted, extra old rows deleted
+    - insert / delete → new rows / removed rows
+    """
+    plan = RechunkPlan()
+    old_hashes = [content_hash(row.get("content") or "") for row in existing]
+    new_hashes = [chunk.content_hash for chunk in chunks]
+
+    def keep(row, chunk):
+        plan.unchanged += 1
+        # Rows read without an article_no column count as up to date
+        if (row.get("sequence_number") != chunk.sequence_number or row.get("hierarchy_path") != chunk.hierarchy_path
+                or row.get("article_no", chunk.article_no) != chunk.article_no):
+            plan.rows.append({"id": row["id"], "sequence_number": chunk.sequence_number,
+                              "hierarchy_path": chunk.hierarchy_path, "article_no": chunk.article_no, "is_new": False})
+
+    def rewrite(row_id, chunk, is_new):
+        plan.rows.append({"id": row_id, "sequence_number": chunk.sequence_number, "hierarchy_path": chunk.hierarchy_path,
+                          "article_no": chunk.article_no, "content": chunk.content, "chunk_word_count": chunk.word_count, "is_new": is_new})
+        plan.to_embed.append({"id": row_id, "content": chunk.content, "embedding_hash": None})
+
+    matcher = difflib.SequenceMatcher(None, old_hashes, new_hashes, autojunk=False)
+    for op, i1, i2, j1, j2 in matcher.get_opcodes():
+        if op == "equal":
+            for row, chunk in zip(existing[i1:i2], chunks[j1:j2]):
+                keep(row, chunk)
+            continue
+        old_rows, new_chunks = existing[i1:i2], chunks[j1:j2]
+        for row, chunk in zip(old_rows, new_chunks):
+            rewrite(row["id"], chunk, is_new=False)
+        for chunk in new_chunks[len(old_rows):]:
+            rewrite(str(uuid.uuid4()), chunk, is_new=True)
+        plan.delete_ids.extend(row["id"] for row in old_rows[len(new_chunks):])
+    return plan
+
+
+class IncrementalReindexer:
+    """Re-chunks changed legal sources and re-embeds only what changed"""
+
+    def __init__(self, db: Any = None, engine: Optional[EmbeddingIngestionEngine] = None,
+                 max_words: int = MAX_CHUNK_WORDS):
+        self._db = db
+        self.engine = engine or EmbeddingIngestionEngine(db=db)
+        self.max_words = max_words
+
+    @property
+    def db(self):
+        if self._db is None:
+            self._db = self.engine.db
+        return self._db
+
+    # ----- persistence (sync client → thread) -----
+
+    async def _run(self, query):
+        return await asyncio.to_thread(query.execute)
+
+    async def _fetch_content(self, source_id: str) -> Optional[str]:
+        result = await self._run(
+            self.db.table(TableNames.LEGAL_SOURCES).select("full_content_md").eq("id", source_id).limit(1)
+        )
+        return result.data[0].get("full_content_md") if result.data else None
+
+    async def _fetch_existing(self, source_id: str, page_size: int = PAGE_SIZE) -> List[Dict[str, Any]]:
+        """All chunks of a source, keyset-paginated by id (PostgREST caps a response at 1000 rows)"""
+        rows: List[Dict[str, Any]] = []
+        after_id = None
+        while True:
+            query = self.db.table(TableNames.DOCUMENT_CHUNKS) \
+                .select("id, sequence_number, hierarchy_path, article_no, content") \
+                .eq("source_id", source_id)
+            if after_id:
+                query = query.gt("id", after_id)
+            result = await self._run(query.order("id").limit(page_size))
+            page = result.data or []
+            rows.extend(page)
+            if len(page) < page_size:
+                break
+            after_id = page[-1]["id"]
+        rows.sort(key=lambda row: row.get("sequence_number") or 0)
+        return rows
+
+    async def _apply(self, source_id: str, plan: RechunkPlan):
+        await self._run(self.db.rpc("apply_source_rechunk", {
+            "p_source_id": source_id,
+            "p_rows": plan.rows,
+            "p_delete_ids": plan.delete_ids
+        }))
+
+    # ----- re-indexing -----
+
+    async def reindex_source(self, source_id: str) -> Dict[str, Any]:
+        """Bring the chunks of one source in line with its full_content_md"""
+        content = await self._fetch_content(source_id)
+        if content is None:
+            raise ValueError(f"Legal source {source_id} not found")
+
+        chunks = split_articles(content, self.max_words)
+        plan = plan_rechunk(await self._fetch_existing(source_id), chunks)
+        if plan.rows or plan.delete_ids:
+            await self._apply(source_id, plan)
+            # Sequence numbers moved: cached N±1 windows of this source are stale
+            get_neighborhood_fetcher().invalidate_source(source_id)
+
+        stats = await self.engine.ingest(plan.to_embed) if plan.to_embed else IngestionStats()
+        logger.info(
+            f"🧩 Re-chunked {source_id}: {len(chunks)} chunks, {plan.unchanged} unchanged, "
+            f"{plan.changed} re-embedded, {len(plan.delete_ids)} removed"
+        )
+        return {
+            "chunks": len(chunks),
+            "unchanged": plan.unchanged,
+            "changed": plan.changed,
+            "deleted": len(plan.delete_ids),
+            "embedding": stats.to_dict()
+        }
+
+    async def process_flagged(self) -> Dict[str, Dict[str, Any]]:
+        """
+        Handle sources flagged by mark_source_for_reindexing().
+
+        The flag is cleared only when every changed chunk was embedded; a failed
+        source is retried on the next run (unchanged chunks are then skipped).
+        """
+        results = {}
+        for source_id in await self.engine._fetch_flagged_sources():
+            try:
+                result = await self.reindex_source(source_id)
+            except Exception as e:
+                logger.error(f"❌ Re-indexing {source_id} failed: {e}")
+                continue
+            if result["embedding"]["failed"] == 0:
+                await self.engine._clear_flag(source_id)
+            results[source_id] = result
+
+        # Keep the local ANN index (if used) in step with the new vectors
+        if results and os.getenv("VECTOR_SEARCH_BACKEND", "pgvector").lower() == "local":
+            from agents.knowledge.ann_index import get_ann_builder
+            await get_ann_builder().refresh()
+        return results
+
+
+async def _main(argv: List[str]):
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Re-chunk amended legal sources and re-embed the changes")
+    parser.add_argument("--source", help="a single legal_sources id (default: all flagged sources)")
+    args = parser.parse_args(argv)
+
+    reindexer = IncrementalReindexer()
+    if args.source:
+        print(await reindexer.reindex_source(args.source))
+    else:
+        for source_id, result in (await reindexer.process_flagged()).items():
+            print(source_id, result)
+
+
+if __name__ == "__main__":
+    import sys
+    logging.basicConfig(level=logging.INFO)
+    asyncio.run(_main(sys.argv[1:]))
@@ -470,23 +470,13 @@ class CaseStorage:
     def search_cases(self, lawyer_id: str, query: str, limit: int = 10) -> List[Dict[str, Any]]:
         """
         Search cases for a lawyer
+        Arabic-normalized fuzzy match on case_number, subject, court_name (ranked)
         """
         if self.use_supabase:
             try:
-                from ..config.settings import TableNames
-                
-                # Search case_number, subject, court_name
-                # Note: Supabase 'or' syntax: "col1.ilike.%q%,col2.ilike.%q%"
-                or_query = f"case_number.ilike.%{query}%,subject.ilike.%{query}%,court_name.ilike.%{query}%"
+                from .entity_search import entity_search
                 
-                response = db.client.table(TableNames.CASES)\
-                    .select("*, clients(full_name)")\
-                    .eq("lawyer_id", lawyer_id)\
-                    .or_(or_query)\
-                    .limit(limit)\
-                    .execute()
-                    
-                return response.data if response.data else []
+                return entity_search.search(lawyer_id, query, entities=["cases"], limit=limit)["cases"]
             except Exception as e:
                 logger.error(f"❌ Failed to search cases: {e}")
                 return []
@@ -130,90 +130,39 @@ class ClientStorage:
         self,
         lawyer_id: str,
         query: str,
-        search_fields: List[str] = ["full_name", "phone", "national_id", "email"]
+        search_fields: List[str] = ["full_name", "phone", "national_id", "email"],
+        limit: int = 20
     ) -> List[Dict[str, Any]]:
         """
         🔍 SMART MULTI-FIELD SEARCH with FLEXIBLE ARABIC MATCHING
         
         Features:
-        - Searches: name, phone, email, address
-        - Handles Arabic variations: أ/إ/ا, ة/ه, ى/ي
-        - Fuzzy matching for typos
-        - "Did you mean?" suggestions
+        - Searches: name, phone, national ID, email, address
+        - Handles Arabic variations: أ/إ/ا, ة/ه, ى/ي, ؤ/و, ئ/ي
+        - Fuzzy matching for typos (trigram index, no full download)
+        - Ranked: substring matches first, then closest spellings
         
         Args:
             lawyer_id: Lawyer UUID (security filter)
             query: Search query
-            search_fields: Fields to search in
+            search_fields: Kept for compatibility; all fields are in the search_norm column
+            limit: Max results
             
         Returns:
-            List with:
-            - exact_matches: Perfect matches
-            - fuzzy_matches: Similar matches (normalized)
-            - suggestions: "Did you mean?" list
+            Matching clients, best match first (each with `search_score`)
         """
         try:
-            from agents.utils.arabic_utils import normalize_arabic, find_similar_matches
+            from agents.storage.entity_search import entity_search
             
-            logger.info(f"🔍 Smart searching: '{query}' across multiple fields")
+            logger.info(f"🔍 Smart searching clients: '{query}'")
+            matches = entity_search.search(lawyer_id, query, entities=["clients"], limit=limit)["clients"]
             
-            # Normalize query for flexible matching
-            normalized_query = normalize_arabic(query)
-            
-            # Try exact search first
-            result = self.client.table(self.TABLE_NAME) \
-                .select("*") \
-                .eq("lawyer_id", lawyer_id) \
-                .or_(
-                    f"full_name.ilike.%{query}%,"
-                    f"phone.ilike.%{query}%,"
-                    f"email.ilike.%{query}%,"
-                    f"address.ilike.%{query}%"
-                ) \
-                .order("created_at", desc=True) \
-                .execute()
-            
-            exact_matches = result.data if result.data else []
-            
-            # If no exact matches, try fuzzy search
-            fuzzy_matches = []
-            if not exact_matches:
-                logger.info("❌ No exact matches, trying fuzzy search...")
-                
-                # Get all clients for fuzzy matching
-                all_clients = self.client.table(self.TABLE_NAME) \
-                    .select("*") \
-                    .eq("lawyer_id", lawyer_id) \
-                    .order("created_at", desc=True) \
-                    .execute()
-                
-                all_clients_data = all_clients.data if all_clients.data else []
-                
-                # Find similar names using fuzzy matching
-                if all_clients_data:
-                    client_names = [c.get('full_name', '') for c in all_clients_data if c.get('full_name')]
-                    
-                    similar = find_similar_matches(query, client_names, threshold=0.6)
-                    
-                    if similar:
-                        logger.info(f"✅ Found {len(similar)} similar matches (fuzzy)")
-                        
-                        # Get clients with similar names
-                        similar_names = [name for name, score in similar]
-                        fuzzy_matches = [
-                            c for c in all_clients_data 
-                            if c.get('full_name') in similar_names
-                        ]
-            
-            # Build response
-            total_matches = exact_matches + fuzzy_matches
-            
-            if total_matches:
-                logger.info(f"✅ Found {len(total_matches)} client(s) (exact: {len(exact_matches)}, fuzzy: {len(fuzzy_matches)})")
+            if matches:
+                logger.info(f"✅ Found {len(matches)} client(s)")
             else:
                 logger.info(f"❌ No clients found matching: {query}")
             
-            return total_matches
+            return matches
             
         except Exception as e:
             logger.error(f"❌ Failed to search clients: {e}")
@@ -0,0 +1,82 @@
+"""
+Entity Search Module
+بحث موحد في الموكلين والقضايا ومحاضر الشرطة
+
+Arabic-normalized, trigram-indexed fuzzy search over the operational entities.
+Ranking happens in the search_entities RPC (migrations/20260218_entity_fuzzy_search.sql):
+substring matches come first, then typo / spelling-variant matches ordered by
+word similarity. Each entity has its own limit.
+"""
+
+from typing import Any, Dict, List, Optional, Sequence
+import logging
+
+from agents.config.database import get_supabase_client
+
+logger = logging.getLogger(__name__)
+
+ENTITIES = ("clients", "cases", "police_records")
+
+
+class EntitySearch:
+    """Ranked fuzzy search for clients / cases / police records of one lawyer"""
+
+    RPC_NAME = "search_entities"
+    DEFAULT_MIN_SCORE = 0.4
+
+    def __init__(self, client: Any = None):
+        self._client = client
+
+    @property
+    def client(self):
+        if self._client is None:
+            self._client = get_supabase_client()
+        return self._client
+
+    def search(
+        self,
+        lawyer_id: str,
+        query: str,
+        entities: Optional[Sequence[str]] = None,
+        limit: int = 10,
+        min_score: float = DEFAULT_MIN_SCORE
+    ) -> Dict[str, List[Dict[str, Any]]]:
+        """
+        Search one or more entities
+
+        Returns:
+            {entity: [record, ...]} best match first. Each record is the full row
+            (same shape as the table select) plus `search_score`.
+        """
+        entities = list(entities or ENTITIES)
+        unknown = set(entities) - set(ENTITIES)
+        if unknown:
+            raise ValueError(f"Unknown entities: {sorted(unknown)}")
+
+        results: Dict[str, List[Dict[str, Any]]] = {entity: [] for entity in entities}
+        if not query or not query.strip():
+            return results
+
+        response = self.client.rpc(self.RPC_NAME, {
+            "p_lawyer_id": lawyer_id,
+            "p_query": query.strip(),
+            "p_entities": entities,
+            "p_limit": limit,
+            "p_min_score": min_score
+        }).execute()
+
+        for row in response.data or []:
+            record = dict(row.get("record") or {})
+            record["search_score"] = row.get("score")
+            results.setdefault(row["entity"], []).append(record)
+
+        logger.info(
+            f"🔍 Entity search '{query}': "
+            + ", ".join(f"{entity}={len(rows)}" for entity, rows in results.items())
+        )
+        return results
+
+
+entity_search = EntitySearch()
+
+__all__ = ["EntitySearch", "entity_search", "ENTITIES"]
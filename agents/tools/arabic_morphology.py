@@ -3,7 +3,8 @@
 Generates legal conjugations and derivatives for Arabic legal terms
 """
 
-from typing import List, Set
+from functools import lru_cache
+from typing import List, Set, Tuple
 import re
 
 
@@ -58,6 +59,9 @@ class ArabicMorphology:
         "حق": ["حق", "حقوق", "الحق", "الحقوق", "حقه", "حقها", "حقوقه", "صاحب الحق"],
     }
     
+    # Possessive suffixes for the fallback forms
+    POSSESSIVE_SUFFIXES = ("ه", "ها", "هم", "هما", "ك", "كم")
+    
     @staticmethod
     def get_conjugations(term: str) -> List[str]:
         """
@@ -67,42 +71,9 @@ class ArabicMorphology:
             term: Arabic legal term
             
         Returns:
-            List of conjugations and derivatives
+            List of conjugations and derivatives (stable order, memoised per term)
         """
-        # Normalize
-        term_clean = term.strip().lower()
-        
-        # Remove "ال" if present
-        if term_clean.startswith("ال"):
-            term_root = term_clean[2:]
-        else:
-            term_root = term_clean
-        
-        # Check if we have predefined patterns
-        if term_root in ArabicMorphology.LEGAL_PATTERNS:
-            return ArabicMorphology.LEGAL_PATTERNS[term_root]
-        
-        # Fallback: generate basic variations
-        variants = set()
-        variants.add(term_clean)
-        
-        # Add with/without ال
-        if term_clean.startswith("ال"):
-            variants.add(term_clean[2:])
-        else:
-            variants.add("ال" + term_clean)
-        
-        # Add possessive forms
-        for suffix in ["ه", "ها", "هم", "هما", "ك", "كم"]:
-            variants.add(term_root + suffix)
-        
-        # ة/ه variants
-        if "ة" in term_clean:
-            variants.add(term_clean.replace("ة", "ه"))
-        if "ه" in term_clean and not term_clean.endswith("ه"):
-            variants.add(term_clean.replace("ه", "ة"))
-        
-        return list(variants)
+        return list(_conjugations(term))
     
     @staticmethod
     def expand_legal_keywords(keywords: List[str]) -> List[str]:
@@ -136,6 +107,44 @@ class ArabicMorphology:
         return list(expanded)
 
 
+@lru_cache(maxsize=2048)
+def _conjugations(term: str) -> Tuple[str, ...]:
+    # Normalize
+    term_clean = term.strip().lower()
+    
+    # Remove "ال" if present
+    if term_clean.startswith("ال"):
+        term_root = term_clean[2:]
+    else:
+        term_root = term_clean
+    
+    # Check if we have predefined patterns
+    if term_root in ArabicMorphology.LEGAL_PATTERNS:
+        return tuple(ArabicMorphology.LEGAL_PATTERNS[term_root])
+    
+    # Fallback: generate basic variations (insertion-ordered, so callers
+    # taking the first N get the same N on every run)
+    variants = {term_clean: None}
+    
+    # Add with/without ال
+    if term_clean.startswith("ال"):
+        variants[term_clean[2:]] = None
+    else:
+        variants["ال" + term_clean] = None
+    
+    # Add possessive forms
+    for suffix in ArabicMorphology.POSSESSIVE_SUFFIXES:
+        variants[term_root + suffix] = None
+    
+    # ة/ه variants
+    if "ة" in term_clean:
+        variants[term_clean.replace("ة", "ه")] = None
+    if "ه" in term_clean and not term_clean.endswith("ه"):
+        variants[term_clean.replace("ه", "ة")] = None
+    
+    return tuple(variants)
+
+
 # Convenient function
 def get_legal_terms(word: str) -> List[str]:
     """Get all legal variations of a word"""
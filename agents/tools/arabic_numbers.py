@@ -3,7 +3,10 @@
 Converts numbers like 368 → "الثامنة والستون بعد الثلاثمائة"
 """
 
+from functools import lru_cache
 
+
+@lru_cache(maxsize=1024)
 def number_to_arabic_text(num: int) -> str:
     """
     Convert number to Arabic text for Saudi legal articles.
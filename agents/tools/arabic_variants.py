@@ -0,0 +1,215 @@
+"""
+🔤 Arabic Variant Expansion Engine
+توليد صيغ الكتابة البديلة للمصطلح العربي (الهمزة، التاء المربوطة، التشكيل، أرقام المواد)
+
+- Translation tables and patterns are compiled once at import time, so the
+  hamza folding and the diacritic scan are one str.translate / set lookup
+  instead of a Python loop per character class.
+- expand(term) is memoised in a bounded LRU keyed by the exact term.
+- expand_many(terms) expands a keyword list in one pass with cross-keyword
+  dedup. A normalized-form index collapses spellings of the same word
+  ("الهبة" / "الهبه" / "الهبةُ") so its morphology is expanded once; the
+  other spellings are still emitted as literal variants.
+
+Used by HybridSearchTool (agents/tools/hybrid_search_tool.py).
+"""
+
+import logging
+import os
+import re
+import threading
+from collections import OrderedDict
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from .arabic_morphology import ArabicMorphology
+from .arabic_numbers import number_to_arabic_text
+
+logger = logging.getLogger(__name__)
+
+VARIANT_CACHE_SIZE = int(os.getenv("ARABIC_VARIANT_CACHE_SIZE", 2048))
+
+# Morphological conjugations kept per term (more variants → RPC timeouts)
+MAX_CONJUGATIONS = 5
+
+DIACRITICS = "ًٌٍَُِّْ"
+_DIACRITIC_SET = frozenset(DIACRITICS)
+
+# أ، إ، آ، ٱ → ا
+_HAMZA_TABLE = str.maketrans("أإآٱ", "اااا")
+
+# Same map as HybridSearchTool.ARABIC_NORMALIZE (used for relevance scoring)
+_NORMALIZE_TABLE = str.maketrans({
+    "أ": "ا", "إ": "ا", "آ": "ا", "ٱ": "ا",
+    "ة": "ه", "ـ": "",
+    "ى": "ي",
+    "ؤ": "و", "ئ": "ي",
+})
+
+# Key of the normalized-form index: only the differences the variant rules
+# themselves generate (hamza, ى/ي, diacritics, final ة/ه)
+_FORM_TABLE = str.maketrans({**{c: None for c in DIACRITICS}, "أ": "ا", "إ": "ا", "آ": "ا", "ٱ": "ا", "ى": "ي"})
+
+_ARTICLE_RE = re.compile(r"(المادة|مادة|الماده)\s+(\d+)")
+
+
+def normalize_arabic(text: str) -> str:
+    """Normalize Arabic text for matching (hamza, ta marbuta, alif maqsura, tatweel)"""
+    if not text:
+        return ""
+    return text.translate(_NORMALIZE_TABLE)
+
+
+def normalized_form(term: str) -> str:
+    """Key of the normalized-form index"""
+    form = term.strip().translate(_FORM_TABLE)
+    return form[:-1] + "ة" if form.endswith("ه") else form
+
+
+def _article_variants(text: str) -> List[str]:
+    """"المادة 368" → "المادة الثامنة والستون بعد الثلاثمائة" (+ the "مادة" form)"""
+    variants = []
+    for match in _ARTICLE_RE.finditer(text):
+        prefix, num_str = match.groups()
+        try:
+            arabic_text = number_to_arabic_text(int(num_str))
+        except Exception:
+            continue
+        if arabic_text and not arabic_text.isdigit():
+            with_text = text.replace(match.group(0), f"{prefix} {arabic_text}")
+            variants.append(with_text)
+            variants.append(with_text.replace("المادة", "مادة"))
+    return variants
+
+
+def _spelling_variants(v: str) -> List[str]:
+    """Hamza / ta marbuta / alif maqsura / tanween forms of one variant"""
+    out = []
+
+    # Remove "ال" article
+    if v.startswith("ال") and len(v) > 3:
+        out.append(v[2:])
+
+    # ة ↔ ه (end of word only)
+    if v.endswith("ة"):
+        out.append(v[:-1] + "ه")
+    elif v.endswith("ه"):
+        out.append(v[:-1] + "ة")
+
+    # Hamzas → bare alif
+    folded = v.translate(_HAMZA_TABLE)
+    if folded != v:
+        out.append(folded)
+
+    # ى ↔ ي
+    if "ى" in v:
+        out.append(v.replace("ى", "ي"))
+    if "ي" in v:
+        out.append(v.replace("ي", "ى"))
+
+    # Drop each tanween / haraka present
+    for mark in _DIACRITIC_SET.intersection(v):
+        out.append(v.replace(mark, ""))
+
+    return out
+
+
+def _is_clean(v: str) -> bool:
+    # Not empty, not starting with ة (impossible in Arabic), at least 2 chars
+    return len(v) >= 2 and not v.startswith("ة")
+
+
+def generate_variants(text: str) -> List[str]:
+    """
+    All Arabic variant forms of a term (uncached)
+
+    Example: "الهبة" → ["الهبة", "الهبه", "هبة", "هبه", "واهب", "موهوب", ...]
+             "المادة 368" → ["المادة 368", "المادة الثامنة والستون بعد الثلاثمائة", ...]
+    """
+    if not text:
+        return [text]
+
+    base = [text]
+    try:
+        base.extend(ArabicMorphology.get_conjugations(text)[:MAX_CONJUGATIONS])
+    except Exception as e:
+        logger.warning(f"Morphological expansion failed: {e}")
+    base.extend(_article_variants(text))
+
+    variants = set(base)
+    for v in base:
+        if v:
+            variants.update(_spelling_variants(v))
+
+    return sorted({s for s in (v.strip() for v in variants) if _is_clean(s)})
+
+
+class ArabicVariantExpander:
+    """Memoised variant expansion with batch dedup"""
+
+    def __init__(self, max_size: int = VARIANT_CACHE_SIZE):
+        self.max_size = max_size
+        self._cache: "OrderedDict[str, Tuple[str, ...]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.stats = {"hits": 0, "misses": 0}
+
+    def expand(self, term: str) -> List[str]:
+        """Variants of one term (sorted, same as generate_variants)"""
+        with self._lock:
+            cached = self._cache.get(term)
+            if cached is not None:
+                self._cache.move_to_end(term)
+                self.stats["hits"] += 1
+                return list(cached)
+            self.stats["misses"] += 1
+
+        variants = tuple(generate_variants(term))
+
+        with self._lock:
+            self._cache[term] = variants
+            self._cache.move_to_end(term)
+            while len(self._cache) > self.max_size:
+                self._cache.popitem(last=False)
+        return list(variants)
+
+    def expand_many(self, terms: Iterable[str], limit: Optional[int] = None) -> List[str]:
+        """
+        Variants of a keyword list, deduplicated across keywords
+
+        Keywords are kept in order. A keyword whose normalized form was already
+        expanded only adds its own spelling. Stops after `limit` variants.
+        """
+        seen_forms: Dict[str, str] = {}
+        result: Dict[str, None] = {}
+
+        for term in terms:
+            term = (term or "").strip()
+            if not term:
+                continue
+            form = normalized_form(term)
+            if form in seen_forms:
+                new = [term] if _is_clean(term) else []
+            else:
+                seen_forms[form] = term
+                new = self.expand(term)
+            for v in new:
+                result.setdefault(v, None)
+                if limit is not None and len(result) >= limit:
+                    return list(result)
+
+        return list(result)
+
+    def clear(self):
+        with self._lock:
+            self._cache.clear()
+
+
+# ===== Singleton Instance =====
+_expander: Optional[ArabicVariantExpander] = None
+
+
+def get_variant_expander() -> ArabicVariantExpander:
+    """الحصول على مولّد الصيغ العربية (Singleton)"""
+    global _expander
+    if _expander is None:
+        _expander = ArabicVariantExpander()
+    return _expander
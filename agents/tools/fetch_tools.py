@@ -10,6 +10,7 @@ from dataclasses import dataclass
 
 from .base_tool import BaseTool, ToolResult
 from ..config.database import db
+from ..knowledge.chunk_neighborhood import get_neighborhood_fetcher
 
 logger = logging.getLogger(__name__)
 
@@ -432,17 +433,25 @@ class GetRelatedDocumentTool(BaseTool):
                 chunk_id = chunk_response.data[0]["id"]
                 # We'll fetch the source below as usual
             
+            # Siblings: chunk + N±1 in one batched lookup (LRU cached), which also gives its source
+            window = []
+            if include_siblings and chunk_id:
+                window = get_neighborhood_fetcher().windows([chunk_id])[0]
+            
             # === Original Logic: If chunk_id provided, first get the source_id ===
             if chunk_id and not source_id:
-                chunk_response = db.document_chunks.select("source_id").eq("id", chunk_id).execute()
-                if chunk_response.data:
-                    source_id = chunk_response.data[0].get("source_id")
+                if window:
+                    source_id = window[0].get("source_id")
                 else:
-                    return ToolResult(
-                        success=False,
-                        error=f"Chunk not found: {chunk_id}",
-                        metadata={"error_code": "CHUNK_NOT_FOUND"}
-                    )
+                    chunk_response = db.document_chunks.select("source_id").eq("id", chunk_id).execute()
+                    if chunk_response.data:
+                        source_id = chunk_response.data[0].get("source_id")
+                    else:
+                        return ToolResult(
+                            success=False,
+                            error=f"Chunk not found: {chunk_id}",
+                            metadata={"error_code": "CHUNK_NOT_FOUND"}
+                        )
             
             if not source_id:
                 return ToolResult(
@@ -474,38 +483,18 @@ class GetRelatedDocumentTool(BaseTool):
             
             # Optionally fetch sibling chunks (Context Expansion)
             if include_siblings and chunk_id:
-                # We need the sequence_number of the ORIGINAL chunk
-                # We already fetched it? No, we fetched source_id only.
-                # Let's re-fetch with sequence info if we didn't have it.
-                
-                target_chunk_res = db.document_chunks.select("sequence_number").eq("id", chunk_id).execute()
-                if target_chunk_res.data:
-                    current_seq = target_chunk_res.data[0].get("sequence_number")
-                    
-                    if current_seq is not None:
-                        # Fetch Surroundings: [Current-1, Current, Current+1]
-                        # We try to get a window centered on the current chunk
-                        range_start = max(1, current_seq - 1)
-                        range_end = current_seq + 1
-                        
-                        siblings_response = db.document_chunks.select(
-                            "id, content, sequence_number, ai_summary"
-                        ).eq("source_id", source_id)\
-                        .gte("sequence_number", range_start)\
-                        .lte("sequence_number", range_end)\
-                        .order("sequence_number")\
-                        .execute()
-                        
-                        result_data["siblings"] = siblings_response.data
-                    else:
-                         # Fallback if no sequence number (should be rare)
-                         siblings_response = db.document_chunks.select(
-                            "id, content, sequence_number, ai_summary"
-                         ).eq("source_id", source_id).limit(sibling_limit).execute()
-                         result_data["siblings"] = siblings_response.data
-                else: 
-                     # Chunk ID invalid - fallback to just source
-                     pass
+                if window:
+                    # Surroundings: [Current-1, Current, Current+1]
+                    result_data["siblings"] = [
+                        {k: c.get(k) for k in ("id", "content", "sequence_number", "ai_summary")}
+                        for c in window
+                    ]
+                else:
+                    # Fallback if no sequence number (should be rare)
+                    siblings_response = db.document_chunks.select(
+                        "id, content, sequence_number, ai_summary"
+                    ).eq("source_id", source_id).limit(sibling_limit).execute()
+                    result_data["siblings"] = siblings_response.data
             
             elif include_siblings and not chunk_id:
                   # If we only have source_id, just return the first few chapters
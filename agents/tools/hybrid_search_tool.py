@@ -10,7 +10,14 @@ from .base_tool import BaseTool, ToolResult
 from .fetch_tools import FlexibleSearchTool
 from .vector_tools import VectorSearchTool
 from agents.core.llm_factory import get_llm, get_embeddings
+from agents.core.llm_response_cache import cached_ainvoke
 from agents.config.database import db  # For country validation
+from agents.knowledge.article_index import get_article_index
+from agents.utils.legal_patterns import ARTICLE_PATTERNS
+from .arabic_variants import get_variant_expander, normalize_arabic
+
+# Variants added to the scout keyword list (the original keywords are always kept)
+MAX_KEYWORD_VARIANTS = 15
 
 logger = logging.getLogger(__name__)
 
@@ -31,31 +38,7 @@ class HybridSearchTool(BaseTool):
     # ==================== LEGAL PATTERNS ====================
     
     # Article Patterns (Arabic, English, with ranges support)
-    ARTICLE_PATTERNS = [
-        # Arabic patterns - Standard
-        r'المادة\s*[\(]?\s*([\d\u0660-\u0669]+)\s*[\)]?',           # المادة 77, المادة (77), المادة ٧٧
-        r'المواد\s*[\(]?\s*([\d\u0660-\u0669]+)\s*[\)]?',          # المواد 77
-        r'مادة\s*[\(]?\s*([\d\u0660-\u0669]+)\s*[\)]?',            # مادة 77
-        r'م\s*[\.\:\-]?\s*([\d\u0660-\u0669]+)',                   # م.77, م:77, م-77
-        
-        # Arabic patterns - Typo variants (ه instead of ة)
-        r'الماده\s*[\(]?\s*([\d\u0660-\u0669]+)\s*[\)]?',          # الماده 77 (typo)
-        r'ماده\s*[\(]?\s*([\d\u0660-\u0669]+)\s*[\)]?',            # ماده 77 (typo)
-        
-        # Arabic patterns - with رقم
-        r'المادة\s+رقم\s*([\d\u0660-\u0669]+)',                    # المادة رقم 77
-        r'الماده\s+رقم\s*([\d\u0660-\u0669]+)',                    # الماده رقم 77 (typo)
-        
-        # English patterns
-        r'Article\s*[\(]?\s*(\d+)\s*[\)]?',                        # Article 77, Article (77)
-        r'Art\s*\.?\s*[\(]?\s*(\d+)\s*[\)]?',                     # Art. 77, Art 77
-        r'Section\s*[\(]?\s*(\d+)\s*[\)]?',                       # Section 77
-        r'Sec\s*\.?\s*[\(]?\s*(\d+)\s*[\)]?',                     # Sec. 77
-        
-        # French patterns
-        r'Article\s*[\(]?\s*(\d+)\s*[\)]?',                       # Article 77
-        r'Art\s*\.?\s*[\(]?\s*(\d+)\s*[\)]?',                     # Art. 77
-    ]
+    ARTICLE_PATTERNS = ARTICLE_PATTERNS
     
     # Range Patterns (المواد من X إلى Y)
     RANGE_PATTERNS = [
@@ -180,11 +163,7 @@ class HybridSearchTool(BaseTool):
     
     def _normalize_arabic(self, text: str) -> str:
         """Normalize Arabic text for better matching"""
-        if not text:
-            return ""
-        for old, new in self.ARABIC_NORMALIZE.items():
-            text = text.replace(old, new)
-        return text
+        return normalize_arabic(text)
     
     def _generate_arabic_variants(self, text: str) -> List[str]:
         """
@@ -193,100 +172,10 @@ class HybridSearchTool(BaseTool):
         Example: "الهبة" → ["الهبة", "الهبه", "هبة", "هبه", "واهب", "موهوب"]
                  "المادة 368" → ["المادة 368", "المادة الثامنة وستون بعد الثلاثمائة", ...]
         This solves the problem where "الهبة" ≠ "الهبه" in search
-        """
-        if not text:
-            return [text]
-        
-        variants = set()
-        variants.add(text)  # Original
-        
-        # ===== MORPHOLOGICAL EXPANSION (NEW) =====
-        try:
-            from .arabic_morphology import ArabicMorphology
-            conjugations = ArabicMorphology.get_conjugations(text)
-            # ✅ OPTIMIZATION: Limit to top 5 variants to prevent RPC timeout (was 16+)
-            variants.update(conjugations[:5])
-        except ImportError:
-            logger.warning("Could not import ArabicMorphology")
-        except Exception as e:
-            logger.warning(f"Morphological expansion failed: {e}")
         
-        # ===== ARTICLE NUMBER CONVERSION =====
-        # Check if text contains article numbers (e.g., "المادة 368")
-        from .arabic_numbers import number_to_arabic_text
-        
-        # Pattern: المادة [number]
-        article_pattern = r'(المادة|مادة|الماده)\s+(\d+)'
-        matches = re.findall(article_pattern, text)
-        
-        for prefix, num_str in matches:
-            try:
-                num = int(num_str)
-                arabic_text = number_to_arabic_text(num)
-                
-                if arabic_text and not arabic_text.isdigit():
-                    # Add variant with Arabic text
-                    # e.g., "المادة الثامنة وستون بعد الثلاثمائة"
-                    variant_with_text = text.replace(f"{prefix} {num_str}", f"{prefix} {arabic_text}")
-                    variants.add(variant_with_text)
-                    
-                    # Also add without "ال" prefix on المادة
-                    variant_no_al = variant_with_text.replace("المادة", "مادة")
-                    variants.add(variant_no_al)
-            except:
-                pass  # Ignore conversion errors
-        
-        # ===== EXISTING VARIANTS (Hamza, Ta Marbuta, etc.) =====
-        # Apply to all current variants to generate sub-variants
-        base_variants = list(variants)
-        for v in base_variants:
-            if not v:
-                continue
-                
-            # Remove "ال" article
-            if v.startswith('ال') and len(v) > 3:
-                variants.add(v[2:])
-            
-            # Swap: ة ↔ ه (ONLY AT THE END OF WORD)
-            if v.endswith('ة'):
-                variants.add(v[:-1] + 'ه')
-            elif v.endswith('ه'):
-                variants.add(v[:-1] + 'ة')
-            
-            # Swap hamzas: أ، إ، آ → ا (Normalize to bare Alif)
-            # This is safer than replacing indiscriminately
-            normalized = v.translate(str.maketrans('أإآٱ', 'aaaa'))
-            if normalized != v:
-                variants.add(normalized)
-            
-            # Swap alif maqsura: ى ↔ ي (Only at end usually, but sometimes middle)
-            if 'ى' in v:
-                variants.add(v.replace('ى', 'ي'))
-            if 'ي' in v:
-                variants.add(v.replace('ي', 'ى'))
-            
-            # Remove Tanween
-            for tanween in ['ً', 'ٌ', 'ٍ', 'َ', 'ُ', 'ِ', 'ّ', 'ْ']:
-                if tanween in v:
-                    variants.add(v.replace(tanween, ''))
-        
-        # 🛡️ FINAL SAFETY FILTER (The Garbage Collector)
-        clean_variants = []
-        for v in variants:
-            v_clean = v.strip()
-            # 1. Must not be empty
-            if not v_clean:
-                continue
-            # 2. Must not start with 'ة' (Impossible in Arabic)
-            if v_clean.startswith('ة'):
-                continue
-            # 3. Must be at least 2 chars
-            if len(v_clean) < 2:
-                continue
-                
-            clean_variants.append(v_clean)
-            
-        return sorted(list(set(clean_variants)))
+        ⚡ Memoised per term (agents/tools/arabic_variants.py)
+        """
+        return get_variant_expander().expand(text)
     
     def _convert_arabic_numerals(self, text: str) -> str:
         """Convert Arabic-Indic numerals to Western numerals"""
@@ -523,7 +412,7 @@ class HybridSearchTool(BaseTool):
         )
         
         try:
-            response = await llm.ainvoke([SystemMessage(content=prompt)])
+            response = await cached_ainvoke(llm, [SystemMessage(content=prompt)], call_site="scout_keywords")
             analysis_text = response.content.strip()
             
             # Extract keywords from LLM analysis
@@ -537,9 +426,7 @@ class HybridSearchTool(BaseTool):
             if not detected_keywords:
                 detected_keywords = self._extract_legal_nouns_from_query(query)
             
-            # ✅ NEW: Expand keywords with Arabic morphology
-            from .arabic_morphology import ArabicMorphology
-            
+            # ✅ NEW: Expand keywords with Arabic variants (morphology + spelling)
             # Extract main legal terms (not articles, not generic words)
             core_legal_terms = []
             for kw in detected_keywords[:5]:  # Top 5 keywords
@@ -547,19 +434,11 @@ class HybridSearchTool(BaseTool):
                 if not any(x in kw for x in ["المادة", "Article", "تعريف", "معنى"]):
                     core_legal_terms.append(kw)
             
-            # Expand with conjugations
-            expanded_keywords = list(detected_keywords)  # Keep originals
-            for term in core_legal_terms[:3]:  # Top 3 legal terms only
-                conjugations = ArabicMorphology.get_conjugations(term)
-                expanded_keywords.extend(conjugations[:5])  # Add top 5 conjugations
+            # Top 3 legal terms only; spellings of the same word are expanded once
+            variants = get_variant_expander().expand_many(core_legal_terms[:3], limit=MAX_KEYWORD_VARIANTS)
             
-            # Remove duplicates while preserving order
-            seen = set()
-            final_keywords = []
-            for kw in expanded_keywords:
-                if kw not in seen:
-                    seen.add(kw)
-                    final_keywords.append(kw)
+            # Originals first, duplicates removed while preserving order
+            final_keywords = list(dict.fromkeys(detected_keywords + variants))
             
             # Add article-specific keywords if present in entities
             if combined_entities.get('articles'):
@@ -936,6 +815,33 @@ Provide ONLY the comma-separated keywords, nothing else.
         # Return top results
         return scored_docs[:limit * 2]  # Return 2x limit for diversity filter,
     
+    def _article_index_seek(self, source_id: str, articles: List[int]) -> List[Dict]:
+        """Chunks of the requested articles via document_chunks.article_no (empty on miss/error)"""
+        try:
+            rows = get_article_index().lookup(source_id, articles)
+        except Exception as e:
+            logger.warning(f"⚠️ Article index lookup failed (falling back to text search): {e}")
+            return []
+        
+        return [
+            {
+                "id": row.get("id"),
+                "content": row.get("content"),
+                "similarity_score": 1.0,
+                "source_id": row.get("source_id"),
+                "article_no": row.get("article_no"),
+                "sequence_number": row.get("sequence_number"),
+                "metadata": {
+                    "source_title": row.get("source_title"),
+                    "hierarchy_path": row.get("hierarchy_path"),
+                    "keywords": row.get("keywords")
+                },
+                "relevance_score": 10.0,
+                "search_method": "ARTICLE_INDEX"
+            }
+            for row in rows
+        ]
+    
     def _build_sniper_query(
         self,
         query_type: str,
@@ -1345,6 +1251,33 @@ Provide ONLY the comma-separated keywords, nothing else.
             query_entities = self._extract_legal_entities(query)
             logger.info(f"Query Entities: {query_entities}")
             
+            # ⚡ Known law + article number(s): index seek on (source_id, article_no).
+            # The text search with spelled-out number variants is only the fallback
+            # (for the articles the index did not return).
+            direct_results = []
+            if source_id_filter and query_entities.get('articles'):
+                direct_results = self._article_index_seek(source_id_filter, query_entities['articles'])
+                found_articles = {r.get("article_no") for r in direct_results}
+                missing_articles = [a for a in query_entities['articles'] if a not in found_articles]
+                if direct_results and missing_articles:
+                    logger.info(f"⚡ Article Index: missing {missing_articles}; text search for those")
+                    query_entities = {**query_entities, 'articles': missing_articles}
+                elif direct_results:
+                    execution_time = time.time() - start
+                    logger.info(f"⚡ Article Index: {len(direct_results)} chunks in {execution_time:.2f}s")
+                    return ToolResult(
+                        success=True,
+                        data=direct_results,
+                        metadata={
+                            "execution_time": execution_time,
+                            "query_type": query_type,
+                            "search_method": "ARTICLE_INDEX",
+                            "extracted_entities": query_entities,
+                            "total_candidates": len(direct_results),
+                        },
+                        execution_time_ms=int(execution_time * 1000)
+                    )
+            
             # Phase 1: Enhanced Scout
             logger.info(f"🕵️‍♂️ Enhanced Scout Phase (Query Type: {query_type})...")
             keywords, scout_entities, found_matches = await self._adaptive_scout_phase(
@@ -1372,12 +1305,12 @@ Provide ONLY the comma-separated keywords, nothing else.
                 # For article enumeration, proceed even with weak signals
                 if not found_matches and not keywords and not all_entities.get('articles'):
                     logger.warning("⛔ Kill Switch: No signal detected (Article Enumeration)")
-                    return ToolResult(success=True, data=[])
+                    return ToolResult(success=True, data=direct_results)
             else:
                 # Standard kill switch for other types
                 if not found_matches and not keywords:
                     logger.warning("⛔ Kill Switch: No signal detected")
-                    return ToolResult(success=True, data=[])
+                    return ToolResult(success=True, data=direct_results)
             
             # Phase 2: Precision Sniper
             logger.info("🎯 Precision Sniper Phase...")
@@ -1402,6 +1335,11 @@ Provide ONLY the comma-separated keywords, nothing else.
             # ⚠️ DISABLED: Quality Guardrail (was blocking valid results)
             # The simple rule-based scoring is accurate enough
             
+            # Index hits first, then the text results for the missing articles
+            if direct_results:
+                seen_ids = {r.get("id") for r in direct_results}
+                final_results = direct_results + [r for r in final_results or [] if r.get("id") not in seen_ids]
+            
             # Log results
             execution_time = time.time() - start
             logger.info(f"✅ Search Complete: {len(final_results)} results in {execution_time:.2f}s")
@@ -1412,6 +1350,7 @@ Provide ONLY the comma-separated keywords, nothing else.
                 metadata={
                     "execution_time": execution_time,
                     "query_type": query_type,
+                    "search_method": "ARTICLE_INDEX+TEXT" if direct_results else "TEXT",
                     "scout_keywords": keywords[:15],
                     "extracted_entities": all_entities,
                     "total_candidates": len(final_results),
@@ -3,7 +3,9 @@ Lookup Principle Tool
 أداة البحث عن المبادئ القانونية في جدول thought_templates
 """
 
+import os
 import time
+import asyncio
 import logging
 from typing import List, Optional, Dict, Any, Type
 # Use standard pydantic, usually compatible. If issues, try langchain_core.pydantic_v1
@@ -11,13 +13,16 @@ from pydantic import BaseModel, Field
 
 from .base_tool import BaseTool, ToolResult
 from ..config.database import db
-from ..knowledge.embeddings import create_query_embedding
+from ..knowledge.embeddings import create_query_embedding, create_embeddings
 
 # Explicitly import StructuredTool for the override
 from langchain_core.tools import StructuredTool
 
 logger = logging.getLogger(__name__)
 
+# Minimum cosine similarity for match_thought_templates (separate from confidence_score)
+PRINCIPLE_MATCH_THRESHOLD = float(os.getenv("PRINCIPLE_MATCH_THRESHOLD", 0.45))
+
 class LookupPrincipleInput(BaseModel):
     """Input for lookup_principle tool."""
     query: str = Field(..., description="The search query for the legal principle.")
@@ -86,8 +91,10 @@ class LookupPrincipleTool(BaseTool):
         try:
             logger.info(f"🔍 LookupPrinciple: Searching for '{query[:50]}...'")
             
-            # Use keyword search (template_embedding is currently NULL in DB)
-            results = self._keyword_search_principles(query, limit, principle_type)
+            # Vector search (template_embedding, see principle_index backfill); keywords as fallback
+            results = self._vector_search_principles(query, limit, principle_type, min_confidence)
+            if not results:
+                results = self._keyword_search_principles(query, limit, principle_type)
             
             elapsed = (time.time() - start_time) * 1000
             
@@ -113,30 +120,28 @@ class LookupPrincipleTool(BaseTool):
         query: str,
         limit: int,
         principle_type: Optional[str],
-        min_confidence: float
+        min_confidence: float,
+        query_embedding: Optional[List[float]] = None
     ) -> List[Dict[str, Any]]:
-        """Search principles using vector similarity"""
+        """Search principles using vector similarity (filters applied in SQL)"""
         try:
-            # Generate embedding for query
-            query_embedding = create_query_embedding(query)
-            embedding_str = "[" + ",".join(map(str, query_embedding)) + "]"
+            if query_embedding is None:
+                query_embedding = create_query_embedding(query)
             
-            # Use RPC for vector search if available
+            # Native float array: PostgREST casts it to vector, no text formatting round trip
             response = db.client.rpc(
                 "match_thought_templates",
                 {
-                    "query_embedding": embedding_str,
-                    "match_threshold": min_confidence,
-                    "match_count": limit
+                    "query_embedding": list(query_embedding),
+                    "match_threshold": PRINCIPLE_MATCH_THRESHOLD,
+                    "match_count": limit,
+                    "p_principle_type": principle_type,
+                    "p_min_confidence": min_confidence
                 }
             ).execute()
             
             results = []
-            for row in response.data:
-                # Apply type filter if specified
-                if principle_type and row.get("principle_type") != principle_type:
-                    continue
-                    
+            for row in response.data or []:
                 results.append({
                     "id": row["id"],
                     "principle_text": row.get("template_text"),
@@ -145,6 +150,7 @@ class LookupPrincipleTool(BaseTool):
                     "is_absolute": row.get("is_absolute"),
                     "exceptions": row.get("exceptions"),
                     "occurrence_count": row.get("occurrence_count"),
+                    "keywords": row.get("keywords"),
                     "similarity": row.get("similarity", 0.0)
                 })
             
@@ -154,6 +160,52 @@ class LookupPrincipleTool(BaseTool):
             logger.warning(f"Vector search failed, falling back to keyword: {e}")
             return []
     
+    async def search_many(
+        self,
+        queries: List[str],
+        limit: int = 2,
+        principle_type: Optional[str] = None,
+        min_confidence: float = 0.0
+    ) -> List[Dict[str, Any]]:
+        """
+        Concurrent multi-query principle search.
+        
+        All queries are embedded in one batched request, the RPCs run in parallel
+        threads, and the results are deduplicated by id (best similarity wins).
+        """
+        queries = list(dict.fromkeys(q.strip() for q in queries if q and q.strip()))
+        if not queries:
+            return []
+        
+        try:
+            embeddings = await asyncio.to_thread(create_embeddings, queries)
+        except Exception as e:
+            logger.warning(f"Batch query embedding failed, using keyword search: {e}")
+            embeddings = [None] * len(queries)
+        
+        async def search_one(query: str, embedding: Optional[List[float]]) -> List[Dict[str, Any]]:
+            results = []
+            if embedding is not None:
+                results = await asyncio.to_thread(
+                    self._vector_search_principles, query, limit, principle_type, min_confidence, embedding
+                )
+            if not results:
+                results = await asyncio.to_thread(self._keyword_search_principles, query, limit, principle_type)
+            return results
+        
+        result_lists = await asyncio.gather(*(search_one(q, e) for q, e in zip(queries, embeddings)))
+        
+        merged: Dict[str, Dict[str, Any]] = {}
+        for results in result_lists:
+            for item in results:
+                best = merged.get(item["id"])
+                if best is None or item.get("similarity", 0.0) > best.get("similarity", 0.0):
+                    merged[item["id"]] = item
+        
+        ranked = sorted(merged.values(), key=lambda item: item.get("similarity", 0.0), reverse=True)
+        logger.info(f"✅ LookupPrinciple: {len(ranked)} unique principles for {len(queries)} queries")
+        return ranked
+    
     def _keyword_search_principles(
         self,
         query: str,
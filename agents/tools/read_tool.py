@@ -3,6 +3,7 @@ import time
 from typing import Optional, Dict, Any, List
 from .base_tool import BaseTool, ToolResult
 from ..config.database import db
+from ..knowledge.chunk_neighborhood import get_neighborhood_fetcher
 
 logger = logging.getLogger(__name__)
 
@@ -66,20 +67,18 @@ class ReadDocumentTool(BaseTool):
             strict=True # REQUIRED for auto-parsing in stricter LLM environments
         )
 
-    def _fetch_neighbors(self, source_id: str, current_seq: int, table: str) -> Dict[str, str]:
-        """Fetches N-1 and N+1 content for context expansion."""
-        # Fetch Prev (N-1) and Next (N+1)
-        neighbors = db.client.from_(table)\
-            .select("sequence_number, content")\
-            .eq("source_id", source_id)\
-            .in_("sequence_number", [current_seq - 1, current_seq + 1])\
-            .execute()
-        
-        neighbor_map = {}
-        if neighbors.data:
-            for item in neighbors.data:
-                neighbor_map[item['sequence_number']] = item.get('content', '')
-        return neighbor_map
+    @staticmethod
+    def _neighbor_map(window: List[Dict[str, Any]], current_seq: int) -> Dict[int, str]:
+        return {
+            item['sequence_number']: item.get('content', '')
+            for item in window
+            if item['sequence_number'] != current_seq
+        }
+
+    def _fetch_neighbors(self, source_id: str, current_seq: int, table: str) -> Dict[int, str]:
+        """Fetches N-1 and N+1 content for context expansion (batched fetcher, LRU cached)."""
+        window = get_neighborhood_fetcher().windows([(source_id, current_seq)])[0]
+        return self._neighbor_map(window, current_seq)
     
     # ... (Keep existing helpers _find_article_boundaries, _extract_article unchanged if needed) ...
 
@@ -106,6 +105,8 @@ class ReadDocumentTool(BaseTool):
         try:
             limit = min(limit, 100)
             
+            window = None
+            
             # --- Navigation Logic (Book Mode) ---
             if source_id and sequence_number is not None:
                 # User wants a specific "Page"
@@ -121,34 +122,43 @@ class ReadDocumentTool(BaseTool):
                 
                 # Update doc_id to match what we found
                 doc_id = res.data["id"]
-                # data is already fetched
+                data = res.data
+            
+            elif doc_id and expand_context and table == "document_chunks":
+                # Chunk + neighbours in one round trip (none when the window is cached)
+                window = get_neighborhood_fetcher().windows([doc_id])[0]
+                data = next((item for item in window if str(item["id"]) == str(doc_id)), None)
             
             elif doc_id:
                 # Standard ID lookup
                 field = "full_content_md" if table == "legal_sources" else "content, source_id, sequence_number" 
                 res = db.client.from_(table).select(field).eq("id", doc_id).single().execute()
+                data = res.data if res else None
             else:
                 return ToolResult(success=False, error="Must provide doc_id OR (source_id + sequence_number)")
             
-            if not res or not res.data:
+            if not data:
                 return ToolResult(success=False, error=f"Document not found")
             
             # Extract content
             if table == "legal_sources":
-                 full_text = res.data.get("full_content_md") or ""
+                 full_text = data.get("full_content_md") or ""
                  current_seq = None
-                 current_source = res.data.get("id")
+                 current_source = data.get("id")
             else:
-                 full_text = res.data.get("content") or ""
-                 current_seq = res.data.get("sequence_number")
-                 current_source = res.data.get("source_id")
+                 full_text = data.get("content") or ""
+                 current_seq = data.get("sequence_number")
+                 current_source = data.get("source_id")
 
             # --- 🚀 NEW: Context Expansion Logic ---
             neighbor_content_prev = ""
             neighbor_content_next = ""
             
             if expand_context and current_source and current_seq is not None:
-                neighbors = self._fetch_neighbors(current_source, current_seq, table)
+                if window is None:
+                    neighbors = self._fetch_neighbors(current_source, current_seq, table)
+                else:
+                    neighbors = self._neighbor_map(window, current_seq)
                 if (current_seq - 1) in neighbors:
                     neighbor_content_prev = f"\n\n--- ⬇️ [PREVIOUS PAGE {current_seq - 1}] ⬇️ ---\n" + neighbors[current_seq - 1]
                 if (current_seq + 1) in neighbors:
@@ -1,4 +1,5 @@
 import logging
+import os
 import time
 from typing import List, Dict, Any, Optional
 from dataclasses import dataclass
@@ -19,9 +20,18 @@ class VectorSearchTool(BaseTool):
     """
     Advanced Vector Search Tool (Infrastructure Ready)
     Uses Supabase `match_documents` RPC for cosine similarity.
+
+    Backends (VECTOR_SEARCH_BACKEND):
+    - "pgvector" (default): match_documents_v2 RPC, filters applied after retrieval
+    - "local": in-process IVF index (agents/knowledge/ann_index.py) partitioned by
+      country_id; only the top ids are fetched from the DB. Falls back to the RPC
+      when no local index has been built.
+    - "quantized": match_documents_quantized RPC — first stage on the binary / half
+      precision index (VECTOR_FIRST_STAGE), exact rescoring of the top
+      match_count × VECTOR_CANDIDATE_MULTIPLIER candidates; country filtered in SQL
     """
     
-    def __init__(self):
+    def __init__(self, backend: Optional[str] = None):
         super().__init__(
             name="vector_search",
             description="بحث دلالي باستخدام تقنية المتجهات (Embeddings)"
@@ -30,6 +40,66 @@ class VectorSearchTool(BaseTool):
         # ✅ FIX 4: Lowered threshold for better recall
         self.match_threshold = 0.3  # Was 0.5, now more lenient
         self.match_count = 10
+        self.backend = (backend or os.getenv("VECTOR_SEARCH_BACKEND", "pgvector")).lower()
+
+    @staticmethod
+    def _matches_filter(item: Dict[str, Any], meta: Dict[str, Any], filter: Dict[str, Any]) -> bool:
+        """All filter keys must match metadata (or the top-level item)"""
+        for k, v in filter.items():
+            val = meta.get(k)
+            if val is None:
+                val = item.get(k)
+            if str(val) != str(v):
+                return False
+        return True
+
+    def _run_local(
+        self,
+        query_vector: List[float],
+        threshold: float,
+        count: int,
+        filter: Optional[Dict[str, Any]],
+        start_time: float
+    ) -> Optional[ToolResult]:
+        """Search the local ANN index; None when it is not available"""
+        from agents.knowledge.ann_index import get_ann_index
+
+        index = get_ann_index()
+        if not index.available:
+            return None
+
+        filter = dict(filter or {})
+        country_id = filter.pop("country_id", None)
+        # country_id is a partition, not a post-filter; other keys still need headroom
+        hits = index.search(query_vector, k=count * 2 if filter else count,
+                            country_id=country_id, threshold=threshold)
+        if not hits:
+            elapsed = (time.time() - start_time) * 1000
+            logger.info(f"🕸️ VectorSearch[local]: No matches above threshold {threshold}")
+            return ToolResult(success=True, data=[], execution_time_ms=elapsed, metadata={"backend": "local"})
+
+        response = db.document_chunks.select(
+            "id, content, source_id, country_id, sequence_number, ai_summary"
+        ).in_("id", [chunk_id for chunk_id, _ in hits]).execute()
+        rows = {row["id"]: row for row in (response.data or [])}
+
+        results = []
+        for chunk_id, similarity in hits:
+            row = rows.get(chunk_id)
+            if row is None:  # Deleted since the index was built
+                continue
+            meta = {k: row.get(k) for k in ("source_id", "country_id", "sequence_number", "ai_summary")}
+            if filter and not self._matches_filter(row, meta, filter):
+                continue
+            results.append(VectorSearchResult(id=chunk_id, content=row.get("content"),
+                                              similarity=similarity, metadata=meta))
+            if len(results) >= count:
+                break
+
+        elapsed = (time.time() - start_time) * 1000
+        logger.info(f"✅ VectorSearch[local]: Found {len(results)} matches in {elapsed:.0f}ms")
+        return ToolResult(success=True, data=[r.__dict__ for r in results],
+                          execution_time_ms=elapsed, metadata={"backend": "local"})
 
     def run(
         self,
@@ -47,6 +117,15 @@ class VectorSearchTool(BaseTool):
         threshold = match_threshold or self.match_threshold
         count = match_count or self.match_count
         
+        if self.backend == "local":
+            try:
+                local = self._run_local(query_vector, threshold, count, filter, start_time)
+                if local is not None:
+                    return local
+            except Exception as e:
+                logger.warning(f"⚠️ Local ANN search failed, using RPC: {e}")
+        
+        rpc_name = "match_documents_v2"
         # We fetch slightly more to allow for post-filtering
         fetch_count = count * 2 if filter else count
         
@@ -59,8 +138,16 @@ class VectorSearchTool(BaseTool):
                 "filter": filter or {}
             }
             
+            if self.backend == "quantized":
+                from agents.knowledge.quantization import DEFAULT_FIRST_STAGE, DEFAULT_CANDIDATE_MULTIPLIER
+                rpc_name = "match_documents_quantized"
+                # country_id is applied inside the query; only other keys need headroom
+                params["match_count"] = count * 2 if set(filter or {}) - {"country_id"} else count
+                params["p_first_stage"] = DEFAULT_FIRST_STAGE
+                params["p_candidate_multiplier"] = DEFAULT_CANDIDATE_MULTIPLIER
+            
             # Using Supabase rpc method
-            response = db.client.rpc("match_documents_v2", params).execute()
+            response = db.client.rpc(rpc_name, params).execute()
             
             elapsed = (time.time() - start_time) * 1000
             
@@ -73,25 +160,8 @@ class VectorSearchTool(BaseTool):
                 meta = item.get("metadata", {})
                 
                 # --- Post-Filtering (Python Side) ---
-                if filter:
-                    # Check if all filter keys match metadata
-                    # Special handling for "country_id" which might be top-level in some RPCs or inside metadata
-                    # We check both
-                    
-                    match = True
-                    for k, v in filter.items():
-                        # Check metadata first
-                        val = meta.get(k)
-                        # If not in metadata, check top-level item (unlikely for match_documents usually, but possible)
-                        if val is None:
-                            val = item.get(k)
-                        
-                        if str(val) != str(v):
-                            match = False
-                            break
-                    
-                    if not match:
-                        continue
+                if filter and not self._matches_filter(item, meta, filter):
+                    continue
                 
                 results.append(VectorSearchResult(
                     id=item.get("id"),
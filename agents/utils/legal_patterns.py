@@ -0,0 +1,112 @@
+"""
+Legal Citation Patterns
+أنماط التعرف على أرقام المواد في النصوص القانونية
+
+Shared by the search tools (citation extraction) and the knowledge pipeline
+(article-boundary chunking), so both agree on what an article reference is.
+"""
+import re
+
+# Article Patterns (Arabic, English, with ranges support)
+ARTICLE_PATTERNS = [
+    # Arabic patterns - Standard
+    r'المادة\s*[\(]?\s*([\d\u0660-\u0669]+)\s*[\)]?',           # المادة 77, المادة (77), المادة ٧٧
+    r'المواد\s*[\(]?\s*([\d\u0660-\u0669]+)\s*[\)]?',          # المواد 77
+    r'مادة\s*[\(]?\s*([\d\u0660-\u0669]+)\s*[\)]?',            # مادة 77
+    r'م\s*[\.\:\-]?\s*([\d\u0660-\u0669]+)',                   # م.77, م:77, م-77
+
+    # Arabic patterns - Typo variants (ه instead of ة)
+    r'الماده\s*[\(]?\s*([\d\u0660-\u0669]+)\s*[\)]?',          # الماده 77 (typo)
+    r'ماده\s*[\(]?\s*([\d\u0660-\u0669]+)\s*[\)]?',            # ماده 77 (typo)
+
+    # Arabic patterns - with رقم
+    r'المادة\s+رقم\s*([\d\u0660-\u0669]+)',                    # المادة رقم 77
+    r'الماده\s+رقم\s*([\d\u0660-\u0669]+)',                    # الماده رقم 77 (typo)
+
+    # English patterns
+    r'Article\s*[\(]?\s*(\d+)\s*[\)]?',                        # Article 77, Article (77)
+    r'Art\s*\.?\s*[\(]?\s*(\d+)\s*[\)]?',                     # Art. 77, Art 77
+    r'Section\s*[\(]?\s*(\d+)\s*[\)]?',                       # Section 77
+    r'Sec\s*\.?\s*[\(]?\s*(\d+)\s*[\)]?',                     # Sec. 77
+
+    # French patterns
+    r'Article\s*[\(]?\s*(\d+)\s*[\)]?',                       # Article 77
+    r'Art\s*\.?\s*[\(]?\s*(\d+)\s*[\)]?',                     # Art. 77
+]
+
+# Article headings spelled out in words: "المادة الأولى", "المادة الثامنة والستون بعد الثلاثمائة"
+SPELLED_ARTICLE_PATTERN = (
+    r'(?:المادة|مادة|الماده|ماده)\s*[\(]?\s*ال'
+    r'(?:أول|اول|ثاني|ثالث|رابع|خامس|سادس|سابع|ثامن|تاسع|عاشر|حادي|مائ|مئ'
+    r'|عشر|ثلاث|أربع|اربع|خمس|ست|سبع|ثمان|تسع)'
+)
+
+_ARTICLE_WORD = re.compile(r'(?:المادة|مادة|الماده|ماده)\s*[\(]?\s*(?:رقم\s*)?')
+_ARTICLE_DIGITS = re.compile(
+    r'(?:المادة|مادة|الماده|ماده|Article|Art\.?)\s*[\(]?\s*(?:رقم\s*)?([\d٠-٩]+)', re.IGNORECASE
+)
+_ARABIC_INDIC_DIGITS = str.maketrans('٠١٢٣٤٥٦٧٨٩', '0123456789')
+# hamza → ا, ة → ه, ى → ي, no diacritics (ordinal spellings vary between sources)
+_ORDINAL_FOLD = str.maketrans('أإآةى', 'اااهي', 'ًٌٍَُِّْـ')
+
+
+def _ordinal_values():
+    values = {}
+    units = ["اول", "ثاني", "ثالث", "رابع", "خامس", "سادس", "سابع", "ثامن", "تاسع", "عاشر"]
+    for n, word in enumerate(units, start=1):
+        values[word] = values[word + "ه"] = n
+    values.update({"اولي": 1, "حادي": 1, "حاديه": 1, "عشر": 10, "عشره": 10})
+    tens = ["عشر", "ثلاث", "اربع", "خمس", "ست", "سبع", "ثمان", "تسع"]
+    for n, stem in enumerate(tens, start=2):
+        values[stem + "ون"] = values[stem + "ين"] = n * 10
+    hundreds = ["", "", "ثلاث", "اربع", "خمس", "ست", "سبع", "ثمان", "تسع"]
+    for n, stem in enumerate(hundreds, start=1):
+        if n == 2:
+            for form in ("مائتان", "مائتين", "مئتان", "مئتين"):
+                values[form] = 200
+            continue
+        values[stem + "مائه"] = values[stem + "مئه"] = n * 100
+    values["الف"] = 1000
+    return values
+
+
+_ORDINAL_VALUES = _ordinal_values()
+
+
+def ordinal_to_number(text: str):
+    """
+    "الثامنة والستون بعد الثلاثمائة" → 368, "الحادية عشرة" → 11
+
+    Reads number words from the start of text and stops at the first other word.
+    Returns None when text does not start with a number word.
+    """
+    total, seen = 0, False
+    for token in re.findall(r'[ء-ي]+', text.translate(_ORDINAL_FOLD)):
+        if token == "بعد" and seen:
+            continue
+        if token.startswith("و") and seen:
+            token = token[1:]
+        if token.startswith("ال"):
+            token = token[2:]
+        value = _ORDINAL_VALUES.get(token)
+        if value is None:
+            break
+        total += value
+        seen = True
+    return total or None
+
+
+def parse_article_number(heading: str):
+    """
+    Article number of an article heading ("المادة 368", "المادة (٧٧)",
+    "المادة الثامنة والستون بعد الثلاثمائة", "Article 5"). None if there is none.
+    """
+    if not heading:
+        return None
+    match = _ARTICLE_DIGITS.search(heading)
+    if match:
+        return int(match.group(1).translate(_ARABIC_INDIC_DIGITS))
+    match = _ARTICLE_WORD.search(heading)
+    if match:
+        return ordinal_to_number(heading[match.end():match.end() + 120])
+    return None
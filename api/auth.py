@@ -157,6 +157,9 @@ async def signup(request: SignupRequest):
                     "extra_words": 0
                 }
                 supabase.table("lawyer_subscriptions").insert(sub_data).execute()
+                # A "no subscription" lookup may already be cached for this user
+                from api.cache.invalidation import invalidate_subscription_caches
+                await invalidate_subscription_caches(user["id"])
             else:
                 logger.warning(f"No starter package found for user {user['id']}")
         except Exception as e:
@@ -375,6 +378,9 @@ async def delete_account(
         # Delete from public.users
         delete_result = supabase.table("users").delete().eq("id", user_id).execute()
         
+        from api.cache.invalidation import invalidate_user_caches
+        await invalidate_user_caches(user_id)
+        
         # If using Supabase Auth, we would also:
         # supabase.auth.admin.delete_user(user_id) 
         # But let's stick to the visible table for now as that's what the app logic seems to revolve around.
@@ -13,34 +13,15 @@ import logging
 import os
 
 from agents.storage.user_storage import user_storage
+from api.cache.user_cache import get_user_cache
+from api.utils.jwt_verifier import get_jwt_verifier
 
 logger = logging.getLogger(__name__)
 
 # --- Performance: User Cache ---
-class UserCache:
-    """Simple in-memory cache for user data to prevent N+1 DB calls"""
-    def __init__(self, ttl_minutes: int = 5):
-        self._cache = {}
-        self._ttl = timedelta(minutes=ttl_minutes)
-    
-    def get(self, user_id: str) -> Optional[Dict[str, Any]]:
-        if user_id in self._cache:
-            data, timestamp = self._cache[user_id]
-            if datetime.utcnow() - timestamp < self._ttl:
-                return data
-            else:
-                del self._cache[user_id] # Expired
-        return None
-    
-    def set(self, user_id: str, data: Dict[str, Any]):
-        self._cache[user_id] = (data, datetime.utcnow())
-        
-    def invalidate(self, user_id: str):
-        if user_id in self._cache:
-            del self._cache[user_id]
-
-# Global user cache instance
-user_cache = UserCache()
+# Bounded LRU+TTL profile cache backed by Redis (see api/cache/user_cache.py);
+# invalidated through api.cache.invalidation.invalidate_user_caches
+user_cache = get_user_cache()
 
 # Security configurations
 SECRET_KEY = os.getenv("JWT_SECRET_KEY", "your-secret-key-change-this-in-production-min-32-chars")
@@ -126,12 +107,31 @@ def decode_token(token: str) -> Optional[Dict[str, Any]]:
     except JWTError:
         return None
 
+async def _load_user_profile(user_id: str) -> Optional[Dict[str, Any]]:
+    """
+    Fetch user profile through the bounded cache.
+    Sensitive fields are stripped before the profile is cached.
+    """
+    user, versions = await user_cache.get_versioned(user_id)
+    if user is not None:
+        return user
+
+    user = user_storage.get_user_by_id(user_id)
+    if user is None:
+        return None
+
+    user.pop("password_hash", None)
+    await user_cache.set(user_id, user, versions)
+    return user
+
+
 async def get_current_user(
     credentials: HTTPAuthorizationCredentials = Depends(security)
 ) -> Dict[str, Any]:
     """
-    Get current authenticated user via Supabase Auth.
-    Verifies the token with Supabase and fetches the profile.
+    Get current authenticated user.
+    Verifies the token locally (internal secret, Supabase secret or cached JWKS)
+    and fetches the profile through the user cache.
     """
     credentials_exception = HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
@@ -140,26 +140,18 @@ async def get_current_user(
     )
     
     token = credentials.credentials
-    supabase = get_supabase_client()
+    verifier = get_jwt_verifier()
     
     try:
-        # 1. OPTIMIZED: Try Local Decode First (Faster & Supports Custom Auth)
-        # Using verify_token=True ensures we trust the signature if it matches our SECRET_KEY
-        payload = decode_token(token)
-        
-        user_id = None
-        
-        if payload and payload.get("sub"):
-            # Valid Local Token found
-            user_id = payload.get("sub")
-            # Check expiration manually if decode_token doesn't throw
-            exp = payload.get("exp")
-            if exp and datetime.fromtimestamp(exp) < datetime.utcnow():
-                 user_id = None # Expired
-
-        # 2. Fallback: Verify Token with Supabase Auth (If local decode failed or external token)
-        if not user_id:
+        # 1. Stateless verification (signature + exp checked by the verifier)
+        payload = await verifier.verify(token)
+        user_id = payload.get("sub") if payload else None
+
+        # 2. Fallback: Supabase Auth round trip, only when no local key material
+        # can judge this token (e.g. SUPABASE_JWT_SECRET not configured)
+        if not user_id and not verifier.has_key_material(token):
             try:
+                supabase = get_supabase_client()
                 user_response = supabase.auth.get_user(token)
                 if user_response.user:
                     user_id = user_response.user.id
@@ -169,26 +161,19 @@ async def get_current_user(
         if not user_id:
              raise credentials_exception
 
-        # 3. Check Cache
-        cached_user = user_cache.get(user_id)
-        if cached_user:
-            return cached_user
-
-        # 4. Get Full Profile from Database
-        # Verify user exists in our profile table and get their Role
-        user = user_storage.get_user_by_id(user_id)
+        # 3. Profile (cache -> DB)
+        user = await _load_user_profile(user_id)
         if user is None:
             # Maybe user exists in auth but not public table
             raise credentials_exception
-            
-        # 5. Cache and Return
-        user_cache.set(user_id, user)
         
         if not user.get("is_active", False):
             raise HTTPException(status_code=403, detail="User account is inactive")
             
         return user
         
+    except HTTPException:
+        raise
     except Exception as e:
         logger.warning(f"Auth verification failed: {e}")
         raise credentials_exception
@@ -301,8 +286,8 @@ async def get_current_user_optional(
     
     token = credentials.credentials
     
-    # Decode token
-    payload = decode_token(token)
+    # Verify token locally
+    payload = await get_jwt_verifier().verify(token)
     if payload is None:
         # Invalid token - treat as anonymous
         logger.warning("Invalid token - treating as anonymous")
@@ -312,8 +297,8 @@ async def get_current_user_optional(
     if user_id is None:
         return None
     
-    # Get user from database
-    user = user_storage.get_user_by_id(user_id)
+    # Get user (cache -> DB; sensitive fields already stripped)
+    user = await _load_user_profile(user_id)
     if user is None:
         logger.warning(f"User {user_id} not found in database")
         return None
@@ -323,10 +308,7 @@ async def get_current_user_optional(
         logger.warning(f"User {user_id} account is inactive")
         return None
     
-    # Remove sensitive data
-    user.pop("password_hash", None)
-    
-    logger.info(f"Authenticated user: {user.get('full_name')} ({user_id})")
+    logger.debug(f"Authenticated user: {user.get('full_name')} ({user_id})")
     return user
 
 
@@ -10,8 +10,16 @@ from .invalidation import (
     invalidate_tasks_caches,
     invalidate_case_caches,
     invalidate_after_task_change,
-    invalidate_after_case_change
+    invalidate_after_case_change,
+    invalidate_subscription_caches,
+    invalidate_all_subscription_caches,
+    invalidate_after_profile_update,
+    invalidate_chat_session_contexts,
+    invalidate_chat_session
 )
+from .subscription_cache import get_subscription_cache, SubscriptionCache
+from .user_cache import get_user_cache, UserProfileCache
+from .session_context_cache import get_session_context_cache, SessionContextCache
 
 __all__ = [
     'get_cache',
@@ -24,5 +32,16 @@ __all__ = [
     'invalidate_tasks_caches',
     'invalidate_case_caches',
     'invalidate_after_task_change',
-    'invalidate_after_case_change'
+    'invalidate_after_case_change',
+    'invalidate_subscription_caches',
+    'invalidate_all_subscription_caches',
+    'invalidate_after_profile_update',
+    'invalidate_chat_session_contexts',
+    'invalidate_chat_session',
+    'get_subscription_cache',
+    'SubscriptionCache',
+    'get_user_cache',
+    'UserProfileCache',
+    'get_session_context_cache',
+    'SessionContextCache'
 ]
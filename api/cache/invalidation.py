@@ -1,185 +1,247 @@
 """
 Cache Invalidation Helpers
 إدارة مركزية لإبطال Cache عند التحديثات
+
+المجموعات (dashboard / tasks / case / كل بيانات المحامي) تُبطل بزيادة نسخة
+الـ tag الخاص بها (INCR واحد) بدلاً من البحث عن المفاتيح بنمط.
 """
 import logging
 from typing import Optional
 from .redis_client import get_cache
 from .keys import CacheKeys
+from .session_context_cache import get_session_context_cache
+from .subscription_cache import get_subscription_cache
+from .user_cache import get_user_cache
 
 logger = logging.getLogger(__name__)
 
 
-def invalidate_user_caches(user_id: str):
+async def invalidate_user_caches(user_id: str):
     """
     إبطال جميع caches متعلقة بمستخدم معين
-    
+
     Args:
         user_id: معرف المستخدم
     """
     cache = get_cache()
-    
-    keys_to_delete = [
+
+    await cache.delete(
         CacheKeys.user_profile(user_id),
         CacheKeys.user_stats(user_id),
-    ]
-    
-    for key in keys_to_delete:
-        cache.delete(key)
-    
+    )
+
+    # In-process auth profile cache (L1)
+    get_user_cache().invalidate(user_id)
+
     logger.info(f"🗑️ Invalidated user caches for: {user_id}")
 
 
-def invalidate_lawyer_dashboard(lawyer_id: str):
+async def invalidate_all_user_profiles():
+    """
+    إبطال جميع ملفات المستخدمين المخزنة
+
+    يُستدعى بعد تعديل صلاحيات دور (مضمّنة في كل ملف مستخدم)
+    """
+    await get_cache().invalidate_tag(CacheKeys.USER_PROFILES_TAG)
+    get_user_cache().clear()
+
+    logger.info("🗑️ Invalidated all user profiles")
+
+
+async def invalidate_lawyer_dashboard(lawyer_id: str):
     """
     إبطال caches لوحة التحكم
-    
+
     Args:
         lawyer_id: معرف المحامي
     """
     cache = get_cache()
-    
-    # حذف جميع بيانات Dashboard
-    pattern = f"lawyer:{lawyer_id}:dashboard:*"
-    count = cache.delete_pattern(pattern)
-    
+
+    # جميع بيانات Dashboard مخزنة مع dashboard tag
+    await cache.invalidate_tag(CacheKeys.lawyer_dashboard_tag(lawyer_id))
+
     # حذف إحصائيات المستخدم أيضاً
-    cache.delete(CacheKeys.user_stats(lawyer_id))
-    
-    logger.info(f"🗑️ Invalidated {count} dashboard caches for lawyer: {lawyer_id}")
+    await cache.delete(CacheKeys.user_stats(lawyer_id))
+
+    logger.info(f"🗑️ Invalidated dashboard caches for lawyer: {lawyer_id}")
 
 
-def invalidate_tasks_caches(lawyer_id: str):
+async def invalidate_tasks_caches(lawyer_id: str):
     """
     إبطال caches المهام
-    
+
     Args:
         lawyer_id: معرف المحامي
     """
-    cache = get_cache()
-    
-    pattern = f"lawyer:{lawyer_id}:tasks:*"
-    count = cache.delete_pattern(pattern)
-    
-    logger.info(f"🗑️ Invalidated {count} tasks caches for lawyer: {lawyer_id}")
+    await get_cache().invalidate_tag(CacheKeys.lawyer_tasks_tag(lawyer_id))
 
+    logger.info(f"🗑️ Invalidated tasks caches for lawyer: {lawyer_id}")
 
-def invalidate_case_caches(case_id: str):
+
+async def invalidate_case_caches(case_id: str):
     """
     إبطال جميع caches متعلقة بقضية
-    
+
     Args:
         case_id: معرف القضية
     """
-    cache = get_cache()
-    
-    pattern = CacheKeys.case_all_data(case_id)
-    count = cache.delete_pattern(pattern)
-    
-    logger.info(f"🗑️ Invalidated {count} case caches for: {case_id}")
+    await get_cache().invalidate_tag(CacheKeys.case_tag(case_id))
 
+    logger.info(f"🗑️ Invalidated case caches for: {case_id}")
 
-def invalidate_police_records_caches(lawyer_id: str):
+
+async def invalidate_police_records_caches(lawyer_id: str):
     """
     إبطال caches المحاضر
-    
+
     Args:
         lawyer_id: معرف المحامي
     """
-    cache = get_cache()
-    
-    cache.delete(CacheKeys.lawyer_police_records(lawyer_id))
+    await get_cache().delete(CacheKeys.lawyer_police_records(lawyer_id))
     logger.info(f"🗑️ Invalidated police records cache for lawyer: {lawyer_id}")
 
 
-def invalidate_notifications_caches(lawyer_id: str):
+async def invalidate_notifications_caches(lawyer_id: str):
     """
     إبطال caches الإشعارات
-    
+
     Args:
         lawyer_id: معرف المحامي
     """
-    cache = get_cache()
-    
-    cache.delete(CacheKeys.lawyer_notifications(lawyer_id))
+    await get_cache().delete(CacheKeys.lawyer_notifications(lawyer_id))
     logger.info(f"🗑️ Invalidated notifications cache for lawyer: {lawyer_id}")
 
 
+async def invalidate_subscription_caches(lawyer_id: str):
+    """
+    إبطال snapshot اشتراك المحامي
+
+    Args:
+        lawyer_id: معرف المحامي
+    """
+    await get_subscription_cache().invalidate(lawyer_id)
+    # Chat session snapshots embed the subscription status
+    await invalidate_chat_session_contexts(lawyer_id)
+    logger.info(f"🗑️ Invalidated subscription snapshot for lawyer: {lawyer_id}")
+
+
+async def invalidate_all_subscription_caches():
+    """
+    إبطال جميع snapshots الاشتراكات
+
+    يُستدعى بعد تعديل حدود باقة (تؤثر على كل المشتركين فيها)
+    """
+    await get_subscription_cache().invalidate_all()
+
+
+async def invalidate_chat_session_contexts(lawyer_id: str):
+    """
+    إبطال snapshots جميع جلسات المحادثة لمحامٍ (INCR واحد)
+
+    Args:
+        lawyer_id: معرف المحامي
+    """
+    await get_cache().invalidate_tag(CacheKeys.lawyer_chat_sessions_tag(lawyer_id))
+    logger.info(f"🗑️ Invalidated chat session snapshots for lawyer: {lawyer_id}")
+
+
+async def invalidate_chat_session(session_id: str):
+    """
+    إبطال snapshot جلسة محادثة واحدة (بعد حذفها)
+
+    Args:
+        session_id: معرف الجلسة
+    """
+    await get_session_context_cache().invalidate(session_id)
+
+
 # ===== Combined Invalidation Functions =====
 
-def invalidate_after_task_change(lawyer_id: str):
+async def invalidate_after_task_change(lawyer_id: str):
     """
     إبطال Caches بعد تغيير في المهام
-    
+
     يُستدعى بعد: Create, Update, Delete task
-    
+
     Args:
         lawyer_id: معرف المحامي
     """
-    invalidate_tasks_caches(lawyer_id)
-    invalidate_lawyer_dashboard(lawyer_id)
-    invalidate_notifications_caches(lawyer_id)
+    cache = get_cache()
+
+    await cache.invalidate_tags([
+        CacheKeys.lawyer_tasks_tag(lawyer_id),
+        CacheKeys.lawyer_dashboard_tag(lawyer_id),
+    ])
+    await cache.delete(
+        CacheKeys.user_stats(lawyer_id),
+        CacheKeys.lawyer_notifications(lawyer_id),
+    )
+
+    logger.info(f"🗑️ Invalidated task-related caches for lawyer: {lawyer_id}")
 
 
-def invalidate_after_case_change(lawyer_id: str, case_id: Optional[str] = None):
+async def invalidate_after_case_change(lawyer_id: str, case_id: Optional[str] = None):
     """
     إبطال Caches بعد تغيير في القضايا
-    
+
     يُستدعى بعد: Create, Update, Delete case
-    
+
     Args:
         lawyer_id: معرف المحامي
         case_id: معرف القضية (اختياري)
     """
     cache = get_cache()
-    
-    # Cases list
-    cache.delete(CacheKeys.lawyer_cases(lawyer_id))
-    
-    # Dashboard
-    invalidate_lawyer_dashboard(lawyer_id)
-    
-    # Case details
+
+    tags = [CacheKeys.lawyer_dashboard_tag(lawyer_id)]
     if case_id:
-        invalidate_case_caches(case_id)
+        tags.append(CacheKeys.case_tag(case_id))
+
+    await cache.invalidate_tags(tags)
+    await cache.delete(
+        CacheKeys.lawyer_cases(lawyer_id),
+        CacheKeys.user_stats(lawyer_id),
+    )
 
 
-def invalidate_after_police_record_change(lawyer_id: str):
+async def invalidate_after_police_record_change(lawyer_id: str):
     """
     إبطال Caches بعد تغيير في المحاضر
-    
+
     Args:
         lawyer_id: معرف المحامي
     """
-    invalidate_police_records_caches(lawyer_id)
-    invalidate_lawyer_dashboard(lawyer_id)
+    await invalidate_police_records_caches(lawyer_id)
+    await invalidate_lawyer_dashboard(lawyer_id)
 
 
-def invalidate_after_profile_update(user_id: str):
+async def invalidate_after_profile_update(user_id: str):
     """
     إبطال Caches بعد تحديث الملف الشخصي
-    
+
+    يُستدعى بعد: تعديل الملف الشخصي، الدور، أو حالة التفعيل
+    (تشمل snapshots جلسات المحادثة التي تحمل الاسم والدولة والدور)
+
     Args:
         user_id: معرف المستخدم
     """
-    invalidate_user_caches(user_id)
+    await invalidate_user_caches(user_id)
+    await invalidate_chat_session_contexts(user_id)
 
 
-def invalidate_all_for_lawyer(lawyer_id: str):
+async def invalidate_all_for_lawyer(lawyer_id: str):
     """
     إبطال جميع Caches لمحامي معين
-    
-    استخدام حذر - يحذف كل شيء!
-    
+
+    O(1): زيادة نسخة lawyer tag تُبطل كل القيم المخزنة معه
+    (الملف الشخصي، الإحصائيات، الاشتراك، ولوحة التحكم).
+
     Args:
         lawyer_id: معرف المحامي
     """
-    cache = get_cache()
-    
-    pattern = CacheKeys.lawyer_all_data(lawyer_id)
-    count = cache.delete_pattern(pattern)
-    
-    # حذف بيانات المستخدم أيضاً
-    invalidate_user_caches(lawyer_id)
-    
-    logger.warning(f"⚠️ Invalidated ALL caches ({count} keys) for lawyer: {lawyer_id}")
+    await get_cache().invalidate_tag(CacheKeys.lawyer_tag(lawyer_id))
+
+    # In-process layers
+    get_user_cache().invalidate(lawyer_id)
+    get_subscription_cache().invalidate_local(lawyer_id)
+
+    logger.warning(f"⚠️ Invalidated ALL caches for lawyer: {lawyer_id}")
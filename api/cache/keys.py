@@ -49,6 +49,17 @@ class CacheKeys:
     def lawyer_notifications(lawyer_id: str) -> str:
         return f"lawyer:{lawyer_id}:notifications"
     
+    # ===== Subscriptions =====
+    @staticmethod
+    def lawyer_subscription(lawyer_id: str) -> str:
+        return f"subscription:{lawyer_id}:snapshot"
+    
+    # ===== Chat Sessions =====
+    @staticmethod
+    def chat_session_context(session_id: str) -> str:
+        """snapshot جلسة المحادثة (المالك، المستخدم، الاشتراك، آخر الرسائل)"""
+        return f"chat_session:{session_id}:context"
+    
     # ===== Case Details =====
     @staticmethod
     def case_details(case_id: str) -> str:
@@ -62,6 +73,12 @@ class CacheKeys:
     def case_hearings(case_id: str) -> str:
         return f"case:{case_id}:hearings"
     
+    # ===== OCR =====
+    @staticmethod
+    def ocr_page(model: str, page_hash: str) -> str:
+        """نص صفحة مستخرج بالـ OCR حسب بصمة محتوى الصفحة"""
+        return f"ocr:{model}:page:{page_hash}"
+    
     # ===== Invalidation Patterns =====
     @staticmethod
     def lawyer_all_data(lawyer_id: str) -> str:
@@ -72,6 +89,34 @@ class CacheKeys:
     def case_all_data(case_id: str) -> str:
         """نمط لحذف جميع بيانات قضية معينة"""
         return f"case:{case_id}:*"
+    
+    
+    # ===== Invalidation Tags (O(1) via RedisCache.invalidate_tag) =====
+    # القيم المخزنة مع tags تُعتبر MISS بمجرد زيادة نسخة أي tag منها
+    USER_PROFILES_TAG = "user_profiles"
+    SUBSCRIPTIONS_TAG = "subscriptions"
+    
+    @staticmethod
+    def lawyer_tag(lawyer_id: str) -> str:
+        """كل البيانات المملوكة لمحامٍ/مستخدم (invalidate_all_for_lawyer)"""
+        return f"lawyer:{lawyer_id}"
+    
+    @staticmethod
+    def lawyer_dashboard_tag(lawyer_id: str) -> str:
+        return f"lawyer:{lawyer_id}:dashboard"
+    
+    @staticmethod
+    def lawyer_chat_sessions_tag(lawyer_id: str) -> str:
+        """كل snapshots جلسات المحادثة لمحامٍ (تُبطل عند تحديث الملف أو الاشتراك)"""
+        return f"lawyer:{lawyer_id}:chat_sessions"
+    
+    @staticmethod
+    def lawyer_tasks_tag(lawyer_id: str) -> str:
+        return f"lawyer:{lawyer_id}:tasks"
+    
+    @staticmethod
+    def case_tag(case_id: str) -> str:
+        return f"case:{case_id}"
 
 
 # ===== TTL Constants (بالثواني) =====
@@ -81,6 +126,7 @@ class CacheTTL:
     # Static/Rarely Changed Data
     COUNTRIES = 7 * 24 * 60 * 60  # 7 أيام
     USER_PROFILE = 30 * 60  # 30 دقيقة
+    USER_PROFILE_LOCAL = 60  # 1 دقيقة (auth cache داخل العملية)
     
     # Dashboard Data
     DASHBOARD_STATS = 2 * 60  # 2 دقيقة
@@ -97,3 +143,14 @@ class CacheTTL:
     
     # Case Details
     CASE_DETAILS = 5 * 60  # 5 دقائق
+    
+    # Subscriptions (invalidated on every mutation)
+    SUBSCRIPTION = 30 * 60  # 30 دقيقة (Redis)
+    SUBSCRIPTION_LOCAL = 60  # 1 دقيقة (داخل العملية)
+    SUBSCRIPTION_REFRESH = 5 * 60  # 5 دقائق (مهمة التحديث الخلفية)
+    
+    # Chat session snapshot (written through on every message)
+    CHAT_SESSION_CONTEXT = 30 * 60  # 30 دقيقة
+    
+    # OCR (page text is immutable for a given page hash + model)
+    OCR_PAGE = 30 * 24 * 60 * 60  # 30 يوم
@@ -3,35 +3,105 @@ Redis Cache Client
 نظام التخزين المؤقت المركزي للنظام مع إمكانية التحكم الكامل
 """
 import redis
-from redis.connection import ConnectionPool
-from typing import Any, Optional, Union
+import redis.asyncio as aioredis
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
 import json
 import logging
+import time
 from functools import wraps
 import os
 from dotenv import load_dotenv
 
+try:
+    import orjson
+except ImportError:  # pragma: no cover - optional fast path
+    orjson = None
+
 load_dotenv()
 logger = logging.getLogger(__name__)
 
+# Tag version keys live in their own namespace so they never collide with data keys
+TAG_VERSION_PREFIX = "tagv:"
+
+# Batch size for SCAN iteration and UNLINK calls in delete_pattern
+SCAN_BATCH_SIZE = 500
+
+
+class CircuitBreaker:
+    """
+    Circuit breaker لتتبع توفر Redis بدلاً من PING قبل كل عملية
+
+    - closed: العمليات تمر طبيعياً
+    - open: بعد failure_threshold أخطاء متتالية تُتجاوز Redis لمدة reset_timeout
+    - half-open: بعد انتهاء المهلة يُسمح بعملية تجريبية واحدة
+    """
+
+    def __init__(self, failure_threshold: int = 3, reset_timeout: float = 30.0):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.failures = 0
+        self.opened_at: Optional[float] = None
+        self._probe_in_flight = False
+
+    @property
+    def state(self) -> str:
+        if self.opened_at is None:
+            return "closed"
+        if time.monotonic() - self.opened_at >= self.reset_timeout:
+            return "half-open"
+        return "open"
+
+    def allow(self) -> bool:
+        state = self.state
+        if state == "closed":
+            return True
+        if state == "half-open" and not self._probe_in_flight:
+            self._probe_in_flight = True
+            return True
+        return False
+
+    def record_success(self):
+        if self.opened_at is not None:
+            logger.info("✅ Redis recovered - circuit closed")
+        self.failures = 0
+        self.opened_at = None
+        self._probe_in_flight = False
+
+    def release_probe(self):
+        """إنهاء العملية التجريبية دون حكم (خطأ غير متعلق بالاتصال)"""
+        self._probe_in_flight = False
+
+    def record_failure(self):
+        self.failures += 1
+        self._probe_in_flight = False
+        if self.opened_at is not None or self.failures >= self.failure_threshold:
+            if self.opened_at is None:
+                logger.warning(f"⚠️ Redis unavailable - circuit opened for {self.reset_timeout}s")
+            self.opened_at = time.monotonic()
+
 
 class RedisCache:
     """
     Redis Cache Client مع Fallback التلقائي والتحكم الكامل
-    
+
     Features:
     - ✅ Enable/Disable toggle control via environment variable
-    - ✅ Connection pooling للأداء العالي
-    - ✅ Automatic fallback عند فشل Redis
-    - ✅ Serialization/Deserialization تلقائي
-    - ✅ TTL management
-    - ✅ Graceful degradation
+    - ✅ Async client (redis.asyncio) مع Connection pooling
+    - ✅ Circuit breaker بدلاً من PING لكل عملية
+    - ✅ Pipelining للعمليات المتعددة (get_many / set_many)
+    - ✅ SCAN + UNLINK لحذف الأنماط بدون حجب Redis
+    - ✅ Tag versions: إبطال مجموعة مفاتيح بعملية INCR واحدة O(1)
+    - ✅ orjson serialization (fallback إلى json)
     - ✅ Performance monitoring (cache hits/misses)
     """
-    
+
     def __init__(self):
         self.enabled = self._is_cache_enabled()
-        self.client: Optional[redis.Redis] = None
+        self.client: Optional[aioredis.Redis] = None
+        self.breaker = CircuitBreaker(
+            failure_threshold=int(os.getenv('REDIS_BREAKER_THRESHOLD', 3)),
+            reset_timeout=float(os.getenv('REDIS_BREAKER_RESET_SECONDS', 30))
+        )
         self.stats = {
             'hits': 0,
             'misses': 0,
@@ -39,19 +109,19 @@ class RedisCache:
             'deletes': 0,
             'errors': 0
         }
-        
+
         if self.enabled:
             self._initialize_client()
         else:
             logger.info("🔴 Redis caching is DISABLED by configuration (REDIS_ENABLED=False)")
-    
+
     def _is_cache_enabled(self) -> bool:
         """التحقق من تفعيل Cache من .env"""
         enabled = os.getenv('REDIS_ENABLED', 'True').lower() == 'true'
         return enabled
-    
+
     def _initialize_client(self):
-        """تهيئة اتصال Redis مع معالجة الأخطاء الاحترافية"""
+        """تهيئة عميل Redis (الاتصال الفعلي يتم عند أول عملية أو عبر connect())"""
         try:
             # قراءة الإعدادات من .env
             redis_config = {
@@ -59,255 +129,496 @@ class RedisCache:
                 'port': int(os.getenv('REDIS_PORT', 6379)),
                 'db': int(os.getenv('REDIS_DB', 0)),
                 'password': os.getenv('REDIS_PASSWORD'),
-                'decode_responses': True,
+                'decode_responses': False,  # orjson works on bytes
                 'socket_timeout': int(os.getenv('REDIS_SOCKET_TIMEOUT', 5)),
                 'socket_connect_timeout': int(os.getenv('REDIS_SOCKET_CONNECT_TIMEOUT', 5)),
                 'max_connections': int(os.getenv('REDIS_MAX_CONNECTIONS', 50)),
                 'health_check_interval': 30,  # Check connection health every 30s
             }
-            
+
             # إضافة SSL إذا كان مفعلاً
             if os.getenv('REDIS_SSL', 'False').lower() == 'true':
                 import ssl
-                redis_config['ssl'] = True
+                redis_config['connection_class'] = aioredis.SSLConnection
                 ssl_cert_reqs = os.getenv('REDIS_SSL_CERT_REQS', 'none').lower()
-                
+
                 if ssl_cert_reqs == 'required':
                     redis_config['ssl_cert_reqs'] = ssl.CERT_REQUIRED
                 elif ssl_cert_reqs == 'optional':
                     redis_config['ssl_cert_reqs'] = ssl.CERT_OPTIONAL
                 else:
                     redis_config['ssl_cert_reqs'] = ssl.CERT_NONE
-                
+
                 if os.getenv('REDIS_SSL_CA_CERTS'):
                     redis_config['ssl_ca_certs'] = os.getenv('REDIS_SSL_CA_CERTS')
-            
+
             # إنشاء Connection Pool
-            pool = ConnectionPool(**redis_config)
-            self.client = redis.Redis(connection_pool=pool)
-            
-            # اختبار الاتصال
-            self.client.ping()
-            logger.info(f"✅ Redis connected successfully to {redis_config['host']}:{redis_config['port']}")
-            
-        except redis.ConnectionError as e:
-            logger.error(f"❌ Redis connection failed: {e}")
-            logger.warning("⚠️ Running without cache - falling back to database")
-            self.enabled = False
-            self.client = None
+            pool = aioredis.ConnectionPool(**redis_config)
+            self.client = aioredis.Redis(connection_pool=pool)
+            self._address = f"{redis_config['host']}:{redis_config['port']}"
+
         except Exception as e:
             logger.error(f"❌ Redis initialization error: {e}")
             logger.warning("⚠️ Running without cache - falling back to database")
             self.enabled = False
             self.client = None
-    
-    def is_available(self) -> bool:
+
+    async def connect(self) -> bool:
         """
-        التحقق من توفر Redis
-        
+        اختبار الاتصال عند بدء التشغيل (PING واحد فقط)
+
         Returns:
-            True إذا كان Redis متاحاً ومفعّلاً
+            True إذا كان Redis متاحاً
         """
         if not self.enabled or not self.client:
             return False
-        
         try:
-            self.client.ping()
+            await self.client.ping()
+            self.breaker.record_success()
+            logger.info(f"✅ Redis connected successfully to {self._address}")
             return True
-        except:
-            logger.warning("⚠️ Redis unavailable - using database fallback")
+        except (redis.RedisError, OSError) as e:
+            self.breaker.record_failure()
+            logger.error(f"❌ Redis connection failed: {e}")
+            logger.warning("⚠️ Running without cache - falling back to database")
+            return False
+
+    async def close(self):
+        """إغلاق connection pool"""
+        if self.client:
+            await self.client.aclose()
+
+    def is_available(self) -> bool:
+        """
+        التحقق من توفر Redis (بدون round trip - حالة circuit breaker)
+
+        Returns:
+            True إذا كان Redis مفعّلاً والـ circuit غير مفتوح
+        """
+        if not self.enabled or not self.client:
             return False
-    
-    def _serialize(self, value: Any) -> str:
-        """تحويل البيانات إلى JSON"""
+        return self.breaker.state != "open"
+
+    def _allow(self) -> bool:
+        return self.enabled and self.client is not None and self.breaker.allow()
+
+    def _on_error(self, op: str, target: str, e: Exception):
+        self.stats['errors'] += 1
+        if isinstance(e, (redis.ConnectionError, redis.TimeoutError, OSError)):
+            self.breaker.record_failure()
+        else:
+            self.breaker.release_probe()
+        logger.error(f"❌ Cache {op} error for '{target}': {e}")
+
+    # =========================================================================
+    # SERIALIZATION
+    # =========================================================================
+
+    def _serialize(self, value: Any) -> bytes:
+        """تحويل البيانات إلى JSON (orjson إن توفر)"""
         try:
-            return json.dumps(value, ensure_ascii=False)
+            if orjson is not None:
+                return orjson.dumps(value, option=orjson.OPT_NON_STR_KEYS)
+            return json.dumps(value, ensure_ascii=False).encode('utf-8')
         except Exception as e:
             logger.error(f"❌ Serialization error: {e}")
             raise
-    
-    def _deserialize(self, value: str) -> Any:
+
+    def _deserialize(self, value: bytes) -> Any:
         """استرجاع البيانات من JSON"""
         try:
+            if orjson is not None:
+                return orjson.loads(value)
             return json.loads(value)
         except Exception as e:
             logger.error(f"❌ Deserialization error: {e}")
-            return value
-    
-    def get(self, key: str) -> Optional[Any]:
+            return None
+
+    # =========================================================================
+    # TAG VERSIONS
+    # =========================================================================
+
+    @staticmethod
+    def _tag_key(tag: str) -> str:
+        return f"{TAG_VERSION_PREFIX}{tag}"
+
+    @staticmethod
+    def _parse_versions(tags: Sequence[str], raw_versions: Sequence[Optional[bytes]]) -> Dict[str, int]:
+        return {t: int(v) if v is not None else 0 for t, v in zip(tags, raw_versions)}
+
+    @staticmethod
+    def _versions_match(stored: Dict[str, int], current: Sequence[Optional[bytes]], tags: Sequence[str]) -> bool:
+        for tag, raw in zip(tags, current):
+            if stored.get(tag, 0) != (int(raw) if raw is not None else 0):
+                return False
+        return True
+
+    async def get_tag_versions(self, tags: Sequence[str]) -> Optional[Dict[str, int]]:
+        """
+        نسخ الـ tags الحالية (تُقرأ قبل تحميل البيانات من قاعدة البيانات ثم تُمرر إلى set)
+
+        Returns:
+            {tag: version} أو None إذا كان Redis غير متاح
+        """
+        if not tags or not self._allow():
+            return None
+        try:
+            raw_versions = await self.client.mget([self._tag_key(t) for t in tags])
+            self.breaker.record_success()
+            return self._parse_versions(tags, raw_versions)
+        except (redis.RedisError, OSError) as e:
+            self._on_error("TAG_VERSIONS", ",".join(tags), e)
+            return None
+
+    async def invalidate_tag(self, tag: str) -> bool:
+        """
+        إبطال جميع المفاتيح المرتبطة بـ tag عبر INCR واحد (O(1))
+
+        المفاتيح القديمة تبقى حتى انتهاء TTL لكنها تُعامل كـ MISS.
+        """
+        return await self.invalidate_tags([tag])
+
+    async def invalidate_tags(self, tags: Iterable[str]) -> bool:
+        """إبطال عدة tags في pipeline واحد"""
+        tags = list(tags)
+        if not tags or not self._allow():
+            return False
+
+        try:
+            async with self.client.pipeline(transaction=False) as pipe:
+                for tag in tags:
+                    pipe.incr(self._tag_key(tag))
+                await pipe.execute()
+            self.breaker.record_success()
+            self.stats['deletes'] += len(tags)
+            logger.debug(f"🏷️ Cache INVALIDATE_TAGS: {tags}")
+            return True
+        except (redis.RedisError, OSError) as e:
+            self._on_error("INVALIDATE_TAGS", ",".join(tags), e)
+            return False
+
+    # =========================================================================
+    # READ
+    # =========================================================================
+
+    async def get(self, key: str, tags: Optional[Sequence[str]] = None) -> Optional[Any]:
         """
         قراءة قيمة من Cache
-        
+
         Args:
             key: مفتاح Cache
-        
+            tags: tags التي خُزّنت بها القيمة (تُقارن نسخها في نفس الـ round trip)
+
         Returns:
             القيمة المخزنة أو None إذا:
-            - المفتاح غير موجود
+            - المفتاح غير موجود أو أُبطل عبر tag
             - Redis غير متاح
             - حدث خطأ
         """
-        if not self.is_available():
-            return None
-        
+        value, _ = await self.get_versioned(key, tags)
+        return value
+
+    async def get_versioned(
+        self,
+        key: str,
+        tags: Optional[Sequence[str]] = None
+    ) -> Tuple[Optional[Any], Optional[Dict[str, int]]]:
+        """
+        مثل get مع نسخ الـ tags المقروءة في نفس الـ MGET
+
+        عند MISS تُمرر النسخ إلى set(versions=...) بعد التحميل من قاعدة البيانات:
+        إبطال يحدث بين القراءة والكتابة يجعل القيمة المخزنة MISS بدلاً من قيمة قديمة.
+
+        Returns:
+            (القيمة أو None, {tag: version} أو None بدون tags / Redis غير متاح)
+        """
+        if not self._allow():
+            return None, None
+
         try:
-            value = self.client.get(key)
-            
+            if tags:
+                raw_values = await self.client.mget([key, *[self._tag_key(t) for t in tags]])
+                raw, raw_versions = raw_values[0], raw_values[1:]
+                versions = self._parse_versions(tags, raw_versions)
+            else:
+                raw, raw_versions, versions = await self.client.get(key), None, None
+            self.breaker.record_success()
+
+            value = self._unwrap(raw, tags, raw_versions)
             if value is None:
                 self.stats['misses'] += 1
                 if os.getenv('REDIS_LOG_CACHE_MISSES', 'False').lower() == 'true':
                     logger.debug(f"❌ Cache MISS: {key}")
-                return None
-            
+                return None, versions
+
             self.stats['hits'] += 1
             if os.getenv('REDIS_LOG_CACHE_HITS', 'True').lower() == 'true':
                 logger.debug(f"✅ Cache HIT: {key}")
-            
-            return self._deserialize(value)
-            
-        except redis.RedisError as e:
-            self.stats['errors'] += 1
-            logger.error(f"❌ Cache GET error for key '{key}': {e}")
-            return None
+            return value, versions
+
+        except (redis.RedisError, OSError) as e:
+            self._on_error("GET", key, e)
+            return None, None
         except Exception as e:
             self.stats['errors'] += 1
+            self.breaker.release_probe()
             logger.error(f"❌ Unexpected error in cache GET for key '{key}': {e}")
+            return None, None
+
+    def _unwrap(self, raw: Optional[bytes], tags: Optional[Sequence[str]], versions) -> Optional[Any]:
+        if raw is None:
             return None
-    
-    def set(
-        self, 
-        key: str, 
-        value: Any, 
-        ttl: Optional[int] = None
+        payload = self._deserialize(raw)
+        if not tags:
+            return payload
+        if not isinstance(payload, dict) or "__tags__" not in payload:
+            return None
+        if not self._versions_match(payload["__tags__"], versions, tags):
+            return None
+        return payload["value"]
+
+    async def get_many(self, keys: Sequence[str]) -> Dict[str, Any]:
+        """
+        قراءة عدة مفاتيح في round trip واحد (MGET)
+
+        Returns:
+            dict بالمفاتيح الموجودة فقط
+        """
+        if not keys or not self._allow():
+            return {}
+
+        try:
+            raw_values = await self.client.mget(list(keys))
+            self.breaker.record_success()
+        except (redis.RedisError, OSError) as e:
+            self._on_error("MGET", f"{len(keys)} keys", e)
+            return {}
+
+        found = {}
+        for key, raw in zip(keys, raw_values):
+            if raw is None:
+                self.stats['misses'] += 1
+                continue
+            value = self._deserialize(raw)
+            if value is not None:
+                self.stats['hits'] += 1
+                found[key] = value
+        return found
+
+    # =========================================================================
+    # WRITE
+    # =========================================================================
+
+    async def set(
+        self,
+        key: str,
+        value: Any,
+        ttl: Optional[int] = None,
+        tags: Optional[Sequence[str]] = None,
+        versions: Optional[Dict[str, int]] = None
     ) -> bool:
         """
         حفظ قيمة في Cache
-        
+
         Args:
             key: مفتاح Cache
             value: القيمة (يتم تحويلها لـ JSON تلقائياً)
             ttl: مدة الصلاحية بالثواني (None = بلا انتهاء)
-        
+            tags: tags للإبطال الجماعي عبر invalidate_tag
+            versions: نسخ الـ tags وقت قراءة البيانات (get_versioned / get_tag_versions)؛
+                      بدونها تُقرأ النسخ الحالية (مناسب فقط لقيمة كُتبت للتو)
+
         Returns:
             True إذا نجحت العملية
         """
-        if not self.is_available():
+        if not self._allow():
             return False
-        
+
         try:
+            if tags:
+                value = {"__tags__": await self._versions_for(tags, versions), "value": value}
             serialized = self._serialize(value)
-            
+
             if ttl:
-                self.client.setex(key, ttl, serialized)
+                await self.client.setex(key, ttl, serialized)
             else:
-                self.client.set(key, serialized)
-            
+                await self.client.set(key, serialized)
+            self.breaker.record_success()
+
             self.stats['sets'] += 1
             logger.debug(f"💾 Cache SET: {key} (TTL: {ttl}s)")
             return True
-            
-        except redis.RedisError as e:
-            self.stats['errors'] += 1
-            logger.error(f"❌ Cache SET error for key '{key}': {e}")
+
+        except (redis.RedisError, OSError) as e:
+            self._on_error("SET", key, e)
             return False
         except Exception as e:
             self.stats['errors'] += 1
+            self.breaker.release_probe()
             logger.error(f"❌ Unexpected error in cache SET for key '{key}': {e}")
             return False
-    
-    def delete(self, key: str) -> bool:
-        """حذف مفتاح من Cache"""
-        if not self.is_available():
+
+    async def set_many(
+        self,
+        items: Dict[str, Any],
+        ttl: Optional[int] = None,
+        tags: Optional[Dict[str, Sequence[str]]] = None,
+        versions: Optional[Dict[str, int]] = None
+    ) -> bool:
+        """
+        حفظ عدة قيم في pipeline واحد
+
+        Args:
+            items: {key: value}
+            ttl: مدة الصلاحية بالثواني
+            tags: {key: tags} اختياري؛ نسخ الـ tags الناقصة من versions تُقرأ بـ MGET واحد
+            versions: نسخ الـ tags وقت قراءة البيانات (get_tag_versions قبل التحميل)
+        """
+        if not items or not self._allow():
             return False
-        
+
         try:
-            self.client.delete(key)
-            self.stats['deletes'] += 1
-            logger.debug(f"🗑️ Cache DELETE: {key}")
+            if tags:
+                distinct = sorted({t for key_tags in tags.values() for t in key_tags})
+                versions = await self._versions_for(distinct, versions)
+                items = {
+                    key: {"__tags__": {t: versions[t] for t in tags[key]}, "value": value}
+                    if tags.get(key) else value
+                    for key, value in items.items()
+                }
+
+            async with self.client.pipeline(transaction=False) as pipe:
+                for key, value in items.items():
+                    serialized = self._serialize(value)
+                    if ttl:
+                        pipe.setex(key, ttl, serialized)
+                    else:
+                        pipe.set(key, serialized)
+                await pipe.execute()
+            self.breaker.record_success()
+            self.stats['sets'] += len(items)
             return True
-        except redis.RedisError as e:
+        except (redis.RedisError, OSError) as e:
+            self._on_error("SET_MANY", f"{len(items)} keys", e)
+            return False
+        except Exception as e:
             self.stats['errors'] += 1
-            logger.error(f"❌ Cache DELETE error for key '{key}': {e}")
+            self.breaker.release_probe()
+            logger.error(f"❌ Unexpected error in cache SET_MANY for {len(items)} keys: {e}")
+            return False
+
+    async def _versions_for(self, tags: Sequence[str], versions: Optional[Dict[str, int]]) -> Dict[str, int]:
+        """النسخ المعطاة، والحالية للـ tags غير الموجودة فيها"""
+        versions = dict(versions or {})
+        missing = [t for t in tags if t not in versions]
+        if missing:
+            versions.update(self._parse_versions(missing, await self.client.mget([self._tag_key(t) for t in missing])))
+        return {t: versions[t] for t in tags}
+
+    async def delete(self, *keys: str) -> bool:
+        """حذف مفتاح أو أكثر من Cache (UNLINK غير حاجب)"""
+        if not keys or not self._allow():
             return False
-    
-    def delete_pattern(self, pattern: str) -> int:
+
+        try:
+            await self.client.unlink(*keys)
+            self.breaker.record_success()
+            self.stats['deletes'] += len(keys)
+            logger.debug(f"🗑️ Cache DELETE: {', '.join(keys)}")
+            return True
+        except (redis.RedisError, OSError) as e:
+            self._on_error("DELETE", ",".join(keys), e)
+            return False
+
+    async def delete_pattern(self, pattern: str) -> int:
         """
-        حذف جميع المفاتيح المطابقة لنمط معين
-        
+        حذف جميع المفاتيح المطابقة لنمط معين (SCAN + UNLINK على دفعات)
+
         Args:
             pattern: نمط البحث (مثال: "lawyer:123:*")
-        
+
         Returns:
             عدد المفاتيح المحذوفة
         """
-        if not self.is_available():
+        if not self._allow():
             return 0
-        
+
+        count = 0
         try:
-            keys = self.client.keys(pattern)
-            if keys:
-                count = self.client.delete(*keys)
-                self.stats['deletes'] += count
-                logger.debug(f"🗑️ Cache DELETE_PATTERN: {pattern} ({count} keys)")
-                return count
-            return 0
-        except redis.RedisError as e:
-            self.stats['errors'] += 1
-            logger.error(f"❌ Cache DELETE_PATTERN error for pattern '{pattern}': {e}")
-            return 0
-    
-    def clear_all(self) -> bool:
+            batch: List[bytes] = []
+            async for key in self.client.scan_iter(match=pattern, count=SCAN_BATCH_SIZE):
+                batch.append(key)
+                if len(batch) >= SCAN_BATCH_SIZE:
+                    count += await self.client.unlink(*batch)
+                    batch = []
+            if batch:
+                count += await self.client.unlink(*batch)
+            self.breaker.record_success()
+
+            self.stats['deletes'] += count
+            logger.debug(f"🗑️ Cache DELETE_PATTERN: {pattern} ({count} keys)")
+            return count
+        except (redis.RedisError, OSError) as e:
+            self._on_error("DELETE_PATTERN", pattern, e)
+            return count
+
+    async def clear_all(self) -> bool:
         """
         مسح جميع البيانات من Cache (خطير - للتطوير فقط!)
-        
+
         ⚠️ تحذير: يحذف جميع البيانات من DB الحالية
         """
-        if not self.is_available():
+        if not self._allow():
             return False
-        
+
         try:
-            self.client.flushdb()
-            logger.warning("⚠️ Cache cleared completely (FLUSHDB)")
+            await self.client.flushdb(asynchronous=True)
+            self.breaker.record_success()
+            logger.warning("⚠️ Cache cleared completely (FLUSHDB ASYNC)")
             return True
-        except redis.RedisError as e:
-            self.stats['errors'] += 1
-            logger.error(f"❌ Cache CLEAR error: {e}")
+        except (redis.RedisError, OSError) as e:
+            self._on_error("CLEAR", "*", e)
             return False
-    
-    def get_ttl(self, key: str) -> int:
+
+    async def get_ttl(self, key: str) -> int:
         """
         الحصول على الوقت المتبقي لانتهاء المفتاح
-        
+
         Returns:
             -2: المفتاح غير موجود
             -1: المفتاح بلا انتهاء
             >0: الثواني المتبقية
         """
-        if not self.is_available():
+        if not self._allow():
             return -2
-        
+
         try:
-            return self.client.ttl(key)
-        except:
+            ttl = await self.client.ttl(key)
+            self.breaker.record_success()
+            return ttl
+        except (redis.RedisError, OSError) as e:
+            self._on_error("TTL", key, e)
             return -2
-    
+
     def get_stats(self) -> dict:
         """
         الحصول على إحصائيات الأداء
-        
+
         Returns:
-            Dict مع: hits, misses, sets, deletes, errors, hit_rate
+            Dict مع: hits, misses, sets, deletes, errors, hit_rate, circuit
         """
         total_reads = self.stats['hits'] + self.stats['misses']
         hit_rate = (self.stats['hits'] / total_reads * 100) if total_reads > 0 else 0
-        
+
         return {
             **self.stats,
             'hit_rate': round(hit_rate, 2),
             'enabled': self.enabled,
-            'available': self.is_available()
+            'available': self.is_available(),
+            'circuit': self.breaker.state,
+            'serializer': 'orjson' if orjson is not None else 'json'
         }
-    
+
     def reset_stats(self):
         """إعادة تعيين الإحصائيات"""
         self.stats = {
@@ -318,19 +629,20 @@ class RedisCache:
             'errors': 0
         }
         logger.info("📊 Cache statistics reset")
-    
-    def get_info(self) -> dict:
+
+    async def get_info(self) -> dict:
         """
         الحصول على معلومات Redis Server
-        
+
         Returns:
             معلومات الخادم أو dict فارغ إذا كان Redis غير متاح
         """
-        if not self.is_available():
+        if not self._allow():
             return {}
-        
+
         try:
-            info = self.client.info()
+            info = await self.client.info()
+            self.breaker.record_success()
             return {
                 'redis_version': info.get('redis_version'),
                 'used_memory_human': info.get('used_memory_human'),
@@ -338,7 +650,8 @@ class RedisCache:
                 'total_commands_processed': info.get('total_commands_processed'),
                 'keyspace': info.get('db0', {})
             }
-        except:
+        except (redis.RedisError, OSError) as e:
+            self._on_error("INFO", "server", e)
             return {}
 
 
@@ -349,7 +662,7 @@ _cache_instance: Optional[RedisCache] = None
 def get_cache() -> RedisCache:
     """
     الحصول على Redis Cache Instance (Singleton)
-    
+
     Returns:
         نفس الـ instance في كل مرة لتوفير الموارد
     """
@@ -364,27 +677,30 @@ def get_cache() -> RedisCache:
 def cached(
     key_prefix: str,
     ttl: int = 300,
-    key_builder: Optional[callable] = None
+    key_builder: Optional[callable] = None,
+    tags_builder: Optional[callable] = None
 ):
     """
     Decorator للتخزين المؤقت التلقائي
-    
+
     Args:
         key_prefix: بادئة المفتاح
         ttl: مدة الصلاحية بالثواني
         key_builder: دالة لبناء المفتاح من المعاملات
-    
+        tags_builder: دالة لبناء tags الإبطال من المعاملات
+
     Usage:
         @cached(key_prefix="countries", ttl=604800)  # 7 days
         async def get_countries():
             # ... database query
             return countries
-        
-        # With dynamic key
+
+        # With dynamic key and O(1) invalidation via invalidate_tag
         @cached(
             key_prefix="user_profile",
             ttl=1800,
-            key_builder=lambda user_id: f"user:{user_id}:profile"
+            key_builder=lambda user_id: f"user:{user_id}:profile",
+            tags_builder=lambda user_id: [CacheKeys.lawyer_tag(user_id)]
         )
         async def get_user_profile(user_id: str):
             # ... database query
@@ -394,25 +710,26 @@ def cached(
         @wraps(func)
         async def wrapper(*args, **kwargs):
             cache = get_cache()
-            
+
             # بناء المفتاح
             if key_builder:
                 cache_key = key_builder(*args, **kwargs)
             else:
                 cache_key = key_prefix
-            
-            # محاولة القراءة من Cache
-            cached_value = cache.get(cache_key)
+            tags = tags_builder(*args, **kwargs) if tags_builder else None
+
+            # محاولة القراءة من Cache (مع نسخ الـ tags وقت القراءة)
+            cached_value, versions = await cache.get_versioned(cache_key, tags=tags)
             if cached_value is not None:
                 return cached_value
-            
+
             # Cache MISS - تنفيذ الدالة
             result = await func(*args, **kwargs)
-            
-            # حفظ في Cache
-            cache.set(cache_key, result, ttl=ttl)
-            
+
+            # حفظ في Cache بالنسخ التي سبقت القراءة من قاعدة البيانات
+            await cache.set(cache_key, result, ttl=ttl, tags=tags, versions=versions)
+
             return result
-        
+
         return wrapper
     return decorator
@@ -0,0 +1,126 @@
+"""
+Chat Session Context Cache
+snapshot لكل جلسة محادثة في Redis
+
+قبل معالجة كل رسالة كان ChatService ينفذ عدة استعلامات متتالية قبل تشغيل الـ graph:
+ملكية الجلسة (ai_chat_sessions)، المستخدم (users)، الدولة (countries)، الدور (roles)،
+ثم جلب آخر الرسائل. الـ snapshot يجمعها في قيمة واحدة:
+- session: id / lawyer_id / conversation_context (الملكية تُتحقق من lawyer_id)
+- user_context: ملف المستخدم مع اسم الدولة والدور وحالة الاشتراك
+- recent_messages: آخر CHAT_HISTORY_WINDOW رسالة (تُحدّث مع كل رسالة محفوظة)
+
+يُبنى عند إنشاء الجلسة (أو عند أول MISS)، ويُقرأ بـ MGET واحد مع نسخ الـ tags.
+الإبطال:
+- تحديث الملف الشخصي / الدور: invalidate_after_profile_update (lawyer chat_sessions tag)
+- تغيير الاشتراك: invalidate_subscription_caches
+- حذف الجلسة: invalidate_chat_session
+"""
+import logging
+from typing import Any, Dict, List, Optional, Tuple
+
+from .redis_client import get_cache
+from .keys import CacheKeys, CacheTTL
+
+logger = logging.getLogger(__name__)
+
+
+def _tags(lawyer_id: str) -> List[str]:
+    return [
+        CacheKeys.lawyer_tag(lawyer_id),
+        CacheKeys.lawyer_chat_sessions_tag(lawyer_id),
+        CacheKeys.USER_PROFILES_TAG,
+        CacheKeys.SUBSCRIPTIONS_TAG,
+    ]
+
+
+class SessionContextCache:
+    """
+    Redis snapshot of everything a chat turn needs before the graph starts.
+
+    Usage:
+        cache = get_session_context_cache()
+        snapshot = await cache.get(session_id, lawyer_id)
+        if snapshot is None:
+            snapshot = build(...)            # DB lookups, once
+            await cache.set(snapshot)
+        ...
+        cache.append_message(snapshot, row, window=10)
+        await cache.set(snapshot)
+    """
+
+    def __init__(self):
+        self.stats = {"hits": 0, "misses": 0, "writes": 0}
+
+    async def get(self, session_id: str, lawyer_id: str) -> Optional[Dict[str, Any]]:
+        """
+        قراءة snapshot الجلسة (round trip واحد)
+
+        Returns:
+            الـ snapshot أو None (غير موجود / أُبطل / Redis غير متاح).
+            المتصل يتحقق من snapshot["session"]["lawyer_id"].
+        """
+        snapshot, _ = await self.get_versioned(session_id, lawyer_id)
+        return snapshot
+
+    async def get_versioned(
+        self, session_id: str, lawyer_id: str
+    ) -> Tuple[Optional[Dict[str, Any]], Optional[Dict[str, int]]]:
+        """
+        مثل get مع نسخ الـ tags المقروءة معه
+
+        عند HIT تُحفظ النسخ في snapshot["tag_versions"] فتستخدمها كل كتابة لاحقة لنفس
+        الـ snapshot؛ عند MISS تُمرر إلى ChatService.build_session_snapshot.
+        """
+        snapshot, versions = await get_cache().get_versioned(
+            CacheKeys.chat_session_context(session_id), tags=_tags(lawyer_id)
+        )
+        if snapshot is None:
+            self.stats["misses"] += 1
+            return None, versions
+        self.stats["hits"] += 1
+        snapshot["tag_versions"] = versions
+        return snapshot, versions
+
+    async def set(self, snapshot: Dict[str, Any]) -> bool:
+        """
+        حفظ snapshot الجلسة مع tags مالكها
+
+        بنسخ الـ tags التي قُرئ أو بُني بها (snapshot["tag_versions"]): إذا أُبطل أثناء
+        الدور تبقى الكتابة MISS ويُعاد بناؤه في الدور التالي.
+        """
+        session = snapshot["session"]
+        self.stats["writes"] += 1
+        return await get_cache().set(
+            CacheKeys.chat_session_context(session["id"]), snapshot,
+            ttl=CacheTTL.CHAT_SESSION_CONTEXT, tags=_tags(session["lawyer_id"]),
+            versions=snapshot.get("tag_versions")
+        )
+
+    @staticmethod
+    def append_message(snapshot: Dict[str, Any], row: Dict[str, Any], window: int):
+        """
+        إضافة رسالة إلى نافذة الـ snapshot في الذاكرة (تُحفظ في Redis عبر set)
+
+        snapshot["session"]["conversation_context"] يجب أن يكون محدثاً مسبقاً.
+        """
+        recent = (snapshot.get("recent_messages") or []) + [row]
+        snapshot["recent_messages"] = recent[-window:]
+
+    async def invalidate(self, session_id: str):
+        """حذف snapshot جلسة واحدة"""
+        await get_cache().delete(CacheKeys.chat_session_context(session_id))
+
+    def get_stats(self) -> dict:
+        return dict(self.stats)
+
+
+# ===== Singleton Instance =====
+_session_context_cache: Optional[SessionContextCache] = None
+
+
+def get_session_context_cache() -> SessionContextCache:
+    """الحصول على Chat Session Context Cache (Singleton)"""
+    global _session_context_cache
+    if _session_context_cache is None:
+        _session_context_cache = SessionContextCache()
+    return _session_context_cache
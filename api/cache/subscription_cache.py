@@ -0,0 +1,298 @@
+"""
+Subscription Snapshot Cache
+ذاكرة مؤقتة لاشتراكات المحامين (In-process TTL + Redis)
+
+كل endpoint محمي كان يستعلم من lawyer_subscriptions مع join للباقة.
+هذه الطبقة تحتفظ بـ snapshot لكل محامٍ:
+- L1: dict داخل العملية مع TTL قصير
+- L2: Redis مشترك بين الـ workers
+- إبطال فوري (push) من راوترات الاشتراكات والإدارة
+- مهمة خلفية تحدّث الـ snapshots الساخنة بدفعة واحدة وتُنهي الاشتراكات المنتهية تاريخياً
+"""
+import asyncio
+import logging
+import os
+import threading
+import time
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Tuple
+
+from agents.config.database import get_supabase_client
+from .redis_client import get_cache
+from .keys import CacheKeys, CacheTTL
+
+logger = logging.getLogger(__name__)
+
+# Sentinel stored for lawyers without any subscription row, so that
+# repeated checks for them don't fall through to the database either.
+_NO_SUBSCRIPTION = {"__none__": True}
+
+SUBSCRIPTION_SELECT = "*, package:subscription_packages(*)"
+
+
+def _tags(lawyer_id: str) -> List[str]:
+    return [CacheKeys.lawyer_tag(lawyer_id), CacheKeys.SUBSCRIPTIONS_TAG]
+
+
+class SubscriptionCache:
+    """
+    Snapshot cache for lawyer subscriptions.
+
+    Usage:
+        cache = get_subscription_cache()
+        sub = await cache.get(lawyer_id)      # None if no subscription
+        await cache.invalidate(lawyer_id)     # after any mutation
+        await cache.apply_delta(lawyer_id, "words_used_this_month", 120)
+    """
+
+    def __init__(self, local_ttl: int = None, refresh_interval: int = None):
+        self.local_ttl = local_ttl or int(os.getenv("SUBSCRIPTION_CACHE_LOCAL_TTL", CacheTTL.SUBSCRIPTION_LOCAL))
+        self.refresh_interval = refresh_interval or int(
+            os.getenv("SUBSCRIPTION_REFRESH_INTERVAL", CacheTTL.SUBSCRIPTION_REFRESH)
+        )
+        self._local: Dict[str, Tuple[float, Dict[str, Any]]] = {}
+        self._last_access: Dict[str, float] = {}
+        self._lock = threading.RLock()
+        self._refresher: Optional[asyncio.Task] = None
+        self.stats = {"local_hits": 0, "redis_hits": 0, "db_loads": 0, "invalidations": 0, "refreshes": 0}
+
+    # =========================================================================
+    # LOOKUP
+    # =========================================================================
+
+    async def get(self, lawyer_id: str) -> Optional[Dict[str, Any]]:
+        """
+        جلب snapshot الاشتراك (L1 ثم Redis ثم قاعدة البيانات)
+
+        Returns:
+            صف الاشتراك مع الباقة، أو None إذا لم يوجد اشتراك
+        """
+        if not lawyer_id:
+            return None
+
+        self._last_access[lawyer_id] = time.monotonic()
+        snapshot = self._get_local(lawyer_id)
+        if snapshot is not None:
+            self.stats["local_hits"] += 1
+            return None if snapshot.get("__none__") else snapshot
+
+        snapshot, versions = await get_cache().get_versioned(
+            CacheKeys.lawyer_subscription(lawyer_id), tags=_tags(lawyer_id)
+        )
+        if snapshot is not None:
+            self.stats["redis_hits"] += 1
+            self._set_local(lawyer_id, snapshot)
+            return None if snapshot.get("__none__") else snapshot
+
+        snapshot = await asyncio.to_thread(self._load_from_db, lawyer_id)
+        self.stats["db_loads"] += 1
+        await self._store(lawyer_id, snapshot, versions)
+        return snapshot
+
+    def _load_from_db(self, lawyer_id: str) -> Optional[Dict[str, Any]]:
+        supabase = get_supabase_client()
+        result = supabase.table("lawyer_subscriptions")\
+            .select(SUBSCRIPTION_SELECT)\
+            .eq("lawyer_id", lawyer_id)\
+            .order("created_at", desc=True)\
+            .limit(1).execute()
+        return result.data[0] if result.data else None
+
+    def _get_local(self, lawyer_id: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            entry = self._local.get(lawyer_id)
+            if entry is None:
+                return None
+            expires_at, snapshot = entry
+            if time.monotonic() > expires_at:
+                # Keep stale entry around: it marks the lawyer as "hot" for the refresher
+                return None
+            return snapshot
+
+    def _set_local(self, lawyer_id: str, snapshot: Dict[str, Any]):
+        with self._lock:
+            self._local[lawyer_id] = (time.monotonic() + self.local_ttl, snapshot)
+
+    async def _store(self, lawyer_id: str, snapshot: Optional[Dict[str, Any]],
+                     versions: Optional[Dict[str, int]] = None):
+        """versions: نسخ الـ tags قبل قراءة الـ snapshot (إبطال لاحق يجعله MISS)"""
+        value = snapshot if snapshot is not None else _NO_SUBSCRIPTION
+        self._set_local(lawyer_id, value)
+        await get_cache().set(
+            CacheKeys.lawyer_subscription(lawyer_id), value,
+            ttl=CacheTTL.SUBSCRIPTION, tags=_tags(lawyer_id), versions=versions
+        )
+
+    # =========================================================================
+    # INVALIDATION / WRITE-THROUGH
+    # =========================================================================
+
+    async def invalidate(self, lawyer_id: str):
+        """إبطال snapshot محامٍ واحد (L1 + Redis)"""
+        if not lawyer_id:
+            return
+        self.invalidate_local(lawyer_id)
+        await get_cache().delete(CacheKeys.lawyer_subscription(lawyer_id))
+        self.stats["invalidations"] += 1
+
+    def invalidate_local(self, lawyer_id: str):
+        """إبطال L1 فقط (Redis أُبطل عبر lawyer tag)"""
+        with self._lock:
+            self._local.pop(lawyer_id, None)
+            self._last_access.pop(lawyer_id, None)
+
+    async def invalidate_all(self):
+        """إبطال جميع الـ snapshots (مثلاً بعد تعديل حدود باقة) عبر subscriptions tag"""
+        with self._lock:
+            self._local.clear()
+            self._last_access.clear()
+        await get_cache().invalidate_tag(CacheKeys.SUBSCRIPTIONS_TAG)
+        self.stats["invalidations"] += 1
+        logger.info("🗑️ Invalidated all subscription snapshots")
+
+    async def apply_delta(self, lawyer_id: str, field: str, delta: float):
+        """
+        تعديل عدّاد استهلاك داخل الـ snapshot بعد تحديثه في قاعدة البيانات
+        (words_used_this_month / storage_used_mb) بدلاً من إبطاله وإعادة تحميله.
+        """
+        snapshot = self._get_local(lawyer_id)
+        if snapshot is None:
+            snapshot, versions = await get_cache().get_versioned(
+                CacheKeys.lawyer_subscription(lawyer_id), tags=_tags(lawyer_id)
+            )
+        else:
+            versions = await get_cache().get_tag_versions(_tags(lawyer_id))
+        if not snapshot or snapshot.get("__none__"):
+            return
+
+        updated = {**snapshot, field: (snapshot.get(field) or 0) + delta}
+        await self._store(lawyer_id, updated, versions)
+
+    # =========================================================================
+    # BACKGROUND REFRESH
+    # =========================================================================
+
+    def hot_lawyers(self) -> List[str]:
+        """المحامون الذين طُلبت اشتراكاتهم مؤخراً؛ يُسقط من لم يُطلب منذ CacheTTL.SUBSCRIPTION"""
+        idle_cutoff = time.monotonic() - CacheTTL.SUBSCRIPTION
+        with self._lock:
+            for lawyer_id in [k for k, t in self._last_access.items() if t < idle_cutoff]:
+                self._last_access.pop(lawyer_id, None)
+                self._local.pop(lawyer_id, None)
+            return list(self._local.keys())
+
+    async def refresh_hot(self) -> int:
+        """
+        إعادة تحميل snapshots المحامين النشطين في هذه العملية باستعلام واحد
+
+        Returns:
+            عدد الـ snapshots المحدثة
+        """
+        lawyer_ids = self.hot_lawyers()
+        if not lawyer_ids:
+            return 0
+
+        # Versions before the DB read: an invalidation during the load wins
+        versions = await get_cache().get_tag_versions(
+            sorted({tag for lawyer_id in lawyer_ids for tag in _tags(lawyer_id)})
+        )
+        latest = await asyncio.to_thread(self._load_latest, lawyer_ids)
+
+        values = {}
+        for lawyer_id in lawyer_ids:
+            value = latest.get(lawyer_id) or _NO_SUBSCRIPTION
+            self._set_local(lawyer_id, value)
+            values[CacheKeys.lawyer_subscription(lawyer_id)] = (lawyer_id, value)
+
+        # Single pipelined write for all refreshed snapshots
+        await get_cache().set_many(
+            {key: value for key, (_, value) in values.items()},
+            ttl=CacheTTL.SUBSCRIPTION,
+            tags={key: _tags(lawyer_id) for key, (lawyer_id, _) in values.items()},
+            versions=versions
+        )
+
+        self.stats["refreshes"] += 1
+        return len(lawyer_ids)
+
+    def _load_latest(self, lawyer_ids: List[str]) -> Dict[str, Dict[str, Any]]:
+        supabase = get_supabase_client()
+        result = supabase.table("lawyer_subscriptions")\
+            .select(SUBSCRIPTION_SELECT)\
+            .in_("lawyer_id", lawyer_ids)\
+            .order("created_at", desc=True)\
+            .execute()
+
+        latest: Dict[str, Dict[str, Any]] = {}
+        for row in result.data or []:
+            # Rows are newest-first; keep the first one seen per lawyer
+            latest.setdefault(row["lawyer_id"], row)
+        return latest
+
+    async def expire_overdue(self) -> int:
+        """
+        تحويل الاشتراكات التي تجاوزت end_date إلى expired (كان يتم داخل الطلب)
+
+        Returns:
+            عدد الاشتراكات التي انتهت
+        """
+        expired = await asyncio.to_thread(self._expire_in_db)
+        for row in expired:
+            await self.invalidate(row.get("lawyer_id"))
+
+        if expired:
+            logger.info(f"⏰ Expired {len(expired)} overdue subscriptions")
+        return len(expired)
+
+    def _expire_in_db(self) -> List[Dict[str, Any]]:
+        supabase = get_supabase_client()
+        today = datetime.now().date().isoformat()
+        result = supabase.table("lawyer_subscriptions")\
+            .update({"status": "expired", "updated_at": datetime.now().isoformat()})\
+            .lt("end_date", today)\
+            .in_("status", ["active", "trial"])\
+            .execute()
+        return result.data or []
+
+    async def _refresh_loop(self):
+        while True:
+            try:
+                await self.expire_overdue()
+                await self.refresh_hot()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"❌ Subscription refresh failed: {e}")
+            await asyncio.sleep(self.refresh_interval)
+
+    def start_refresher(self):
+        """تشغيل مهمة التحديث الخلفية (تُستدعى من startup)"""
+        if self._refresher is None or self._refresher.done():
+            self._refresher = asyncio.create_task(self._refresh_loop())
+            logger.info(f"🔄 Subscription refresher started (every {self.refresh_interval}s)")
+
+    async def stop_refresher(self):
+        if self._refresher and not self._refresher.done():
+            self._refresher.cancel()
+            try:
+                await self._refresher
+            except asyncio.CancelledError:
+                pass
+        self._refresher = None
+
+    def get_stats(self) -> dict:
+        with self._lock:
+            size = len(self._local)
+        return {**self.stats, "local_size": size}
+
+
+# ===== Singleton Instance =====
+_subscription_cache: Optional[SubscriptionCache] = None
+
+
+def get_subscription_cache() -> SubscriptionCache:
+    """الحصول على Subscription Cache (Singleton)"""
+    global _subscription_cache
+    if _subscription_cache is None:
+        _subscription_cache = SubscriptionCache()
+    return _subscription_cache
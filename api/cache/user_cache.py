@@ -0,0 +1,113 @@
+"""
+User Profile Cache
+ذاكرة مؤقتة محدودة الحجم لملفات المستخدمين (LRU + TTL + Redis)
+
+تُستخدم في dependency المصادقة لتجنب استعلام users/roles مع كل طلب.
+- L1: OrderedDict داخل العملية بحد أقصى للحجم وTTL قصير
+- L2: Redis (CacheKeys.user_profile) مشترك بين الـ workers
+- الإبطال عبر invalidate_user_caches
+"""
+import logging
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Tuple
+
+from .redis_client import get_cache
+from .keys import CacheKeys, CacheTTL
+
+logger = logging.getLogger(__name__)
+
+
+def _tags(user_id: str) -> List[str]:
+    return [CacheKeys.lawyer_tag(user_id), CacheKeys.USER_PROFILES_TAG]
+
+
+class UserProfileCache:
+    """
+    Bounded LRU+TTL cache for authenticated user profiles.
+
+    Usage:
+        cache = get_user_cache()
+        user, versions = await cache.get_versioned(user_id)
+        if user is None:
+            user = user_storage.get_user_by_id(user_id)
+            await cache.set(user_id, user, versions)
+    """
+
+    def __init__(self, max_size: int = None, local_ttl: int = None):
+        self.max_size = max_size or int(os.getenv("USER_CACHE_MAX_SIZE", 5000))
+        self.local_ttl = local_ttl or int(os.getenv("USER_CACHE_LOCAL_TTL", CacheTTL.USER_PROFILE_LOCAL))
+        self._cache: "OrderedDict[str, Tuple[float, Dict[str, Any]]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.stats = {"local_hits": 0, "redis_hits": 0, "misses": 0, "evictions": 0}
+
+    async def get(self, user_id: str) -> Optional[Dict[str, Any]]:
+        """قراءة ملف المستخدم من L1 ثم Redis"""
+        user, _ = await self.get_versioned(user_id)
+        return user
+
+    async def get_versioned(self, user_id: str) -> Tuple[Optional[Dict[str, Any]], Optional[Dict[str, int]]]:
+        """مثل get مع نسخ الـ tags عند MISS (تُمرر إلى set بعد القراءة من قاعدة البيانات)"""
+        now = time.monotonic()
+        with self._lock:
+            entry = self._cache.get(user_id)
+            if entry is not None:
+                expires_at, user = entry
+                if now <= expires_at:
+                    self._cache.move_to_end(user_id)
+                    self.stats["local_hits"] += 1
+                    return user, None
+                del self._cache[user_id]
+
+        user, versions = await get_cache().get_versioned(CacheKeys.user_profile(user_id), tags=_tags(user_id))
+        if user is not None:
+            self.stats["redis_hits"] += 1
+            self._set_local(user_id, user)
+            return user, versions
+
+        self.stats["misses"] += 1
+        return None, versions
+
+    async def set(self, user_id: str, user: Dict[str, Any], versions: Optional[Dict[str, int]] = None):
+        """حفظ ملف المستخدم في L1 وRedis (versions: من get_versioned قبل القراءة من قاعدة البيانات)"""
+        self._set_local(user_id, user)
+        await get_cache().set(
+            CacheKeys.user_profile(user_id), user,
+            ttl=CacheTTL.USER_PROFILE, tags=_tags(user_id), versions=versions
+        )
+
+    def _set_local(self, user_id: str, user: Dict[str, Any]):
+        with self._lock:
+            self._cache[user_id] = (time.monotonic() + self.local_ttl, user)
+            self._cache.move_to_end(user_id)
+            while len(self._cache) > self.max_size:
+                self._cache.popitem(last=False)
+                self.stats["evictions"] += 1
+
+    def invalidate(self, user_id: str):
+        """حذف المستخدم من L1 (Redis يُحذف عبر invalidate_user_caches)"""
+        with self._lock:
+            self._cache.pop(user_id, None)
+
+    def clear(self):
+        with self._lock:
+            self._cache.clear()
+
+    def get_stats(self) -> dict:
+        with self._lock:
+            size = len(self._cache)
+        return {**self.stats, "size": size, "max_size": self.max_size}
+
+
+# ===== Singleton Instance =====
+_user_cache: Optional[UserProfileCache] = None
+
+
+def get_user_cache() -> UserProfileCache:
+    """الحصول على User Profile Cache (Singleton)"""
+    global _user_cache
+    if _user_cache is None:
+        _user_cache = UserProfileCache()
+    return _user_cache
@@ -4,7 +4,7 @@ from datetime import datetime
 import logging
 
 from api.auth_middleware import get_current_user
-from agents.config.database import get_supabase_client
+from api.cache.subscription_cache import get_subscription_cache
 
 logger = logging.getLogger(__name__)
 
@@ -13,8 +13,6 @@ async def get_user_subscription(user: Dict[str, Any]) -> Optional[Dict[str, Any]
     Helper to fetch subscription for the relevant lawyer.
     If user is assistant, fetch parent's subscription via office_id.
     """
-    supabase = get_supabase_client()
-    
     # Determine Lawyer ID
     lawyer_id = None
     role_raw = user.get("role")
@@ -37,18 +35,9 @@ async def get_user_subscription(user: Dict[str, Any]) -> Optional[Dict[str, Any]
     if not lawyer_id:
         return None
 
-    # Fetch Subscription with Package details
-    # We sort by created_at desc to get the latest one
-    res = supabase.table("lawyer_subscriptions")\
-        .select("*, package:subscription_packages(*)")\
-        .eq("lawyer_id", lawyer_id)\
-        .order("created_at", desc=True)\
-        .limit(1)\
-        .execute()
-        
-    if res.data:
-        return res.data[0]
-    return None
+    # Subscription snapshot (with package) from the cache; the latest row
+    # per lawyer is loaded on miss and kept fresh by the background refresher
+    return await get_subscription_cache().get(lawyer_id)
 
 async def verify_subscription_active(
     user: Dict[str, Any] = Depends(get_current_user)
@@ -16,7 +16,7 @@ import logging
 
 from api.auth_middleware import get_current_user
 from api.guards import verify_subscription_active
-from api.database import get_supabase_client
+from api.services.audit_log import log_audit
 from agents.storage.hearing_storage import hearing_storage
 from agents.storage.case_storage import CaseStorage
 
@@ -35,39 +35,6 @@ def get_effective_lawyer_id(user: Dict[str, Any]) -> str:
     return user['id']
 
 
-def log_audit(supabase, action: str, table: str, record_id: str,
-              user: Dict[str, Any], lawyer_id: str,
-              old_values: Any = None, new_values: Any = None,
-              description: str = None):
-    """Log action to audit_logs table"""
-    try:
-        changes = None
-        if old_values and new_values and action == 'update':
-            changes = {}
-            for key in new_values:
-                if key in old_values and old_values[key] != new_values[key]:
-                    changes[key] = {'old': old_values[key], 'new': new_values[key]}
-
-        audit_data = {
-            'action': action,
-            'table_name': table,
-            'record_id': record_id,
-            'user_id': user['id'],
-            'user_name': user.get('full_name'),
-            'user_role': user.get('role', 'lawyer'),
-            'old_values': old_values,
-            'new_values': new_values,
-            'changes': changes,
-            'description': description,
-            'lawyer_id': lawyer_id,
-            'created_at': datetime.now().isoformat()
-        }
-
-        supabase.table('audit_logs').insert(audit_data).execute()
-    except Exception as e:
-        logger.warning(f"Failed to log audit: {e}")
-
-
 def verify_case_ownership(case_id: str, lawyer_id: str) -> bool:
     """Verify case belongs to lawyer"""
     case = case_storage.get_case_by_id(case_id, lawyer_id)
@@ -236,7 +203,6 @@ async def create_hearing(
     إنشاء جلسة جديدة - with ownership verification and audit logging
     """
     try:
-        supabase = get_supabase_client()
         lawyer_id = get_effective_lawyer_id(current_user)
         
         # Verify case ownership
@@ -305,7 +271,7 @@ async def create_hearing(
         
         # Log audit
         log_audit(
-            supabase, 'create', 'hearings', hearing.get('id', ''),
+            'create', 'hearings', hearing.get('id', ''),
             current_user, lawyer_id,
             new_values=request.dict(exclude_none=True),
             description=f'إضافة جلسة بتاريخ {request.hearing_date}'
@@ -339,7 +305,6 @@ async def update_hearing(
     تعديل جلسة - with audit logging
     """
     try:
-        supabase = get_supabase_client()
         lawyer_id = get_effective_lawyer_id(current_user)
         
         updates = request.dict(exclude_none=True)
@@ -369,7 +334,7 @@ async def update_hearing(
         
         # Log audit
         log_audit(
-            supabase, 'update', 'hearings', hearing_id,
+            'update', 'hearings', hearing_id,
             current_user, lawyer_id,
             old_values=old_hearing,
             new_values=hearing,
@@ -403,7 +368,6 @@ async def delete_hearing(
     حذف جلسة - with audit logging
     """
     try:
-        supabase = get_supabase_client()
         lawyer_id = get_effective_lawyer_id(current_user)
         
         # Get existing hearing for audit
@@ -421,7 +385,7 @@ async def delete_hearing(
         
         # Log audit
         log_audit(
-            supabase, 'delete', 'hearings', hearing_id,
+            'delete', 'hearings', hearing_id,
             current_user, lawyer_id,
             old_values=old_hearing,
             description='حذف جلسة'
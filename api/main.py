@@ -67,6 +67,7 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["GET", "POST", "PUT", "DELETE", "OPTIONS", "PATCH"],
     allow_headers=["Authorization", "Content-Type", "X-Requested-With", "Accept"],
+    expose_headers=["X-Next-Cursor"],
 )
 
 from fastapi.staticfiles import StaticFiles
@@ -245,11 +246,15 @@ async def api_health_check():
     """
     Comprehensive health check endpoint
     """
-    from api.cache import get_cache
+    from api.cache import get_cache, get_subscription_cache, get_user_cache, get_session_context_cache
+    from api.services.message_persistence import get_message_persistence
+    from agents.core.llm_router import get_llm_router
+    from agents.core.llm_response_cache import get_llm_response_cache
+    from agents.core.context_packer import get_packing_stats
     
     cache = get_cache()
     cache_stats = cache.get_stats()
-    cache_info = cache.get_info()
+    cache_info = await cache.get_info()
     
     return {
         "status": "healthy",
@@ -271,7 +276,14 @@ async def api_health_check():
                     "hit_rate": f"{cache_stats['hit_rate']}%"
                 },
                 "server_info": cache_info if cache_info else None
-            }
+            },
+            "subscriptions": get_subscription_cache().get_stats(),
+            "auth_user_cache": get_user_cache().get_stats(),
+            "chat_sessions": get_session_context_cache().get_stats(),
+            "message_persistence": get_message_persistence().get_stats(),
+            "llm_router": get_llm_router().get_stats(),
+            "llm_response_cache": get_llm_response_cache().get_stats(),
+            "context_packing": get_packing_stats()
         }
     }
 
@@ -458,10 +470,11 @@ async def startup_event():
     
     # Initialize Redis Cache
     cache = get_cache()
+    connected = await cache.connect()
     cache_stats = cache.get_stats()
-    if cache_stats['available']:
+    if connected:
         logger.info(f"✅ Redis Cache: Connected (REDIS_ENABLED=True)")
-        cache_info = cache.get_info()
+        cache_info = await cache.get_info()
         if cache_info:
             logger.info(f"   Redis Version: {cache_info.get('redis_version', 'unknown')}")
             logger.info(f"   Memory Used: {cache_info.get('used_memory_human', 'unknown')}")
@@ -470,6 +483,27 @@ async def startup_event():
     else:
         logger.info("🔴 Redis Cache: Disabled (REDIS_ENABLED=False)")
     
+    # Subscription snapshots: background refresh + date-based expiry
+    from api.cache.subscription_cache import get_subscription_cache
+    get_subscription_cache().start_refresher()
+    
+    # Audit events: batched background writer (replays events spooled while the DB was down)
+    from api.services.audit_log import get_audit_writer
+    await get_audit_writer().start()
+    
+    # Summaries interrupted by a restart continue from their stored partial results
+    from api.services.summarization_service import resume_interrupted_summaries
+    await resume_interrupted_summaries()
+    
+    # Local ANN index (VECTOR_SEARCH_BACKEND=local): follow re-embedded chunks
+    if os.getenv("VECTOR_SEARCH_BACKEND", "pgvector").lower() == "local":
+        from agents.knowledge.ann_index import get_ann_builder
+        get_ann_builder().start_refresher()
+    
+    # Preload Supabase JWKS so the first authenticated request verifies locally
+    from api.utils.jwt_verifier import get_jwt_verifier
+    await get_jwt_verifier().warm_up()
+    
     # Test agent initialization
     logger.info("Testing agent initialization...")
     logger.info("✅ Agent System: Ready (Factory Pattern)")
@@ -484,6 +518,23 @@ async def startup_event():
 @app.on_event("shutdown")
 async def shutdown_event():
     """Cleanup on shutdown"""
+    from api.cache.subscription_cache import get_subscription_cache
+    await get_subscription_cache().stop_refresher()
+    
+    from agents.knowledge.ann_index import get_ann_builder
+    await get_ann_builder().stop_refresher()
+    
+    # Write (or spool) queued audit events before exiting
+    from api.services.audit_log import get_audit_writer
+    await get_audit_writer().stop()
+    
+    # Deferred chat message writes
+    from api.services.message_persistence import get_message_persistence
+    await get_message_persistence().flush()
+    
+    from api.cache import get_cache
+    await get_cache().close()
+    
     logger.info("👋 Shutting down Legal AI Multi-Agent System")
 
 
@@ -1,6 +1,6 @@
 import asyncio
 import logging
-from typing import Dict, Any
+from typing import Dict, Any, Optional
 from arq import create_pool
 from arq.connections import RedisSettings as ArqRedisSettings
 from api.queue.config import redis_settings, QUEUE_NAME
@@ -13,11 +13,20 @@ async def startup(ctx):
     logger.info("🚀 Worker starting up...")
     # Initialize any global connections if needed (DB, etc.)
     # chat_service should already be initialized globally in its module
+    # Batched audit writes (log_audit) and replay of spooled events
+    from api.services.audit_log import get_audit_writer
+    await get_audit_writer().start()
 
 async def shutdown(ctx):
     logger.info("👋 Worker shutting down...")
+    # Deferred chat message writes
+    from api.services.message_persistence import get_message_persistence
+    await get_message_persistence().flush()
+    from api.services.audit_log import get_audit_writer
+    await get_audit_writer().stop()
 
-async def run_agent_task(ctx, session_id: str, message_text: str, user_context: Dict[str, Any], generate_title: bool):
+async def run_agent_task(ctx, session_id: str, message_text: str, user_context: Dict[str, Any], generate_title: bool,
+                         message_id: Optional[str] = None):
     """
     The main worker function that runs the agent graph.
     This persists across server restarts (if queue is persistent).
@@ -30,7 +39,8 @@ async def run_agent_task(ctx, session_id: str, message_text: str, user_context:
             session_id=session_id,
             message_text=message_text,
             user_context=user_context,
-            generate_title=False # Title generation usually fast, can happen here
+            generate_title=False, # Title generation usually fast, can happen here
+            message_id=message_id # Idempotency key: retries don't duplicate messages
         )
         return result.dict()
     except Exception as e:
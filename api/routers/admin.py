@@ -14,6 +14,7 @@ import logging
 
 from api.auth_middleware import get_current_manager
 from api.database import get_supabase_client
+from api.cache.invalidation import invalidate_after_profile_update, invalidate_all_user_profiles
 from api.admin_models import (
     PlatformSettingsResponse,
     PlatformSettingsUpdate,
@@ -121,9 +122,9 @@ async def update_platform_settings(
         logger.info(f"✅ Platform settings updated by {current_user.get('full_name')}")
         
         # Log audit
-        from api.routers.settings import log_audit
+        from api.services.audit_log import log_audit
         log_audit(
-            supabase, 'update', 'platform_settings', str(result.data[0]['id']),
+            'update', 'platform_settings', str(result.data[0]['id']),
             current_user,
             description='تحديث إعدادات المنصة'
         )
@@ -244,6 +245,8 @@ async def toggle_lawyer_activation(
         if not result.data:
             raise HTTPException(status_code=404, detail="Lawyer not found")
         
+        await invalidate_after_profile_update(lawyer_id)
+        
         # Update platform_settings to track this
         settings = supabase.table('platform_settings')\
             .select('lawyers_activation_status')\
@@ -268,9 +271,9 @@ async def toggle_lawyer_activation(
         logger.info(f"✅ {action} محامي: {lawyer_id} by {current_user.get('full_name')}")
         
         # Log audit
-        from api.routers.settings import log_audit
+        from api.services.audit_log import log_audit
         log_audit(
-            supabase, 'update', 'users', lawyer_id,
+            'update', 'users', lawyer_id,
             current_user,
             description=f'{action} حساب المحامي - السبب: {status.reason or "غير محدد"}'
         )
@@ -359,7 +362,7 @@ async def get_system_health(
         
         cache = get_cache()
         cache_stats = cache.get_stats()
-        cache_info = cache.get_info()
+        cache_info = await cache.get_info()
         
         # Database health (simple query)
         supabase = get_supabase_client()
@@ -411,7 +414,7 @@ async def clear_cache(
         from api.cache import get_cache
         
         cache = get_cache()
-        success = cache.clear_all()
+        success = await cache.clear_all()
         
         if success:
             logger.warning(f"⚠️ Cache cleared by {current_user.get('full_name')}")
@@ -859,9 +862,9 @@ async def create_role(
         logger.info(f"✅ Role created: {role.name} by {current_user.get('full_name')}")
         
         # Log audit
-        from api.routers.settings import log_audit
+        from api.services.audit_log import log_audit
         log_audit(
-            supabase, 'create', 'roles', str(result.data[0]['id']),
+            'create', 'roles', str(result.data[0]['id']),
             current_user,
             description=f'إنشاء دور جديد: {role.name_ar}'
         )
@@ -900,12 +903,15 @@ async def update_role(
         if not result.data:
             raise HTTPException(status_code=404, detail="Role not found")
         
+        # Role permissions are embedded in every cached user profile
+        await invalidate_all_user_profiles()
+        
         logger.info(f"✅ Role updated: {role_id} by {current_user.get('full_name')}")
         
         # Log audit
-        from api.routers.settings import log_audit
+        from api.services.audit_log import log_audit
         log_audit(
-            supabase, 'update', 'roles', role_id,
+            'update', 'roles', role_id,
             current_user,
             description=f'تحديث الدور: {result.data[0].get("name_ar", "")}'
         )
@@ -967,9 +973,9 @@ async def delete_role(
         logger.info(f"✅ Role deleted: {role_id} by {current_user.get('full_name')}")
         
         # Log audit
-        from api.routers.settings import log_audit
+        from api.services.audit_log import log_audit
         log_audit(
-            supabase, 'delete', 'roles', role_id,
+            'delete', 'roles', role_id,
             current_user,
             description=f'حذف الدور: {role.data[0].get("name_ar", "")}'
         )
@@ -1017,15 +1023,17 @@ async def update_user_role(
         if not result.data:
             raise HTTPException(status_code=404, detail="User not found")
         
+        await invalidate_after_profile_update(user_id)
+        
         logger.info(
             f"✅ User {user_id} role updated to {role.data[0]['name']} "
             f"by {current_user.get('full_name')}"
         )
         
         # Log audit
-        from api.routers.settings import log_audit
+        from api.services.audit_log import log_audit
         log_audit(
-            supabase, 'update', 'users', user_id,
+            'update', 'users', user_id,
             current_user,
             description=f'تغيير دور المستخدم إلى: {role.data[0].get("name_ar", "")}'
         )
@@ -6,6 +6,7 @@ import logging
 from api.auth import get_current_user
 from api.auth_middleware import require_role
 from api.database import get_supabase_client
+from api.cache.invalidation import invalidate_subscription_caches, invalidate_all_subscription_caches
 from pydantic import BaseModel
 
 # Setup Logger
@@ -100,6 +101,9 @@ async def update_package(
         
         if not result.data:
              raise HTTPException(status_code=404, detail="Package not found")
+        
+        # Package limits are embedded in every subscription snapshot
+        await invalidate_all_subscription_caches()
              
         return result.data[0]
     except Exception as e:
@@ -355,6 +359,7 @@ async def activate_subscription(
         }
         
         result = supabase.table("lawyer_subscriptions").update(update_data).eq("id", sub_id).execute()
+        await invalidate_subscription_caches(sub['lawyer_id'])
         
         return {"message": "Subscription activated for 30 days", "new_end_date": new_end_date}
         
@@ -394,6 +399,7 @@ async def extend_subscription(
         }
         
         supabase.table("lawyer_subscriptions").update(update_data).eq("id", sub_id).execute()
+        await invalidate_subscription_caches(sub['lawyer_id'])
         
         return {"message": "Subscription extended successfully", "new_end_date": new_end_date}
         
@@ -428,7 +434,9 @@ async def change_subscription_package(
             "updated_at": datetime.now().isoformat()
         }
         
-        supabase.table("lawyer_subscriptions").update(update_data).eq("id", sub_id).execute()
+        result = supabase.table("lawyer_subscriptions").update(update_data).eq("id", sub_id).execute()
+        if result.data:
+            await invalidate_subscription_caches(result.data[0].get('lawyer_id'))
         
         return {"message": "Package changed successfully", "package_name": package.data['name']}
         
@@ -480,6 +488,7 @@ async def activate_trial_for_lawyer(
         }
         
         result = supabase.table("lawyer_subscriptions").insert(new_sub).execute()
+        await invalidate_subscription_caches(lawyer_id)
         
         return {"message": "Trial activated successfully", "data": result.data[0] if result.data else None}
         
@@ -517,6 +526,8 @@ async def update_lawyer_resources(
         
         if not result.data:
              raise HTTPException(status_code=404, detail="Subscription not found")
+        
+        await invalidate_subscription_caches(result.data[0].get('lawyer_id'))
              
         return {"message": "Resources updated successfully", "data": result.data[0]}
     except Exception as e:
@@ -534,6 +545,8 @@ async def reset_subscription_usage(
     try:
         supabase = get_supabase_client()
         result = supabase.table("lawyer_subscriptions").update({"words_used_this_month": 0, "updated_at": datetime.now().isoformat()}).eq("id", sub_id).execute()
+        if result.data:
+            await invalidate_subscription_caches(result.data[0].get('lawyer_id'))
         return {"message": "Usage reset successfully"}
     except Exception as e:
         logger.error(f"Failed to reset usage: {e}")
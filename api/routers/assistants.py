@@ -11,6 +11,8 @@ import logging
 
 from api.auth_middleware import get_current_user
 from api.database import get_supabase_client
+from api.cache.invalidation import invalidate_user_caches, invalidate_subscription_caches
+from api.services.audit_log import log_audit
 
 logger = logging.getLogger(__name__)
 
@@ -55,39 +57,6 @@ def get_effective_lawyer_id(user: Dict[str, Any]) -> str:
     return user['id']
 
 
-def log_audit(supabase, action: str, table: str, record_id: str,
-              user: Dict[str, Any], lawyer_id: str,
-              old_values: Any = None, new_values: Any = None,
-              description: str = None):
-    """Log action to audit_logs table"""
-    try:
-        changes = None
-        if old_values and new_values and action == 'update':
-            changes = {}
-            for key in new_values:
-                if key in old_values and old_values[key] != new_values[key]:
-                    changes[key] = {'old': old_values[key], 'new': new_values[key]}
-
-        audit_data = {
-            'action': action,
-            'table_name': table,
-            'record_id': record_id,
-            'user_id': user['id'],
-            'user_name': user.get('full_name'),
-            'user_role': user.get('role', 'lawyer'),
-            'old_values': old_values,
-            'new_values': new_values,
-            'changes': changes,
-            'description': description,
-            'lawyer_id': lawyer_id,
-            'created_at': datetime.now().isoformat()
-        }
-
-        supabase.table('audit_logs').insert(audit_data).execute()
-    except Exception as e:
-        logger.warning(f"Failed to log audit: {e}")
-
-
 # --- Endpoints ---
 
 @router.get("", response_model=List[AssistantResponse])
@@ -205,11 +174,13 @@ async def toggle_assistant_status(
         if not result.data:
             raise Exception("Failed to update assistant status")
         
+        await invalidate_user_caches(assistant_id)
+        
         updated_assistant = result.data[0]
         
         # Log audit
         log_audit(
-            supabase, 'update', 'users', assistant_id,
+            'update', 'users', assistant_id,
             current_user, lawyer_id,
             old_values=old_assistant,
             new_values=updated_assistant,
@@ -281,12 +252,20 @@ async def create_assistant(request: CreateAssistantRequest):
         
         # 5. Update Statistics
         try:
+             count_result = supabase.table("users")\
+                 .select("id", count="exact")\
+                 .eq("office_id", request.office_id)\
+                 .eq("role", "assistant")\
+                 .execute()
+
              supabase.table("lawyer_subscriptions")\
-                 .update({"assistants_count": supabase.table("users").select("count").eq("office_id", request.office_id).count().data or 1})\
+                 .update({"assistants_count": count_result.count or 1})\
                  .eq("lawyer_id", request.office_id)\
                  .execute()
-        except Exception:
-             pass 
+        except Exception as e:
+             logger.warning(f"Failed to update assistants_count: {e}")
+        # check_assistant_limit reads the cached subscription snapshot
+        await invalidate_subscription_caches(request.office_id)
 
         if not result.data:
             # Rollback
@@ -399,10 +378,11 @@ async def delete_assistant(
                  .execute()
         except Exception as e:
              logger.warning(f"Failed to update assistants_count: {e}")
+        await invalidate_subscription_caches(lawyer_id)
 
         # 5. Log audit
         log_audit(
-            supabase, 'delete', 'users', assistant_id,
+            'delete', 'users', assistant_id,
             current_user, lawyer_id,
             old_values=old_assistant,
             description=f"حذف المساعد: {old_assistant.get('full_name')}"
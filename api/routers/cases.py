@@ -17,7 +17,7 @@ from datetime import datetime
 
 from api.auth_middleware import get_current_user
 from api.guards import verify_subscription_active
-from api.database import get_supabase_client
+from api.services.audit_log import log_audit
 from agents.storage.case_storage import CaseStorage
 
 logger = logging.getLogger(__name__)
@@ -39,38 +39,6 @@ def get_effective_lawyer_id(user: Dict[str, Any]) -> str:
     return user['id']
 
 
-def log_audit(supabase, action: str, table: str, record_id: str,
-              user: Dict[str, Any], lawyer_id: str,
-              old_values: Any = None, new_values: Any = None,
-              description: str = None):
-    """Log action to audit_logs table"""
-    try:
-        changes = None
-        if old_values and new_values and action == 'update':
-            changes = {}
-            for key in new_values:
-                if key in old_values and old_values[key] != new_values[key]:
-                    changes[key] = {'old': old_values[key], 'new': new_values[key]}
-
-        audit_data = {
-            'action': action,
-            'table_name': table,
-            'record_id': record_id,
-            'user_id': user['id'],
-            'user_name': user.get('full_name'),
-            'user_role': user.get('role', 'lawyer'),
-            'old_values': old_values,
-            'new_values': new_values,
-            'changes': changes,
-            'description': description,
-            'lawyer_id': lawyer_id,
-            'created_at': datetime.now().isoformat()
-        }
-
-        supabase.table('audit_logs').insert(audit_data).execute()
-    except Exception as e:
-        logger.warning(f"Failed to log audit: {e}")
-
 
 # ===== Request/Response Models =====
 
@@ -192,7 +160,6 @@ async def create_case(
     إنشاء قضية جديدة
     """
     try:
-        supabase = get_supabase_client()
         lawyer_id = get_effective_lawyer_id(current_user)
         
         case_data = request.dict(exclude_none=True)
@@ -219,7 +186,7 @@ async def create_case(
         
         # Log audit
         log_audit(
-            supabase, 'create', 'cases', created_case.get('id', ''),
+            'create', 'cases', created_case.get('id', ''),
             current_user, lawyer_id,
             new_values=case_data,
             description=f'إنشاء قضية جديدة للموكل {client_name}' if client_name else 'إنشاء قضية جديدة'
@@ -286,7 +253,6 @@ async def update_case(
     تعديل قضية
     """
     try:
-        supabase = get_supabase_client()
         lawyer_id = get_effective_lawyer_id(current_user)
         
         # Verify ownership
@@ -322,7 +288,7 @@ async def update_case(
         
         # Log audit
         log_audit(
-            supabase, 'update', 'cases', case_id,
+            'update', 'cases', case_id,
             current_user, lawyer_id,
             old_values=existing_case,
             new_values=updated_case,
@@ -357,7 +323,6 @@ async def delete_case(
     حذف قضية (للمحامي فقط)
     """
     try:
-        supabase = get_supabase_client()
         lawyer_id = get_effective_lawyer_id(current_user)
         
         # Only lawyers can delete (not assistants)
@@ -387,7 +352,7 @@ async def delete_case(
         
         # Log audit
         log_audit(
-            supabase, 'delete', 'cases', case_id,
+            'delete', 'cases', case_id,
             current_user, lawyer_id,
             old_values=existing_case,
             description='حذف قضية'
@@ -462,7 +427,6 @@ async def create_opponent(
     إضافة خصم للقضية
     """
     try:
-        supabase = get_supabase_client()
         lawyer_id = get_effective_lawyer_id(current_user)
         
         # Verify ownership
@@ -487,7 +451,7 @@ async def create_opponent(
         
         # Log audit
         log_audit(
-            supabase, 'create', 'opponents', created_opponent['id'],
+            'create', 'opponents', created_opponent['id'],
             current_user, lawyer_id,
             new_values=created_opponent,
             description=f"إضافة خصم: {created_opponent.get('full_name')}"
@@ -519,7 +483,6 @@ async def delete_opponent(
     حذف خصم من القضية
     """
     try:
-        supabase = get_supabase_client()
         lawyer_id = get_effective_lawyer_id(current_user)
         
         # Verify ownership of case
@@ -547,7 +510,7 @@ async def delete_opponent(
         
         # Log audit
         log_audit(
-            supabase, 'delete', 'opponents', opponent_id,
+            'delete', 'opponents', opponent_id,
             current_user, lawyer_id,
             old_values=opponent,
             description=f"حذف خصم: {opponent.get('full_name')}"
@@ -3,7 +3,7 @@ Chat API Router
 Secure backend access for AI chat sessions and messages
 Replaces direct Supabase access from Frontend
 """
-from fastapi import APIRouter, Depends, HTTPException, Body
+from fastapi import APIRouter, Depends, HTTPException, Body, Query, Response
 from pydantic import BaseModel
 from typing import Dict, Any, List, Optional
 from datetime import datetime
@@ -13,6 +13,8 @@ import requests
 
 from api.auth_middleware import get_current_user
 from api.database import get_supabase_client
+from api.utils.pagination import encode_cursor, decode_cursor, cursor_score, cursor_uuid
+from api.cache.invalidation import invalidate_chat_session
 from agents.config.settings import settings
 
 logger = logging.getLogger(__name__)
@@ -43,43 +45,60 @@ class ChatSessionUpdate(BaseModel):
 @router.get("/search")
 async def search_chats(
     q: str,
+    limit: int = Query(10, ge=1, le=50),
+    cursor: Optional[str] = None,
     current_user: Dict[str, Any] = Depends(get_current_user)
-) -> Dict[str, List[Dict[str, Any]]]:
+) -> Dict[str, Any]:
     """
     Search sessions (title) and messages (content).
-    Returns { sessions: [], messages: [] }
+    Arabic-normalized, index-backed and ranked (see migrations/20260210_chat_search_indexes.sql).
+    Messages are keyset-paginated: pass back `next_cursor` as `cursor` for the next page.
+    Returns { sessions: [], messages: [], next_cursor: str | None }
     """
     try:
         supabase = get_supabase_client()
         lawyer_id = current_user['id']
+        after = decode_cursor(cursor, 2)
+        if after:
+            after = [cursor_score(after[0]), cursor_uuid(after[1])]
         
-        # 1. Search Sessions
-        sessions_res = supabase.table('ai_chat_sessions')\
-            .select('*')\
-            .eq('lawyer_id', lawyer_id)\
-            .ilike('title', f'%{q}%')\
-            .limit(5)\
-            .execute()
+        # 1. Search Sessions (first page only)
+        sessions = []
+        if after is None:
+            sessions_res = supabase.rpc('search_chat_sessions', {
+                'p_lawyer_id': lawyer_id,
+                'p_query': q,
+                'p_limit': 5
+            }).execute()
+            sessions = sessions_res.data or []
             
-        # 2. Search Messages (Join with sessions to get context if feasible, or just return raw)
-        # Note: Supabase-py might not support complex joins easily in one go used this way,
-        # so we fetch messages and maybe enrich them.
-        messages_res = supabase.table('ai_chat_messages')\
-            .select('*, ai_chat_sessions!inner(title, lawyer_id)')\
-            .eq('ai_chat_sessions.lawyer_id', lawyer_id)\
-            .ilike('content', f'%{q}%')\
-            .limit(10)\
-            .execute()
+        # 2. Search Messages (ranked, keyset on (score, id))
+        messages_res = supabase.rpc('search_chat_messages', {
+            'p_lawyer_id': lawyer_id,
+            'p_query': q,
+            'p_limit': limit + 1,
+            'p_cursor_score': after[0] if after else None,
+            'p_cursor_id': after[1] if after else None
+        }).execute()
+        messages = messages_res.data or []
+        
+        next_cursor = None
+        if len(messages) > limit:
+            messages = messages[:limit]
+            next_cursor = encode_cursor(messages[-1]['score'], messages[-1]['id'])
             
         return {
-            "sessions": sessions_res.data,
-            "messages": messages_res.data
+            "sessions": sessions,
+            "messages": messages,
+            "next_cursor": next_cursor
         }
         
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"❌ Search failed: {e}")
         # Return empty on error to avoid breaking UI
-        return {"sessions": [], "messages": []}
+        return {"sessions": [], "messages": [], "next_cursor": None}
 
 @router.get("/sessions")
 async def get_sessions(
@@ -137,6 +156,13 @@ async def create_session(
             
         if not result.data:
             raise Exception("Failed to create session")
+        
+        # Session snapshot (owner, profile, subscription) so the first message skips those lookups
+        try:
+            from api.services.chat_service import chat_service
+            await chat_service.build_session_snapshot(result.data[0], current_user, recent_messages=[])
+        except Exception as e:
+            logger.warning(f"⚠️ Failed to build session snapshot: {e}")
             
         return result.data[0]
         
@@ -211,6 +237,8 @@ async def delete_session(
             .delete()\
             .eq('id', session_id)\
             .execute()
+        
+        await invalidate_chat_session(session_id)
             
         return {"success": True}
         
@@ -266,9 +294,17 @@ async def update_session(
 @router.get("/sessions/{session_id}/messages")
 async def get_messages(
     session_id: str,
+    response: Response,
+    limit: Optional[int] = Query(None, ge=1, le=200),
+    before: Optional[str] = None,
     current_user: Dict[str, Any] = Depends(get_current_user)
 ) -> List[Dict[str, Any]]:
-    """Get messages for a session"""
+    """
+    Get messages for a session.
+    With `limit`, returns the latest page (chronological order) and sets the
+    `X-Next-Cursor` header; pass it back as `before` to load older messages.
+    Without `limit`, returns the full transcript (legacy behaviour).
+    """
     try:
         supabase = get_supabase_client()
         lawyer_id = current_user['id']
@@ -283,6 +319,13 @@ async def get_messages(
         if not check.data:
             raise HTTPException(status_code=404, detail="Session not found or access denied")
             
+        if limit is not None or before:
+            from api.services.chat_service import chat_service
+            rows, next_cursor = chat_service.fetch_messages_page(session_id, limit or 50, before)
+            if next_cursor:
+                response.headers['X-Next-Cursor'] = next_cursor
+            return rows
+            
         result = supabase.table('ai_chat_messages')\
             .select('*')\
             .eq('session_id', session_id)\
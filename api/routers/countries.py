@@ -43,7 +43,7 @@ async def get_countries() -> List[CountryResponse]:
     cache_key = CacheKeys.COUNTRIES
     
     # 1. محاولة القراءة من Cache
-    cached_data = cache.get(cache_key)
+    cached_data = await cache.get(cache_key)
     if cached_data is not None:
         logger.info("✅ Countries loaded from Redis cache")
         return [CountryResponse(**country) for country in cached_data]
@@ -61,7 +61,7 @@ async def get_countries() -> List[CountryResponse]:
         countries = result.data or []
         
         # 3. حفظ في Cache لمدة 7 أيام
-        cache.set(cache_key, countries, ttl=CacheTTL.COUNTRIES)
+        await cache.set(cache_key, countries, ttl=CacheTTL.COUNTRIES)
         logger.info(f"💾 Cached {len(countries)} countries for 7 days")
         
         return [CountryResponse(**country) for country in countries]
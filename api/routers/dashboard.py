@@ -2,13 +2,14 @@
 Dashboard API Router
 Provides aggregated statistics for lawyer dashboard
 """
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Request, Response
 from typing import Dict, Any
 from datetime import datetime, timedelta
 import logging
 
 from api.auth_middleware import get_current_user
 from api.database import get_supabase_client
+from api.services.agenda_service import agenda_service
 
 logger = logging.getLogger(__name__)
 
@@ -210,11 +211,16 @@ async def get_upcoming_hearings(
 async def get_calendar_events(
     start_date: str,
     end_date: str,
+    request: Request,
+    response: Response,
     current_user: Dict[str, Any] = Depends(get_current_user)
 ) -> dict:
     """
     Get calendar events (hearings + tasks) for date range
     
+    Reads the trigger-maintained lawyer_agenda (case fields denormalized) and
+    supports If-None-Match: unchanged agenda + same range returns 304.
+    
     Args:
         start_date: Start of range (ISO 8601 format)
         end_date: End of range (ISO 8601 format)
@@ -224,96 +230,53 @@ async def get_calendar_events(
     """
     try:
         lawyer_id = current_user['id']
-        supabase = get_supabase_client()
         
-        logger.info(f"📅 Fetching calendar events from {start_date} to {end_date}")
+        etag = agenda_service.make_etag(
+            lawyer_id, agenda_service.get_version(lawyer_id), "calendar", start_date[:10], end_date[:10]
+        )
+        cached = agenda_service.not_modified(request, response, etag)
+        if cached:
+            return cached
         
-        # 1. Fetch hearings
-        hearings_result = supabase.table('hearings')\
-            .select('id, hearing_date, hearing_time, case_id')\
-            .eq('lawyer_id', lawyer_id)\
-            .gte('hearing_date', start_date)\
-            .lte('hearing_date', end_date)\
-            .execute()
+        logger.info(f"📅 Fetching calendar events from {start_date} to {end_date}")
         
-        # 2. Fetch tasks
-        tasks_result = supabase.table('tasks')\
-            .select('id, title, execution_date, priority, case_id')\
-            .eq('lawyer_id', lawyer_id)\
-            .gte('execution_date', start_date)\
-            .lte('execution_date', end_date)\
-            .execute()
-            
-        # 3. Collect unique Case IDs
-        case_ids = set()
-        if hearings_result.data:
-            case_ids.update(h['case_id'] for h in hearings_result.data if h.get('case_id'))
-        if tasks_result.data:
-            case_ids.update(t['case_id'] for t in tasks_result.data if t.get('case_id'))
-            
-        # 4. Fetch Cases (Only relevant ones) - Using fast columns
-        cases_map = {}
-        if case_ids:
-            # Try to use client_name if available (denormalized), else fallback or select both
-            # Assuming 'client_name' is the new fast column as per instructions.
-            cases_result = supabase.table('cases')\
-                .select('id, subject, case_number, court_name, client_name')\
-                .in_('id', list(case_ids))\
-                .execute()
-                
-            if cases_result.data:
-                for case in cases_result.data:
-                    cases_map[case['id']] = {
-                        'subject': case.get('subject'),
-                        'case_number': case.get('case_number'),
-                        'court_name': case.get('court_name'),
-                        'client_name': case.get('client_name') or "مجهول"
-                    }
+        rows = agenda_service.fetch_range(lawyer_id, start_date, end_date)
         
-        # 5. Format events
         events = []
-        
-        # Format hearings
-        if hearings_result.data:
-            for h in hearings_result.data:
-                case_info = cases_map.get(h.get('case_id'), {})
+        for row in rows:
+            client_name = row.get('client_name') or ("مجهول" if row.get('case_id') else None)
+            
+            if row['item_type'] == 'hearing':
                 title = 'جلسة'
-                if h.get('hearing_time'):
-                    title += f" الساعة {h['hearing_time']}"
-                if case_info.get('client_name'):
-                    title += f" للعميل {case_info['client_name']}"
-                if case_info.get('case_number'):
-                    title += f" - قضية رقم {case_info['case_number']}"
-                if case_info.get('court_name'):
-                    title += f" - {case_info['court_name']}"
-                
-                if not case_info and h.get('case_id'):
-                    title = 'جلسة (جاري التحميل...)'
+                if row.get('event_time'):
+                    title += f" الساعة {row['event_time']}"
+                if client_name:
+                    title += f" للعميل {client_name}"
+                if row.get('case_number'):
+                    title += f" - قضية رقم {row['case_number']}"
+                if row.get('court_name'):
+                    title += f" - {row['court_name']}"
                 
                 events.append({
-                    'id': h['id'],
+                    'id': row['id'],
                     'type': 'hearing',
-                    'date': h['hearing_date'],
+                    'date': row['event_date'],
                     'title': title,
-                    'time': h.get('hearing_time'),
-                    'case_id': h.get('case_id'),
-                    'case_title': case_info.get('subject'),
-                    'client_name': case_info.get('client_name')
+                    'time': row.get('event_time'),
+                    'case_id': row.get('case_id'),
+                    'case_title': row.get('case_subject'),
+                    'client_name': client_name
                 })
-        
-        # Format tasks
-        if tasks_result.data:
-            for t in tasks_result.data:
-                case_info = cases_map.get(t.get('case_id'), {})
+            else:
                 events.append({
-                    'id': t['id'],
+                    'id': row['id'],
                     'type': 'task',
-                    'date': t['execution_date'],
-                    'title': t.get('title'),
-                    'priority': t.get('priority'),
-                    'case_id': t.get('case_id'),
-                    'case_title': case_info.get('subject'),
-                    'client_name': case_info.get('client_name')
+                    'date': row.get('due_at') or row['event_date'],
+                    'title': row.get('title'),
+                    'priority': row.get('priority'),
+                    'case_id': row.get('case_id'),
+                    'case_title': row.get('case_subject'),
+                    'client_name': client_name
                 })
         
         logger.info(f"✅ Found {len(events)} calendar events")
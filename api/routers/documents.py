@@ -4,15 +4,19 @@ API للتعامل مع المستندات، الرفع، OCR، والتلخيص
 """
 from fastapi import APIRouter, UploadFile, File, Form, HTTPException, Depends
 from api.guards import verify_subscription_active
+from api.utils.subscription_enforcement import get_remaining_storage_bytes
 from fastapi.responses import JSONResponse
 from typing import Optional
+import asyncio
 import os
-import shutil
+import time
 import uuid
 from datetime import datetime
 from supabase import create_client
 from ..services.ocr_service import get_ocr_service
-from ..services.llm_service import get_llm_service
+from ..services.summarization_service import DocumentSummarizer, start_summary_job
+from ..services.document_storage import DocumentStorage, stream_upload, resolve_local_path, MAX_DOCUMENT_BYTES
+from ..cache.subscription_cache import get_subscription_cache
 import logging
 from dotenv import load_dotenv
 
@@ -37,6 +41,9 @@ else:
 UPLOAD_DIR = "uploads/documents"
 os.makedirs(UPLOAD_DIR, exist_ok=True)
 
+# Minimum seconds between OCR progress writes (the final page is always written)
+OCR_PROGRESS_INTERVAL = 1.0
+
 
 @router.post("/upload")
 async def upload_document(
@@ -59,10 +66,8 @@ async def upload_document(
         document_type: Type of document
         enable_ocr: Whether to enable OCR extraction
     """
+    temp_upload = None
     try:
-        # 0. Subscription and Storage Governance Check
-        await check_storage_limit(lawyer_id, file.size if hasattr(file, 'size') else 0)
-
         # Validate file type
         allowed_extensions = ['pdf', 'png', 'jpg', 'jpeg']
         file_extension = file.filename.split('.')[-1].lower()
@@ -73,22 +78,26 @@ async def upload_document(
                 detail=f"نوع الملف غير مدعوم. الأنواع المدعومة: {', '.join(allowed_extensions)}"
             )
         
-        # Generate unique filename
-        file_id = str(uuid.uuid4())
-        filename = f"{file_id}.{file_extension}"
-        file_path = os.path.join(UPLOAD_DIR, filename)
-        
-        # Save file locally
-        with open(file_path, "wb") as buffer:
-            shutil.copyfileobj(file.file, buffer)
+        # Check if supabase client is initialized
+        if supabase is None:
+            logger.error("Supabase client is None - cannot save document")
+            raise HTTPException(status_code=500, detail="Database connection not available")
         
-        file_size = os.path.getsize(file_path)
+        # 0. Subscription and Storage Governance: limits are enforced while streaming
+        quota_bytes = await get_remaining_storage_bytes(lawyer_id)
         
-        logger.info(f"File uploaded: {filename}, size: {file_size} bytes")
+        # Stream to disk in chunks (hashing as we go), then store by content hash
+        temp_upload = streamed = await stream_upload(file, max_bytes=MAX_DOCUMENT_BYTES, quota_bytes=quota_bytes)
+        storage = DocumentStorage(db=supabase)
+        blob = await storage.commit(streamed, file_extension)
+        temp_upload = None
         
-        # Upload to Supabase Storage (optional - for now using local storage)
-        # You can implement Supabase Storage upload here if needed
-        file_url = f"/uploads/documents/{filename}"
+        file_id = str(uuid.uuid4())
+        file_size = streamed.size
+        logger.info(
+            f"File uploaded: {file.filename}, size: {file_size} bytes, "
+            f"sha256: {blob['sha256'][:12]} ({'shared blob' if blob['deduplicated'] else 'new blob'})"
+        )
         
         # Create document record in database
         document_data = {
@@ -97,9 +106,10 @@ async def upload_document(
             "client_id": client_id,
             "lawyer_id": lawyer_id,
             "file_name": file.filename,
-            "file_url": file_url,
+            "file_url": blob["file_url"],
             "file_type": file_extension,
             "file_size": file_size,
+            "content_hash": blob["sha256"],
             "document_type": document_type,
             "ocr_enabled": enable_ocr,
             "ocr_status": "pending" if enable_ocr else "disabled",
@@ -108,16 +118,20 @@ async def upload_document(
             "created_at": datetime.utcnow().isoformat()
         }
         
-        # Check if supabase client is initialized
-        if supabase is None:
-            logger.error("Supabase client is None - cannot save document")
-            raise HTTPException(status_code=500, detail="Database connection not available")
+        # Identical content already processed: reuse its OCR text / summary
+        if blob["deduplicated"]:
+            document_data.update(await storage.find_processed(blob["sha256"]))
         
         logger.info(f"Attempting to insert document: {document_data['file_name']}")
-        result = supabase.table("documents").insert(document_data).execute()
+        try:
+            result = supabase.table("documents").insert(document_data).execute()
+        except Exception:
+            await storage.release(blob["sha256"], blob["file_path"])
+            raise
         
         if not result.data:
             logger.error(f"Insert failed - no data returned: {result}")
+            await storage.release(blob["sha256"], blob["file_path"])
             raise HTTPException(status_code=500, detail="فشل حفظ المستند في قاعدة البيانات")
         
         logger.info(f"Document inserted successfully: {result.data[0]['id']}")
@@ -128,6 +142,7 @@ async def upload_document(
                 "lawyer_id_val": lawyer_id, 
                 "size_mb": file_size / (1024 * 1024)
             }).execute()
+            await get_subscription_cache().apply_delta(lawyer_id, "storage_used_mb", file_size / (1024 * 1024))
         except Exception as e:
             logger.warning(f"Failed to update storage stats: {e}")
 
@@ -146,12 +161,15 @@ async def upload_document(
             }
         )
         
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"Document upload failed: {str(e)}")
-        # Clean up file if database insert failed
-        if os.path.exists(file_path):
-            os.remove(file_path)
         raise HTTPException(status_code=500, detail=f"فشل رفع المستند: {str(e)}")
+    finally:
+        # Streamed but never committed (e.g. blob registration failed)
+        if temp_upload and os.path.exists(temp_upload.temp_path):
+            os.remove(temp_upload.temp_path)
 
 
 @router.post("/{document_id}/extract", dependencies=[Depends(verify_subscription_active)])
@@ -170,37 +188,75 @@ async def extract_text(document_id: str):
             raise HTTPException(status_code=404, detail="المستند غيرموجود")
         
         document = result.data[0]
-        file_path = os.path.join(UPLOAD_DIR, document["file_url"].split("/")[-1])
+        file_path = resolve_local_path(document["file_url"])
         
         if not os.path.exists(file_path):
             raise HTTPException(status_code=404, detail="الملف غير موجود")
         
+        # Same content already extracted for another document: reuse it
+        if document.get("content_hash"):
+            reused = await DocumentStorage(db=supabase).find_processed(document["content_hash"], exclude_id=document_id)
+            if reused:
+                supabase.table("documents").update({**reused, "ocr_enabled": True}).eq("id", document_id).execute()
+                text = reused.get("raw_text") or ""
+                return JSONResponse(content={
+                    "success": True,
+                    "message": "تم استخراج النص بنجاح",
+                    "word_count": reused.get("word_count", 0),
+                    "text_preview": text[:200] + "..." if len(text) > 200 else text
+                })
+        
         # Update status to processing
         supabase.table("documents").update({
             "ocr_status": "processing",
-            "ocr_enabled": True
+            "ocr_enabled": True,
+            "ocr_pages_done": 0
         }).eq("id", document_id).execute()
         
-        # Extract text using OCR
+        # Extract text using OCR (page by page; progress is streamed to the documents row)
         logger.info(f"Starting OCR for document: {document_id}")
         ocr = get_ocr_service()
-        extraction_result = await ocr.extract_text_from_file(file_path)
+        last_progress_at = 0.0
+        
+        async def report_progress(pages_done: int, pages_total: int):
+            nonlocal last_progress_at
+            now = time.monotonic()
+            if pages_done < pages_total and now - last_progress_at < OCR_PROGRESS_INTERVAL:
+                return
+            last_progress_at = now
+            try:
+                await asyncio.to_thread(
+                    supabase.table("documents").update({
+                        "ocr_pages_done": pages_done,
+                        "ocr_pages_total": pages_total
+                    }).eq("id", document_id).execute
+                )
+            except Exception as e:
+                logger.warning(f"Failed to update OCR progress: {e}")
+        
+        extraction_result = await ocr.extract_text_from_file(file_path, on_progress=report_progress)
         
         if extraction_result["success"]:
-            # Update document with extracted text
+            # Some pages may have failed: keep the text, mark the document partial
+            # (partial results are not reused for identical uploads, so a retry can complete them)
+            failed_pages = extraction_result.get("failed_pages") or []
+            partial_error = (
+                f"فشل استخراج النص من الصفحات: {', '.join(map(str, failed_pages))}" if failed_pages else None
+            )
             supabase.table("documents").update({
                 "raw_text": extraction_result["text"],
                 "word_count": extraction_result["word_count"],
-                "ocr_status": "completed",
-                "extraction_error": None,
+                "ocr_status": "partial" if failed_pages else "completed",
+                "extraction_error": partial_error,
                 "is_analyzed": True
             }).eq("id", document_id).execute()
             
-            logger.info(f"OCR completed: {extraction_result['word_count']} words")
+            logger.info(f"OCR completed: {extraction_result['word_count']} words, failed pages: {failed_pages}")
             
             return JSONResponse(content={
                 "success": True,
-                "message": "تم استخراج النص بنجاح",
+                "message": partial_error or "تم استخراج النص بنجاح",
+                "failed_pages": failed_pages,
                 "word_count": extraction_result["word_count"],
                 "text_preview": extraction_result["text"][:200] + "..." if len(extraction_result["text"]) > 200 else extraction_result["text"]
             })
@@ -227,15 +283,18 @@ async def extract_text(document_id: str):
 @router.post("/{document_id}/summarize", dependencies=[Depends(verify_subscription_active)])
 async def summarize_document(document_id: str):
     """
-    Summarize document using LLM
-    Handles large documents by chunking (max 3000 words per chunk)
+    Summarize document using LLM (background map-reduce job)
+    
+    Chunks are split on article/paragraph boundaries, summarized concurrently and
+    merged in a tree. Progress is written to chunk_number / total_chunks and the
+    result to ai_summary with summary_status="completed"; poll the document row.
     
     Args:
         document_id: ID of the document
     """
     try:
         # Get document from database
-        result = supabase.table("documents").select("*").eq("id", document_id).execute()
+        result = supabase.table("documents").select("id, raw_text, summary_status").eq("id", document_id).execute()
         
         if not result.data:
             raise HTTPException(status_code=404, detail="المستند غير موجود")
@@ -253,81 +312,15 @@ async def summarize_document(document_id: str):
             "summary_status": "processing"
         }).eq("id", document_id).execute()
         
-        # Chunk text if needed
-        text = document["raw_text"]
-        ocr = get_ocr_service()
-        word_count = ocr.count_words(text)
+        started = start_summary_job(document_id, DocumentSummarizer(db=supabase))
+        logger.info(f"Summarization job {'started' if started else 'already running'} for: {document_id}")
         
-        if word_count <= 3000:
-            # Single chunk - summarize directly
-            logger.info(f"Summarizing document ({word_count} words)")
-            llm = get_llm_service()
-            summary_result = await llm.summarize_chunk(text, 1, 1, True)
-            
-            if summary_result["success"]:
-                supabase.table("documents").update({
-                    "ai_summary": summary_result["summary"],
-                    "summary_status": "completed",
-                    "is_complete": True,
-                    "total_chunks": 1,
-                    "chunk_number": 1
-                }).eq("id", document_id).execute()
-                
-                return JSONResponse(content={
-                    "success": True,
-                    "message": "تم تلخيص المستند بنجاح",
-                    "summary": summary_result["summary"],
-                    "chunks": 1
-                })
-            else:
-                raise HTTPException(status_code=400, detail=summary_result["error"])
-        
-        else:
-            # Multiple chunks - process in batches
-            ocr = get_ocr_service()
-            chunks = ocr.chunk_text(text, max_words=3000)
-            total_chunks = len(chunks)
-            
-            logger.info(f"Document split into {total_chunks} chunks")
-            
-            summaries = []
-            llm = get_llm_service()
-            for i, chunk in enumerate(chunks, 1):
-                is_final = (i == total_chunks)
-                
-                logger.info(f"Processing chunk {i}/{total_chunks}")
-                summary_result = await llm.summarize_chunk(
-                    chunk, i, total_chunks, is_final
-                )
-                
-                if not summary_result["success"]:
-                    raise HTTPException(status_code=400, detail=summary_result["error"])
-                
-                summaries.append(summary_result["summary"])
-                
-                # Update progress
-                supabase.table("documents").update({
-                    "chunk_number": i,
-                    "total_chunks": total_chunks
-                }).eq("id", document_id).execute()
-            
-            # Save final summary (only the last one which is comprehensive)
-            final_summary = summaries[-1]  # The last chunk contains the complete summary
-            
-            supabase.table("documents").update({
-                "ai_summary": final_summary,
-                "summary_status": "completed",
-                "is_complete": True,
-                "chunk_number": total_chunks,
-                "total_chunks": total_chunks
-            }).eq("id", document_id).execute()
-            
-            return JSONResponse(content={
-                "success": True,
-                "message": f"تم تلخيص المستند بنجاح ({total_chunks} أجزاء)",
-                "summary": final_summary,
-                "chunks": total_chunks
-            })
+        return JSONResponse(status_code=202, content={
+            "success": True,
+            "message": "جاري تلخيص المستند",
+            "document_id": document_id,
+            "summary_status": "processing"
+        })
             
     except HTTPException:
         raise
@@ -381,21 +374,26 @@ async def delete_document(document_id: str):
             raise HTTPException(status_code=404, detail="المستند غير موجود")
         
         document = result.data[0]
-        file_path = os.path.join(UPLOAD_DIR, document["file_url"].split("/")[-1])
-        
-        # Delete file
-        if os.path.exists(file_path):
-            os.remove(file_path)
+        file_path = resolve_local_path(document["file_url"])
         
         # Delete from database
         supabase.table("documents").delete().eq("id", document_id).execute()
         
+        # Delete file (shared blobs only when the last document referencing them is gone)
+        if document.get("content_hash"):
+            await DocumentStorage(db=supabase).release(document["content_hash"], file_path)
+        elif os.path.exists(file_path):
+            os.remove(file_path)
+        
         # Decrease Storage Usage
         try:
             supabase.rpc("increment_storage_usage", {
                 "lawyer_id_val": document["lawyer_id"], 
                 "size_mb": -(document.get("file_size", 0) / (1024 * 1024))
             }).execute()
+            await get_subscription_cache().apply_delta(
+                document["lawyer_id"], "storage_used_mb", -(document.get("file_size", 0) / (1024 * 1024))
+            )
         except Exception as e:
             logger.warning(f"Failed to decrease storage stats: {e}")
 
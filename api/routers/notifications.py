@@ -3,14 +3,15 @@ Notifications API Router
 Provides unified notifications from hearings and tasks
 Replaces direct Supabase access from Frontend (notificationStore.ts)
 """
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Request, Response
 from pydantic import BaseModel
 from typing import Dict, Any, List, Optional
-from datetime import datetime, timedelta
+from datetime import datetime, timedelta, timezone
 import logging
 
 from api.auth_middleware import get_current_user
 from api.database import get_supabase_client
+from api.services.agenda_service import agenda_service
 
 logger = logging.getLogger(__name__)
 
@@ -47,6 +48,8 @@ def get_effective_lawyer_id(user: Dict[str, Any]) -> str:
 
 @router.get("", response_model=NotificationsResponse)
 async def get_notifications(
+    request: Request,
+    response: Response,
     current_user: Dict[str, Any] = Depends(get_current_user)
 ) -> NotificationsResponse:
     """
@@ -54,32 +57,41 @@ async def get_notifications(
     Includes:
     - Upcoming hearings (next 7 days)
     - Pending/in-progress tasks
+    
+    Built from the precomputed lawyer_agenda; polls with a matching
+    If-None-Match get 304 until the agenda (or the day) changes.
     """
     try:
-        supabase = get_supabase_client()
         lawyer_id = get_effective_lawyer_id(current_user)
         is_assistant = current_user.get('role') == 'assistant'
         
         notifications: List[Notification] = []
+        today = datetime.now()
+        
+        # Feed text depends on "today" and, for assistants, on their assignments
+        etag = agenda_service.make_etag(
+            lawyer_id, agenda_service.get_version(lawyer_id), "notifications",
+            today.date().isoformat(), current_user['id'] if is_assistant else ""
+        )
+        cached = agenda_service.not_modified(request, response, etag)
+        if cached:
+            return cached
         
         # 1. Fetch upcoming hearings (next 7 days)
-        today = datetime.now()
         seven_days_later = today + timedelta(days=7)
         
-        hearings_query = supabase.table('hearings')\
-            .select('id, hearing_date, hearing_time, case_id')\
-            .eq('lawyer_id', lawyer_id)\
-            .gte('hearing_date', today.date().isoformat())\
-            .lte('hearing_date', seven_days_later.date().isoformat())\
-            .order('hearing_date', desc=False)\
-            .limit(5)
-        
-        hearings_result = hearings_query.execute()
+        hearings = agenda_service.fetch_range(
+            lawyer_id,
+            today.date().isoformat(),
+            seven_days_later.date().isoformat(),
+            item_type='hearing',
+            limit=5
+        )
         
-        if hearings_result.data:
-            for h in hearings_result.data:
+        if hearings:
+            for h in hearings:
                 try:
-                    hearing_date_str = f"{h['hearing_date']}T{h.get('hearing_time') or '00:00'}"
+                    hearing_date_str = f"{h['event_date']}T{h.get('event_time') or '00:00'}"
                     hearing_date = datetime.fromisoformat(hearing_date_str)
                     
                     days_until = (hearing_date.date() - today.date()).days
@@ -108,27 +120,20 @@ async def get_notifications(
                     continue
         
         # 2. Fetch pending/in-progress tasks
-        tasks_query = supabase.table('tasks')\
-            .select('id, title, execution_date, status')\
-            .eq('lawyer_id', lawyer_id)\
-            .in_('status', ['pending', 'in_progress'])\
-            .order('execution_date', desc=False)\
-            .limit(10)
-        
         # For assistants: filter to their assigned tasks
-        if is_assistant:
-            user_id = current_user['id']
-            tasks_query = tasks_query.or_(f'assigned_to.eq.{user_id},assign_to_all.eq.true')
-        
-        tasks_result = tasks_query.execute()
+        tasks = agenda_service.fetch_open_tasks(
+            lawyer_id,
+            limit=10,
+            assignee_id=current_user['id'] if is_assistant else None
+        )
         
-        if tasks_result.data:
-            for t in tasks_result.data:
+        if tasks:
+            for t in tasks:
                 try:
                     # Parse execution_date if exists
                     due_date = None
-                    if t.get('execution_date'):
-                        due_date = datetime.fromisoformat(t['execution_date'])
+                    if t.get('due_at'):
+                        due_date = datetime.fromisoformat(t['due_at'])
                         timestamp = due_date.isoformat()
                     else:
                         # Use current time if no execution date
@@ -185,60 +190,23 @@ async def get_active_announcements(
     """
     try:
         supabase = get_supabase_client()
-        today = datetime.now().isoformat()
+        now = datetime.now(timezone.utc).isoformat()
         
         user_role = current_user.get('role', 'lawyer')
         
-        # Build query
-        query = supabase.table('system_announcements')\
+        # Audience + date window are filtered in SQL
+        # (idx_system_announcements_active_window)
+        result = supabase.table('system_announcements')\
             .select('*')\
             .eq('is_active', True)\
+            .in_('target_audience', ['all', user_role])\
+            .or_(f'start_date.is.null,start_date.lte."{now}"')\
+            .or_(f'end_date.is.null,end_date.gte."{now}"')\
             .order('priority', desc=True)\
-            .order('created_at', desc=True)
-            
-        # Filter by date (start_date <= now OR null)
-        # Note: Supabase JS client handles complex ORs easier, but for simple REST:
-        # We'll fetch active ones and filter in python for now to handle complex date logic easily
-        # or use simple filters if possible.
-        # Let's try to filter by audience first
-        
-        # Audience filter: 'all' OR user's role
-        # query = query.in_('target_audience', ['all', user_role]) # Supabase doesn't support IN with OR logic easily in one go without raw sql or RPC
-        
-        result = query.execute()
-        
-        logger.info(f"🔍 Checking announcements for user role: {user_role}. Found {len(result.data)} candidates.")
-        
-        valid_announcements = []
-        if result.data:
-            for ann in result.data:
-                # 1. Audience Check
-                if ann['target_audience'] != 'all' and ann['target_audience'] != user_role:
-                    logger.info(f"Skipping announcement '{ann['title']}': audience '{ann['target_audience']}' != '{user_role}'")
-                    continue
-                
-                # 2. Date Check
-                start_date = datetime.fromisoformat(ann['start_date']) if ann.get('start_date') else None
-                end_date = datetime.fromisoformat(ann['end_date']) if ann.get('end_date') else None
-                
-                # Determine 'now' compatible with the dates
-                # If parsed date is aware, use aware 'now'. If naive, use naive 'now'.
-                # We use start_date or end_date to determine preference, defaulting to naive local if no dates (though dates are null then so it doesn't matter)
-                check_tz = start_date.tzinfo if start_date else (end_date.tzinfo if end_date else None)
-                
-                if check_tz:
-                    now = datetime.now(check_tz)
-                else:
-                    now = datetime.now()
-                
-                if start_date and start_date > now:
-                    logger.info(f"Skipping announcement '{ann['title']}': not started yet (Start: {start_date})")
-                    continue
-                if end_date and end_date < now:
-                    logger.info(f"Skipping announcement '{ann['title']}': expired (End: {end_date})")
-                    continue
-                    
-                valid_announcements.append(ann)
+            .order('created_at', desc=True)\
+            .execute()
+        
+        valid_announcements = result.data or []
         
         logger.info(f"✅ Returning {len(valid_announcements)} valid announcements.")
         return valid_announcements
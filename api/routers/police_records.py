@@ -11,11 +11,16 @@ import logging
 
 from api.auth_middleware import get_current_user
 from api.database import get_supabase_client
+from api.services.audit_log import log_audit
+from agents.storage.entity_search import EntitySearch
 
 logger = logging.getLogger(__name__)
 
 router = APIRouter(prefix="/api/police-records", tags=["police-records"])
 
+# Max ranked hits returned for a search query
+SEARCH_LIMIT = 50
+
 
 # --- Models ---
 
@@ -51,39 +56,6 @@ def get_effective_lawyer_id(user: Dict[str, Any]) -> str:
     return user['id']
 
 
-def log_audit(supabase, action: str, table: str, record_id: str,
-              user: Dict[str, Any], lawyer_id: str,
-              old_values: Any = None, new_values: Any = None,
-              description: str = None):
-    """Log action to audit_logs table"""
-    try:
-        changes = None
-        if old_values and new_values and action == 'update':
-            changes = {}
-            for key in new_values:
-                if key in old_values and old_values[key] != new_values[key]:
-                    changes[key] = {'old': old_values[key], 'new': new_values[key]}
-
-        audit_data = {
-            'action': action,
-            'table_name': table,
-            'record_id': record_id,
-            'user_id': user['id'],
-            'user_name': user.get('full_name'),
-            'user_role': user.get('role', 'lawyer'),
-            'old_values': old_values,
-            'new_values': new_values,
-            'changes': changes,
-            'description': description,
-            'lawyer_id': lawyer_id,
-            'created_at': datetime.now().isoformat()
-        }
-
-        supabase.table('audit_logs').insert(audit_data).execute()
-    except Exception as e:
-        logger.warning(f"Failed to log audit: {e}")
-
-
 # --- Endpoints ---
 
 @router.get("")
@@ -98,6 +70,12 @@ async def get_police_records(
         supabase = get_supabase_client()
         lawyer_id = get_effective_lawyer_id(current_user)
 
+        # Search: ranked, Arabic-normalized fuzzy match served by the trigram index
+        if search and search.strip():
+            return EntitySearch(supabase).search(
+                lawyer_id, search, entities=["police_records"], limit=SEARCH_LIMIT
+            )["police_records"]
+
         # Build query with case relation
         query = supabase.table('police_records')\
             .select('*, case:cases(case_number)')\
@@ -105,18 +83,7 @@ async def get_police_records(
             .order('created_at', desc=True)
 
         result = query.execute()
-        records = result.data or []
-
-        # Apply search filter if provided (done client-side for flexibility)
-        if search:
-            search_lower = search.lower()
-            records = [r for r in records if
-                       search_lower in (r.get('record_number', '') or '').lower() or
-                       search_lower in (r.get('police_station', '') or '').lower() or
-                       search_lower in (r.get('complainant_name', '') or '').lower() or
-                       search_lower in (r.get('accused_name', '') or '').lower()]
-
-        return records
+        return result.data or []
 
     except Exception as e:
         logger.error(f"❌ Failed to fetch police records: {e}")
@@ -157,7 +124,7 @@ async def create_police_record(
 
         # Log audit
         log_audit(
-            supabase, 'create', 'police_records', new_record['id'],
+            'create', 'police_records', new_record['id'],
             current_user, lawyer_id,
             new_values=record_data,
             description='إضافة محضر شرطة'
@@ -212,7 +179,7 @@ async def update_police_record(
 
         # Log audit
         log_audit(
-            supabase, 'update', 'police_records', record_id,
+            'update', 'police_records', record_id,
             current_user, lawyer_id,
             old_values=old_record,
             new_values=updated_record,
@@ -255,7 +222,7 @@ async def delete_police_record(
 
         # Log audit
         log_audit(
-            supabase, 'delete', 'police_records', record_id,
+            'delete', 'police_records', record_id,
             current_user, lawyer_id,
             old_values=old_record,
             description='حذف محضر شرطة'
@@ -6,7 +6,6 @@ Implements Redis caching with automatic invalidation
 from fastapi import APIRouter, Depends, HTTPException, File, UploadFile
 from pydantic import BaseModel
 from typing import Dict, Any, Optional
-from datetime import datetime
 import logging
 import os
 import shutil
@@ -15,7 +14,8 @@ import uuid
 from api.auth_middleware import get_current_user
 from api.database import get_supabase_client
 from api.cache import get_cache, CacheKeys, CacheTTL
-from api.cache.invalidation import invalidate_user_caches
+from api.cache.invalidation import invalidate_after_profile_update
+from api.services.audit_log import log_audit
 
 logger = logging.getLogger(__name__)
 
@@ -105,47 +105,6 @@ class ProfileUpdate(BaseModel):
     notification_preferences: Optional[dict] = None
 
 
-# --- Helper Functions ---
-
-def log_audit(supabase, action: str, table: str, record_id: str,
-              user: Dict[str, Any],
-              old_values: Any = None, new_values: Any = None,
-              description: str = None):
-    """Log action to audit_logs table"""
-    try:
-        changes = None
-        if old_values and new_values and action == 'update':
-            changes = {}
-            for key in new_values:
-                if key in old_values and old_values[key] != new_values[key]:
-                    changes[key] = {'old': old_values[key], 'new': new_values[key]}
-
-        # Get lawyer_id
-        if user.get('role') == 'assistant':
-            lawyer_id = user.get('office_id', user['id'])
-        else:
-            lawyer_id = user['id']
-
-        audit_data = {
-            'action': action,
-            'table_name': table,
-            'record_id': record_id,
-            'user_id': user['id'],
-            'user_name': user.get('full_name'),
-            'user_role': user.get('role', 'lawyer'),
-            'old_values': old_values,
-            'new_values': new_values,
-            'changes': changes,
-            'description': description,
-            'lawyer_id': lawyer_id,
-            'created_at': datetime.now().isoformat()
-        }
-
-        supabase.table('audit_logs').insert(audit_data).execute()
-    except Exception as e:
-        logger.warning(f"Failed to log audit: {e}")
-
-
 # --- Endpoints ---
 
 
@@ -165,9 +124,10 @@ async def get_account_stats(
     lawyer_id = current_user['id']
     cache = get_cache()
     cache_key = CacheKeys.user_stats(lawyer_id)
+    cache_tags = [CacheKeys.lawyer_tag(lawyer_id), CacheKeys.lawyer_dashboard_tag(lawyer_id)]
     
     # محاولة القراءة من Cache
-    cached_stats = cache.get(cache_key)
+    cached_stats, tag_versions = await cache.get_versioned(cache_key, tags=cache_tags)
     if cached_stats:
         logger.info(f"✅ Account stats loaded from cache for {lawyer_id}")
         return cached_stats
@@ -214,7 +174,7 @@ async def get_account_stats(
         }
         
         # حفظ في Cache لمدة 5 دقائق
-        cache.set(cache_key, stats, ttl=CacheTTL.ACCOUNT_STATS)
+        await cache.set(cache_key, stats, ttl=CacheTTL.ACCOUNT_STATS, tags=cache_tags, versions=tag_versions)
         logger.info(f"💾 Cached account stats for {lawyer_id}")
         
         return stats
@@ -274,7 +234,7 @@ async def update_profile(
         
         # Log audit
         log_audit(
-            supabase, 'update', 'users', user_id,
+            'update', 'users', user_id,
             current_user,
             old_values=old_user,
             new_values=updated_user,
@@ -282,7 +242,7 @@ async def update_profile(
         )
         
         # ✅ إبطال Cache بعد التحديث
-        invalidate_user_caches(user_id)
+        await invalidate_after_profile_update(user_id)
         
         logger.info(f"✅ Profile updated: {user_id}")
         
@@ -309,7 +269,7 @@ async def get_public_settings() -> dict:
     # Cache key for public settings
     cache_key = "platform:settings:public"
     
-    cached_settings = cache.get(cache_key)
+    cached_settings = await cache.get(cache_key)
     if cached_settings:
         return cached_settings
 
@@ -341,7 +301,7 @@ async def get_public_settings() -> dict:
         }
         
         # Cache for 1 hour (3600 seconds)
-        cache.set(cache_key, public_settings, ttl=3600)
+        await cache.set(cache_key, public_settings, ttl=3600)
         
         return public_settings
         
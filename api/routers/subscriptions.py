@@ -5,6 +5,7 @@ from datetime import datetime, date
 
 from api.auth import get_current_user_id
 from api.database import get_supabase_client
+from api.cache.invalidation import invalidate_subscription_caches
 
 # Setup logging
 logger = logging.getLogger(__name__)
@@ -70,6 +71,7 @@ async def get_my_subscription(user_id: str = Depends(get_current_user_id)):
                 }
                 
                 create_res = supabase.table("lawyer_subscriptions").insert(new_sub).execute()
+                await invalidate_subscription_caches(user_id)
                 
                 # Fetch again with relations
                 if create_res.data:
@@ -349,6 +351,8 @@ async def request_renewal(
         if hasattr(result, 'error') and result.error:
             logger.error(f"Supabase error updating subscription: {result.error}")
             raise Exception(str(result.error))
+        
+        await invalidate_subscription_caches(user_id)
             
         return {"message": "تم إرسال طلب التجديد بنجاح. سيقوم المسؤول بمراجعة طلبك وتفعيل الباقة."}
         
@@ -14,6 +14,7 @@ from api.guards import verify_subscription_active
 from api.database import get_supabase_client
 from api.cache import get_cache, CacheKeys, CacheTTL
 from api.cache.invalidation import invalidate_after_task_change
+from api.services.audit_log import log_audit
 
 logger = logging.getLogger(__name__)
 
@@ -59,40 +60,6 @@ def get_effective_lawyer_id(user: Dict[str, Any]) -> str:
     return user['id']
 
 
-def log_audit(supabase, action: str, table: str, record_id: str, 
-              user: Dict[str, Any], lawyer_id: str,
-              old_values: Any = None, new_values: Any = None, 
-              description: str = None):
-    """Log action to audit_logs table"""
-    try:
-        # Calculate changes for updates
-        changes = None
-        if old_values and new_values and action == 'update':
-            changes = {}
-            for key in new_values:
-                if key in old_values and old_values[key] != new_values[key]:
-                    changes[key] = {'old': old_values[key], 'new': new_values[key]}
-        
-        audit_data = {
-            'action': action,
-            'table_name': table,
-            'record_id': record_id,
-            'user_id': user['id'],
-            'user_name': user.get('full_name'),
-            'user_role': user.get('role', 'lawyer'),
-            'old_values': old_values,
-            'new_values': new_values,
-            'changes': changes,
-            'description': description,
-            'lawyer_id': lawyer_id,
-            'created_at': datetime.now().isoformat()
-        }
-        
-        supabase.table('audit_logs').insert(audit_data).execute()
-    except Exception as e:
-        logger.warning(f"Failed to log audit: {e}")
-
-
 # --- Endpoints ---
 
 @router.get("")
@@ -199,14 +166,14 @@ async def create_task(
         
         # Log audit
         log_audit(
-            supabase, 'create', 'tasks', new_task['id'],
+            'create', 'tasks', new_task['id'],
             current_user, lawyer_id,
             new_values=task_data,
             description='إنشاء مهمة جديدة'
         )
         
         # ✅ إبطال Caches المتأثرة
-        invalidate_after_task_change(lawyer_id)
+        await invalidate_after_task_change(lawyer_id)
         
         logger.info(f"✅ Task created: {new_task['id']}") 
         return new_task
@@ -262,7 +229,7 @@ async def update_task(
         
         # Log audit
         log_audit(
-            supabase, 'update', 'tasks', task_id,
+            'update', 'tasks', task_id,
             current_user, lawyer_id,
             old_values=old_task,
             new_values=updated_task,
@@ -270,7 +237,7 @@ async def update_task(
         )
         
         # ✅ إبطال Caches
-        invalidate_after_task_change(lawyer_id)
+        await invalidate_after_task_change(lawyer_id)
         
         return updated_task
         
@@ -334,7 +301,7 @@ async def update_task_status(
         
         # Log audit
         log_audit(
-            supabase, 'update', 'tasks', task_id,
+            'update', 'tasks', task_id,
             current_user, lawyer_id,
             old_values=old_task,
             new_values=updated_task,
@@ -342,7 +309,7 @@ async def update_task_status(
         )
         
         # ✅ إبطال Caches
-        invalidate_after_task_change(lawyer_id)
+        await invalidate_after_task_change(lawyer_id)
         
         return updated_task
         
@@ -385,14 +352,14 @@ async def delete_task(
         
         # Log audit
         log_audit(
-            supabase, 'delete', 'tasks', task_id,
+            'delete', 'tasks', task_id,
             current_user, lawyer_id,
             old_values=old_task,
             description='حذف مهمة'
         )
         
         # ✅ إبطال Caches
-        invalidate_after_task_change(lawyer_id)
+        await invalidate_after_task_change(lawyer_id)
         
         logger.info(f"✅ Task deleted: {task_id}")
         return {"success": True}
@@ -2,12 +2,16 @@ from fastapi import APIRouter, UploadFile, File, Depends, HTTPException
 import httpx
 import os
 import logging
+import tempfile
 from api.auth_middleware import get_current_user
 
 logger = logging.getLogger(__name__)
 
 router = APIRouter(prefix="/api", tags=["transcription"])
 
+STREAM_CHUNK_SIZE = 256 * 1024
+SPOOL_MAX_MEMORY = 1024 * 1024
+
 @router.post("/transcribe")
 async def transcribe_audio(
     file: UploadFile = File(...),
@@ -16,6 +20,8 @@ async def transcribe_audio(
     """
     Secure proxy for speech-to-text transcription
     """
+    # Small recordings stay in memory, larger ones spill to a temp file
+    audio_buffer = tempfile.SpooledTemporaryFile(max_size=SPOOL_MAX_MEMORY)
     try:
         stt_url = os.getenv("STT_API_URL")
         stt_key = os.getenv("STT_API_KEY")
@@ -27,19 +33,27 @@ async def transcribe_audio(
             )
         
         MAX_AUDIO_SIZE = 10 * 1024 * 1024
-        audio_content = await file.read()
         
-        if len(audio_content) > MAX_AUDIO_SIZE:
-            raise HTTPException(
-                status_code=413,
-                detail=f"حجم الملف يتجاوز الحد الأقصى ({MAX_AUDIO_SIZE // 1024 // 1024} ميجابايت)"
-            )
+        # Stream in chunks: the size limit is enforced before the whole body is buffered
+        audio_size = 0
+        while True:
+            chunk = await file.read(STREAM_CHUNK_SIZE)
+            if not chunk:
+                break
+            audio_size += len(chunk)
+            if audio_size > MAX_AUDIO_SIZE:
+                raise HTTPException(
+                    status_code=413,
+                    detail=f"حجم الملف يتجاوز الحد الأقصى ({MAX_AUDIO_SIZE // 1024 // 1024} ميجابايت)"
+                )
+            audio_buffer.write(chunk)
         
-        if len(audio_content) < 100:
+        if audio_size < 100:
             raise HTTPException(
                 status_code=400,
                 detail="الملف الصوتي فارغ أو تالف"
             )
+        audio_buffer.seek(0)
         
         logger.info(f"🎤 STT Request - URL: {stt_url}")
         
@@ -47,7 +61,7 @@ async def transcribe_audio(
             response = await client.post(
                 stt_url,
                 headers={"Authorization": f"Bearer {stt_key}", "X-Custom-Auth-Key": stt_key},
-                files={"file": (file.filename, audio_content, file.content_type)},
+                files={"file": (file.filename, audio_buffer, file.content_type)},
                 data={"model": "whisper-1", "language": "ar"}
             )
             
@@ -72,9 +86,13 @@ async def transcribe_audio(
             
             return {"text": cleaned_text}
             
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"❌ Transcription failed: {e}")
         raise HTTPException(
             status_code=500, 
             detail="حدث خطأ غير متوقع. يرجى المحاولة مرة أخرى."
         )
+    finally:
+        audio_buffer.close()
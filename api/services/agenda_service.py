@@ -0,0 +1,90 @@
+import hashlib
+import logging
+from typing import Dict, Any, List, Optional
+
+from fastapi import Request, Response
+
+from api.database import get_supabase_client
+
+logger = logging.getLogger(__name__)
+
+AGENDA_COLUMNS = (
+    "id, item_type, event_date, event_time, due_at, title, status, priority, "
+    "assigned_to, assign_to_all, case_id, case_subject, case_number, court_name, client_name"
+)
+
+
+class AgendaService:
+    """
+    Read side of the per-lawyer agenda (migrations/20260211_lawyer_agenda.sql).
+    Hearings and tasks arrive with case fields already denormalized by triggers,
+    and lawyer_agenda_versions gives a cheap change marker for ETags.
+    """
+
+    def _get_db(self):
+        return get_supabase_client()
+
+    def get_version(self, lawyer_id: str) -> int:
+        """Current agenda version (0 if the lawyer has never had an agenda row)."""
+        result = self._get_db().table("lawyer_agenda_versions") \
+            .select("version") \
+            .eq("lawyer_id", lawyer_id) \
+            .limit(1) \
+            .execute()
+        return result.data[0]["version"] if result.data else 0
+
+    def make_etag(self, lawyer_id: str, version: int, *scope: Any) -> str:
+        """Weak ETag for a feed: agenda version + anything else the response depends on."""
+        raw = "|".join(str(part) for part in (lawyer_id, version, *scope))
+        return f'W/"{hashlib.sha1(raw.encode("utf-8")).hexdigest()}"'
+
+    def not_modified(self, request: Request, response: Response, etag: str) -> Optional[Response]:
+        """
+        Set the ETag on the response; return a 304 if the client already has it.
+        """
+        response.headers["ETag"] = etag
+        response.headers["Cache-Control"] = "private, no-cache"
+        client_etags = request.headers.get("if-none-match", "")
+        if etag in [tag.strip() for tag in client_etags.split(",")]:
+            return Response(status_code=304, headers={"ETag": etag, "Cache-Control": "private, no-cache"})
+        return None
+
+    def fetch_range(
+        self,
+        lawyer_id: str,
+        start_date: str,
+        end_date: str,
+        item_type: Optional[str] = None,
+        limit: Optional[int] = None
+    ) -> List[Dict[str, Any]]:
+        """Agenda rows in [start_date, end_date] (idx_lawyer_agenda_lawyer_date)."""
+        query = self._get_db().table("lawyer_agenda") \
+            .select(AGENDA_COLUMNS) \
+            .eq("lawyer_id", lawyer_id) \
+            .gte("event_date", start_date[:10]) \
+            .lte("event_date", end_date[:10])
+        if item_type:
+            query = query.eq("item_type", item_type)
+        query = query.order("event_date", desc=False)
+        if limit:
+            query = query.limit(limit)
+        return query.execute().data or []
+
+    def fetch_open_tasks(
+        self,
+        lawyer_id: str,
+        limit: int,
+        assignee_id: Optional[str] = None
+    ) -> List[Dict[str, Any]]:
+        """Pending / in-progress tasks, soonest first (idx_lawyer_agenda_open_tasks)."""
+        query = self._get_db().table("lawyer_agenda") \
+            .select(AGENDA_COLUMNS) \
+            .eq("lawyer_id", lawyer_id) \
+            .eq("item_type", "task") \
+            .in_("status", ["pending", "in_progress"])
+        if assignee_id:
+            query = query.or_(f"assigned_to.eq.{assignee_id},assign_to_all.eq.true")
+        return query.order("due_at", desc=False).limit(limit).execute().data or []
+
+
+agenda_service = AgendaService()
@@ -0,0 +1,299 @@
+"""
+Audit Log Pipeline
+سجل التدقيق: إضافة فورية للطابور + كتابة مجمّعة في الخلفية
+
+- log_audit() builds the event and enqueues it in O(1). No database call happens
+  on the request path.
+- A background writer sends multi-row inserts when a batch fills
+  (AUDIT_BATCH_SIZE) or when AUDIT_FLUSH_SECONDS pass, whichever is first.
+- When the insert fails (DB unavailable), the batch is appended to a local
+  append-only spool file (AUDIT_SPOOL_PATH). The spool is replayed on the next
+  start and after the DB recovers.
+- Each event carries its own id and rows are upserted with ignore_duplicates, so
+  replaying a spool that was partly written already does not create duplicates.
+- The spool is shared by all uvicorn workers: appends hold an flock on
+  <spool>.lock, and one process at a time replays (<spool>.replay.lock).
+"""
+
+import asyncio
+import fcntl
+import json
+import logging
+import os
+import time
+import uuid
+from collections import deque
+from contextlib import contextmanager
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+
+from api.database import get_supabase_client
+
+logger = logging.getLogger(__name__)
+
+AUDIT_TABLE = "audit_logs"
+BATCH_SIZE = int(os.getenv("AUDIT_BATCH_SIZE", 100))
+FLUSH_SECONDS = float(os.getenv("AUDIT_FLUSH_SECONDS", 1.0))
+SPOOL_PATH = os.getenv("AUDIT_SPOOL_PATH", "data/audit_spool.jsonl")
+# Wait before trying the DB again after a failed insert
+RETRY_SECONDS = float(os.getenv("AUDIT_RETRY_SECONDS", 30))
+
+
+def compute_changes(old_values: Any, new_values: Any) -> Optional[Dict[str, Any]]:
+    """Fields present in both snapshots whose value changed: {field: {old, new}}"""
+    if not old_values or not new_values:
+        return None
+    return {
+        key: {"old": old_values[key], "new": new_values[key]}
+        for key in new_values
+        if key in old_values and old_values[key] != new_values[key]
+    }
+
+
+def build_audit_event(action: str, table: str, record_id: str,
+                      user: Dict[str, Any], lawyer_id: Optional[str] = None,
+                      old_values: Any = None, new_values: Any = None,
+                      description: str = None) -> Dict[str, Any]:
+    """One audit_logs row (lawyer_id defaults to the user's office for assistants)"""
+    if lawyer_id is None:
+        lawyer_id = user.get("office_id", user["id"]) if user.get("role") == "assistant" else user["id"]
+    return {
+        "id": str(uuid.uuid4()),
+        "action": action,
+        "table_name": table,
+        "record_id": record_id,
+        "user_id": user["id"],
+        "user_name": user.get("full_name"),
+        "user_role": user.get("role", "lawyer"),
+        "old_values": old_values,
+        "new_values": new_values,
+        "changes": compute_changes(old_values, new_values) if action == "update" else None,
+        "description": description,
+        "lawyer_id": lawyer_id,
+        "created_at": datetime.now().isoformat()
+    }
+
+
+class AuditWriter:
+    """Batches queued audit events into multi-row inserts, spilling to disk on failure"""
+
+    def __init__(self, db: Any = None, batch_size: int = BATCH_SIZE,
+                 flush_interval: float = FLUSH_SECONDS, spool_path: str = SPOOL_PATH,
+                 retry_interval: float = RETRY_SECONDS):
+        self._db = db
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.spool_path = spool_path
+        self.retry_interval = retry_interval
+
+        self._queue: deque = deque()
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._wake: Optional[asyncio.Event] = None
+        self._task: Optional[asyncio.Task] = None
+        self._db_down_until = 0.0
+        self.stats = {"enqueued": 0, "written": 0, "batches": 0, "spooled": 0, "replayed": 0}
+
+    @property
+    def db(self):
+        if self._db is None:
+            self._db = get_supabase_client()
+        return self._db
+
+    @property
+    def running(self) -> bool:
+        return self._task is not None and not self._task.done()
+
+    # ---------- enqueue (request path) ----------
+
+    def enqueue(self, event: Dict[str, Any]):
+        """O(1); safe from sync endpoints running in the threadpool"""
+        self.stats["enqueued"] += 1
+        if not self.running:
+            # No writer (scripts, or after shutdown): keep the event durable for the next start
+            self._spool([event])
+            return
+        self._queue.append(event)
+        if len(self._queue) >= self.batch_size:
+            self._loop.call_soon_threadsafe(self._wake.set)
+
+    # ---------- persistence ----------
+
+    def _insert(self, rows: List[Dict[str, Any]]):
+        self.db.table(AUDIT_TABLE).upsert(rows, on_conflict="id", ignore_duplicates=True).execute()
+
+    @contextmanager
+    def _file_lock(self, suffix: str, blocking: bool = True):
+        """flock on <spool><suffix>: excludes other threads and other worker processes"""
+        os.makedirs(os.path.dirname(self.spool_path) or ".", exist_ok=True)
+        with open(self.spool_path + suffix, "w") as handle:
+            try:
+                fcntl.flock(handle, fcntl.LOCK_EX | (0 if blocking else fcntl.LOCK_NB))
+            except BlockingIOError:
+                yield False
+                return
+            try:
+                yield True
+            finally:
+                fcntl.flock(handle, fcntl.LOCK_UN)
+
+    def _spool(self, rows: List[Dict[str, Any]]):
+        with self._file_lock(".lock"):
+            with open(self.spool_path, "a", encoding="utf-8") as f:
+                for row in rows:
+                    f.write(json.dumps(row, ensure_ascii=False, default=str) + "\n")
+                f.flush()
+                os.fsync(f.fileno())
+        self.stats["spooled"] += len(rows)
+
+    async def _write(self, rows: List[Dict[str, Any]]) -> bool:
+        """Insert one batch; on failure spill it to the spool and back off"""
+        if time.monotonic() >= self._db_down_until:
+            try:
+                await asyncio.to_thread(self._insert, rows)
+                self.stats["written"] += len(rows)
+                self.stats["batches"] += 1
+                return True
+            except Exception as e:
+                logger.warning(f"⚠️ Audit insert failed ({len(rows)} events spooled): {e}")
+                self._db_down_until = time.monotonic() + self.retry_interval
+        await asyncio.to_thread(self._spool, rows)
+        return False
+
+    async def flush(self) -> int:
+        """Write everything queued so far; returns the number of events taken"""
+        taken = 0
+        while self._queue:
+            batch = []
+            while self._queue and len(batch) < self.batch_size:
+                batch.append(self._queue.popleft())
+            taken += len(batch)
+            await self._write(batch)
+        return taken
+
+    async def replay_spool(self) -> int:
+        """
+        Insert spooled events; whatever still fails goes back to the spool.
+        Skipped (returns 0) while another process is replaying.
+        """
+        with self._file_lock(".replay.lock", blocking=False) as acquired:
+            if not acquired:
+                return 0
+            return await self._replay_claimed()
+
+    async def _replay_claimed(self) -> int:
+        replaying = self.spool_path + ".replaying"
+
+        def _claim() -> List[Dict[str, Any]]:
+            with self._file_lock(".lock"):
+                # A leftover .replaying file means the previous replay was interrupted
+                if not os.path.exists(replaying):
+                    if not os.path.exists(self.spool_path):
+                        return []
+                    os.replace(self.spool_path, replaying)
+            rows = []
+            with open(replaying, encoding="utf-8") as f:
+                for line in f:
+                    line = line.strip()
+                    if not line:
+                        continue
+                    try:
+                        rows.append(json.loads(line))
+                    except ValueError:
+                        # Torn last line from a crash mid-write
+                        logger.warning("⚠️ Skipping unreadable audit spool line")
+            return rows
+
+        rows = await asyncio.to_thread(_claim)
+        if not rows:
+            if os.path.exists(replaying):
+                os.remove(replaying)
+            return 0
+
+        replayed = 0
+        for start in range(0, len(rows), self.batch_size):
+            batch = rows[start:start + self.batch_size]
+            try:
+                await asyncio.to_thread(self._insert, batch)
+                replayed += len(batch)
+            except Exception as e:
+                logger.warning(f"⚠️ Audit spool replay stopped: {e}")
+                self._db_down_until = time.monotonic() + self.retry_interval
+                await asyncio.to_thread(self._spool, rows[start:])
+                break
+        os.remove(replaying)
+
+        self.stats["replayed"] += replayed
+        if replayed:
+            logger.info(f"📼 Replayed {replayed} spooled audit events")
+        return replayed
+
+    # ---------- background loop ----------
+
+    async def _run(self):
+        while True:
+            try:
+                await asyncio.wait_for(self._wake.wait(), timeout=self.flush_interval)
+            except asyncio.TimeoutError:
+                pass
+            self._wake.clear()
+            try:
+                await self.flush()
+                if os.path.exists(self.spool_path) and time.monotonic() >= self._db_down_until:
+                    await self.replay_spool()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"❌ Audit writer error: {e}")
+
+    async def start(self):
+        """تشغيل الكاتب الخلفي (تُستدعى من startup) بعد إعادة إرسال ما بقي في الملف المحلي"""
+        if self.running:
+            return
+        self._loop = asyncio.get_running_loop()
+        self._wake = asyncio.Event()
+        try:
+            await self.replay_spool()
+        except Exception as e:
+            logger.error(f"❌ Audit spool replay failed: {e}")
+        self._task = asyncio.create_task(self._run())
+        logger.info(f"📝 Audit writer started (batch {self.batch_size}, every {self.flush_interval}s)")
+
+    async def stop(self):
+        """Stop the loop and write (or spool) everything still queued"""
+        if self._task and not self._task.done():
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+        self._task = None
+        await self.flush()
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {**self.stats, "queued": len(self._queue)}
+
+
+# ===== Singleton Instance =====
+_audit_writer: Optional[AuditWriter] = None
+
+
+def get_audit_writer() -> AuditWriter:
+    """الحصول على كاتب سجل التدقيق (Singleton)"""
+    global _audit_writer
+    if _audit_writer is None:
+        _audit_writer = AuditWriter()
+    return _audit_writer
+
+
+def log_audit(action: str, table: str, record_id: str,
+              user: Dict[str, Any], lawyer_id: Optional[str] = None,
+              old_values: Any = None, new_values: Any = None,
+              description: str = None):
+    """Queue an audit event (never raises, never touches the DB on the request path)"""
+    try:
+        get_audit_writer().enqueue(build_audit_event(
+            action, table, record_id, user, lawyer_id,
+            old_values=old_values, new_values=new_values, description=description
+        ))
+    except Exception as e:
+        logger.warning(f"Failed to log audit: {e}")
@@ -1,20 +1,39 @@
 import logging
+import os
 import re
 import uuid
 import json
 import asyncio
-from typing import Dict, Any, Optional, List
+from typing import Dict, Any, Optional, List, Tuple
 from datetime import datetime
 from langchain_core.messages import HumanMessage, AIMessage, ToolMessage, BaseMessage
 from fastapi import HTTPException
 
 from agents.core.graph_agent import create_graph_agent
+from agents.core.conversation_state_manager import ConversationStateManager, ConversationContext
 import requests
 from api.schemas import ChatResponse, ChatSession, ChatMessage, ChatSessionCreate
 from api.database import get_supabase_client
+from api.utils.pagination import encode_cursor, decode_cursor, cursor_timestamp, cursor_uuid
+from api.cache.session_context_cache import get_session_context_cache
+from api.cache.subscription_cache import get_subscription_cache
+from api.services.message_persistence import (
+    get_message_persistence, new_message_id, reply_id, turn_state, TurnLog, ContextConflict
+)
 
 logger = logging.getLogger(__name__)
 
+# Messages loaded per turn; older turns live in ai_chat_sessions.conversation_context
+CHAT_HISTORY_WINDOW = int(os.getenv("CHAT_HISTORY_WINDOW", 10))
+# Re-folds of one message when concurrent turns of the session keep saving first
+CONTEXT_WRITE_ATTEMPTS = 3
+
+state_manager = ConversationStateManager()
+
+HISTORY_COLUMNS = "id, role, content, metadata, created_at"
+# Metadata needed to rebuild LangChain messages (council / HCF logs stay in the DB only)
+HISTORY_METADATA_KEYS = ("tool_calls", "tool_call_id", "entities")
+
 # --- Helper: JSON Datetime Encoder ---
 def datetime_encoder(obj):
     if isinstance(obj, datetime):
@@ -35,35 +54,257 @@ class ChatService:
         role = row.get("role")
         content = row.get("content") or ""
         metadata = row.get("metadata") or {}
+        # Entities extracted when the message was saved (read by ConversationStateManager)
+        extra = {"entities": metadata["entities"]} if metadata.get("entities") else {}
 
         if role == "user":
-            return HumanMessage(content=content)
+            return HumanMessage(content=content, additional_kwargs=extra)
         elif role == "assistant":
             tool_calls = metadata.get("tool_calls", [])
-            return AIMessage(content=content, tool_calls=tool_calls)
+            return AIMessage(content=content, tool_calls=tool_calls, additional_kwargs=extra)
         elif role == "tool":
             tool_call_id = metadata.get("tool_call_id") or "unknown_call_id"
             return ToolMessage(content=content, tool_call_id=tool_call_id)
         else:
             return HumanMessage(content=content)
 
+    def fetch_messages_page(
+        self,
+        session_id: str,
+        limit: int,
+        before: Optional[str] = None,
+        columns: str = "*"
+    ) -> Tuple[List[Dict[str, Any]], Optional[str]]:
+        """
+        Keyset page of a session's messages, newest page first.
+        Served by idx_ai_chat_messages_session_created, so cost does not grow with session length.
+
+        Returns:
+            (rows in chronological order, cursor for the previous page or None)
+
+        Raises:
+            ValidationError: malformed `before` cursor
+        """
+        db = self._get_db()
+        query = db.table("ai_chat_messages") \
+            .select(columns) \
+            .eq("session_id", session_id)
+
+        cursor = decode_cursor(before, 2)
+        if cursor:
+            # Validated before they are placed in the PostgREST filter string (400 otherwise)
+            created_at, row_id = cursor_timestamp(cursor[0]), cursor_uuid(cursor[1])
+            query = query.or_(
+                f'created_at.lt."{created_at}",and(created_at.eq."{created_at}",id.lt.{row_id})'
+            )
+
+        response = query \
+            .order("created_at", desc=True) \
+            .order("id", desc=True) \
+            .limit(limit + 1) \
+            .execute()
+
+        rows = response.data or []
+        next_cursor = None
+        if len(rows) > limit:
+            rows = rows[:limit]
+            next_cursor = encode_cursor(rows[-1]["created_at"], rows[-1]["id"])
+
+        rows.reverse()
+        return rows, next_cursor
+
     async def fetch_session_history(self, session_id: str, limit: int = 30) -> List[BaseMessage]:
-        """Hydrate LangChain History from SQL Table."""
+        """Hydrate LangChain History from SQL Table (latest `limit` messages)."""
         try:
-            db = self._get_db()
-            response = db.table("ai_chat_messages") \
-                .select("*") \
-                .eq("session_id", session_id) \
-                .order("created_at", desc=True) \
-                .limit(limit) \
-                .execute()
-            
-            rows = sorted(response.data, key=lambda x: x['created_at'])
+            rows, _ = self.fetch_messages_page(session_id, limit, columns=HISTORY_COLUMNS)
             return [self._map_db_row_to_langchain_message(row) for row in rows]
         except Exception as e:
             logger.error(f"❌ Failed to fetch session history: {e}")
             return []
     
+    @staticmethod
+    def _history_row(row: Dict[str, Any]) -> Dict[str, Any]:
+        """Message row as kept in the session snapshot (only what history mapping reads)."""
+        metadata = row.get("metadata") or {}
+        return {
+            "id": row.get("id"),
+            "role": row.get("role"),
+            "content": row.get("content"),
+            "created_at": row.get("created_at"),
+            "metadata": {k: metadata[k] for k in HISTORY_METADATA_KEYS if metadata.get(k)}
+        }
+
+    async def _save_message(
+        self,
+        snapshot: Dict[str, Any],
+        role: str,
+        content: str,
+        metadata: Optional[Dict[str, Any]] = None,
+        message_id: Optional[str] = None,
+        agent_state: Optional[Dict[str, Any]] = None,
+        wait: bool = True
+    ) -> Optional[Dict[str, Any]]:
+        """
+        Persist a message with its entities and fold it into the session context.
+
+        `snapshot` is the session snapshot of this turn (_load_session_snapshot). Its
+        conversation_context and message window are updated in memory at once, so the
+        graph sees the message even when the write is deferred. The DB write
+        (atomic_step_transaction, keyed by `message_id`) and the snapshot write then run
+        through MessagePersistenceService: awaited when `wait`, written behind otherwise.
+
+        Returns:
+            The stored row when `wait`, else None
+        """
+        session = snapshot["session"]
+        message_id = message_id or new_message_id()
+        entities = state_manager.message_entities(content)
+        metadata = {**(metadata or {}), "entities": entities}
+        cache = get_session_context_cache()
+
+        persistence = get_message_persistence()
+        if wait:
+            # Keep the session's messages in order (pending user message first; a lost
+            # user message is replayed here, and raises rather than storing the reply alone)
+            await persistence.flush(session["id"])
+
+        def fold(stored: Optional[Dict[str, Any]]) -> Dict[str, Any]:
+            return state_manager.fold_message(
+                ConversationContext.from_dict(stored),
+                content,
+                is_user=(role == "user"),
+                entities=entities
+            ).to_dict()
+
+        # A retried job replays the same id: it is already in the window and the context
+        if not any(m.get("id") == message_id for m in snapshot.get("recent_messages") or []):
+            stored = session.get("conversation_context")
+            if stored is None:
+                # Session from before the running context: seed it once from the loaded window
+                stored = state_manager.extract_context_from_history(snapshot.get("recent_messages") or []).to_dict()
+            session["conversation_context"] = fold(stored)
+            cache.append_message(
+                snapshot,
+                self._history_row({"id": message_id, "role": role, "content": content, "metadata": metadata}),
+                CHAT_HISTORY_WINDOW
+            )
+        context = session["conversation_context"]
+
+        async def persist() -> Dict[str, Any]:
+            nonlocal context
+            conflicted = False
+            for _ in range(CONTEXT_WRITE_ATTEMPTS):
+                try:
+                    result = await persistence.write(
+                        session["id"], role, content, metadata,
+                        context=context, agent_state=agent_state, message_id=message_id,
+                        context_version=session.get("context_version")
+                    )
+                    break
+                except ContextConflict as conflict:
+                    # Another turn of this session saved its context first: fold onto it
+                    context = fold(conflict.context)
+                    session["conversation_context"] = context
+                    session["context_version"] = conflict.version
+                    conflicted = True
+            else:
+                raise RuntimeError(f"Conversation context of session {session['id']} kept changing")
+            if result.get("context_version") is not None:
+                session["context_version"] = result["context_version"]
+            if conflicted and not await self._reload_window(snapshot, message_id):
+                # The other turn's messages are missing from this window: let the next turn rebuild it
+                await cache.invalidate(session["id"])
+                return result.get("message") or {}
+            await cache.set(snapshot)
+            return result.get("message") or {}
+
+        if not wait:
+            persistence.defer(session["id"], persist)
+            return None
+        return await persist()
+
+    async def _reload_window(self, snapshot: Dict[str, Any], message_id: str) -> bool:
+        """
+        Re-read the snapshot's message window after another turn of the session wrote
+        concurrently (its messages are not in this turn's window).
+
+        Messages of this turn queued after `message_id` are not stored yet: they are kept
+        at the end of the window.
+
+        Returns:
+            False when the window could not be reloaded
+        """
+        recent = snapshot.get("recent_messages") or []
+        ids = [m.get("id") for m in recent]
+        pending = recent[ids.index(message_id) + 1:] if message_id in ids else []
+        try:
+            rows, _ = await asyncio.to_thread(
+                self.fetch_messages_page, snapshot["session"]["id"], CHAT_HISTORY_WINDOW,
+                columns=HISTORY_COLUMNS
+            )
+        except Exception as e:
+            logger.warning(f"Could not reload message window of session {snapshot['session']['id']}: {e}")
+            return False
+        stored = [self._history_row(row) for row in rows]
+        stored_ids = {m["id"] for m in stored}
+        window = stored + [m for m in pending if m.get("id") not in stored_ids]
+        snapshot["recent_messages"] = window[-CHAT_HISTORY_WINDOW:]
+        return True
+
+    async def build_session_snapshot(
+        self,
+        session: Dict[str, Any],
+        user_context: Dict[str, Any],
+        recent_messages: Optional[List[Dict[str, Any]]] = None,
+        tag_versions: Optional[Dict[str, int]] = None
+    ) -> Dict[str, Any]:
+        """
+        Build and cache the session snapshot: owner, running context, enriched user
+        (country / role / subscription status) and the last CHAT_HISTORY_WINDOW messages.
+
+        Called at session creation and on a snapshot miss.
+        """
+        user_context = await self._enrich_full_user_context(dict(user_context))
+        try:
+            subscription = await get_subscription_cache().get(session["lawyer_id"])
+            user_context["subscription_status"] = subscription.get("status") if subscription else None
+        except Exception as e:
+            logger.warning(f"Feature degradation: Could not fetch subscription status: {e}")
+
+        if recent_messages is None:
+            rows, _ = self.fetch_messages_page(session["id"], CHAT_HISTORY_WINDOW, columns=HISTORY_COLUMNS)
+            recent_messages = [self._history_row(row) for row in rows]
+
+        snapshot = {
+            "session": {
+                "id": session["id"],
+                "lawyer_id": session["lawyer_id"],
+                "conversation_context": session.get("conversation_context"),
+                "context_version": session.get("conversation_context_version")
+            },
+            "user_context": user_context,
+            "recent_messages": recent_messages,
+            # Tag versions read before the DB lookups (None: read when the snapshot is stored)
+            "tag_versions": tag_versions
+        }
+        await get_session_context_cache().set(snapshot)
+        return snapshot
+
+    async def _load_session_snapshot(self, session_id: str, user_context: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Session snapshot for a turn: one Redis read on a hit.
+        Replaces the per-message ownership / users / countries / roles / history queries.
+        """
+        lawyer_id = user_context.get("id")
+        snapshot, tag_versions = await get_session_context_cache().get_versioned(session_id, lawyer_id)
+        if snapshot is not None:
+            if snapshot["session"].get("lawyer_id") != lawyer_id:
+                raise HTTPException(status_code=403, detail="Unauthorized access to this session")
+            return snapshot
+
+        session = await self._verify_ownership(session_id, lawyer_id)
+        return await self.build_session_snapshot(session, user_context, tag_versions=tag_versions)
+
     async def _verify_ownership(self, session_id: str, user_id: str) -> Dict[str, Any]:
         """Verify session ownership."""
         try:
@@ -167,12 +408,17 @@ class ChatService:
         
         try:
             # Enqueue
+            # The message id is the idempotency key of both messages of this turn:
+            # a retried job stores them once
+            message_id = new_message_id()
             job = await pool.enqueue_job(
                 "run_agent_task",
                 session_id=session_id,
                 message_text=message_text,
                 user_context=user_context,
                 generate_title=generate_title,
+                message_id=message_id,
+                _job_id=f"chat:{message_id}",
                 _queue_name=QUEUE_NAME
             )
             
@@ -194,10 +440,12 @@ class ChatService:
         session_id: str,
         message_text: str,
         user_context: Dict[str, Any],
-        generate_title: bool = False
+        generate_title: bool = False,
+        message_id: Optional[str] = None
     ) -> ChatResponse:
         """
         The ACTUAL logic (Executed by Worker).
+        `message_id` comes with the job, so an ARQ retry does not duplicate messages.
         """
         user_context = user_context or {}
         lawyer_id = user_context.get("id")
@@ -206,19 +454,13 @@ class ChatService:
         if not lawyer_id:
              raise Exception("User Identity Missing")
 
-        # 1. Security Check
-        await self._verify_ownership(session_id, lawyer_id)
-        db = self._get_db()
-        
-        # 🆕 Enrich user_context with country_id
-        user_context = await self._enrich_full_user_context(user_context)
+        # 1. Security Check + enriched user context (session snapshot)
+        snapshot = await self._load_session_snapshot(session_id, user_context)
+        user_context = {**user_context, **snapshot["user_context"]}
         
-        # 2. Save User Message
-        db.table("ai_chat_messages").insert({
-            "session_id": session_id,
-            "role": "user",
-            "content": message_text
-        }).execute()
+        # 2. Save User Message (write-behind)
+        message_id = message_id or new_message_id()
+        await self._save_message(snapshot, "user", message_text, message_id=message_id, wait=False)
 
         # 3. Initialize Graph
         graph = create_graph_agent(
@@ -229,8 +471,8 @@ class ChatService:
         )
         config = {"configurable": {"thread_id": session_id}}
         
-        # 4. Prepare State
-        history = await self.fetch_session_history(session_id, limit=20)
+        # 4. Prepare State (running context + last N messages)
+        history = [self._map_db_row_to_langchain_message(row) for row in snapshot["recent_messages"]]
         
         input_state = {
             "input": message_text,
@@ -238,7 +480,10 @@ class ChatService:
             "user_id": lawyer_id,
             "lawyer_id": lawyer_id,
             "session_id": session_id,
-            "context": {"user_context": user_context},
+            "context": {
+                "user_context": user_context,
+                "conversation_context": snapshot["session"]["conversation_context"]
+            },
             "conversation_stage": "GATHERING" 
         }
         
@@ -255,17 +500,15 @@ class ChatService:
         if isinstance(ai_response_text, dict):
              ai_response_text = ai_response_text.get("message") or str(ai_response_text)
              
-        # 7. Save AI Message
-        # (The graph MIGHT have saved it if using atomic memory? 
-        # No, memory_manager saves intermediate steps. The final output needs saving?)
-        # Let's save it to be sure.
-        
-        db.table("ai_chat_messages").insert({
-            "session_id": session_id,
-            "role": "assistant",
-            "content": ai_response_text,
-            "metadata": {"worker_processed": True}
-        }).execute()
+        # 7. Save AI Message (atomic: message + council / HCF logs + turn state)
+        turn_log = TurnLog()
+        turn_log.capture(final_state)
+        await self._save_message(
+            snapshot, "assistant", ai_response_text,
+            {"worker_processed": True, **turn_log.to_metadata()},
+            message_id=reply_id(message_id),
+            agent_state=turn_state(final_state)
+        )
         
         # 8. Return ChatResponse
         return ChatResponse(
@@ -297,22 +540,15 @@ class ChatService:
             yield f"data: {json.dumps({'type': 'error', 'content': 'User Identity Missing'})}\n\n"
             return
 
-        # 1. Security Check
-        await self._verify_ownership(session_id, lawyer_id)
-        db = self._get_db()
-        
-        # 🆕 Enrich user_context with country_id
-        user_context = await self._enrich_full_user_context(user_context)
+        # 1. Security Check + enriched user context (session snapshot)
+        snapshot = await self._load_session_snapshot(session_id, user_context)
+        user_context = {**user_context, **snapshot["user_context"]}
         
-        # 2. Save User Message
+        # 2. Save User Message (write-behind: the stream does not wait for the insert;
+        #    user_message_saved is sent once the write is confirmed, before the reply is saved)
+        message_id = new_message_id()
         try:
-            db.table("ai_chat_messages").insert({
-                "session_id": session_id,
-                "role": "user",
-                "content": message_text
-            }).execute()
-            # Notify frontend that user message is confirmed saved
-            yield f"data: {json.dumps({'type': 'user_message_saved', 'message': {'content': message_text, 'role': 'user'}})}\n\n"
+            await self._save_message(snapshot, "user", message_text, message_id=message_id, wait=False)
         except Exception as e:
             logger.error(f"⚠️ Failed to save user message: {e}")
 
@@ -330,12 +566,8 @@ class ChatService:
         
         config = {"configurable": {"thread_id": session_id}}
         
-        # 4. Prepare State
-        try:
-            history = await self.fetch_session_history(session_id, limit=10)
-        except Exception as e:
-            logger.warning(f"Failed to fetch history: {e}")
-            history = []
+        # 4. Prepare State (running context + last N messages)
+        history = [self._map_db_row_to_langchain_message(row) for row in snapshot["recent_messages"]]
 
         input_state = {
             "input": message_text,
@@ -343,14 +575,18 @@ class ChatService:
             "user_id": lawyer_id,
             "lawyer_id": lawyer_id,
             "session_id": session_id,
-            "context": {"user_context": user_context, "summary": context_summary},
+            "context": {
+                "user_context": user_context,
+                "summary": context_summary,
+                "conversation_context": snapshot["session"]["conversation_context"]
+            },
             "conversation_stage": "GATHERING" 
         }
         
             # 5. Execute Graph with Strict Event Routing
         ai_content = "" # Accumulator for final DB save
-        council_log = [] # Capture Council Monologues for DB
-        hcf_log = [] # Capture HCF Decisions for DB
+        turn_log = TurnLog() # Council monologues + HCF decisions, saved with the reply
+        agent_state = {} # Turn state saved with the reply
         
         try:
             async for event in graph.astream_events(input_state, config=config, version="v1"):
@@ -394,14 +630,15 @@ class ChatService:
                     output = event_data.get("output")
                     
                     if output and isinstance(output, dict):
+                        agent_state.update(turn_state(output))
                         
                         # 1. COUNCIL THOUGHTS (Reasoning)
                         if "council_opinions" in output:
                             opinions = output["council_opinions"]
                             if opinions and isinstance(opinions, dict):
+                                # CAPTURE FOR DB
+                                turn_log.add_council(opinions)
                                 for agent, text in opinions.items():
-                                    # CAPTURE FOR DB
-                                    council_log.append({"agent": agent, "content": text, "timestamp": datetime.now().isoformat()})
                                     yield f"data: {json.dumps({'type': 'reasoning_chunk', 'content': f'[{agent.upper()}]: {text}\n'})}\n\n"
 
                         # 2. JUDGE (The Voice)
@@ -435,13 +672,13 @@ class ChatService:
                                 ai_content = final_res
                                 yield f"data: {json.dumps({'type': 'token', 'content': final_res})}\n\n"
 
-                        # 4. DEEP RESEARCH (The Scout Speaking Directly)
-                        elif name == "deep_research":
+                        # 4. DEEP RESEARCH / ARTICLE FAST PATH (The Scout Speaking Directly)
+                        elif name in ("deep_research", "article_lookup"):
                             # Stream HCF Verification Data First
                             hcf_details = output.get("hcf_details")
                             if hcf_details and isinstance(hcf_details, dict):
                                 # CAPTURE FOR DB
-                                hcf_log.append(hcf_details)
+                                turn_log.add_hcf(hcf_details)
                                 yield f"data: {json.dumps({'type': 'hcf_decision', 'payload': hcf_details})}\n\n"
 
                             final_res = output.get("final_response")
@@ -471,22 +708,19 @@ class ChatService:
                 ai_content = "تمت العملية."
                 yield f"data: {json.dumps({'type': 'token', 'content': ai_content})}\n\n"
 
-            # Save to DB
+            # Save to DB (user message first: confirmed, or replayed once)
             try:
-                db.table("ai_chat_messages").insert({
-                    "session_id": session_id,
-                    "role": "assistant",
-                    "content": ai_content,
-                    "metadata": {
-                        "streamed": True, 
-                        "protocol": "viva_v1",
-                        "council_log": council_log,
-                        "hcf_log": hcf_log
-                    }
-                }).execute()
+                await get_message_persistence().flush(session_id)
+                yield f"data: {json.dumps({'type': 'user_message_saved', 'message': {'id': message_id, 'content': message_text, 'role': 'user'}})}\n\n"
+                await self._save_message(
+                    snapshot, "assistant", ai_content,
+                    {"streamed": True, "protocol": "viva_v1", **turn_log.to_metadata()},
+                    message_id=reply_id(message_id),
+                    agent_state=agent_state or None
+                )
                 yield f"data: {json.dumps({'type': 'ai_message_saved', 'message': {'content': ai_content}})}\n\n"
             except Exception as e:
-                logger.error(f"Failed to save AI message: {e}")
+                logger.error(f"Failed to save turn messages: {e}")
 
             # End Stream
             yield "data: [DONE]\n\n"
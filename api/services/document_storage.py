@@ -0,0 +1,192 @@
+"""
+Content-Addressed Document Storage
+تخزين المستندات حسب بصمة المحتوى (SHA-256) مع عدّ المراجع
+
+- Uploads are streamed to disk in chunks (aiofiles) while the SHA-256 is computed
+- Size / quota limits are enforced during the stream, not after the file is on disk
+- Blobs live at uploads/documents/blobs/<aa>/<sha256>.<ext>; identical files share one blob
+- document_blobs.ref_count tracks how many documents point at a blob; the file is
+  removed when the last reference is released
+"""
+import asyncio
+import hashlib
+import logging
+import os
+import uuid
+from dataclasses import dataclass
+from typing import Any, Dict, Optional
+
+import aiofiles
+import aiofiles.os
+from fastapi import HTTPException, UploadFile
+
+from api.database import get_supabase_client
+
+logger = logging.getLogger(__name__)
+
+UPLOAD_DIR = "uploads/documents"
+BLOB_DIR = os.path.join(UPLOAD_DIR, "blobs")
+TMP_DIR = os.path.join(UPLOAD_DIR, "tmp")
+CHUNK_SIZE = 1024 * 1024  # 1 MB
+MAX_DOCUMENT_BYTES = int(os.getenv("MAX_DOCUMENT_BYTES", 50 * 1024 * 1024))
+
+# Fields copied from an already-processed document with the same content hash
+REUSABLE_FIELDS = ("raw_text", "word_count", "ocr_status", "extraction_error", "is_analyzed",
+                   "ai_summary", "summary_status", "is_complete", "total_chunks", "chunk_number")
+
+
+class UploadLimitExceeded(HTTPException):
+    """Raised while streaming when the upload passes the size or quota limit"""
+
+
+@dataclass
+class StreamedUpload:
+    sha256: str
+    size: int
+    temp_path: str
+
+
+async def stream_upload(
+    upload: UploadFile,
+    max_bytes: int,
+    quota_bytes: Optional[int] = None,
+    tmp_dir: str = TMP_DIR,
+    chunk_size: int = CHUNK_SIZE
+) -> StreamedUpload:
+    """
+    Stream an UploadFile to a temp file, hashing as it goes.
+
+    Args:
+        max_bytes: Hard per-file limit (413 when exceeded)
+        quota_bytes: Remaining storage quota of the owner (403 when exceeded)
+    """
+    await aiofiles.os.makedirs(tmp_dir, exist_ok=True)
+    temp_path = os.path.join(tmp_dir, f"{uuid.uuid4()}.part")
+    digest = hashlib.sha256()
+    size = 0
+
+    try:
+        async with aiofiles.open(temp_path, "wb") as out:
+            while True:
+                chunk = await upload.read(chunk_size)
+                if not chunk:
+                    break
+                size += len(chunk)
+                if size > max_bytes:
+                    raise UploadLimitExceeded(
+                        status_code=413,
+                        detail=f"حجم الملف يتجاوز الحد الأقصى ({max_bytes // 1024 // 1024} ميجابايت)"
+                    )
+                if quota_bytes is not None and size > quota_bytes:
+                    raise UploadLimitExceeded(
+                        status_code=403,
+                        detail=f"لا توجد مساحة تخزين كافية. المتبقي: {max(0, quota_bytes) / (1024 * 1024):.2f} ميجابايت"
+                    )
+                digest.update(chunk)
+                await out.write(chunk)
+    except BaseException:
+        await _remove_quietly(temp_path)
+        raise
+
+    return StreamedUpload(sha256=digest.hexdigest(), size=size, temp_path=temp_path)
+
+
+async def _remove_quietly(path: str):
+    try:
+        await aiofiles.os.remove(path)
+    except FileNotFoundError:
+        pass
+
+
+def blob_path(sha256: str, extension: str) -> str:
+    return os.path.join(BLOB_DIR, sha256[:2], f"{sha256}.{extension}")
+
+
+def resolve_local_path(file_url: str) -> str:
+    """Local path of a stored document (blob URLs and legacy uploads/documents/<file> URLs)"""
+    relative = os.path.normpath(file_url.lstrip("/"))
+    if not relative.startswith(UPLOAD_DIR + os.sep):
+        return os.path.join(UPLOAD_DIR, os.path.basename(relative))
+    return relative
+
+
+class DocumentStorage:
+    """Blob store + reference counting (document_blobs / acquire/release RPCs)"""
+
+    def __init__(self, db: Any = None):
+        self._db = db
+
+    @property
+    def db(self):
+        if self._db is None:
+            self._db = get_supabase_client()
+        return self._db
+
+    async def _rpc(self, name: str, params: Dict[str, Any]):
+        return await asyncio.to_thread(self.db.rpc(name, params).execute)
+
+    async def commit(self, upload: StreamedUpload, extension: str) -> Dict[str, Any]:
+        """
+        Move a streamed upload into its content-addressed location and take a reference.
+
+        Returns: {"sha256", "file_url", "file_path", "ref_count", "deduplicated"}
+        """
+        result = await self._rpc("acquire_document_blob", {
+            "p_sha256": upload.sha256,
+            "p_file_path": blob_path(upload.sha256, extension),
+            "p_file_size": upload.size
+        })
+        row = (result.data or [{}])[0]
+        ref_count = row.get("ref_count", 1)
+        # The first upload decides the blob path (e.g. .jpeg vs .jpg of the same bytes)
+        path = row.get("file_path") or blob_path(upload.sha256, extension)
+        deduplicated = ref_count > 1 and await aiofiles.os.path.exists(path)
+
+        if deduplicated:
+            await _remove_quietly(upload.temp_path)
+            logger.info(f"♻️ Duplicate upload {upload.sha256[:12]} shares existing blob (refs={ref_count})")
+        else:
+            await aiofiles.os.makedirs(os.path.dirname(path), exist_ok=True)
+            await aiofiles.os.replace(upload.temp_path, path)
+
+        return {
+            "sha256": upload.sha256,
+            "file_url": "/" + path.replace(os.sep, "/"),
+            "file_path": path,
+            "ref_count": ref_count,
+            "deduplicated": deduplicated
+        }
+
+    async def release(self, sha256: str, file_path: str) -> int:
+        """Drop one reference; delete the blob file when none remain."""
+        result = await self._rpc("release_document_blob", {"p_sha256": sha256})
+        remaining = result.data if isinstance(result.data, int) else 0
+        if remaining <= 0:
+            await _remove_quietly(file_path)
+            logger.info(f"🗑️ Blob {sha256[:12]} released and deleted")
+        return remaining
+
+    async def find_processed(self, sha256: str, exclude_id: Optional[str] = None) -> Dict[str, Any]:
+        """
+        OCR / summary results of another document with identical content.
+
+        Returns only the fields that are complete (empty dict if none).
+        """
+        query = self.db.table("documents") \
+            .select(", ".join(("id",) + REUSABLE_FIELDS)) \
+            .eq("content_hash", sha256) \
+            .eq("ocr_status", "completed")
+        if exclude_id:
+            query = query.neq("id", exclude_id)
+        result = await asyncio.to_thread(query.limit(1).execute)
+        if not result.data:
+            return {}
+
+        source = result.data[0]
+        reused = {k: source.get(k) for k in ("raw_text", "word_count", "ocr_status", "extraction_error", "is_analyzed")}
+        if source.get("summary_status") == "completed":
+            reused.update({k: source.get(k) for k in ("ai_summary", "summary_status", "is_complete",
+                                                      "total_chunks", "chunk_number")})
+        logger.info(f"♻️ Reusing OCR{' + summary' if 'ai_summary' in reused else ''} from document {source['id']}")
+        return reused
+
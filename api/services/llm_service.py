@@ -3,7 +3,7 @@ LLM Service for document summarization
 خدمة تلخيص المستندات باستخدام نموذج اللغة
 """
 import os
-from typing import Optional, Dict
+from typing import Optional, Dict, List
 from mistralai import Mistral
 import logging
 
@@ -72,17 +72,7 @@ class LLMService:
             logger.info(f"Starting summarization for chunk {chunk_number}/{total_chunks}")
             
             # Call LLM
-            response = self.client.chat.complete(
-                model=self.model,
-                messages=[
-                    {"role": "system", "content": self.system_prompt},
-                    {"role": "user", "content": user_message}
-                ],
-                temperature=0.3,  # Lower temperature for more factual summaries
-                max_tokens=1000
-            )
-            
-            summary = response.choices[0].message.content.strip()
+            summary = await self._complete(user_message)
             
             # Check if summarization failed
             if "لا يمكن التلخيص" in summary:
@@ -115,6 +105,44 @@ class LLMService:
             }
 
 
+    async def reduce_summaries(self, summaries: List[str], is_final: bool = False) -> Dict[str, any]:
+        """
+        Merge partial summaries (one node of the map-reduce tree)
+        
+        Args:
+            summaries: Summaries of consecutive document parts, in order
+            is_final: Whether this merge produces the final document summary
+            
+        Returns:
+            dict with success / summary / error (same shape as summarize_chunk)
+        """
+        try:
+            parts = "\n\n".join(f"### الجزء {i}\n{summary}" for i, summary in enumerate(summaries, 1))
+            if is_final:
+                user_message = f"فيما يلي ملخصات أجزاء متتالية من مستند واحد.\n\n{parts}\n\nانتهى المستند كامل. يُرجى تقديم الملخص النهائي الشامل."
+            else:
+                user_message = f"فيما يلي ملخصات أجزاء متتالية من مستند طويل. ادمجها في ملخص واحد لهذه الأجزاء فقط دون استنتاجات نهائية:\n\n{parts}"
+            
+            summary = await self._complete(user_message)
+            return {"success": True, "summary": summary, "error": None}
+            
+        except Exception as e:
+            logger.error(f"Summary reduction failed: {str(e)}")
+            return {"success": False, "summary": None, "error": f"خطأ في التلخيص: {str(e)}"}
+    
+    async def _complete(self, user_message: str) -> str:
+        response = await self.client.chat.complete_async(
+            model=self.model,
+            messages=[
+                {"role": "system", "content": self.system_prompt},
+                {"role": "user", "content": user_message}
+            ],
+            temperature=0.3,  # Lower temperature for more factual summaries
+            max_tokens=1000
+        )
+        return response.choices[0].message.content.strip()
+
+
 # Lazy singleton instance
 _llm_service_instance = None
 
@@ -0,0 +1,243 @@
+"""
+Chat Message Persistence
+حفظ رسائل المحادثة خارج مسار الطلب
+
+- User messages are written behind: save() schedules the write and returns at
+  once. The caller awaits the returned task only when it needs the stored row.
+- Every message carries an id generated by the caller. That id is the
+  idempotency key: atomic_step_transaction ignores a replayed id, so an ARQ retry
+  of the same job does not duplicate the message or fold it twice.
+- Assistant messages are written with their metadata, the session context and
+  the turn state in one atomic_step_transaction call
+  (migrations/20260223_message_write_behind.sql).
+- The running conversation context is folded in Python, so the write carries the
+  context version it was folded from. If another turn of the session stored a
+  context in between, the RPC writes nothing and ContextConflict returns the
+  stored context to fold onto.
+- TurnLog collects the council and HCF entries of a turn. They are stored once,
+  in the assistant message metadata, instead of per event.
+
+Writes of one session run in order: an assistant write waits for the pending
+user write of the same session (flush). A deferred write that failed is kept and
+replayed by that flush with the same id; if the replay fails too, flush raises,
+so the reply is never stored without the message it answers.
+"""
+import asyncio
+import logging
+import uuid
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Set
+
+from api.database import get_supabase_client
+
+logger = logging.getLogger(__name__)
+
+# Turn fields kept in ai_chat_sessions.agent_state (the full graph state is not needed)
+TURN_STATE_KEYS = ("intent", "conversation_stage", "next_agent")
+
+
+class ContextConflict(Exception):
+    """Another turn of the session stored its conversation context first"""
+
+    def __init__(self, context: Optional[Dict[str, Any]], version: int):
+        super().__init__(f"Conversation context changed (version {version})")
+        self.context = context
+        self.version = version
+
+
+def new_message_id() -> str:
+    return str(uuid.uuid4())
+
+
+def reply_id(message_id: str) -> str:
+    """Idempotency key of the assistant reply to a user message (stable across retries)"""
+    return str(uuid.uuid5(uuid.UUID(message_id), "assistant"))
+
+
+def turn_state(output: Dict[str, Any]) -> Dict[str, Any]:
+    """The TURN_STATE_KEYS of a node output / final graph state"""
+    return {key: output[key] for key in TURN_STATE_KEYS if output.get(key) is not None}
+
+
+@dataclass
+class TurnLog:
+    """Council opinions and HCF decisions of one turn, written with the reply"""
+    council: List[Dict[str, Any]] = field(default_factory=list)
+    hcf: List[Dict[str, Any]] = field(default_factory=list)
+
+    def add_council(self, opinions: Dict[str, Any]):
+        now = datetime.now().isoformat()
+        for agent, text in opinions.items():
+            self.council.append({"agent": agent, "content": text, "timestamp": now})
+
+    def add_hcf(self, details: Dict[str, Any]):
+        self.hcf.append(details)
+
+    def capture(self, output: Dict[str, Any]):
+        """Collect what a node output / final graph state carries"""
+        opinions = output.get("council_opinions")
+        if opinions and isinstance(opinions, dict):
+            self.add_council(opinions)
+        details = output.get("hcf_details")
+        if details and isinstance(details, dict):
+            self.add_hcf(details)
+
+    def to_metadata(self) -> Dict[str, Any]:
+        return {"council_log": self.council, "hcf_log": self.hcf}
+
+
+class MessagePersistenceService:
+    """
+    Write-behind / atomic persistence for ai_chat_messages.
+
+    Usage:
+        persistence = get_message_persistence()
+        persistence.defer(session_id, write)              # user message (write: async callable)
+        await persistence.flush(session_id)               # before the reply (raises if it was lost)
+        result = await persistence.write(session_id, "assistant", ...)   # {"message": row, ...}
+    """
+
+    def __init__(self):
+        self._pending: Dict[str, Set[asyncio.Task]] = {}
+        self._failed: Dict[str, List[Callable[[], Awaitable[Any]]]] = {}
+        self.stats = {"writes": 0, "duplicates": 0, "retries": 0, "failures": 0, "replayed": 0, "conflicts": 0}
+
+    def _write_sync(
+        self,
+        session_id: str,
+        role: str,
+        content: str,
+        metadata: Dict[str, Any],
+        context: Optional[Dict[str, Any]],
+        agent_state: Optional[Dict[str, Any]],
+        message_id: str,
+        context_version: Optional[int]
+    ) -> Dict[str, Any]:
+        result = get_supabase_client().rpc("atomic_step_transaction", {
+            "p_session_id": session_id,
+            "p_role": role,
+            "p_content": content,
+            "p_metadata": metadata,
+            "p_agent_state": agent_state,
+            "p_context": context,
+            "p_message_id": message_id,
+            "p_context_version": context_version
+        }).execute().data or {}
+        if result.get("conflict"):
+            self.stats["conflicts"] += 1
+            raise ContextConflict(result.get("context"), result.get("context_version"))
+        if result.get("duplicate"):
+            self.stats["duplicates"] += 1
+            logger.info(f"♻️ Message {message_id} already stored (retry)")
+        return result
+
+    async def write(
+        self,
+        session_id: str,
+        role: str,
+        content: str,
+        metadata: Dict[str, Any],
+        context: Optional[Dict[str, Any]] = None,
+        agent_state: Optional[Dict[str, Any]] = None,
+        message_id: Optional[str] = None,
+        context_version: Optional[int] = None
+    ) -> Dict[str, Any]:
+        """
+        Store one message atomically with the session context / turn state.
+        Retried once: the message id makes the retry safe.
+
+        Returns:
+            {"message": row, "duplicate": bool, "context_version": int}
+
+        Raises:
+            ContextConflict: the session context is no longer at `context_version`
+                (nothing was written; not retried here)
+        """
+        message_id = message_id or new_message_id()
+        args = (session_id, role, content, metadata, context, agent_state, message_id, context_version)
+        try:
+            row = await asyncio.to_thread(self._write_sync, *args)
+        except ContextConflict:
+            raise
+        except Exception as e:
+            self.stats["retries"] += 1
+            logger.warning(f"⚠️ Message write failed, retrying {message_id}: {e}")
+            row = await asyncio.to_thread(self._write_sync, *args)
+        self.stats["writes"] += 1
+        return row
+
+    def defer(self, session_id: str, write: Callable[[], Awaitable[Any]]) -> asyncio.Task:
+        """
+        Run a write in the background (kept referenced until done).
+        `write` is called again by flush() if it fails, so it must be idempotent.
+        """
+        task = asyncio.create_task(self._guard(session_id, write))
+        pending = self._pending.setdefault(session_id, set())
+        pending.add(task)
+
+        def _done(t: asyncio.Task):
+            pending.discard(t)
+            if not pending and self._pending.get(session_id) is pending:
+                self._pending.pop(session_id, None)
+
+        task.add_done_callback(_done)
+        return task
+
+    async def _guard(self, session_id: str, write: Callable[[], Awaitable[Any]]) -> Any:
+        try:
+            return await write()
+        except Exception as e:
+            self.stats["failures"] += 1
+            self._failed.setdefault(session_id, []).append(write)
+            logger.error(f"❌ Deferred message write failed, kept for replay: {e}")
+            return None
+
+    async def flush(self, session_id: Optional[str] = None):
+        """
+        Wait for the pending writes of a session (all sessions if None) and replay
+        the ones that failed.
+
+        Raises:
+            The replay error, for a single session: the caller must not store a
+            reply to a message that was lost. Logged only when flushing all
+            sessions (shutdown).
+        """
+        if session_id is None:
+            tasks = [t for pending in self._pending.values() for t in pending]
+        else:
+            tasks = list(self._pending.get(session_id, ()))
+        if tasks:
+            await asyncio.gather(*tasks)
+
+        sessions = list(self._failed) if session_id is None else [session_id]
+        error = None
+        for sid in sessions:
+            for write in self._failed.pop(sid, []):
+                try:
+                    await write()
+                    self.stats["replayed"] += 1
+                except Exception as e:
+                    logger.error(f"❌ Message write lost for session {sid}: {e}")
+                    error = error or e
+        if error is not None and session_id is not None:
+            raise error
+
+    def get_stats(self) -> dict:
+        return {
+            **self.stats,
+            "pending": sum(len(p) for p in self._pending.values()),
+            "failed": sum(len(f) for f in self._failed.values())
+        }
+
+
+# ===== Singleton Instance =====
+_persistence: Optional[MessagePersistenceService] = None
+
+
+def get_message_persistence() -> MessagePersistenceService:
+    """الحصول على خدمة حفظ الرسائل (Singleton)"""
+    global _persistence
+    if _persistence is None:
+        _persistence = MessagePersistenceService()
+    return _persistence
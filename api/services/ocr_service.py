@@ -1,101 +1,272 @@
 """
 OCR Service using Mistral AI for document text extraction
 استخدام Mistral AI لاستخراج النص من المستندات
+
+Page-level pipeline:
+- PDFs are rendered page by page (PyMuPDF) — only the pages in flight are held in memory
+- Each page is OCR'd on the async client, bounded by OCR_CONCURRENCY
+- Page text is cached in Redis by page content hash (identical pages are never re-OCR'd)
+- Progress is reported per page through an optional callback
+
+Backends: "mistral" (default) or "stub" (offline, deterministic — OCR_BACKEND=stub)
 """
+import asyncio
+import base64
+import hashlib
 import os
-from typing import Optional, Dict
-from mistralai import Mistral
+from typing import Any, Awaitable, Callable, Dict, Iterator, List, Optional, Tuple
 import logging
 
+from api.cache import get_cache
+from api.cache.keys import CacheKeys, CacheTTL
+
+try:
+    import fitz  # PyMuPDF
+except ImportError:  # pragma: no cover - optional dependency
+    fitz = None
+
 logger = logging.getLogger(__name__)
 
+OCR_PROMPT = "استخرج جميع النصوص من هذا المستند بدقة. إذا كان النص غير واضح أو لا يمكن قراءته، اكتب 'لا يمكن الاستخراج'."
+UNREADABLE_MARKER = "لا يمكن الاستخراج"
 
-class OCRService:
-    def __init__(self):
-        """Initialize Mistral OCR client"""
-        api_key = os.getenv("MISTRAL_API_KEY")
-        if not api_key:
-            raise ValueError("MISTRAL_API_KEY environment variable is required")
-        
+MIME_TYPES = {
+    'pdf': 'application/pdf',
+    'png': 'image/png',
+    'jpg': 'image/jpeg',
+    'jpeg': 'image/jpeg',
+}
+
+# (page_number, page_bytes, mime_type)
+Page = Tuple[int, bytes, str]
+ProgressCallback = Callable[[int, int], Awaitable[None]]
+
+
+# =============================================================================
+# BACKENDS
+# =============================================================================
+
+class MistralOCRBackend:
+    """Vision-model OCR through Mistral's async chat API"""
+
+    def __init__(self, api_key: str, model: str = "pixtral-12b-2409"):
+        from mistralai import Mistral
         self.client = Mistral(api_key=api_key)
-        self.model = "pixtral-12b-2409"  # Mistral's vision model
-    
-    async def extract_text_from_file(self, file_path: str) -> Dict[str, any]:
+        self.model = model  # Mistral's vision model
+
+    async def ocr_page(self, data: bytes, mime_type: str) -> str:
+        encoded = base64.b64encode(data).decode('utf-8')
+        response = await self.client.chat.complete_async(
+            model=self.model,
+            messages=[
+                {
+                    "role": "user",
+                    "content": [
+                        {"type": "text", "text": OCR_PROMPT},
+                        {"type": "image_url", "image_url": f"data:{mime_type};base64,{encoded}"}
+                    ]
+                }
+            ]
+        )
+        return response.choices[0].message.content.strip()
+
+
+class StubOCRBackend:
+    """Offline backend: returns a deterministic text per page (tests / local development)"""
+
+    model = "stub"
+
+    def __init__(self, texts: Optional[Dict[str, str]] = None, delay: float = 0.0):
+        self.texts = texts or {}
+        self.delay = delay
+        self.calls = 0
+
+    async def ocr_page(self, data: bytes, mime_type: str) -> str:
+        self.calls += 1
+        if self.delay:
+            await asyncio.sleep(self.delay)
+        digest = hashlib.sha256(data).hexdigest()
+        return self.texts.get(digest, f"نص تجريبي مستخرج من الصفحة {digest[:12]}")
+
+
+# =============================================================================
+# PAGE SOURCES
+# =============================================================================
+
+def count_pages(file_path: str) -> int:
+    """Number of OCR pages in a file (1 for images, or PDFs without PyMuPDF)"""
+    if file_path.lower().endswith('.pdf') and fitz is not None:
+        with fitz.open(file_path) as doc:
+            return doc.page_count
+    return 1
+
+
+def iter_pages(file_path: str, dpi: int = 150) -> Iterator[Page]:
+    """
+    Yield pages one at a time.
+
+    PDFs are rendered to PNG page by page so memory does not grow with document size;
+    without PyMuPDF the whole PDF is sent as a single payload (previous behaviour).
+    """
+    file_extension = file_path.lower().split('.')[-1]
+    mime_type = MIME_TYPES.get(file_extension, 'application/octet-stream')
+
+    if file_extension == 'pdf' and fitz is not None:
+        with fitz.open(file_path) as doc:
+            for index in range(doc.page_count):
+                pixmap = doc.load_page(index).get_pixmap(dpi=dpi)
+                yield index + 1, pixmap.tobytes("png"), 'image/png'
+        return
+
+    if file_extension == 'pdf':
+        logger.warning("PyMuPDF not installed - sending PDF as a single OCR payload")
+    with open(file_path, 'rb') as f:
+        yield 1, f.read(), mime_type
+
+
+# =============================================================================
+# SERVICE
+# =============================================================================
+
+class OCRService:
+    def __init__(self, backend: Any = None, concurrency: Optional[int] = None):
+        """Initialize OCR backend (Mistral unless OCR_BACKEND=stub)"""
+        if backend is None:
+            if os.getenv("OCR_BACKEND", "mistral").lower() == "stub":
+                backend = StubOCRBackend()
+            else:
+                api_key = os.getenv("MISTRAL_API_KEY")
+                if not api_key:
+                    raise ValueError("MISTRAL_API_KEY environment variable is required")
+                backend = MistralOCRBackend(api_key)
+
+        self.backend = backend
+        self.model = getattr(backend, "model", "unknown")
+        self.concurrency = concurrency or int(os.getenv("OCR_CONCURRENCY", 4))
+        self.dpi = int(os.getenv("OCR_PDF_DPI", 150))
+
+    async def _ocr_page_cached(self, data: bytes, mime_type: str) -> Tuple[str, bool]:
+        """OCR one page, reusing the cached text of an identical page. Returns (text, from_cache)."""
+        cache = get_cache()
+        key = CacheKeys.ocr_page(self.model, hashlib.sha256(data).hexdigest())
+        cached = await cache.get(key)
+        if cached is not None:
+            return cached, True
+
+        text = await self.backend.ocr_page(data, mime_type)
+        if text and UNREADABLE_MARKER not in text:
+            await cache.set(key, text, ttl=CacheTTL.OCR_PAGE)
+        return text, False
+
+    async def extract_text_from_file(
+        self,
+        file_path: str,
+        on_progress: Optional[ProgressCallback] = None
+    ) -> Dict[str, Any]:
         """
-        Extract text from document using Mistral OCR
-        
+        Extract text from document using Mistral OCR (page by page, concurrently)
+
         Args:
             file_path: Path to the document file
-            
+            on_progress: Optional async callback(pages_done, pages_total)
+
         Returns:
             dict with:
                 - success: bool
                 - text: extracted text (if successful)
                 - error: error message (if failed)
                 - word_count: number of words
+                - pages / cached_pages: page statistics
+                - failed_pages: page numbers whose OCR failed (their text is missing)
         """
         try:
-            # Read file as base64
-            import base64
-            with open(file_path, 'rb') as f:
-                file_data = base64.b64encode(f.read()).decode('utf-8')
-            
-            # Determine MIME type
-            file_extension = file_path.lower().split('.')[-1]
-            mime_types = {
-                'pdf': 'application/pdf',
-                'png': 'image/png',
-                'jpg': 'image/jpeg',
-                'jpeg': 'image/jpeg',
-            }
-            mime_type = mime_types.get(file_extension, 'application/octet-stream')
-            
-            # Call Mistral OCR
             logger.info(f"Starting OCR extraction for: {file_path}")
-            
-            response = self.client.chat.complete(
-                model=self.model,
-                messages=[
-                    {
-                        "role": "user",
-                        "content": [
-                            {
-                                "type": "text",
-                                "text": "استخرج جميع النصوص من هذا المستند بدقة. إذا كان النص غير واضح أو لا يمكن قراءته، اكتب 'لا يمكن الاستخراج'."
-                            },
-                            {
-                                "type": "image_url",
-                                "image_url": f"data:{mime_type};base64,{file_data}"
-                            }
-                        ]
-                    }
-                ]
-            )
-            
-            # Extract text from response
-            extracted_text = response.choices[0].message.content.strip()
-            
+            total = await asyncio.to_thread(count_pages, file_path)
+            texts: Dict[int, str] = {}
+            stats = {"done": 0, "cached": 0}
+            failed_pages: List[int] = []
+
+            # Bounded queue: the reader never renders more than `concurrency` pages ahead
+            queue: asyncio.Queue = asyncio.Queue(maxsize=self.concurrency)
+
+            async def produce():
+                pages = iter_pages(file_path, self.dpi)
+                try:
+                    while True:
+                        page = await asyncio.to_thread(next, pages, None)
+                        if page is None:
+                            break
+                        await queue.put(page)
+                finally:
+                    pages.close()
+                for _ in range(self.concurrency):
+                    await queue.put(None)
+
+            async def work():
+                while True:
+                    page = await queue.get()
+                    if page is None:
+                        return
+                    number, data, mime_type = page
+                    del page
+                    try:
+                        text, from_cache = await self._ocr_page_cached(data, mime_type)
+                    except Exception as e:
+                        logger.warning(f"OCR failed for page {number}: {e}")
+                        text, from_cache = "", False
+                        failed_pages.append(number)
+                    del data
+                    texts[number] = "" if UNREADABLE_MARKER in text else text
+                    stats["done"] += 1
+                    stats["cached"] += int(from_cache)
+                    if on_progress:
+                        await on_progress(stats["done"], max(total, stats["done"]))
+
+            producer = asyncio.create_task(produce())
+            workers = [asyncio.create_task(work()) for _ in range(self.concurrency)]
+            try:
+                await asyncio.gather(producer, *workers)
+            except BaseException:
+                for task in [producer, *workers]:
+                    task.cancel()
+                raise
+
+            extracted_text = "\n\n".join(texts[n] for n in sorted(texts) if texts[n]).strip()
+            failed_pages.sort()
+
             # Check if extraction failed
-            if "لا يمكن الاستخراج" in extracted_text or len(extracted_text) < 10:
+            if len(extracted_text) < 10:
+                error = "لا يمكن استخراج النص من المستند"
+                if failed_pages:
+                    error += f" (فشلت {len(failed_pages)} صفحة)"
                 return {
                     "success": False,
                     "text": None,
-                    "error": "لا يمكن استخراج النص من المستند",
-                    "word_count": 0
+                    "error": error,
+                    "word_count": 0,
+                    "pages": stats["done"],
+                    "cached_pages": stats["cached"],
+                    "failed_pages": failed_pages
                 }
-            
+
             # Count words
             word_count = len(extracted_text.split())
-            
-            logger.info(f"OCR successful: {word_count} words extracted")
-            
+
+            logger.info(
+                f"OCR successful: {word_count} words extracted from {stats['done']} pages "
+                f"({stats['cached']} from cache, {len(failed_pages)} failed)"
+            )
+
             return {
                 "success": True,
                 "text": extracted_text,
                 "error": None,
-                "word_count": word_count
+                "word_count": word_count,
+                "pages": stats["done"],
+                "cached_pages": stats["cached"],
+                "failed_pages": failed_pages
             }
-            
+
         except Exception as e:
             logger.error(f"OCR extraction failed: {str(e)}")
             return {
@@ -104,36 +275,36 @@ class OCRService:
                 "error": f"خطأ في استخراج النص: {str(e)}",
                 "word_count": 0
             }
-    
+
     @staticmethod
     def count_words(text: str) -> int:
         """Count words in text"""
         if not text:
             return 0
         return len(text.split())
-    
+
     @staticmethod
-    def chunk_text(text: str, max_words: int = 3000) -> list[str]:
+    def chunk_text(text: str, max_words: int = 3000) -> List[str]:
         """
         Split text into chunks of max_words
-        
+
         Args:
             text: Text to split
             max_words: Maximum words per chunk (default: 3000)
-            
+
         Returns:
             List of text chunks
         """
         if not text:
             return []
-        
+
         words = text.split()
         chunks = []
-        
+
         for i in range(0, len(words), max_words):
             chunk = ' '.join(words[i:i + max_words])
             chunks.append(chunk)
-        
+
         return chunks
 
 
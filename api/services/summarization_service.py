@@ -0,0 +1,342 @@
+"""
+Document Summarization Jobs (map-reduce)
+تلخيص المستندات الطويلة كمهمة خلفية: تلخيص الأجزاء بالتوازي ثم دمجها شجرياً
+
+- Text is split on article / paragraph boundaries (not fixed word windows)
+- Map: chunks are summarized concurrently (SUMMARY_PARALLELISM)
+- Reduce: partial summaries are merged in groups of SUMMARY_REDUCE_FANOUT until one remains
+- Every partial summary is stored in document_summary_chunks keyed by content hash,
+  so a restarted job only redoes the work that was not finished
+- A job runs under a lease on its documents row (claim_summary_job): with several
+  API workers, only one of them runs a given document
+"""
+import asyncio
+import hashlib
+import logging
+import os
+import re
+import socket
+from typing import Any, Dict, List, Optional
+
+from api.database import get_supabase_client
+
+logger = logging.getLogger(__name__)
+
+MAX_CHUNK_WORDS = 3000
+SUMMARY_LEASE_SECONDS = int(os.getenv("SUMMARY_LEASE_SECONDS", 300))
+
+# Lease owner: one per process (uvicorn workers share the hostname, not the pid)
+PROCESS_ID = f"{socket.gethostname()}:{os.getpid()}"
+
+# New unit starts at an article heading ("المادة 5", "مادة (12)", "Article 3") or a blank line
+_ARTICLE_BOUNDARY = re.compile(r"(?m)^(?=\s*(?:ال)?(?:مادة|Article)\s*[\(\[]?\s*\d+)", re.IGNORECASE)
+_PARAGRAPH_BOUNDARY = re.compile(r"\n\s*\n")
+_SENTENCE_BOUNDARY = re.compile(r"(?<=[\.\!\?؟۔])\s+")
+
+
+# =============================================================================
+# CHUNKING
+# =============================================================================
+
+def _split_units(text: str) -> List[str]:
+    units = []
+    for block in _ARTICLE_BOUNDARY.split(text):
+        units.extend(p.strip() for p in _PARAGRAPH_BOUNDARY.split(block) if p.strip())
+    return units
+
+
+def _split_oversized(unit: str, max_words: int) -> List[str]:
+    """A single paragraph longer than max_words: split on sentences, then on words."""
+    pieces, current, count = [], [], 0
+    for sentence in _SENTENCE_BOUNDARY.split(unit):
+        words = sentence.split()
+        if len(words) > max_words:
+            if current:
+                pieces.append(" ".join(current))
+                current, count = [], 0
+            pieces.extend(" ".join(words[i:i + max_words]) for i in range(0, len(words), max_words))
+            continue
+        if count + len(words) > max_words and current:
+            pieces.append(" ".join(current))
+            current, count = [], 0
+        current.append(sentence)
+        count += len(words)
+    if current:
+        pieces.append(" ".join(current))
+    return pieces
+
+
+def split_on_boundaries(text: str, max_words: int = MAX_CHUNK_WORDS) -> List[str]:
+    """
+    Split text into chunks of at most max_words, cutting only between
+    articles / paragraphs (or sentences when a paragraph alone is too long).
+    """
+    chunks: List[str] = []
+    current: List[str] = []
+    count = 0
+    for unit in _split_units(text or ""):
+        words = len(unit.split())
+        if words > max_words:
+            if current:
+                chunks.append("\n\n".join(current))
+                current, count = [], 0
+            chunks.extend(_split_oversized(unit, max_words))
+            continue
+        if count + words > max_words and current:
+            chunks.append("\n\n".join(current))
+            current, count = [], 0
+        current.append(unit)
+        count += words
+    if current:
+        chunks.append("\n\n".join(current))
+    return chunks
+
+
+def _content_hash(*parts: str) -> str:
+    return hashlib.sha256("\x1e".join(parts).encode("utf-8")).hexdigest()
+
+
+# =============================================================================
+# SUMMARIZER
+# =============================================================================
+
+class DocumentSummarizer:
+    """
+    Map-reduce summarizer for one document.
+
+    Partial results live in document_summary_chunks (document_id, level, chunk_index):
+    level 0 = chunk summaries, level n = merged summaries of level n-1.
+    """
+
+    def __init__(
+        self,
+        db: Any = None,
+        llm: Any = None,
+        parallelism: Optional[int] = None,
+        fanout: Optional[int] = None,
+        max_words: int = MAX_CHUNK_WORDS,
+        lease_seconds: int = SUMMARY_LEASE_SECONDS
+    ):
+        self.db = db or get_supabase_client()
+        if llm is None:
+            from api.services.llm_service import get_llm_service
+            llm = get_llm_service()
+        self.llm = llm
+        self.parallelism = parallelism or int(os.getenv("SUMMARY_PARALLELISM", 4))
+        self.fanout = max(2, fanout or int(os.getenv("SUMMARY_REDUCE_FANOUT", 4)))
+        self.max_words = max_words
+        self.lease_seconds = lease_seconds
+
+    # ----- persistence (sync client → thread) -----
+
+    async def _run(self, query):
+        return await asyncio.to_thread(query.execute)
+
+    async def _update_document(self, document_id: str, data: Dict[str, Any]):
+        await self._run(self.db.table("documents").update(data).eq("id", document_id))
+
+    async def _load_partials(self, document_id: str) -> Dict[tuple, Dict[str, Any]]:
+        result = await self._run(
+            self.db.table("document_summary_chunks")
+            .select("level, chunk_index, content_hash, summary")
+            .eq("document_id", document_id)
+        )
+        return {(row["level"], row["chunk_index"]): row for row in (result.data or [])}
+
+    async def _claim(self, document_id: str) -> bool:
+        """Take or renew the job lease (False: another live process runs this document)"""
+        result = await self._run(self.db.rpc("claim_summary_job", {
+            "p_document_id": document_id,
+            "p_owner": PROCESS_ID,
+            "p_lease_seconds": self.lease_seconds
+        }))
+        return bool(result.data)
+
+    async def _keep_lease(self, document_id: str, job: asyncio.Task):
+        """Renew the lease while `job` runs; cancel `job` once another process holds it."""
+        while True:
+            await asyncio.sleep(self.lease_seconds / 3)
+            try:
+                if not await self._claim(document_id):
+                    logger.warning(f"Summary lease of {document_id} was lost, stopping the job")
+                    job.cancel()
+                    return
+            except Exception as e:
+                logger.warning(f"Could not renew summary lease of {document_id}: {e}")
+
+    async def _save_partial(self, document_id: str, level: int, index: int, content_hash: str, summary: str):
+        await self._run(
+            self.db.table("document_summary_chunks").upsert({
+                "document_id": document_id,
+                "level": level,
+                "chunk_index": index,
+                "content_hash": content_hash,
+                "summary": summary
+            }, on_conflict="document_id,level,chunk_index")
+        )
+
+    # ----- map / reduce -----
+
+    async def _level(
+        self,
+        document_id: str,
+        level: int,
+        inputs: List[Any],
+        partials: Dict[tuple, Dict[str, Any]],
+        progress: Optional[Dict[str, int]] = None
+    ) -> List[str]:
+        """Run one level of the tree; inputs are chunk texts (level 0) or summary groups."""
+        semaphore = asyncio.Semaphore(self.parallelism)
+        is_final = level > 0 and len(inputs) == 1
+
+        async def process(index: int, item: Any) -> str:
+            if level > 0 and len(item) == 1 and not is_final:
+                return item[0]  # Odd group out: carried up unchanged
+            content_hash = _content_hash(item) if level == 0 else _content_hash(*item)
+            stored = partials.get((level, index))
+            if stored and stored["content_hash"] == content_hash:
+                return stored["summary"]
+
+            async with semaphore:
+                if level == 0:
+                    result = await self.llm.summarize_chunk(item, index + 1, len(inputs), False)
+                else:
+                    result = await self.llm.reduce_summaries(item, is_final=is_final)
+            if not result["success"]:
+                raise RuntimeError(result["error"])
+
+            await self._save_partial(document_id, level, index, content_hash, result["summary"])
+            if progress is not None:
+                progress["done"] += 1
+                await self._update_document(document_id, {
+                    "chunk_number": progress["done"],
+                    "total_chunks": progress["total"]
+                })
+            return result["summary"]
+
+        # Let every chunk finish (and be stored) before surfacing a failure
+        results = await asyncio.gather(*(process(i, item) for i, item in enumerate(inputs)), return_exceptions=True)
+        for result in results:
+            if isinstance(result, BaseException):
+                raise result
+        return list(results)
+
+    async def summarize(self, document_id: str, text: str) -> str:
+        """Summarize text, reusing partial summaries already stored for this document."""
+        chunks = split_on_boundaries(text, self.max_words)
+        if not chunks:
+            raise ValueError("لا يوجد نص للتلخيص")
+
+        if len(chunks) == 1:
+            result = await self.llm.summarize_chunk(chunks[0], 1, 1, True)
+            if not result["success"]:
+                raise RuntimeError(result["error"])
+            return result["summary"]
+
+        partials = await self._load_partials(document_id)
+        done = sum(
+            1 for i, chunk in enumerate(chunks)
+            if partials.get((0, i), {}).get("content_hash") == _content_hash(chunk)
+        )
+        logger.info(f"Summarizing {document_id}: {len(chunks)} chunks ({done} already done)")
+        await self._update_document(document_id, {"chunk_number": done, "total_chunks": len(chunks)})
+
+        summaries = await self._level(
+            document_id, 0, chunks, partials,
+            progress={"done": done, "total": len(chunks)}
+        )
+
+        level = 1
+        while len(summaries) > 1:
+            groups = [summaries[i:i + self.fanout] for i in range(0, len(summaries), self.fanout)]
+            logger.info(f"Reducing {document_id}: level {level}, {len(summaries)} → {len(groups)}")
+            summaries = await self._level(document_id, level, groups, partials)
+            level += 1
+
+        return summaries[0]
+
+    async def run(self, document_id: str):
+        """Background job body: summarize the document and record the outcome on its row."""
+        try:
+            if not await self._claim(document_id):
+                logger.info(f"Summary of {document_id} is run by another process")
+                return
+        except Exception as e:
+            logger.error(f"Could not claim summary job {document_id}: {e}")
+            return
+
+        job = asyncio.current_task()
+        lease = asyncio.create_task(self._keep_lease(document_id, job))
+        try:
+            result = await self._run(
+                self.db.table("documents").select("id, raw_text").eq("id", document_id).limit(1)
+            )
+            if not result.data or not result.data[0].get("raw_text"):
+                raise ValueError("يجب استخراج النص أولاً قبل التلخيص")
+
+            summary = await self.summarize(document_id, result.data[0]["raw_text"])
+
+            await self._update_document(document_id, {
+                "ai_summary": summary,
+                "summary_status": "completed",
+                "is_complete": True,
+                "summary_lease_until": None
+            })
+            await self._run(self.db.table("document_summary_chunks").delete().eq("document_id", document_id))
+            logger.info(f"✅ Summary completed for document {document_id}")
+
+        except asyncio.CancelledError:
+            if not lease.done() or lease.cancelled():
+                raise
+            # Lease lost: the new owner runs the document, so nothing more is written here
+            job.uncancel()
+        except Exception as e:
+            logger.error(f"Summarization failed for {document_id}: {e}")
+            await self._update_document(document_id, {"summary_status": "failed", "summary_lease_until": None})
+        finally:
+            lease.cancel()
+
+
+# =============================================================================
+# JOBS
+# =============================================================================
+
+_jobs: Dict[str, asyncio.Task] = {}
+
+
+def start_summary_job(document_id: str, summarizer: Optional[DocumentSummarizer] = None) -> bool:
+    """
+    Schedule summarization in the background (one job per document per process).
+
+    Returns False if a job for this document is already running.
+    """
+    running = _jobs.get(document_id)
+    if running and not running.done():
+        return False
+
+    task = asyncio.create_task((summarizer or DocumentSummarizer()).run(document_id))
+    _jobs[document_id] = task
+    task.add_done_callback(lambda t: _jobs.pop(document_id, None) if _jobs.get(document_id) is t else None)
+    return True
+
+
+async def resume_interrupted_summaries() -> int:
+    """
+    Restart jobs left in 'processing' by a previous process (called on startup).
+
+    Runs in every API worker: each job first claims its lease, so a document is
+    resumed by one worker only, and not while its current owner is alive.
+    """
+    try:
+        db = get_supabase_client()
+        result = await asyncio.to_thread(
+            db.table("documents").select("id").eq("summary_status", "processing").execute
+        )
+        resumed = sum(1 for row in (result.data or []) if start_summary_job(row["id"]))
+        if resumed:
+            logger.info(f"🔁 Found {resumed} interrupted summarization job(s), claiming")
+        return resumed
+    except Exception as e:
+        logger.warning(f"Could not resume summarization jobs: {e}")
+        return 0
+
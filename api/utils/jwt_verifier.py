@@ -0,0 +1,214 @@
+"""
+Stateless JWT Verification
+التحقق المحلي من رموز Supabase والرموز الداخلية بدون استدعاء شبكة لكل طلب
+
+- HS256: الرموز الداخلية (JWT_SECRET_KEY) ورموز Supabase (SUPABASE_JWT_SECRET)
+- RS256/ES256: مفاتيح Supabase العامة من JWKS مع تخزين مؤقت وتحديث عند ظهور kid جديد
+- LRU صغير للـ claims المتحقق منها حتى انتهاء صلاحيتها
+"""
+import asyncio
+import logging
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Optional
+
+import httpx
+from jose import JWTError, jwt
+
+logger = logging.getLogger(__name__)
+
+SUPABASE_AUDIENCE = "authenticated"
+ASYMMETRIC_ALGORITHMS = ("RS256", "ES256")
+
+
+class JWTVerifier:
+    """
+    Local verifier for internal and Supabase-issued access tokens.
+
+    Usage:
+        claims = await get_jwt_verifier().verify(token)
+        if claims is None and not verifier.has_key_material(token):
+            ...  # legacy remote check
+    """
+
+    def __init__(
+        self,
+        local_secret: Optional[str] = None,
+        local_algorithm: str = "HS256",
+        supabase_url: Optional[str] = None,
+        supabase_secret: Optional[str] = None,
+        jwks_ttl: int = 600,
+        jwks_min_refresh_interval: int = 30,
+        claims_cache_size: int = 10000
+    ):
+        self.local_secret = local_secret
+        self.local_algorithm = local_algorithm
+        self.supabase_secret = supabase_secret
+        self.jwks_url = f"{supabase_url.rstrip('/')}/auth/v1/.well-known/jwks.json" if supabase_url else None
+        self.jwks_ttl = jwks_ttl
+        self.jwks_min_refresh_interval = jwks_min_refresh_interval
+
+        self._jwks: Dict[str, Dict[str, Any]] = {}
+        self._jwks_fetched_at = 0.0
+        self._jwks_lock = asyncio.Lock()
+
+        self._claims: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        self._claims_lock = threading.Lock()
+        self._claims_cache_size = claims_cache_size
+
+    # =========================================================================
+    # PUBLIC API
+    # =========================================================================
+
+    async def verify(self, token: str) -> Optional[Dict[str, Any]]:
+        """
+        التحقق من الرمز محلياً
+
+        Returns:
+            claims إذا كان التوقيع والصلاحية سليمين، وإلا None
+        """
+        cached = self._get_cached_claims(token)
+        if cached is not None:
+            return cached
+
+        try:
+            header = jwt.get_unverified_header(token)
+        except JWTError:
+            return None
+
+        alg = header.get("alg")
+        if alg in ASYMMETRIC_ALGORITHMS:
+            claims = await self._verify_asymmetric(token, header)
+        elif alg == "HS256":
+            claims = self._verify_hmac(token)
+        else:
+            claims = None
+
+        if claims is not None:
+            self._cache_claims(token, claims)
+        return claims
+
+    def has_key_material(self, token: str) -> bool:
+        """هل يملك المتحقق مفاتيح كافية للحكم على هذا الرمز محلياً؟"""
+        try:
+            alg = jwt.get_unverified_header(token).get("alg")
+        except JWTError:
+            return True  # Malformed: reject locally, no point asking Supabase
+        if alg in ASYMMETRIC_ALGORITHMS:
+            return bool(self._jwks)
+        if alg == "HS256":
+            return bool(self.supabase_secret)
+        return True
+
+    async def warm_up(self):
+        """تحميل JWKS مسبقاً عند بدء التشغيل"""
+        if self.jwks_url:
+            await self._refresh_jwks(force=True)
+
+    # =========================================================================
+    # HMAC (internal + legacy Supabase secret)
+    # =========================================================================
+
+    def _verify_hmac(self, token: str) -> Optional[Dict[str, Any]]:
+        if self.local_secret:
+            try:
+                return jwt.decode(
+                    token, self.local_secret, algorithms=[self.local_algorithm],
+                    options={"verify_aud": False}
+                )
+            except JWTError:
+                pass
+
+        if self.supabase_secret:
+            try:
+                return jwt.decode(token, self.supabase_secret, algorithms=["HS256"], audience=SUPABASE_AUDIENCE)
+            except JWTError:
+                pass
+        return None
+
+    # =========================================================================
+    # JWKS (asymmetric Supabase keys)
+    # =========================================================================
+
+    async def _verify_asymmetric(self, token: str, header: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        kid = header.get("kid")
+        key = self._jwks.get(kid)
+
+        if key is None or self._jwks_expired():
+            # Unknown kid usually means a key rotation: refetch (rate-limited)
+            await self._refresh_jwks(force=key is None)
+            key = self._jwks.get(kid)
+        if key is None:
+            return None
+
+        try:
+            return jwt.decode(token, key, algorithms=[header["alg"]], audience=SUPABASE_AUDIENCE)
+        except JWTError:
+            return None
+
+    def _jwks_expired(self) -> bool:
+        return time.monotonic() - self._jwks_fetched_at > self.jwks_ttl
+
+    async def _refresh_jwks(self, force: bool = False):
+        if not self.jwks_url:
+            return
+        async with self._jwks_lock:
+            since_last = time.monotonic() - self._jwks_fetched_at
+            if since_last < self.jwks_min_refresh_interval:
+                return
+            if not force and not self._jwks_expired():
+                return
+            try:
+                async with httpx.AsyncClient(timeout=5.0) as client:
+                    response = await client.get(self.jwks_url)
+                    response.raise_for_status()
+                keys = response.json().get("keys", [])
+                self._jwks = {k["kid"]: k for k in keys if k.get("kid")}
+                logger.info(f"🔑 Loaded {len(self._jwks)} Supabase JWKS keys")
+            except Exception as e:
+                logger.warning(f"⚠️ JWKS fetch failed (keeping {len(self._jwks)} cached keys): {e}")
+            finally:
+                self._jwks_fetched_at = time.monotonic()
+
+    # =========================================================================
+    # VERIFIED CLAIMS CACHE
+    # =========================================================================
+
+    def _get_cached_claims(self, token: str) -> Optional[Dict[str, Any]]:
+        with self._claims_lock:
+            claims = self._claims.get(token)
+            if claims is None:
+                return None
+            exp = claims.get("exp")
+            if exp and exp < time.time():
+                del self._claims[token]
+                return None
+            self._claims.move_to_end(token)
+            return claims
+
+    def _cache_claims(self, token: str, claims: Dict[str, Any]):
+        with self._claims_lock:
+            self._claims[token] = claims
+            self._claims.move_to_end(token)
+            while len(self._claims) > self._claims_cache_size:
+                self._claims.popitem(last=False)
+
+
+# ===== Singleton Instance =====
+_verifier: Optional[JWTVerifier] = None
+
+
+def get_jwt_verifier() -> JWTVerifier:
+    """الحصول على JWT Verifier (Singleton) من متغيرات البيئة"""
+    global _verifier
+    if _verifier is None:
+        _verifier = JWTVerifier(
+            local_secret=os.getenv("JWT_SECRET_KEY", "your-secret-key-change-this-in-production-min-32-chars"),
+            local_algorithm=os.getenv("JWT_ALGORITHM", "HS256"),
+            supabase_url=os.getenv("SUPABASE_URL"),
+            supabase_secret=os.getenv("SUPABASE_JWT_SECRET"),
+            jwks_ttl=int(os.getenv("JWKS_CACHE_TTL", 600)),
+        )
+    return _verifier
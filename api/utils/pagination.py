@@ -0,0 +1,77 @@
+"""
+Keyset Pagination Cursors
+مؤشرات ترقيم الصفحات (keyset) بدلاً من OFFSET
+
+المؤشر قيمة opaque (base64 لـ JSON list) تحمل مفتاح آخر صف في الصفحة السابقة،
+مثل (created_at, id) للتاريخ أو (score, id) لنتائج البحث.
+"""
+import base64
+import json
+import uuid
+from datetime import datetime
+from typing import Any, List, Optional
+
+from api.utils.errors import ValidationError
+
+
+def encode_cursor(*values: Any) -> str:
+    """ترميز مفتاح آخر صف كمؤشر"""
+    raw = json.dumps(list(values), separators=(",", ":"), default=str)
+    return base64.urlsafe_b64encode(raw.encode("utf-8")).decode("ascii").rstrip("=")
+
+
+def decode_cursor(cursor: Optional[str], size: int) -> Optional[List[Any]]:
+    """
+    فك ترميز المؤشر
+
+    Raises:
+        ValidationError: إذا كان المؤشر تالفاً أو بعدد قيم غير متوقع
+    """
+    if not cursor:
+        return None
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        values = json.loads(base64.urlsafe_b64decode(padded.encode("ascii")))
+    except (ValueError, UnicodeError):
+        raise ValidationError("Invalid pagination cursor")
+    if not isinstance(values, list) or len(values) != size:
+        raise ValidationError("Invalid pagination cursor")
+    return values
+
+
+def cursor_timestamp(value: Any) -> str:
+    """
+    قيمة created_at من المؤشر كـ ISO timestamp (تُستخدم داخل فلاتر PostgREST)
+
+    Raises:
+        ValidationError: إذا لم تكن timestamp صالحة
+    """
+    try:
+        return datetime.fromisoformat(value).isoformat()
+    except (TypeError, ValueError):
+        raise ValidationError("Invalid pagination cursor")
+
+
+def cursor_uuid(value: Any) -> str:
+    """
+    قيمة id من المؤشر كـ UUID
+
+    Raises:
+        ValidationError: إذا لم تكن UUID صالحة
+    """
+    try:
+        return str(uuid.UUID(value))
+    except (TypeError, ValueError, AttributeError):
+        raise ValidationError("Invalid pagination cursor")
+
+
+def cursor_score(value: Any) -> float:
+    """
+    قيمة score من المؤشر كرقم
+
+    Raises:
+        ValidationError: إذا لم تكن رقماً
+    """
+    if isinstance(value, bool) or not isinstance(value, (int, float)):
+        raise ValidationError("Invalid pagination cursor")
+    return float(value)
@@ -619,12 +619,14 @@ export function CaseDetails() {
                                             <span className="text-gray-400" style={{ fontFamily: 'Cairo, sans-serif' }}>استخراج النص:</span>
                                             <span className={`px-2 py-0.5 rounded ${doc.ocr_status === 'completed' ? 'bg-green-500/20 text-green-400' :
                                                 doc.ocr_status === 'processing' ? 'bg-yellow-500/20 text-yellow-400' :
-                                                    doc.ocr_status === 'failed' ? 'bg-red-500/20 text-red-400' :
-                                                        'bg-gray-500/20 text-gray-400'
+                                                    doc.ocr_status === 'partial' ? 'bg-orange-500/20 text-orange-400' :
+                                                        doc.ocr_status === 'failed' ? 'bg-red-500/20 text-red-400' :
+                                                            'bg-gray-500/20 text-gray-400'
                                                 }`} style={{ fontFamily: 'Cairo, sans-serif' }}>
                                                 {doc.ocr_status === 'completed' ? 'مكتمل' :
                                                     doc.ocr_status === 'processing' ? 'جاري...' :
-                                                        doc.ocr_status === 'failed' ? 'فشل' : 'معلق'}
+                                                        doc.ocr_status === 'partial' ? 'جزئي' :
+                                                            doc.ocr_status === 'failed' ? 'فشل' : 'معلق'}
                                             </span>
                                             {doc.word_count > 0 && (
                                                 <span className="text-gray-500" style={{ fontFamily: 'Cairo, sans-serif' }}>
@@ -636,7 +638,7 @@ export function CaseDetails() {
                                 )}
 
                                 {/* AI Summary Status */}
-                                {doc.ocr_enabled && doc.ocr_status === 'completed' && (
+                                {doc.ocr_enabled && (doc.ocr_status === 'completed' || doc.ocr_status === 'partial') && (
                                     <div className="mb-2">
                                         <div className="flex items-center gap-2 text-xs mb-1">
                                             <span className="text-gray-400" style={{ fontFamily: 'Cairo, sans-serif' }}>التلخيص:</span>
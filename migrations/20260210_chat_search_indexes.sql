@@ -0,0 +1,130 @@
+-- Optimization: Index-backed, ranked & keyset-paginated chat search / history
+-- Generated: 2026-02-10
+-- Depends on: normalize_arabic() from 20260206_optimize_search_ranking.sql
+-- Description:
+-- 1. Arabic-normalized trigram + full-text indexes on ai_chat_messages.content
+--    and a trigram index on ai_chat_sessions.title (replaces seq-scan ILIKE '%q%').
+-- 2. Composite (session_id, created_at, id) index so history pages are
+--    constant-time index range scans regardless of transcript length.
+-- 3. search_chat_messages / search_chat_sessions RPCs: ranked results with a
+--    (score, id) keyset cursor instead of OFFSET.
+
+CREATE EXTENSION IF NOT EXISTS pg_trgm;
+
+-- 🧱 INDEXES
+CREATE INDEX IF NOT EXISTS idx_ai_chat_messages_content_norm_trgm
+ON ai_chat_messages
+USING GIN (normalize_arabic(content) gin_trgm_ops);
+
+CREATE INDEX IF NOT EXISTS idx_ai_chat_messages_content_norm_fts
+ON ai_chat_messages
+USING GIN (to_tsvector('arabic', normalize_arabic(content)));
+
+CREATE INDEX IF NOT EXISTS idx_ai_chat_messages_session_created
+ON ai_chat_messages (session_id, created_at DESC, id DESC);
+
+CREATE INDEX IF NOT EXISTS idx_ai_chat_sessions_title_norm_trgm
+ON ai_chat_sessions
+USING GIN (normalize_arabic(title) gin_trgm_ops);
+
+CREATE INDEX IF NOT EXISTS idx_ai_chat_sessions_lawyer_last_message
+ON ai_chat_sessions (lawyer_id, last_message_at DESC);
+
+
+-- 🔎 MESSAGE SEARCH
+-- Usage: supabase.rpc('search_chat_messages', { p_lawyer_id, p_query, p_limit, p_cursor_score, p_cursor_id })
+CREATE OR REPLACE FUNCTION search_chat_messages(
+  p_lawyer_id UUID,
+  p_query TEXT,
+  p_limit INT DEFAULT 10,
+  p_cursor_score FLOAT DEFAULT NULL,
+  p_cursor_id UUID DEFAULT NULL
+)
+RETURNS TABLE (
+  id UUID,
+  session_id UUID,
+  role TEXT,
+  content TEXT,
+  created_at TIMESTAMPTZ,
+  session_title TEXT,
+  score FLOAT
+)
+LANGUAGE plpgsql
+STABLE
+AS $$
+DECLARE
+  norm_query TEXT;
+  like_query TEXT;
+  ts_query tsquery;
+BEGIN
+  norm_query := normalize_arabic(trim(p_query));
+  IF norm_query IS NULL OR length(norm_query) = 0 THEN
+    RETURN;
+  END IF;
+  ts_query := plainto_tsquery('arabic', norm_query);
+  -- % and _ in the search text are literals, not wildcards
+  like_query := '%' || replace(replace(replace(norm_query, '\', '\\'), '%', '\%'), '_', '\_') || '%';
+
+  RETURN QUERY
+  WITH Candidates AS (
+    SELECT
+      m.id,
+      m.session_id,
+      m.role::TEXT,
+      m.content,
+      m.created_at,
+      s.title::TEXT AS session_title,
+      (
+        ts_rank(to_tsvector('arabic', normalize_arabic(m.content)), ts_query)
+        + word_similarity(norm_query, normalize_arabic(m.content))
+        + CASE WHEN normalize_arabic(m.content) ILIKE like_query THEN 1.0 ELSE 0.0 END
+      )::FLOAT AS score
+    FROM ai_chat_messages m
+    JOIN ai_chat_sessions s ON s.id = m.session_id
+    WHERE s.lawyer_id = p_lawyer_id
+      AND (
+        -- Both predicates are served by the GIN indexes above
+        to_tsvector('arabic', normalize_arabic(m.content)) @@ ts_query
+        OR normalize_arabic(m.content) ILIKE like_query
+      )
+  )
+  SELECT c.id, c.session_id, c.role, c.content, c.created_at, c.session_title, c.score
+  FROM Candidates c
+  WHERE p_cursor_score IS NULL
+     OR (c.score, c.id) < (p_cursor_score, p_cursor_id)
+  ORDER BY c.score DESC, c.id DESC
+  -- The API asks for its page size (max 50) + 1 to detect a next page
+  LIMIT LEAST(GREATEST(p_limit, 1), 51);
+END;
+$$;
+
+
+-- 🔎 SESSION TITLE SEARCH
+CREATE OR REPLACE FUNCTION search_chat_sessions(
+  p_lawyer_id UUID,
+  p_query TEXT,
+  p_limit INT DEFAULT 5
+)
+RETURNS SETOF ai_chat_sessions
+LANGUAGE plpgsql
+STABLE
+AS $$
+DECLARE
+  norm_query TEXT;
+  like_query TEXT;
+BEGIN
+  norm_query := normalize_arabic(trim(p_query));
+  IF norm_query IS NULL OR length(norm_query) = 0 THEN
+    RETURN;
+  END IF;
+  like_query := '%' || replace(replace(replace(norm_query, '\', '\\'), '%', '\%'), '_', '\_') || '%';
+
+  RETURN QUERY
+  SELECT s.*
+  FROM ai_chat_sessions s
+  WHERE s.lawyer_id = p_lawyer_id
+    AND normalize_arabic(s.title) ILIKE like_query
+  ORDER BY word_similarity(norm_query, normalize_arabic(s.title)) DESC, s.last_message_at DESC
+  LIMIT LEAST(GREATEST(p_limit, 1), 50);
+END;
+$$;
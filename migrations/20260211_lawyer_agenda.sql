@@ -0,0 +1,282 @@
+-- Optimization: Per-lawyer agenda materialization for calendar & notifications
+-- Generated: 2026-02-11
+-- Description:
+-- 1. lawyer_agenda: one row per hearing/task with case title/number/court/client
+--    denormalized, maintained by triggers on hearings, tasks and cases.
+-- 2. lawyer_agenda_versions: monotonically increasing version per lawyer, bumped
+--    by the same triggers. The API derives ETags from it so unchanged polls get 304.
+-- 3. Composite (lawyer_id, event_date) index for calendar/notification ranges.
+-- 4. Index for announcement date/audience filtering in SQL.
+-- 5. Both tables copy tenant data (client names, case subjects), so they get the
+--    same lawyer_id RLS as hearings/tasks/cases. Rows are written only by the
+--    SECURITY DEFINER triggers below; clients get read-only policies.
+
+-- 🧱 TABLES
+CREATE TABLE IF NOT EXISTS lawyer_agenda (
+    id UUID PRIMARY KEY,                 -- hearings.id / tasks.id
+    lawyer_id UUID NOT NULL,
+    item_type TEXT NOT NULL CHECK (item_type IN ('hearing', 'task')),
+    event_date DATE,
+    event_time TEXT,                     -- hearings.hearing_time
+    due_at TIMESTAMPTZ,                  -- tasks.execution_date
+    title TEXT,
+    status TEXT,
+    priority TEXT,
+    assigned_to UUID,
+    assign_to_all BOOLEAN DEFAULT FALSE,
+    case_id UUID,
+    case_subject TEXT,
+    case_number TEXT,
+    court_name TEXT,
+    client_name TEXT,
+    updated_at TIMESTAMPTZ DEFAULT NOW()
+);
+
+CREATE INDEX IF NOT EXISTS idx_lawyer_agenda_lawyer_date
+ON lawyer_agenda (lawyer_id, event_date, item_type);
+
+CREATE INDEX IF NOT EXISTS idx_lawyer_agenda_open_tasks
+ON lawyer_agenda (lawyer_id, due_at)
+WHERE item_type = 'task' AND status IN ('pending', 'in_progress');
+
+CREATE INDEX IF NOT EXISTS idx_lawyer_agenda_case
+ON lawyer_agenda (case_id);
+
+CREATE TABLE IF NOT EXISTS lawyer_agenda_versions (
+    lawyer_id UUID PRIMARY KEY,
+    version BIGINT NOT NULL DEFAULT 1,
+    updated_at TIMESTAMPTZ DEFAULT NOW()
+);
+
+CREATE INDEX IF NOT EXISTS idx_system_announcements_active_window
+ON system_announcements (is_active, target_audience, start_date, end_date);
+
+
+-- 🔒 SECURITY
+ALTER TABLE lawyer_agenda ENABLE ROW LEVEL SECURITY;
+ALTER TABLE lawyer_agenda_versions ENABLE ROW LEVEL SECURITY;
+
+DROP POLICY IF EXISTS "Lawyers can view their own agenda" ON lawyer_agenda;
+CREATE POLICY "Lawyers can view their own agenda" ON lawyer_agenda
+    FOR SELECT USING (auth.uid() = lawyer_id);
+
+DROP POLICY IF EXISTS "Lawyers can view their own agenda version" ON lawyer_agenda_versions;
+CREATE POLICY "Lawyers can view their own agenda version" ON lawyer_agenda_versions
+    FOR SELECT USING (auth.uid() = lawyer_id);
+
+
+-- 🔁 VERSION BUMP
+CREATE OR REPLACE FUNCTION bump_lawyer_agenda_version(p_lawyer_id UUID)
+RETURNS VOID
+LANGUAGE plpgsql
+SECURITY DEFINER
+SET search_path = public
+AS $$
+BEGIN
+    IF p_lawyer_id IS NULL THEN
+        RETURN;
+    END IF;
+    INSERT INTO lawyer_agenda_versions (lawyer_id, version, updated_at)
+    VALUES (p_lawyer_id, 1, NOW())
+    ON CONFLICT (lawyer_id)
+    DO UPDATE SET version = lawyer_agenda_versions.version + 1, updated_at = NOW();
+END;
+$$;
+
+
+-- ⚖️ HEARINGS
+CREATE OR REPLACE FUNCTION sync_agenda_from_hearing()
+RETURNS TRIGGER
+LANGUAGE plpgsql
+SECURITY DEFINER
+SET search_path = public
+AS $$
+BEGIN
+    IF TG_OP = 'DELETE' THEN
+        DELETE FROM lawyer_agenda WHERE id = OLD.id;
+        PERFORM bump_lawyer_agenda_version(OLD.lawyer_id);
+        RETURN OLD;
+    END IF;
+
+    IF NEW.lawyer_id IS NULL THEN
+        DELETE FROM lawyer_agenda WHERE id = NEW.id;
+        RETURN NEW;
+    END IF;
+
+    INSERT INTO lawyer_agenda (
+        id, lawyer_id, item_type, event_date, event_time, title,
+        case_id, case_subject, case_number, court_name, client_name, updated_at
+    )
+    SELECT
+        NEW.id, NEW.lawyer_id, 'hearing', NEW.hearing_date::DATE, NEW.hearing_time::TEXT, NULL,
+        NEW.case_id, c.subject, COALESCE(c.case_number::TEXT, NEW.case_number::TEXT),
+        COALESCE(c.court_name, NEW.court_name), COALESCE(c.client_name, NEW.client_name), NOW()
+    FROM (SELECT 1) AS one
+    LEFT JOIN cases c ON c.id = NEW.case_id
+    ON CONFLICT (id) DO UPDATE SET
+        lawyer_id = EXCLUDED.lawyer_id,
+        event_date = EXCLUDED.event_date,
+        event_time = EXCLUDED.event_time,
+        case_id = EXCLUDED.case_id,
+        case_subject = EXCLUDED.case_subject,
+        case_number = EXCLUDED.case_number,
+        court_name = EXCLUDED.court_name,
+        client_name = EXCLUDED.client_name,
+        updated_at = NOW();
+
+    PERFORM bump_lawyer_agenda_version(NEW.lawyer_id);
+    IF TG_OP = 'UPDATE' AND OLD.lawyer_id IS DISTINCT FROM NEW.lawyer_id THEN
+        PERFORM bump_lawyer_agenda_version(OLD.lawyer_id);
+    END IF;
+    RETURN NEW;
+END;
+$$;
+
+DROP TRIGGER IF EXISTS trg_agenda_hearings ON hearings;
+CREATE TRIGGER trg_agenda_hearings
+AFTER INSERT OR UPDATE OR DELETE ON hearings
+FOR EACH ROW
+EXECUTE FUNCTION sync_agenda_from_hearing();
+
+
+-- 📋 TASKS
+CREATE OR REPLACE FUNCTION sync_agenda_from_task()
+RETURNS TRIGGER
+LANGUAGE plpgsql
+SECURITY DEFINER
+SET search_path = public
+AS $$
+BEGIN
+    IF TG_OP = 'DELETE' THEN
+        DELETE FROM lawyer_agenda WHERE id = OLD.id;
+        PERFORM bump_lawyer_agenda_version(OLD.lawyer_id);
+        RETURN OLD;
+    END IF;
+
+    IF NEW.lawyer_id IS NULL THEN
+        DELETE FROM lawyer_agenda WHERE id = NEW.id;
+        RETURN NEW;
+    END IF;
+
+    INSERT INTO lawyer_agenda (
+        id, lawyer_id, item_type, event_date, due_at, title, status, priority,
+        assigned_to, assign_to_all, case_id, case_subject, case_number, court_name, client_name, updated_at
+    )
+    SELECT
+        NEW.id, NEW.lawyer_id, 'task', NEW.execution_date::DATE, NEW.execution_date::TIMESTAMPTZ,
+        NEW.title, NEW.status::TEXT, NEW.priority::TEXT,
+        NEW.assigned_to, COALESCE(NEW.assign_to_all, FALSE),
+        NEW.case_id, c.subject, c.case_number::TEXT, c.court_name, c.client_name, NOW()
+    FROM (SELECT 1) AS one
+    LEFT JOIN cases c ON c.id = NEW.case_id
+    ON CONFLICT (id) DO UPDATE SET
+        lawyer_id = EXCLUDED.lawyer_id,
+        event_date = EXCLUDED.event_date,
+        due_at = EXCLUDED.due_at,
+        title = EXCLUDED.title,
+        status = EXCLUDED.status,
+        priority = EXCLUDED.priority,
+        assigned_to = EXCLUDED.assigned_to,
+        assign_to_all = EXCLUDED.assign_to_all,
+        case_id = EXCLUDED.case_id,
+        case_subject = EXCLUDED.case_subject,
+        case_number = EXCLUDED.case_number,
+        court_name = EXCLUDED.court_name,
+        client_name = EXCLUDED.client_name,
+        updated_at = NOW();
+
+    PERFORM bump_lawyer_agenda_version(NEW.lawyer_id);
+    IF TG_OP = 'UPDATE' AND OLD.lawyer_id IS DISTINCT FROM NEW.lawyer_id THEN
+        PERFORM bump_lawyer_agenda_version(OLD.lawyer_id);
+    END IF;
+    RETURN NEW;
+END;
+$$;
+
+DROP TRIGGER IF EXISTS trg_agenda_tasks ON tasks;
+CREATE TRIGGER trg_agenda_tasks
+AFTER INSERT OR UPDATE OR DELETE ON tasks
+FOR EACH ROW
+EXECUTE FUNCTION sync_agenda_from_task();
+
+
+-- 📁 CASES (denormalized titles, deleted cases)
+CREATE OR REPLACE FUNCTION sync_agenda_from_case()
+RETURNS TRIGGER
+LANGUAGE plpgsql
+SECURITY DEFINER
+SET search_path = public
+AS $$
+BEGIN
+    IF TG_OP = 'DELETE' THEN
+        -- A deleted case takes its hearings/tasks off the agenda
+        PERFORM bump_lawyer_agenda_version(a.lawyer_id)
+        FROM (SELECT DISTINCT lawyer_id FROM lawyer_agenda WHERE case_id = OLD.id) a;
+        DELETE FROM lawyer_agenda WHERE case_id = OLD.id;
+        RETURN OLD;
+    END IF;
+
+    IF NEW.subject IS NOT DISTINCT FROM OLD.subject
+       AND NEW.case_number IS NOT DISTINCT FROM OLD.case_number
+       AND NEW.court_name IS NOT DISTINCT FROM OLD.court_name
+       AND NEW.client_name IS NOT DISTINCT FROM OLD.client_name THEN
+        RETURN NEW;
+    END IF;
+
+    UPDATE lawyer_agenda SET
+        case_subject = NEW.subject,
+        case_number = NEW.case_number::TEXT,
+        court_name = NEW.court_name,
+        client_name = NEW.client_name,
+        updated_at = NOW()
+    WHERE case_id = NEW.id;
+
+    IF FOUND THEN
+        PERFORM bump_lawyer_agenda_version(a.lawyer_id)
+        FROM (SELECT DISTINCT lawyer_id FROM lawyer_agenda WHERE case_id = NEW.id) a;
+    END IF;
+    RETURN NEW;
+END;
+$$;
+
+DROP TRIGGER IF EXISTS trg_agenda_cases ON cases;
+CREATE TRIGGER trg_agenda_cases
+AFTER UPDATE OR DELETE ON cases
+FOR EACH ROW
+EXECUTE FUNCTION sync_agenda_from_case();
+
+
+REVOKE ALL ON FUNCTION bump_lawyer_agenda_version(UUID) FROM PUBLIC, anon, authenticated;
+
+
+-- 📦 BACKFILL
+INSERT INTO lawyer_agenda (
+    id, lawyer_id, item_type, event_date, event_time,
+    case_id, case_subject, case_number, court_name, client_name
+)
+SELECT
+    h.id, h.lawyer_id, 'hearing', h.hearing_date::DATE, h.hearing_time::TEXT,
+    h.case_id, c.subject, COALESCE(c.case_number::TEXT, h.case_number::TEXT),
+    COALESCE(c.court_name, h.court_name), COALESCE(c.client_name, h.client_name)
+FROM hearings h
+LEFT JOIN cases c ON c.id = h.case_id
+WHERE h.lawyer_id IS NOT NULL
+ON CONFLICT (id) DO NOTHING;
+
+INSERT INTO lawyer_agenda (
+    id, lawyer_id, item_type, event_date, due_at, title, status, priority,
+    assigned_to, assign_to_all, case_id, case_subject, case_number, court_name, client_name
+)
+SELECT
+    t.id, t.lawyer_id, 'task', t.execution_date::DATE, t.execution_date::TIMESTAMPTZ,
+    t.title, t.status::TEXT, t.priority::TEXT,
+    t.assigned_to, COALESCE(t.assign_to_all, FALSE),
+    t.case_id, c.subject, c.case_number::TEXT, c.court_name, c.client_name
+FROM tasks t
+LEFT JOIN cases c ON c.id = t.case_id
+WHERE t.lawyer_id IS NOT NULL
+ON CONFLICT (id) DO NOTHING;
+
+INSERT INTO lawyer_agenda_versions (lawyer_id)
+SELECT DISTINCT lawyer_id FROM lawyer_agenda
+ON CONFLICT (lawyer_id) DO NOTHING;
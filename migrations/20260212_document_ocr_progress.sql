@@ -0,0 +1,10 @@
+-- Optimization: Page-level OCR progress on documents
+-- Generated: 2026-02-12
+-- Description:
+-- OCR now runs page by page (api/services/ocr_service.py). The extract endpoint
+-- writes pages done / total while it runs so the UI can show progress instead of
+-- a single "processing" state for the whole document.
+
+-- 🧱 COLUMNS
+ALTER TABLE documents ADD COLUMN IF NOT EXISTS ocr_pages_total INTEGER;
+ALTER TABLE documents ADD COLUMN IF NOT EXISTS ocr_pages_done INTEGER NOT NULL DEFAULT 0;
@@ -0,0 +1,56 @@
+-- Optimization: Resumable map-reduce document summarization
+-- Generated: 2026-02-13
+-- Description:
+-- Long documents are summarized as a background job (api/services/summarization_service.py):
+-- chunk summaries (level 0) are produced concurrently and merged in a tree (level 1..n).
+-- Each partial summary is stored here with the hash of its input, so a job restarted
+-- after a crash or deploy only recomputes what is missing. Rows are removed once the
+-- final summary is written to documents.ai_summary.
+-- A job runs under a lease on its documents row (summary_owner / summary_lease_until):
+-- every API worker resumes 'processing' documents on startup, and claim_summary_job
+-- lets exactly one of them run each job. The owner renews the lease while it runs.
+
+-- 🧱 TABLES
+CREATE TABLE IF NOT EXISTS document_summary_chunks (
+    document_id UUID NOT NULL REFERENCES documents(id) ON DELETE CASCADE,
+    level INTEGER NOT NULL,              -- 0 = chunk summary, n = reduce level
+    chunk_index INTEGER NOT NULL,
+    content_hash TEXT NOT NULL,          -- sha256 of the chunk text / merged summaries
+    summary TEXT NOT NULL,
+    created_at TIMESTAMPTZ NOT NULL DEFAULT NOW(),
+    PRIMARY KEY (document_id, level, chunk_index)
+);
+
+ALTER TABLE documents ADD COLUMN IF NOT EXISTS summary_owner TEXT;
+ALTER TABLE documents ADD COLUMN IF NOT EXISTS summary_lease_until TIMESTAMPTZ;
+
+-- 🔒 SECURITY (service role only; never exposed to clients)
+ALTER TABLE document_summary_chunks ENABLE ROW LEVEL SECURITY;
+
+-- ⚙️ FUNCTIONS
+-- Take (or renew) the lease of a summarization job. FALSE: another live process owns it.
+CREATE OR REPLACE FUNCTION claim_summary_job(p_document_id UUID, p_owner TEXT, p_lease_seconds INTEGER)
+RETURNS BOOLEAN
+LANGUAGE sql
+AS $$
+    WITH claimed AS (
+        UPDATE documents
+        SET summary_owner = p_owner,
+            summary_lease_until = NOW() + make_interval(secs => p_lease_seconds)
+        WHERE id = p_document_id
+          AND summary_status = 'processing'
+          AND (summary_lease_until IS NULL
+               OR summary_lease_until < NOW()
+               OR summary_owner = p_owner)
+        RETURNING id
+    )
+    SELECT EXISTS (SELECT 1 FROM claimed);
+$$;
+
+REVOKE ALL ON FUNCTION claim_summary_job(UUID, TEXT, INTEGER) FROM PUBLIC, anon, authenticated;
+
+-- ⚡ INDEXES
+-- Resume scan on startup
+CREATE INDEX IF NOT EXISTS idx_documents_summary_processing
+    ON documents (summary_status)
+    WHERE summary_status = 'processing';
@@ -0,0 +1,68 @@
+-- Optimization: Content-addressed document storage with reference counting
+-- Generated: 2026-02-14
+-- Description:
+-- 1. documents.content_hash: SHA-256 of the uploaded bytes, computed while streaming.
+-- 2. document_blobs: one row per stored file; ref_count = number of documents using it.
+--    Identical files uploaded to several cases share a single blob on disk.
+-- 3. acquire_document_blob / release_document_blob: atomic ref counting for the API.
+-- 4. Index to find an already-OCR'd/summarized document with the same content.
+
+-- 🧱 COLUMNS
+ALTER TABLE documents ADD COLUMN IF NOT EXISTS content_hash TEXT;
+
+-- 🧱 TABLES
+CREATE TABLE IF NOT EXISTS document_blobs (
+    sha256 TEXT PRIMARY KEY,
+    file_path TEXT NOT NULL,
+    file_size BIGINT NOT NULL,
+    ref_count INTEGER NOT NULL DEFAULT 0 CHECK (ref_count >= 0),
+    created_at TIMESTAMPTZ NOT NULL DEFAULT NOW(),
+    updated_at TIMESTAMPTZ NOT NULL DEFAULT NOW()
+);
+
+-- 🔒 SECURITY (service role only)
+ALTER TABLE document_blobs ENABLE ROW LEVEL SECURITY;
+
+-- ⚙️ FUNCTIONS
+CREATE OR REPLACE FUNCTION acquire_document_blob(p_sha256 TEXT, p_file_path TEXT, p_file_size BIGINT)
+RETURNS TABLE (ref_count INTEGER, file_path TEXT)
+LANGUAGE sql
+AS $$
+    INSERT INTO document_blobs AS b (sha256, file_path, file_size, ref_count)
+    VALUES (p_sha256, p_file_path, p_file_size, 1)
+    ON CONFLICT (sha256) DO UPDATE
+        SET ref_count = b.ref_count + 1,
+            updated_at = NOW()
+    RETURNING b.ref_count, b.file_path;
+$$;
+
+-- Returns the remaining reference count (0 = blob row removed, file can be deleted)
+CREATE OR REPLACE FUNCTION release_document_blob(p_sha256 TEXT)
+RETURNS INTEGER
+LANGUAGE plpgsql
+AS $$
+DECLARE
+    v_remaining INTEGER;
+BEGIN
+    UPDATE document_blobs
+       SET ref_count = GREATEST(ref_count - 1, 0),
+           updated_at = NOW()
+     WHERE sha256 = p_sha256
+    RETURNING ref_count INTO v_remaining;
+
+    IF v_remaining IS NULL THEN
+        RETURN 0;
+    END IF;
+
+    IF v_remaining = 0 THEN
+        DELETE FROM document_blobs WHERE sha256 = p_sha256 AND ref_count = 0;
+    END IF;
+
+    RETURN v_remaining;
+END;
+$$;
+
+-- ⚡ INDEXES
+CREATE INDEX IF NOT EXISTS idx_documents_content_hash_processed
+    ON documents (content_hash)
+    WHERE ocr_status = 'completed';
@@ -0,0 +1,53 @@
+-- Optimization: Batched embedding ingestion for document_chunks
+-- Generated: 2026-02-15
+-- Description:
+-- Re-indexing (agents/knowledge/ingestion.py) embeds chunks in multi-input requests
+-- and writes the vectors back in bulk. embedding_hash stores sha256(model + content)
+-- of the text that produced the current vector. Chunks whose hash still matches are
+-- skipped, so re-indexing a source only pays for the chunks that actually changed.
+-- legal_sources.needs_reindexing is set by mark_source_for_reindexing() (20260203)
+-- and cleared by the ingestion engine once every chunk of the source is embedded.
+
+-- 🧱 TABLES
+ALTER TABLE document_chunks
+    ADD COLUMN IF NOT EXISTS embedding_hash TEXT,
+    ADD COLUMN IF NOT EXISTS embedded_at TIMESTAMPTZ;
+
+-- ⚙️ FUNCTIONS
+-- One UPDATE ... FROM for a whole batch of vectors.
+-- p_rows: [{"id": uuid, "embedding": [float, ...], "embedding_hash": text}, ...]
+-- A plain PostgREST upsert would try to INSERT partial rows first, which violates
+-- the NOT NULL columns of document_chunks, so the update goes through this function.
+CREATE OR REPLACE FUNCTION bulk_update_chunk_embeddings(p_rows JSONB)
+RETURNS INTEGER
+LANGUAGE plpgsql
+SECURITY DEFINER
+SET search_path = public
+AS $$
+DECLARE
+    v_updated INTEGER;
+BEGIN
+    UPDATE document_chunks AS c
+    SET embedding = (r.embedding::TEXT)::vector,
+        embedding_hash = r.embedding_hash,
+        embedded_at = NOW()
+    FROM jsonb_to_recordset(p_rows) AS r(id UUID, embedding JSONB, embedding_hash TEXT)
+    WHERE c.id = r.id;
+
+    GET DIAGNOSTICS v_updated = ROW_COUNT;
+    RETURN v_updated;
+END;
+$$;
+
+-- 🔒 SECURITY
+REVOKE ALL ON FUNCTION bulk_update_chunk_embeddings(JSONB) FROM PUBLIC, anon, authenticated;
+
+-- ⚡ INDEXES
+-- Keyset pagination over the chunks of one source
+CREATE INDEX IF NOT EXISTS idx_document_chunks_source_id_id
+    ON document_chunks (source_id, id);
+
+-- Pending work for process_flagged()
+CREATE INDEX IF NOT EXISTS idx_legal_sources_needs_reindexing
+    ON legal_sources (id)
+    WHERE needs_reindexing = TRUE;
@@ -0,0 +1,77 @@
+-- Optimization: Diff-aware re-chunking of amended legal sources
+-- Generated: 2026-02-16
+-- Description:
+-- mark_source_for_reindexing() (20260203) flags a legal source when full_content_md
+-- changes. agents/knowledge/reindexer.py splits the new text by article, aligns it with
+-- the existing document_chunks by content hash and sends only the differences here:
+-- renumbered rows, rows with new content, new rows and removed rows. Unchanged chunks
+-- keep their id, enrichment and embedding. Only changed chunks are re-embedded
+-- (embedding_hash no longer matches, see 20260215).
+-- sequence_number is rewritten to a contiguous 1..N in one transaction, so
+-- ReadDocumentTool._fetch_neighbors (N-1 / N+1) keeps finding the adjacent chunks.
+
+-- ⚙️ FUNCTIONS
+-- p_rows: [{"id", "sequence_number", "hierarchy_path", "is_new",
+--           "content"?, "chunk_word_count"?}]   (content present = text changed)
+-- Returns the number of inserted chunks.
+CREATE OR REPLACE FUNCTION apply_source_rechunk(
+    p_source_id UUID,
+    p_rows JSONB,
+    p_delete_ids UUID[]
+)
+RETURNS INTEGER
+LANGUAGE plpgsql
+SECURITY DEFINER
+SET search_path = public
+AS $$
+DECLARE
+    v_inserted INTEGER;
+BEGIN
+    DELETE FROM document_chunks
+    WHERE source_id = p_source_id AND id = ANY(p_delete_ids);
+
+    -- Park renumbered rows on negative numbers first, so shifting 5→6 while 6→7
+    -- never collides on (source_id, sequence_number)
+    UPDATE document_chunks AS c
+    SET sequence_number = -r.sequence_number
+    FROM jsonb_to_recordset(p_rows) AS r(id UUID, sequence_number INTEGER, is_new BOOLEAN)
+    WHERE c.id = r.id AND c.source_id = p_source_id AND NOT r.is_new;
+
+    UPDATE document_chunks AS c
+    SET sequence_number = r.sequence_number,
+        hierarchy_path = r.hierarchy_path,
+        content = COALESCE(r.content, c.content),
+        chunk_word_count = COALESCE(r.chunk_word_count, c.chunk_word_count),
+        -- The old vector stays searchable until the new one is written
+        embedding_hash = CASE WHEN r.content IS NULL THEN c.embedding_hash END
+    FROM jsonb_to_recordset(p_rows) AS r(
+        id UUID, sequence_number INTEGER, hierarchy_path TEXT,
+        content TEXT, chunk_word_count INTEGER, is_new BOOLEAN
+    )
+    WHERE c.id = r.id AND c.source_id = p_source_id AND NOT r.is_new;
+
+    INSERT INTO document_chunks (
+        id, source_id, country_id, source_title,
+        content, sequence_number, hierarchy_path, chunk_word_count
+    )
+    SELECT r.id, s.id, s.country_id, s.title,
+           r.content, r.sequence_number, r.hierarchy_path, r.chunk_word_count
+    FROM jsonb_to_recordset(p_rows) AS r(
+        id UUID, sequence_number INTEGER, hierarchy_path TEXT,
+        content TEXT, chunk_word_count INTEGER, is_new BOOLEAN
+    )
+    JOIN legal_sources AS s ON s.id = p_source_id
+    WHERE r.is_new;
+
+    GET DIAGNOSTICS v_inserted = ROW_COUNT;
+    RETURN v_inserted;
+END;
+$$;
+
+-- 🔒 SECURITY
+REVOKE ALL ON FUNCTION apply_source_rechunk(UUID, JSONB, UUID[]) FROM PUBLIC, anon, authenticated;
+
+-- ⚡ INDEXES
+-- Existing chunks of a source in reading order (diff input, neighbour lookups)
+CREATE INDEX IF NOT EXISTS idx_document_chunks_source_sequence
+    ON document_chunks (source_id, sequence_number);
@@ -0,0 +1,164 @@
+-- Optimization: Quantized first-stage vector search with full-precision rescoring
+-- Generated: 2026-02-17
+-- Description:
+-- document_chunks.embedding is a 1024-dim float32 vector (bge-m3, 4 KB per row).
+-- At the current corpus size its ivfflat index no longer fits in shared_buffers,
+-- so vector queries read from disk. This adds two compact copies, kept in sync by
+-- a trigger:
+--   embedding_half  halfvec(1024)  2 KB/row  (float16)
+--   embedding_bin   bit(1024)      128 B/row (sign bit per dimension)
+-- Each copy has an HNSW index. match_documents_quantized() gets
+-- match_count × candidate_multiplier candidates from the compact index and rescores
+-- them with the full-precision vector, so the returned similarities are exact.
+-- Existing rows are filled by backfill_quantized_embeddings() in batches, driven by
+-- agents/knowledge/quantization.py. The trigger covers every later write.
+-- Requires pgvector >= 0.7 (halfvec, bit, binary_quantize). Iterative index scans
+-- for filtered queries need 0.8; on older versions that setting is skipped.
+
+CREATE EXTENSION IF NOT EXISTS vector;
+
+-- 🧱 TABLES
+ALTER TABLE document_chunks
+    ADD COLUMN IF NOT EXISTS embedding_half halfvec(1024),
+    ADD COLUMN IF NOT EXISTS embedding_bin bit(1024);
+
+-- ⚙️ FUNCTIONS
+CREATE OR REPLACE FUNCTION sync_quantized_embeddings()
+RETURNS TRIGGER
+LANGUAGE plpgsql
+AS $$
+BEGIN
+    IF NEW.embedding IS NULL THEN
+        NEW.embedding_half := NULL;
+        NEW.embedding_bin := NULL;
+    ELSE
+        NEW.embedding_half := NEW.embedding::halfvec(1024);
+        NEW.embedding_bin := binary_quantize(NEW.embedding)::bit(1024);
+    END IF;
+    RETURN NEW;
+END;
+$$;
+
+DROP TRIGGER IF EXISTS trg_sync_quantized_embeddings ON document_chunks;
+CREATE TRIGGER trg_sync_quantized_embeddings
+BEFORE INSERT OR UPDATE OF embedding ON document_chunks
+FOR EACH ROW
+EXECUTE FUNCTION sync_quantized_embeddings();
+
+-- Fill compact columns for rows embedded before this migration (one batch per call)
+CREATE OR REPLACE FUNCTION backfill_quantized_embeddings(p_batch_size INTEGER DEFAULT 2000)
+RETURNS INTEGER
+LANGUAGE plpgsql
+SECURITY DEFINER
+SET search_path = public
+AS $$
+DECLARE
+    v_updated INTEGER;
+BEGIN
+    WITH batch AS (
+        SELECT id FROM document_chunks
+        WHERE embedding IS NOT NULL AND embedding_bin IS NULL
+        LIMIT p_batch_size
+        FOR UPDATE SKIP LOCKED
+    )
+    UPDATE document_chunks AS c
+    SET embedding_half = c.embedding::halfvec(1024),
+        embedding_bin = binary_quantize(c.embedding)::bit(1024)
+    FROM batch
+    WHERE c.id = batch.id;
+
+    GET DIAGNOSTICS v_updated = ROW_COUNT;
+    RETURN v_updated;
+END;
+$$;
+
+-- First stage on the compact index, second stage exact cosine on the full vector.
+-- p_first_stage: 'binary' (hamming on embedding_bin) or 'half' (cosine on embedding_half)
+CREATE OR REPLACE FUNCTION match_documents_quantized(
+    query_embedding vector(1024),
+    match_threshold FLOAT,
+    match_count INTEGER,
+    filter JSONB DEFAULT '{}',
+    p_first_stage TEXT DEFAULT 'binary',
+    p_candidate_multiplier INTEGER DEFAULT 8
+)
+RETURNS TABLE (
+    id UUID,
+    content TEXT,
+    similarity FLOAT,
+    metadata JSONB
+)
+LANGUAGE plpgsql
+STABLE
+AS $$
+DECLARE
+    v_candidates INTEGER := GREATEST(match_count * p_candidate_multiplier, match_count);
+    v_country UUID := (filter ->> 'country_id')::UUID;
+BEGIN
+    -- The HNSW scan must be allowed to return every requested candidate
+    PERFORM set_config('hnsw.ef_search', GREATEST(40, v_candidates)::TEXT, TRUE);
+    IF v_country IS NOT NULL THEN
+        BEGIN
+            -- pgvector 0.8+: keep scanning until enough rows pass the country filter
+            PERFORM set_config('hnsw.iterative_scan', 'relaxed_order', TRUE);
+        EXCEPTION WHEN OTHERS THEN
+            NULL;
+        END;
+    END IF;
+
+    RETURN QUERY
+    WITH candidates AS (
+        SELECT dc.id
+        FROM document_chunks AS dc
+        WHERE p_first_stage = 'binary'
+          AND dc.embedding_bin IS NOT NULL
+          AND (v_country IS NULL OR dc.country_id = v_country)
+        ORDER BY dc.embedding_bin <~> binary_quantize(query_embedding)::bit(1024)
+        LIMIT v_candidates
+    ),
+    half_candidates AS (
+        SELECT dc.id
+        FROM document_chunks AS dc
+        WHERE p_first_stage = 'half'
+          AND dc.embedding_half IS NOT NULL
+          AND (v_country IS NULL OR dc.country_id = v_country)
+        ORDER BY dc.embedding_half <=> query_embedding::halfvec(1024)
+        LIMIT v_candidates
+    ),
+    rescored AS (
+        SELECT
+            c.id,
+            c.content,
+            1 - (c.embedding <=> query_embedding) AS similarity,
+            jsonb_build_object(
+                'source_id', c.source_id,
+                'country_id', c.country_id,
+                'sequence_number', c.sequence_number,
+                'ai_summary', c.ai_summary
+            ) AS metadata
+        FROM document_chunks AS c
+        WHERE c.id IN (SELECT candidates.id FROM candidates UNION ALL SELECT half_candidates.id FROM half_candidates)
+    )
+    SELECT r.id, r.content, r.similarity, r.metadata
+    FROM rescored AS r
+    WHERE r.similarity > match_threshold
+    ORDER BY r.similarity DESC
+    LIMIT match_count;
+END;
+$$;
+
+-- 🔒 SECURITY
+REVOKE ALL ON FUNCTION backfill_quantized_embeddings(INTEGER) FROM PUBLIC, anon, authenticated;
+
+-- ⚡ INDEXES
+-- 128 B/row: the whole binary index stays in memory
+CREATE INDEX IF NOT EXISTS idx_document_chunks_embedding_bin
+    ON document_chunks USING hnsw (embedding_bin bit_hamming_ops);
+
+CREATE INDEX IF NOT EXISTS idx_document_chunks_embedding_half
+    ON document_chunks USING hnsw (embedding_half halfvec_cosine_ops);
+
+-- Remaining backfill work
+CREATE INDEX IF NOT EXISTS idx_document_chunks_unquantized
+    ON document_chunks (id)
+    WHERE embedding IS NOT NULL AND embedding_bin IS NULL;
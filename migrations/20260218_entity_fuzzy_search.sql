@@ -0,0 +1,145 @@
+-- Optimization: Index-backed, Arabic-normalized fuzzy search for clients / cases / police records
+-- Generated: 2026-02-18
+-- Depends on: normalize_arabic() from 20260206_optimize_search_ranking.sql
+-- Description:
+-- ClientStorage.search_clients ran an ILIKE OR over four columns. When nothing
+-- matched, it downloaded every client of the lawyer and fuzzy-matched names in
+-- Python. CaseStorage.search_cases ran unindexed ILIKEs. The police records
+-- endpoint loaded every record and filtered substrings in Python.
+-- 1. fold_arabic(): normalize_arabic() plus hamza carriers (ؤ→و, ئ→ي, ء dropped)
+--    and lower-casing, so "مؤسسة" / "موسسه" and "Ahmed" / "ahmed" compare equal.
+-- 2. A generated search_norm column on each entity, with a trigram GIN index.
+-- 3. search_entities(): one ranked RPC over all three entities. Substring matches
+--    score 1.0. Everything else is ranked by word_similarity(), and each entity
+--    gets its own limit. Both predicates (LIKE and <%) are served by the trigram
+--    index, so a typo in a name is an index probe rather than a full download.
+
+CREATE EXTENSION IF NOT EXISTS pg_trgm;
+
+-- ⚙️ FUNCTIONS
+CREATE OR REPLACE FUNCTION fold_arabic(input_text TEXT)
+RETURNS TEXT
+LANGUAGE sql
+IMMUTABLE
+PARALLEL SAFE
+AS $$
+  SELECT lower(translate(normalize_arabic(coalesce(input_text, '')), 'ؤئء', 'وي'));
+$$;
+
+-- 🧱 TABLES
+-- text || text is immutable (concat_ws is not), which generated columns require
+ALTER TABLE clients
+  ADD COLUMN IF NOT EXISTS search_norm TEXT GENERATED ALWAYS AS (
+    fold_arabic(
+      coalesce(full_name, '') || ' ' || coalesce(phone, '') || ' ' ||
+      coalesce(national_id, '') || ' ' || coalesce(email, '') || ' ' || coalesce(address, '')
+    )
+  ) STORED;
+
+ALTER TABLE cases
+  ADD COLUMN IF NOT EXISTS search_norm TEXT GENERATED ALWAYS AS (
+    fold_arabic(
+      coalesce(case_number, '') || ' ' || coalesce(subject, '') || ' ' || coalesce(court_name, '')
+    )
+  ) STORED;
+
+ALTER TABLE police_records
+  ADD COLUMN IF NOT EXISTS search_norm TEXT GENERATED ALWAYS AS (
+    fold_arabic(
+      coalesce(record_number, '') || ' ' || coalesce(police_station, '') || ' ' ||
+      coalesce(complainant_name, '') || ' ' || coalesce(accused_name, '')
+    )
+  ) STORED;
+
+
+-- 🔎 ENTITY SEARCH
+-- Usage: supabase.rpc('search_entities', { p_lawyer_id, p_query, p_entities, p_limit, p_min_score })
+CREATE OR REPLACE FUNCTION search_entities(
+  p_lawyer_id UUID,
+  p_query TEXT,
+  p_entities TEXT[] DEFAULT ARRAY['clients', 'cases', 'police_records'],
+  p_limit INT DEFAULT 10,
+  p_min_score FLOAT DEFAULT 0.4
+)
+RETURNS TABLE (
+  entity TEXT,
+  id UUID,
+  score FLOAT,
+  record JSONB
+)
+LANGUAGE plpgsql
+STABLE
+AS $$
+DECLARE
+  norm_query TEXT;
+  like_query TEXT;
+BEGIN
+  norm_query := btrim(regexp_replace(fold_arabic(p_query), '\s+', ' ', 'g'));
+  IF length(norm_query) = 0 THEN
+    RETURN;
+  END IF;
+  like_query := '%' || replace(replace(replace(norm_query, '\', '\\'), '%', '\%'), '_', '\_') || '%';
+  -- Lets the <% operator (and its index scan) apply the same cut-off as the ranking
+  PERFORM set_config('pg_trgm.word_similarity_threshold', p_min_score::TEXT, TRUE);
+
+  IF 'clients' = ANY(p_entities) THEN
+    RETURN QUERY
+    SELECT 'clients'::TEXT, c.id, s.score, to_jsonb(c) - 'search_norm'
+    FROM clients AS c
+    CROSS JOIN LATERAL (
+      SELECT (CASE WHEN c.search_norm LIKE like_query THEN 1.0
+                   ELSE word_similarity(norm_query, c.search_norm) END)::FLOAT AS score
+    ) AS s
+    WHERE c.lawyer_id = p_lawyer_id
+      AND (c.search_norm LIKE like_query OR norm_query <% c.search_norm)
+    ORDER BY s.score DESC, c.created_at DESC
+    LIMIT p_limit;
+  END IF;
+
+  IF 'cases' = ANY(p_entities) THEN
+    RETURN QUERY
+    SELECT 'cases'::TEXT, k.id, s.score,
+           (to_jsonb(k) - 'search_norm') || jsonb_build_object('clients', jsonb_build_object('full_name', cl.full_name))
+    FROM cases AS k
+    LEFT JOIN clients AS cl ON cl.id = k.client_id
+    CROSS JOIN LATERAL (
+      SELECT (CASE WHEN k.search_norm LIKE like_query THEN 1.0
+                   ELSE word_similarity(norm_query, k.search_norm) END)::FLOAT AS score
+    ) AS s
+    WHERE k.lawyer_id = p_lawyer_id
+      AND (k.search_norm LIKE like_query OR norm_query <% k.search_norm)
+    ORDER BY s.score DESC, k.created_at DESC
+    LIMIT p_limit;
+  END IF;
+
+  IF 'police_records' = ANY(p_entities) THEN
+    RETURN QUERY
+    SELECT 'police_records'::TEXT, p.id, s.score,
+           (to_jsonb(p) - 'search_norm') || jsonb_build_object('case', jsonb_build_object('case_number', k.case_number))
+    FROM police_records AS p
+    LEFT JOIN cases AS k ON k.id = p.case_id
+    CROSS JOIN LATERAL (
+      SELECT (CASE WHEN p.search_norm LIKE like_query THEN 1.0
+                   ELSE word_similarity(norm_query, p.search_norm) END)::FLOAT AS score
+    ) AS s
+    WHERE p.user_id = p_lawyer_id
+      AND (p.search_norm LIKE like_query OR norm_query <% p.search_norm)
+    ORDER BY s.score DESC, p.created_at DESC
+    LIMIT p_limit;
+  END IF;
+END;
+$$;
+
+
+-- ⚡ INDEXES
+CREATE INDEX IF NOT EXISTS idx_clients_search_norm_trgm
+ON clients
+USING GIN (search_norm gin_trgm_ops);
+
+CREATE INDEX IF NOT EXISTS idx_cases_search_norm_trgm
+ON cases
+USING GIN (search_norm gin_trgm_ops);
+
+CREATE INDEX IF NOT EXISTS idx_police_records_search_norm_trgm
+ON police_records
+USING GIN (search_norm gin_trgm_ops);
@@ -0,0 +1,63 @@
+-- Optimization: Batched neighbourhood (N-k .. N+k) fetch for document chunks
+-- Generated: 2026-02-19
+-- Depends on: idx_document_chunks_source_sequence from 20260216_incremental_rechunk.sql
+-- Description:
+-- Deep research expanded each of its top results through ReadDocumentTool. Every
+-- expansion selected the chunk and then its N-1 / N+1 neighbours, which is about six
+-- sequential round trips for the top 3. GetRelatedDocumentTool walked siblings the
+-- same way. fetch_chunk_windows() takes any number of anchors and returns every
+-- window in one query. An anchor is either a (source_id, sequence_number) pair or a
+-- chunk_id, which is resolved in the same statement. The window positions come from
+-- a generate_series join, so each position is one probe of the
+-- (source_id, sequence_number) index.
+-- The caller is agents/knowledge/chunk_neighborhood.py, which also keeps an LRU of
+-- hot chunks.
+
+-- ⚙️ FUNCTIONS
+-- p_anchors: [{"source_id", "sequence_number"} | {"chunk_id"}, ...]
+-- Returns one row per (anchor, existing chunk in its window). anchor_index is the
+-- 0-based position in p_anchors, and center_sequence is the anchor's own sequence_number.
+CREATE OR REPLACE FUNCTION fetch_chunk_windows(
+    p_anchors JSONB,
+    p_radius INTEGER DEFAULT 1
+)
+RETURNS TABLE (
+    anchor_index INTEGER,
+    center_sequence INTEGER,
+    id UUID,
+    source_id UUID,
+    sequence_number INTEGER,
+    content TEXT,
+    ai_summary TEXT,
+    hierarchy_path TEXT
+)
+LANGUAGE sql
+STABLE
+AS $$
+    WITH anchors AS (
+        SELECT
+            (a.ordinality - 1)::INTEGER AS anchor_index,
+            COALESCE(a.source_id, ac.source_id) AS source_id,
+            COALESCE(a.sequence_number, ac.sequence_number) AS center_sequence
+        FROM ROWS FROM (
+            jsonb_to_recordset(p_anchors) AS (source_id UUID, sequence_number INTEGER, chunk_id UUID)
+        ) WITH ORDINALITY AS a(source_id, sequence_number, chunk_id, ordinality)
+        LEFT JOIN document_chunks AS ac ON ac.id = a.chunk_id
+    )
+    SELECT
+        an.anchor_index,
+        an.center_sequence,
+        c.id,
+        c.source_id,
+        c.sequence_number,
+        c.content,
+        c.ai_summary,
+        c.hierarchy_path::TEXT
+    FROM anchors AS an
+    CROSS JOIN LATERAL generate_series(an.center_sequence - p_radius, an.center_sequence + p_radius) AS w(seq)
+    JOIN document_chunks AS c
+      ON c.source_id = an.source_id
+     AND c.sequence_number = w.seq
+    WHERE an.source_id IS NOT NULL AND an.center_sequence IS NOT NULL
+    ORDER BY an.anchor_index, c.sequence_number;
+$$;
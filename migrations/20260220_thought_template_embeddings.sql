@@ -0,0 +1,111 @@
+-- Optimization: Vector index for legal principles (thought_templates)
+-- Generated: 2026-02-20
+-- Description:
+-- thought_templates.template_embedding was never filled. LookupPrincipleTool and the
+-- deep research principle step therefore used keyword search: up to 5 words × N
+-- ILIKE '%w%' OR clauses over template_text, which is a sequential scan that misses
+-- paraphrases.
+-- 1. embedding_hash / embedded_at (same scheme as document_chunks, 20260215): the
+--    backfill job (agents/knowledge/principle_index.py) embeds only templates whose
+--    text changed, then writes the vectors back in bulk through
+--    bulk_update_template_embeddings().
+-- 2. match_thought_templates(): cosine match with the type and confidence filters
+--    applied in SQL. The query vector is a native vector parameter (sent as a JSON
+--    float array), not a formatted text literal. The similarity threshold is
+--    separate from the template's confidence_score.
+-- 3. HNSW index on template_embedding. HNSW needs a fixed dimension, so the column
+--    becomes vector(1024) (bge-m3, same as document_chunks.embedding). It was never
+--    filled; any vector of another size is cleared and re-embedded by the backfill.
+
+-- 🧱 TABLES
+ALTER TABLE thought_templates
+    ADD COLUMN IF NOT EXISTS embedding_hash TEXT,
+    ADD COLUMN IF NOT EXISTS embedded_at TIMESTAMPTZ;
+
+UPDATE thought_templates
+SET template_embedding = NULL, embedding_hash = NULL
+WHERE template_embedding IS NOT NULL AND vector_dims(template_embedding) <> 1024;
+
+ALTER TABLE thought_templates
+    ALTER COLUMN template_embedding TYPE vector(1024);
+
+-- ⚙️ FUNCTIONS
+-- p_rows: [{"id": uuid, "embedding": [float, ...], "embedding_hash": text}, ...]
+CREATE OR REPLACE FUNCTION bulk_update_template_embeddings(p_rows JSONB)
+RETURNS INTEGER
+LANGUAGE plpgsql
+SECURITY DEFINER
+SET search_path = public
+AS $$
+DECLARE
+    v_updated INTEGER;
+BEGIN
+    UPDATE thought_templates AS t
+    SET template_embedding = (r.embedding::TEXT)::vector(1024),
+        embedding_hash = r.embedding_hash,
+        embedded_at = NOW()
+    FROM jsonb_to_recordset(p_rows) AS r(id UUID, embedding JSONB, embedding_hash TEXT)
+    WHERE t.id = r.id;
+
+    GET DIAGNOSTICS v_updated = ROW_COUNT;
+    RETURN v_updated;
+END;
+$$;
+
+-- Replace any earlier signature so PostgREST does not see ambiguous overloads
+DO $$
+DECLARE
+    r RECORD;
+BEGIN
+    FOR r IN SELECT oid::regprocedure AS signature FROM pg_proc WHERE proname = 'match_thought_templates' LOOP
+        EXECUTE 'DROP FUNCTION ' || r.signature;
+    END LOOP;
+END;
+$$;
+
+CREATE FUNCTION match_thought_templates(
+    query_embedding vector(1024),
+    match_threshold FLOAT DEFAULT 0.45,
+    match_count INTEGER DEFAULT 5,
+    p_principle_type TEXT DEFAULT NULL,
+    p_min_confidence FLOAT DEFAULT 0
+)
+RETURNS TABLE (
+    id UUID,
+    template_text TEXT,
+    principle_type TEXT,
+    confidence_score FLOAT,
+    is_absolute BOOLEAN,
+    exceptions TEXT,
+    occurrence_count INTEGER,
+    keywords TEXT,
+    similarity FLOAT
+)
+LANGUAGE sql
+STABLE
+AS $$
+    SELECT
+        t.id,
+        t.template_text,
+        t.principle_type::TEXT,
+        t.confidence_score::FLOAT,
+        t.is_absolute,
+        t.exceptions::TEXT,
+        t.occurrence_count::INTEGER,
+        t.keywords::TEXT,
+        (1 - (t.template_embedding <=> query_embedding))::FLOAT AS similarity
+    FROM thought_templates AS t
+    WHERE t.template_embedding IS NOT NULL
+      AND (p_principle_type IS NULL OR t.principle_type = p_principle_type)
+      AND COALESCE(t.confidence_score, 0) >= p_min_confidence
+      AND 1 - (t.template_embedding <=> query_embedding) > match_threshold
+    ORDER BY t.template_embedding <=> query_embedding
+    LIMIT match_count;
+$$;
+
+-- 🔒 SECURITY
+REVOKE ALL ON FUNCTION bulk_update_template_embeddings(JSONB) FROM PUBLIC, anon, authenticated;
+
+-- ⚡ INDEXES
+CREATE INDEX IF NOT EXISTS idx_thought_templates_embedding_hnsw
+    ON thought_templates USING hnsw (template_embedding vector_cosine_ops);
@@ -0,0 +1,108 @@
+-- Optimization: Article number column for direct article lookups
+-- Generated: 2026-02-21
+-- Depends on: 20260216_incremental_rechunk.sql
+-- Description:
+-- "المادة 368" was found by text search. The number was spelled out at query time
+-- (arabic_numbers.number_to_arabic_text) and sent to check_text_existence as extra
+-- OR variants, which widened the FTS / trigram query and slowed it down.
+-- 1. document_chunks.article_no: the article number of the chunk. It is parsed
+--    at ingestion time from the heading, whether written in digits or in words
+--    ("المادة الثامنة والستون بعد الثلاثمائة" → 368).
+--    - agents/knowledge/reindexer.py writes it through apply_source_rechunk().
+--    - Existing chunks are filled by `python -m agents.knowledge.article_index backfill`
+--      through bulk_update_chunk_articles().
+-- 2. A (source_id, article_no) index. An article of a known law is then one index
+--    seek (agents/knowledge/article_index.py). The text variants remain only as a
+--    fallback for chunks without a number.
+
+-- 🧱 TABLES
+ALTER TABLE document_chunks
+    ADD COLUMN IF NOT EXISTS article_no INTEGER;
+
+-- ⚙️ FUNCTIONS
+-- p_rows: [{"id": uuid, "article_no": int | null}, ...]
+CREATE OR REPLACE FUNCTION bulk_update_chunk_articles(p_rows JSONB)
+RETURNS INTEGER
+LANGUAGE plpgsql
+SECURITY DEFINER
+SET search_path = public
+AS $$
+DECLARE
+    v_updated INTEGER;
+BEGIN
+    UPDATE document_chunks AS c
+    SET article_no = r.article_no
+    FROM jsonb_to_recordset(p_rows) AS r(id UUID, article_no INTEGER)
+    WHERE c.id = r.id
+      AND c.article_no IS DISTINCT FROM r.article_no;
+
+    GET DIAGNOSTICS v_updated = ROW_COUNT;
+    RETURN v_updated;
+END;
+$$;
+
+-- Same as 20260216, plus article_no on updated and inserted rows
+CREATE OR REPLACE FUNCTION apply_source_rechunk(
+    p_source_id UUID,
+    p_rows JSONB,
+    p_delete_ids UUID[]
+)
+RETURNS INTEGER
+LANGUAGE plpgsql
+SECURITY DEFINER
+SET search_path = public
+AS $$
+DECLARE
+    v_inserted INTEGER;
+BEGIN
+    DELETE FROM document_chunks
+    WHERE source_id = p_source_id AND id = ANY(p_delete_ids);
+
+    -- Park renumbered rows on negative numbers first, so shifting 5→6 while 6→7
+    -- never collides on (source_id, sequence_number)
+    UPDATE document_chunks AS c
+    SET sequence_number = -r.sequence_number
+    FROM jsonb_to_recordset(p_rows) AS r(id UUID, sequence_number INTEGER, is_new BOOLEAN)
+    WHERE c.id = r.id AND c.source_id = p_source_id AND NOT r.is_new;
+
+    UPDATE document_chunks AS c
+    SET sequence_number = r.sequence_number,
+        hierarchy_path = r.hierarchy_path,
+        article_no = r.article_no,
+        content = COALESCE(r.content, c.content),
+        chunk_word_count = COALESCE(r.chunk_word_count, c.chunk_word_count),
+        -- The old vector stays searchable until the new one is written
+        embedding_hash = CASE WHEN r.content IS NULL THEN c.embedding_hash END
+    FROM jsonb_to_recordset(p_rows) AS r(
+        id UUID, sequence_number INTEGER, hierarchy_path TEXT, article_no INTEGER,
+        content TEXT, chunk_word_count INTEGER, is_new BOOLEAN
+    )
+    WHERE c.id = r.id AND c.source_id = p_source_id AND NOT r.is_new;
+
+    INSERT INTO document_chunks (
+        id, source_id, country_id, source_title,
+        content, sequence_number, hierarchy_path, article_no, chunk_word_count
+    )
+    SELECT r.id, s.id, s.country_id, s.title,
+           r.content, r.sequence_number, r.hierarchy_path, r.article_no, r.chunk_word_count
+    FROM jsonb_to_recordset(p_rows) AS r(
+        id UUID, sequence_number INTEGER, hierarchy_path TEXT, article_no INTEGER,
+        content TEXT, chunk_word_count INTEGER, is_new BOOLEAN
+    )
+    JOIN legal_sources AS s ON s.id = p_source_id
+    WHERE r.is_new;
+
+    GET DIAGNOSTICS v_inserted = ROW_COUNT;
+    RETURN v_inserted;
+END;
+$$;
+
+-- 🔒 SECURITY
+REVOKE ALL ON FUNCTION bulk_update_chunk_articles(JSONB) FROM PUBLIC, anon, authenticated;
+REVOKE ALL ON FUNCTION apply_source_rechunk(UUID, JSONB, UUID[]) FROM PUBLIC, anon, authenticated;
+
+-- ⚡ INDEXES
+-- An article of a law in reading order (long articles span several chunks)
+CREATE INDEX IF NOT EXISTS idx_document_chunks_source_article
+    ON document_chunks (source_id, article_no, sequence_number)
+    WHERE article_no IS NOT NULL;
@@ -0,0 +1,57 @@
+-- Optimization: Incremental conversation context
+-- Generated: 2026-02-22
+-- Depends on: 20260210_chat_search_indexes.sql
+-- Description:
+-- Each research turn re-scanned the last messages with the article / law / topic
+-- regexes (ConversationStateManager.extract_context_from_history). ChatService
+-- also reloaded 10-20 messages per message.
+-- 1. Entities are extracted once per message, when it is saved, and stored in
+--    ai_chat_messages.metadata.entities.
+-- 2. ai_chat_sessions.conversation_context: the running session context. Each
+--    saved message is folded into it (ConversationStateManager.fold_message).
+--    A new turn reads it from the session row that is already loaded for the
+--    ownership check.
+-- 3. append_chat_message: inserts the message and stores the new context in one
+--    call (api/services/chat_service.py ChatService._save_message).
+-- 4. conversation_context_version: bumped with every context write. The fold runs
+--    in Python, so a writer sends the version it folded from and a concurrent turn
+--    that saved first is detected (20260223 atomic_step_transaction).
+
+-- 🧱 TABLES
+ALTER TABLE ai_chat_sessions
+    ADD COLUMN IF NOT EXISTS conversation_context JSONB,
+    ADD COLUMN IF NOT EXISTS conversation_context_version INTEGER NOT NULL DEFAULT 0;
+
+-- ⚙️ FUNCTIONS
+-- p_context NULL keeps the current session context
+CREATE OR REPLACE FUNCTION append_chat_message(
+    p_session_id UUID,
+    p_role TEXT,
+    p_content TEXT,
+    p_metadata JSONB,
+    p_context JSONB
+)
+RETURNS JSONB
+LANGUAGE plpgsql
+SECURITY DEFINER
+SET search_path = public
+AS $$
+DECLARE
+    v_message ai_chat_messages;
+BEGIN
+    INSERT INTO ai_chat_messages (session_id, role, content, metadata, created_at)
+    VALUES (p_session_id, p_role, p_content, COALESCE(p_metadata, '{}'::jsonb), NOW())
+    RETURNING * INTO v_message;
+
+    UPDATE ai_chat_sessions
+    SET conversation_context = COALESCE(p_context, conversation_context),
+        conversation_context_version = conversation_context_version + CASE WHEN p_context IS NULL THEN 0 ELSE 1 END,
+        last_message_at = v_message.created_at
+    WHERE id = p_session_id;
+
+    RETURN to_jsonb(v_message);
+END;
+$$;
+
+-- 🔒 SECURITY
+REVOKE ALL ON FUNCTION append_chat_message(UUID, TEXT, TEXT, JSONB, JSONB) FROM PUBLIC, anon, authenticated;
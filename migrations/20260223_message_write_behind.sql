@@ -0,0 +1,107 @@
+-- Optimization: Write-behind, idempotent chat message persistence
+-- Generated: 2026-02-23
+-- Depends on: 20260203_atomic_memory_transaction.sql, 20260222_incremental_conversation_context.sql
+-- Description:
+-- ChatService inserted the user message before running the graph and waited for
+-- it. The worker path and the stream path each had their own insert code.
+-- A retried ARQ job inserted the user message a second time.
+-- 1. atomic_step_transaction gains p_context (the running conversation context)
+--    and p_message_id. The id is generated by the caller and is the idempotency
+--    key: a replayed id returns the stored row and changes nothing (no second
+--    insert, no second context fold).
+-- 2. p_agent_state NULL now keeps the stored state (user messages do not touch it).
+-- 3. append_chat_message (20260222) is replaced by this function
+--    (api/services/message_persistence.py).
+-- 4. p_context_version: the conversation_context_version the caller folded its
+--    context from. The session row is locked; if another turn stored a context in
+--    between, nothing is written and the stored context is returned
+--    ('conflict': true) so the caller folds its message onto it and retries.
+--    NULL skips the check (last write wins).
+
+-- ⚙️ FUNCTIONS
+DROP FUNCTION IF EXISTS append_chat_message(UUID, TEXT, TEXT, JSONB, JSONB);
+DROP FUNCTION IF EXISTS atomic_step_transaction(UUID, TEXT, TEXT, JSONB, JSONB, JSONB, UUID);
+DROP FUNCTION IF EXISTS atomic_step_transaction(UUID, TEXT, TEXT, JSONB, JSONB);
+
+CREATE OR REPLACE FUNCTION atomic_step_transaction(
+    p_session_id UUID,
+    p_role TEXT,
+    p_content TEXT,
+    p_metadata JSONB,
+    p_agent_state JSONB,
+    p_context JSONB DEFAULT NULL,
+    p_message_id UUID DEFAULT NULL,
+    p_context_version INTEGER DEFAULT NULL
+)
+RETURNS JSONB
+LANGUAGE plpgsql
+SECURITY DEFINER
+SET search_path = public
+AS $$
+DECLARE
+    v_message ai_chat_messages;
+    v_session ai_chat_sessions;
+BEGIN
+    -- Serializes the writes of one session (context read-check-write)
+    SELECT * INTO v_session FROM ai_chat_sessions WHERE id = p_session_id FOR UPDATE;
+
+    IF p_context IS NOT NULL
+       AND p_context_version IS NOT NULL
+       AND v_session.conversation_context_version <> p_context_version
+       AND NOT EXISTS (SELECT 1 FROM ai_chat_messages WHERE id = p_message_id) THEN
+        RETURN jsonb_build_object(
+            'success', false,
+            'conflict', true,
+            'context', v_session.conversation_context,
+            'context_version', v_session.conversation_context_version
+        );
+    END IF;
+
+    INSERT INTO ai_chat_messages (id, session_id, role, content, metadata, created_at)
+    VALUES (
+        COALESCE(p_message_id, gen_random_uuid()), p_session_id, p_role, p_content,
+        COALESCE(p_metadata, '{}'::jsonb), NOW()
+    )
+    ON CONFLICT (id) DO NOTHING
+    RETURNING * INTO v_message;
+
+    IF NOT FOUND THEN
+        -- Replayed id (job retry): the message and its session update are already stored
+        SELECT * INTO v_message
+        FROM ai_chat_messages
+        WHERE id = p_message_id AND session_id = p_session_id;
+
+        IF NOT FOUND THEN
+            RAISE EXCEPTION 'Message % does not belong to session %', p_message_id, p_session_id;
+        END IF;
+
+        RETURN jsonb_build_object(
+            'success', true,
+            'message_id', v_message.id,
+            'duplicate', true,
+            'context_version', v_session.conversation_context_version,
+            'message', to_jsonb(v_message)
+        );
+    END IF;
+
+    UPDATE ai_chat_sessions
+    SET agent_state = COALESCE(p_agent_state, agent_state),
+        conversation_context = COALESCE(p_context, conversation_context),
+        conversation_context_version = conversation_context_version
+            + CASE WHEN p_context IS NULL THEN 0 ELSE 1 END,
+        last_message_at = v_message.created_at
+    WHERE id = p_session_id
+    RETURNING conversation_context_version INTO v_session.conversation_context_version;
+
+    RETURN jsonb_build_object(
+        'success', true,
+        'message_id', v_message.id,
+        'duplicate', false,
+        'context_version', v_session.conversation_context_version,
+        'message', to_jsonb(v_message)
+    );
+END;
+$$;
+
+-- 🔒 SECURITY
+REVOKE ALL ON FUNCTION atomic_step_transaction(UUID, TEXT, TEXT, JSONB, JSONB, JSONB, UUID, INTEGER) FROM PUBLIC, anon, authenticated;
@@ -0,0 +1,136 @@
+"""
+Local ANN index benchmark (recall / latency)
+قياس دقة الاسترجاع وزمن البحث للفهرس المحلي مقارنة بالبحث الدقيق
+
+Synthetic mode (default) builds an index from clustered random vectors and
+compares it with an exact brute-force cosine scan, which returns the same
+ranking as pgvector without an approximate index.
+
+--pgvector mode builds the index from the real document_chunks embeddings
+(one country) and uses match_documents_v2 over HTTP as the reference, so the
+latency column shows what the RPC round trip costs.
+
+Usage:
+    python scripts/bench_ann_index.py [--count 30000] [--dim 1024] [--queries 200]
+    python scripts/bench_ann_index.py --pgvector --country <country_id>
+"""
+import argparse
+import asyncio
+import os
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+sys.path.append(os.path.join(os.getcwd()))
+
+from agents.knowledge.ann_index import ANNIndexBuilder, LocalANNIndex, build_partition
+
+K = 10
+
+
+def _percentile(samples, p):
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * p))]
+
+
+def _report(label, recalls, latencies_ms):
+    print(
+        f"{label:<24} recall@{K}={np.mean(recalls):.3f}  "
+        f"p50={_percentile(latencies_ms, 0.50):7.2f}ms  p99={_percentile(latencies_ms, 0.99):7.2f}ms"
+    )
+
+
+def _synthetic(count, dim, clusters=256, seed=0):
+    rng = np.random.default_rng(seed)
+    centers = rng.normal(size=(clusters, dim)).astype(np.float32)
+    vectors = centers[rng.integers(0, clusters, count)] + 1.0 * rng.normal(size=(count, dim)).astype(np.float32)
+    return [f"{i:08d}" for i in range(count)], vectors
+
+
+def _queries(vectors, count, seed=1):
+    rng = np.random.default_rng(seed)
+    picks = vectors[rng.choice(len(vectors), count, replace=False)]
+    return picks + 0.3 * rng.normal(size=picks.shape).astype(np.float32)
+
+
+def run_synthetic(args):
+    ids, vectors = _synthetic(args.count, args.dim)
+    queries = _queries(vectors, args.queries)
+    normed = vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+
+    with tempfile.TemporaryDirectory() as root:
+        start = time.perf_counter()
+        build_partition(os.path.join(root, "bench"), ids, vectors)
+        print(f"🗺️ Built {args.count} × {args.dim} in {time.perf_counter() - start:.1f}s")
+
+        truth, exact_ms = [], []
+        for q in queries:
+            start = time.perf_counter()
+            scores = normed @ (q / np.linalg.norm(q))
+            top = np.argpartition(-scores, K)[:K]
+            exact_ms.append((time.perf_counter() - start) * 1000)
+            truth.append({ids[i] for i in top})
+        _report("exact scan (float32)", [1.0], exact_ms)
+
+        index = LocalANNIndex(root=root)
+        for nprobe in args.nprobe:
+            recalls, latencies = [], []
+            for q, expected in zip(queries, truth):
+                start = time.perf_counter()
+                hits = index.search(q, K, country_id="bench", nprobe=nprobe)
+                latencies.append((time.perf_counter() - start) * 1000)
+                recalls.append(len(expected & {h for h, _ in hits}) / K)
+            _report(f"ivf nprobe={nprobe}", recalls, latencies)
+
+
+async def run_pgvector(args):
+    from agents.config.database import get_supabase_client
+
+    db = get_supabase_client()
+    with tempfile.TemporaryDirectory() as root:
+        builder = ANNIndexBuilder(db=db, root=root)
+        partitions = await builder._collect()
+        ids, vectors = partitions[args.country]
+        vectors = np.stack(vectors)
+        build_partition(os.path.join(root, args.country), ids, vectors)
+        print(f"🗺️ Built {len(ids)} real vectors for country {args.country}")
+
+        queries = _queries(vectors, min(args.queries, len(vectors)))
+        truth, rpc_ms = [], []
+        for q in queries:
+            start = time.perf_counter()
+            result = db.rpc("match_documents_v2", {
+                "query_embedding": q.tolist(), "match_threshold": -1.0,
+                "match_count": K, "filter": {"country_id": args.country}
+            }).execute()
+            rpc_ms.append((time.perf_counter() - start) * 1000)
+            truth.append({row["id"] for row in result.data or []})
+        _report("match_documents_v2 RPC", [1.0], rpc_ms)
+
+        index = LocalANNIndex(root=root)
+        for nprobe in args.nprobe:
+            recalls, latencies = [], []
+            for q, expected in zip(queries, truth):
+                start = time.perf_counter()
+                hits = index.search(q, K, country_id=args.country, nprobe=nprobe)
+                latencies.append((time.perf_counter() - start) * 1000)
+                recalls.append(len(expected & {h for h, _ in hits}) / max(1, len(expected)))
+            _report(f"ivf nprobe={nprobe}", recalls, latencies)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--count", type=int, default=30_000)
+    parser.add_argument("--dim", type=int, default=1024)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--nprobe", type=int, nargs="+", default=[4, 8, 16, 32])
+    parser.add_argument("--pgvector", action="store_true")
+    parser.add_argument("--country")
+    args = parser.parse_args()
+
+    if args.pgvector:
+        asyncio.run(run_pgvector(args))
+    else:
+        run_synthetic(args)
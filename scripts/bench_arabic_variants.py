@@ -0,0 +1,85 @@
+"""
+Arabic variant expansion microbenchmark
+قياس زمن توليد الصيغ العربية لكلمات مجموعة الاختبار الذهبية
+
+Keywords: every expected_keyword of tests/golden_dataset.py, plus the "ال" form
+and an article reference per expected_article_ref, repeated --rounds times
+(one round ≈ the keyword stream of one pass over the golden queries).
+
+Modes:
+    cold      generate_variants with the conjugation/number caches cleared per call
+    warm      ArabicVariantExpander.expand (LRU per term)
+    batch     ArabicVariantExpander.expand_many per query (cross-keyword dedup)
+
+Usage:
+    python scripts/bench_arabic_variants.py [--rounds 200]
+"""
+import argparse
+import os
+import sys
+import time
+
+sys.path.append(os.path.join(os.getcwd()))
+
+from agents.tools.arabic_morphology import _conjugations
+from agents.tools.arabic_numbers import number_to_arabic_text
+from agents.tools.arabic_variants import ArabicVariantExpander, generate_variants
+from tests.golden_dataset import GOLDEN_DATASET
+
+
+def _query_keywords():
+    queries = []
+    for item in GOLDEN_DATASET:
+        keywords = []
+        for kw in item.get("expected_keywords", []):
+            keywords += [kw, "ال" + kw]
+        ref = str(item.get("expected_article_ref", ""))
+        if ref.isdigit():
+            keywords.append(f"المادة {ref}")
+        queries.append(keywords)
+    return queries
+
+
+def _timed(fn, queries, rounds):
+    start = time.perf_counter()
+    produced = 0
+    for _ in range(rounds):
+        for keywords in queries:
+            produced += fn(keywords)
+    elapsed = time.perf_counter() - start
+    calls = rounds * sum(len(k) for k in queries)
+    return elapsed * 1e6 / calls, produced // rounds
+
+
+def main(args):
+    queries = _query_keywords()
+    total = sum(len(k) for k in queries)
+    print(f"🔤 {len(queries)} golden queries, {total} keywords per round, {args.rounds} rounds")
+
+    def cold(keywords):
+        n = 0
+        for kw in keywords:
+            _conjugations.cache_clear()
+            number_to_arabic_text.cache_clear()
+            n += len(generate_variants(kw))
+        return n
+
+    expander = ArabicVariantExpander()
+
+    def warm(keywords):
+        return sum(len(expander.expand(kw)) for kw in keywords)
+
+    def batch(keywords):
+        return len(expander.expand_many(keywords))
+
+    print(f"{'mode':<8} {'µs/keyword':>11} {'variants/round':>15}")
+    for name, fn in (("cold", cold), ("warm", warm), ("batch", batch)):
+        per_kw, variants = _timed(fn, queries, args.rounds)
+        print(f"{name:<8} {per_kw:>11.2f} {variants:>15}")
+    print(f"LRU: {expander.stats}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rounds", type=int, default=200)
+    main(parser.parse_args())
@@ -0,0 +1,69 @@
+"""
+Auth dependency microbenchmark
+قياس زمن get_current_user (تحقق JWT محلي + cache ملف المستخدم)
+
+Runs the real dependency with the database layer mocked out, so the numbers
+reflect only the CPU cost of verification and profile lookup.
+
+Usage:
+    python scripts/bench_auth.py [iterations]
+"""
+import asyncio
+import os
+import sys
+import time
+from datetime import timedelta
+from unittest.mock import MagicMock, patch
+
+sys.path.append(os.path.join(os.getcwd()))
+os.environ.setdefault("JWT_SECRET_KEY", "bench-secret-key-with-at-least-32-characters")
+os.environ.setdefault("REDIS_ENABLED", "False")
+
+from fastapi.security import HTTPAuthorizationCredentials
+
+from api import auth_middleware
+from api.auth_middleware import create_access_token, get_current_user
+from api.cache.user_cache import get_user_cache
+
+USER = {"id": "bench-user", "full_name": "Bench", "role": "lawyer", "is_active": True}
+
+
+def _percentile(samples, p):
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * p))]
+
+
+async def _run(label: str, iterations: int, credentials, reset_caches: bool):
+    samples = []
+    for _ in range(iterations):
+        if reset_caches:
+            get_user_cache().clear()
+            auth_middleware.get_jwt_verifier()._claims.clear()
+        start = time.perf_counter()
+        await get_current_user(credentials)
+        samples.append((time.perf_counter() - start) * 1_000_000)
+
+    print(
+        f"{label:<28} p50={_percentile(samples, 0.50):8.1f}µs "
+        f"p99={_percentile(samples, 0.99):8.1f}µs "
+        f"mean={sum(samples) / len(samples):8.1f}µs"
+    )
+
+
+async def main(iterations: int):
+    token = create_access_token({"sub": USER["id"]}, expires_delta=timedelta(hours=1))
+    credentials = HTTPAuthorizationCredentials(scheme="Bearer", credentials=token)
+
+    storage = MagicMock()
+    storage.get_user_by_id.side_effect = lambda user_id: dict(USER)
+
+    print(f"🔐 get_current_user microbenchmark ({iterations} iterations)")
+    with patch.object(auth_middleware, "user_storage", storage):
+        await _run("cold (verify + profile load)", iterations, credentials, reset_caches=True)
+        await _run("warm (steady state)", iterations, credentials, reset_caches=False)
+
+    print(f"📊 user cache: {get_user_cache().get_stats()}")
+
+
+if __name__ == "__main__":
+    asyncio.run(main(int(sys.argv[1]) if len(sys.argv) > 1 else 10000))
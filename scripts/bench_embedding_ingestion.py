@@ -0,0 +1,109 @@
+"""
+Embedding ingestion benchmark
+قياس سرعة إعادة الفهرسة (chunks/s) مقابل خادم embeddings محلي وهمي
+
+Starts a local OpenAI-compatible /v1/embeddings stub with a fixed per-request
+latency plus a per-input cost, then re-indexes an in-memory document_chunks
+table twice: one request per chunk (the old create_embeddings_batch loop) and
+with EmbeddingIngestionEngine (multi-input batches, concurrent, bulk writes).
+
+Usage:
+    python scripts/bench_embedding_ingestion.py [chunks] [request_ms] [per_input_ms]
+"""
+import asyncio
+import json
+import os
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+sys.path.append(os.path.join(os.getcwd()))
+
+from openai import OpenAI
+
+from agents.knowledge.ingestion import EmbeddingIngestionEngine, openai_embed_fn
+
+DIMENSIONS = 1024
+
+
+def _stub_handler(request_ms: float, per_input_ms: float):
+    class StubEmbeddings(BaseHTTPRequestHandler):
+        def do_POST(self):
+            body = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+            inputs = body["input"] if isinstance(body["input"], list) else [body["input"]]
+            time.sleep((request_ms + per_input_ms * len(inputs)) / 1000)
+            payload = json.dumps({
+                "object": "list",
+                "model": body["model"],
+                "data": [
+                    {"object": "embedding", "index": i, "embedding": [len(text) / 1000.0] * DIMENSIONS}
+                    for i, text in enumerate(inputs)
+                ],
+                "usage": {"prompt_tokens": 0, "total_tokens": 0}
+            }).encode()
+            self.send_response(200)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(payload)))
+            self.end_headers()
+            self.wfile.write(payload)
+
+        def log_message(self, *args):
+            pass
+
+    return StubEmbeddings
+
+
+class MemoryEngine(EmbeddingIngestionEngine):
+    def __init__(self, chunks, **kwargs):
+        super().__init__(db=object(), **kwargs)
+        self.chunks = chunks
+
+    async def _fetch_chunks(self, source_id, after_id, limit):
+        ids = sorted(i for i in self.chunks if not after_id or i > after_id)[:limit]
+        return [dict(self.chunks[i]) for i in ids]
+
+    async def _write_embeddings(self, rows):
+        for row in rows:
+            self.chunks[row["id"]]["embedding_hash"] = row["embedding_hash"]
+
+
+def _chunks(count):
+    return {
+        f"{n:06d}": {"id": f"{n:06d}", "content": f"المادة {n} " + "نص قانوني " * 150, "embedding_hash": None}
+        for n in range(count)
+    }
+
+
+async def main(count: int, request_ms: float, per_input_ms: float):
+    server = ThreadingHTTPServer(("127.0.0.1", 0), _stub_handler(request_ms, per_input_ms))
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    client = OpenAI(base_url=f"http://127.0.0.1:{server.server_port}/v1", api_key="stub")
+
+    print(f"🧮 Embedding ingestion benchmark: {count} chunks, stub latency {request_ms}ms + {per_input_ms}ms/input")
+
+    chunks = _chunks(count)
+    start = time.perf_counter()
+    for chunk in chunks.values():
+        client.embeddings.create(model="stub", input=chunk["content"])
+    sequential = time.perf_counter() - start
+    print(f"{'one request per chunk':<28} {count / sequential:8.1f} chunks/s  ({sequential:.2f}s)")
+
+    engine = MemoryEngine(chunks, embed_fn=openai_embed_fn(client, "stub"), model="stub", requests_per_second=0)
+    stats = await engine.reindex()
+    print(f"{'batched ingestion engine':<28} {stats.chunks_per_second:8.1f} chunks/s  "
+          f"({stats.elapsed:.2f}s, {stats.requests} requests)")
+
+    stats = await engine.reindex()
+    print(f"{'re-run (all unchanged)':<28} {stats.skipped} skipped, {stats.requests} requests")
+
+    server.shutdown()
+
+
+if __name__ == "__main__":
+    args = sys.argv[1:]
+    asyncio.run(main(
+        int(args[0]) if len(args) > 0 else 2000,
+        float(args[1]) if len(args) > 1 else 30.0,
+        float(args[2]) if len(args) > 2 else 0.5
+    ))
@@ -0,0 +1,105 @@
+"""
+Quantized search benchmark (recall / size / latency trade-off)
+قياس أثر ضغط المتجهات على دقة الاسترجاع وحجم الفهرس
+
+Offline mode (default): synthetic clustered 1024-dim vectors. For each compact
+representation and candidate multiplier it reports bytes per vector, recall@10
+against exact float32 cosine, and first-stage + rescore latency. These are the
+same two stages match_documents_quantized runs in SQL. The latency column is a
+numpy brute-force scan, useful for comparing settings but not for predicting
+HNSW query times; use --db mode for those.
+
+--db mode: samples real embeddings from document_chunks as queries and compares
+match_documents_quantized with match_documents_v2 (recall and RPC latency).
+
+Usage:
+    python scripts/bench_quantized_search.py [--count 50000] [--queries 100]
+    python scripts/bench_quantized_search.py --db [--country <country_id>]
+"""
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.append(os.path.join(os.getcwd()))
+
+from agents.knowledge.quantization import CompactIndex
+
+K = 10
+
+
+def _percentile(samples, p):
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * p))]
+
+
+def run_offline(args):
+    rng = np.random.default_rng(0)
+    centers = rng.normal(size=(256, args.dim)).astype(np.float32)
+    vectors = centers[rng.integers(0, 256, args.count)] + rng.normal(size=(args.count, args.dim)).astype(np.float32)
+    queries = vectors[rng.choice(args.count, args.queries, replace=False)]
+    queries = queries + 0.5 * rng.normal(size=queries.shape).astype(np.float32)
+
+    normed = vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+    truth = [set(np.argpartition(-(normed @ (q / np.linalg.norm(q))), K)[:K].tolist()) for q in queries]
+
+    print(f"🗜️ {args.count} × {args.dim} vectors, {args.queries} queries, float32 = {args.dim * 4} B/vector")
+    print(f"{'first stage':<10} {'bytes':>6} {'×cand':>6} {'recall@10':>10} {'p50 ms':>8}")
+    for stage in ("binary", "int8", "half"):
+        index = CompactIndex(vectors, stage)
+        for multiplier in args.multipliers:
+            recalls, latencies = [], []
+            for q, expected in zip(queries, truth):
+                start = time.perf_counter()
+                hits = index.search(q, K, candidate_multiplier=multiplier)
+                latencies.append((time.perf_counter() - start) * 1000)
+                recalls.append(len(expected & {i for i, _ in hits}) / K)
+            print(f"{stage:<10} {index.bytes_per_vector:>6} {multiplier:>6} "
+                  f"{np.mean(recalls):>10.3f} {_percentile(latencies, 0.5):>8.2f}")
+
+
+def run_db(args):
+    from agents.config.database import get_supabase_client
+    from agents.knowledge.ann_index import parse_embedding
+
+    db = get_supabase_client()
+    query = db.table("document_chunks").select("embedding").not_.is_("embedding", "null").limit(args.queries)
+    if args.country:
+        query = query.eq("country_id", args.country)
+    samples = [parse_embedding(row["embedding"]) for row in query.execute().data]
+    filter = {"country_id": args.country} if args.country else {}
+
+    def timed(name, params):
+        start = time.perf_counter()
+        rows = db.rpc(name, params).execute().data or []
+        return {row["id"] for row in rows}, (time.perf_counter() - start) * 1000
+
+    base = {"match_threshold": -1.0, "match_count": K, "filter": filter}
+    exact = [timed("match_documents_v2", {**base, "query_embedding": v.tolist()}) for v in samples]
+    print(f"{'match_documents_v2':<28} p50={_percentile([ms for _, ms in exact], 0.5):7.1f}ms")
+
+    for stage in ("binary", "half"):
+        for multiplier in args.multipliers:
+            runs = [
+                timed("match_documents_quantized", {**base, "query_embedding": v.tolist(),
+                                                    "p_first_stage": stage, "p_candidate_multiplier": multiplier})
+                for v in samples
+            ]
+            recall = np.mean([len(ids & ref) / max(1, len(ref)) for (ids, _), (ref, _) in zip(runs, exact)])
+            print(f"{f'quantized {stage} ×{multiplier}':<28} p50={_percentile([ms for _, ms in runs], 0.5):7.1f}ms  "
+                  f"recall@{K}={recall:.3f}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--count", type=int, default=50_000)
+    parser.add_argument("--dim", type=int, default=1024)
+    parser.add_argument("--queries", type=int, default=100)
+    parser.add_argument("--multipliers", type=int, nargs="+", default=[1, 2, 4, 8])
+    parser.add_argument("--db", action="store_true")
+    parser.add_argument("--country")
+    args = parser.parse_args()
+
+    run_db(args) if args.db else run_offline(args)
@@ -0,0 +1,79 @@
+import pytest
+from unittest.mock import patch, MagicMock
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from api.auth_middleware import get_current_user
+from api.routers import dashboard, notifications
+
+USER = {"id": "lawyer_1", "role": "lawyer"}
+
+AGENDA = [
+    {"id": "h1", "item_type": "hearing", "event_date": "2026-03-01", "event_time": "10:00",
+     "case_id": "c1", "case_subject": "نزاع إيجار", "case_number": "55", "court_name": "محكمة الرياض",
+     "client_name": "أحمد"},
+    {"id": "t1", "item_type": "task", "event_date": "2026-03-02", "due_at": "2026-03-02T09:00:00+00:00",
+     "title": "تقديم مذكرة", "status": "pending", "priority": "high", "case_id": "c1",
+     "case_subject": "نزاع إيجار", "client_name": "أحمد"},
+]
+
+
+@pytest.fixture
+def client():
+    app = FastAPI()
+    app.include_router(dashboard.router)
+    app.include_router(notifications.router)
+    app.dependency_overrides[get_current_user] = lambda: USER
+    return TestClient(app)
+
+
+@pytest.fixture
+def agenda_db():
+    db = MagicMock()
+    versions = db.table.return_value.select.return_value.eq.return_value.limit.return_value
+    versions.execute.return_value.data = [{"version": 7}]
+    rows = db.table.return_value.select.return_value.eq.return_value.gte.return_value.lte.return_value
+    rows.order.return_value.execute.return_value.data = AGENDA
+    with patch("api.services.agenda_service.get_supabase_client", return_value=db):
+        yield db
+
+
+def test_calendar_reads_denormalized_agenda(client, agenda_db):
+    res = client.get("/api/dashboard/calendar-events", params={"start_date": "2026-03-01", "end_date": "2026-03-31"})
+
+    assert res.status_code == 200
+    hearing, task = res.json()["events"]
+    assert hearing["title"] == "جلسة الساعة 10:00 للعميل أحمد - قضية رقم 55 - محكمة الرياض"
+    assert task["date"] == "2026-03-02T09:00:00+00:00"
+    assert task["case_title"] == "نزاع إيجار"
+    # Only agenda tables are touched: no hearings/tasks/cases fan-out
+    assert {c.args[0] for c in agenda_db.table.call_args_list} == {"lawyer_agenda_versions", "lawyer_agenda"}
+
+
+def test_unchanged_poll_returns_304(client, agenda_db):
+    params = {"start_date": "2026-03-01", "end_date": "2026-03-31"}
+    first = client.get("/api/dashboard/calendar-events", params=params)
+    etag = first.headers["ETag"]
+
+    agenda_db.table.reset_mock()
+    second = client.get("/api/dashboard/calendar-events", params=params, headers={"If-None-Match": etag})
+
+    assert second.status_code == 304
+    assert [c.args[0] for c in agenda_db.table.call_args_list] == ["lawyer_agenda_versions"]
+
+    other_range = client.get(
+        "/api/dashboard/calendar-events",
+        params={"start_date": "2026-04-01", "end_date": "2026-04-30"},
+        headers={"If-None-Match": etag}
+    )
+    assert other_range.status_code == 200
+
+
+def test_notifications_etag_changes_with_agenda_version(client, agenda_db):
+    versions = agenda_db.table.return_value.select.return_value.eq.return_value.limit.return_value
+    etag = client.get("/api/notifications").headers["ETag"]
+
+    versions.execute.return_value.data = [{"version": 8}]
+    res = client.get("/api/notifications", headers={"If-None-Match": etag})
+
+    assert res.status_code == 200
+    assert res.headers["ETag"] != etag
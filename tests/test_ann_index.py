@@ -0,0 +1,94 @@
+import asyncio
+import numpy as np
+from unittest.mock import MagicMock, patch
+from agents.knowledge import ann_index
+from agents.knowledge.ann_index import LocalANNIndex, build_partition, update_partition
+from agents.tools.vector_tools import VectorSearchTool
+
+
+def _clustered(count, dim=32, clusters=40, seed=0):
+    rng = np.random.default_rng(seed)
+    centers = rng.normal(size=(clusters, dim))
+    vectors = centers[rng.integers(0, clusters, count)] + 0.35 * rng.normal(size=(count, dim))
+    return [f"chunk-{seed}-{i}" for i in range(count)], vectors.astype(np.float32)
+
+
+def _exact(vectors, query, k):
+    normed = vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+    return np.argsort(-(normed @ (query / np.linalg.norm(query))))[:k]
+
+
+def test_ivf_recall_and_country_partitions(tmp_path):
+    ids, vectors = _clustered(6000)
+    other_ids, other_vectors = _clustered(500, seed=1)
+    build_partition(str(tmp_path / "country-a"), ids, vectors)
+    build_partition(str(tmp_path / "country-b"), other_ids, other_vectors)
+    index = LocalANNIndex(root=str(tmp_path), nprobe=16)
+
+    queries = _clustered(50, seed=2)[1]
+    recall = np.mean([
+        len({ids[i] for i in _exact(vectors, q, 10)} & {h for h, _ in index.search(q, 10, country_id="country-a")}) / 10
+        for q in queries
+    ])
+
+    assert recall >= 0.9
+    assert all(h.startswith("chunk-1-") for h, _ in index.search(queries[0], 10, country_id="country-b"))
+    assert len(index.search(queries[0], 10)) == 10
+
+
+def test_incremental_update_is_seen_by_other_readers(tmp_path, monkeypatch):
+    monkeypatch.setattr(ann_index, "RELOAD_CHECK_SECONDS", 0)
+    ids, vectors = _clustered(3000)
+    build_partition(str(tmp_path / "eg"), ids, vectors)
+    reader = LocalANNIndex(root=str(tmp_path))
+    base_generation = reader.search(vectors[7], 1, country_id="eg")
+
+    moved = -vectors[7]
+    assert update_partition(str(tmp_path / "eg"), ["chunk-0-7", "new-chunk"], np.stack([moved, vectors[7]])) == "delta"
+
+    assert base_generation[0][0] == "chunk-0-7"
+    assert reader.search(moved, 1, country_id="eg")[0][0] == "chunk-0-7"
+    assert reader.search(vectors[7], 2, country_id="eg")[0][0] == "new-chunk"
+    assert "chunk-0-7" not in [h for h, _ in reader.search(vectors[7], 5, country_id="eg")]
+    assert len(list((tmp_path / "eg").glob("gen-*"))) == 2
+
+
+def test_rebuild_drops_chunks_deleted_from_the_db(tmp_path):
+    ids, vectors = _clustered(300)
+    build_partition(str(tmp_path / "eg"), ids, vectors)
+    build_partition(str(tmp_path / "sa"), ids[:10], vectors[:10])
+    reader = LocalANNIndex(root=str(tmp_path))
+    assert reader.search(vectors[5], 1, country_id="sa")
+
+    # chunk-0-5 was deleted; the refresh delta is large enough to rebuild
+    new_ids, new_vectors = _clustered(300, seed=3)
+    live = set(ids) - {"chunk-0-5"} | set(new_ids)
+    assert update_partition(str(tmp_path / "eg"), new_ids, new_vectors, live_ids=lambda: live) == "rebuild"
+    assert "chunk-0-5" not in [h for h, _ in LocalANNIndex(root=str(tmp_path)).search(vectors[5], 5, country_id="eg")]
+
+    # A full build removes partitions that have no chunks left
+    builder = ann_index.ANNIndexBuilder(db=MagicMock(), root=str(tmp_path))
+    rows = [{"id": i, "country_id": "eg", "embedding": v.tolist()} for i, v in zip(ids[:20], vectors[:20])]
+    with patch.object(builder, "_fetch_page", return_value=rows):
+        assert asyncio.run(builder.build()) == {"eg": 20}
+    assert not (tmp_path / "sa").exists()
+    reader._checked_at = 0.0
+    assert reader.search(vectors[5], 1, country_id="sa") == []
+
+
+def test_vector_tool_local_backend_skips_rpc(tmp_path):
+    ids, vectors = _clustered(300)
+    build_partition(str(tmp_path / "eg"), ids, vectors)
+    rows = [{"id": i, "content": f"text {i}", "source_id": "law", "country_id": "eg",
+             "sequence_number": n, "ai_summary": None} for n, i in enumerate(ids[:5])]
+
+    fake_db = MagicMock()
+    fake_db.document_chunks.select.return_value.in_.return_value.execute.return_value.data = rows
+    with patch.object(ann_index, "_ann_index", LocalANNIndex(root=str(tmp_path))), \
+         patch("agents.tools.vector_tools.db", fake_db):
+        result = VectorSearchTool(backend="local").run(vectors[0].tolist(), match_count=5, filter={"country_id": "eg"})
+
+    assert result.success and result.metadata["backend"] == "local"
+    assert result.data[0]["id"] == "chunk-0-0"
+    assert result.data[0]["metadata"]["country_id"] == "eg"
+    fake_db.client.rpc.assert_not_called()
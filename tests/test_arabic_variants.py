@@ -0,0 +1,77 @@
+import pytest
+from unittest.mock import AsyncMock, MagicMock, patch
+from langchain_core.messages import AIMessage
+from agents.tools.arabic_morphology import ArabicMorphology
+from agents.tools.arabic_variants import ArabicVariantExpander, generate_variants
+from agents.tools.base_tool import BaseTool, ToolResult
+from agents.tools.hybrid_search_tool import MAX_KEYWORD_VARIANTS, HybridSearchTool
+
+
+def test_variants_cover_spellings_and_article_text():
+    variants = generate_variants("الهبة")
+    assert {"الهبة", "الهبه", "هبة", "هبه", "واهب"} <= set(variants)
+    assert variants == sorted(variants)
+
+    # Hamza folds to bare alif (not a Latin letter)
+    assert "ايجار" in generate_variants("إيجار")
+    assert not any("a" in v for v in generate_variants("إيجار"))
+
+    assert "المادة الثامنة والستون بعد الثلاثمائة" in generate_variants("المادة 368")
+    assert "الهبة" in generate_variants("الهبَة")
+
+
+def test_expand_is_memoised_per_term():
+    expander = ArabicVariantExpander(max_size=2)
+
+    with patch.object(ArabicMorphology, "get_conjugations", wraps=ArabicMorphology.get_conjugations) as conj:
+        first = expander.expand("الهبة")
+        again = expander.expand("الهبة")
+        assert first == again and conj.call_count == 1
+
+        expander.expand("عقد")
+        expander.expand("بيع")  # evicts الهبة
+        expander.expand("الهبة")
+        assert conj.call_count == 4
+
+    assert expander.stats == {"hits": 1, "misses": 4}
+
+
+def test_expand_many_dedups_across_keywords():
+    expander = ArabicVariantExpander()
+
+    with patch("agents.tools.arabic_variants.generate_variants", wraps=generate_variants) as gen:
+        variants = expander.expand_many(["الهبة", "الهبه", "هبة", "الهبة"])
+
+    # الهبه is the same word: its spelling is kept but it is not re-expanded
+    assert [c.args[0] for c in gen.call_args_list] == ["الهبة", "هبة"]
+    assert len(variants) == len(set(variants))
+    assert variants[:len(expander.expand("الهبة"))] == expander.expand("الهبة")
+    assert expander.expand_many(["الهبة", "عقد"], limit=3) == expander.expand("الهبة")[:3]
+
+
+@pytest.mark.asyncio
+async def test_scout_keywords_are_expanded_in_one_batch():
+    tool = HybridSearchTool.__new__(HybridSearchTool)
+    BaseTool.__init__(tool, "hybrid", "test")
+    tool.vector_tool = MagicMock()
+    tool.keyword_tool = MagicMock()
+    tool.keyword_tool.run.return_value = ToolResult(success=True, data=[{"content": "الهبة عقد"}])
+    embeddings = MagicMock()
+    embeddings.aembed_query = AsyncMock(side_effect=RuntimeError("offline"))
+    expander = ArabicVariantExpander()
+
+    with patch("agents.tools.hybrid_search_tool.get_embeddings", return_value=embeddings), \
+         patch("agents.tools.hybrid_search_tool.get_llm"), \
+         patch("agents.tools.hybrid_search_tool.cached_ainvoke",
+               AsyncMock(return_value=AIMessage(content="الهبة, الهبه, عقد"))), \
+         patch("agents.tools.hybrid_search_tool.get_variant_expander", return_value=expander), \
+         patch.object(expander, "expand_many", wraps=expander.expand_many) as expand_many:
+        keywords, _, found = await tool._adaptive_scout_phase("ما هي الهبة", "DEFINITION", None)
+
+    assert found
+    expand_many.assert_called_once_with(["الهبة", "الهبه", "عقد"], limit=MAX_KEYWORD_VARIANTS)
+    # Originals first, then the batch variants without duplicates
+    assert keywords[:3] == ["الهبة", "الهبه", "عقد"]
+    assert len(keywords) == len(set(keywords))
+    variants = expander.expand_many(["الهبة", "الهبه", "عقد"], limit=MAX_KEYWORD_VARIANTS)
+    assert set(keywords) == {"الهبة", "الهبه", "عقد"} | set(variants)
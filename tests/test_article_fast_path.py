@@ -0,0 +1,84 @@
+import pytest
+from unittest.mock import AsyncMock, MagicMock, patch
+from agents.graph.nodes import article_lookup
+from agents.graph.nodes.article_lookup import article_lookup_node, detect_article_request
+from agents.graph.nodes.gatekeeper import gatekeeper_node
+from agents.tools.base_tool import ToolResult
+from agents.tools.hybrid_search_tool import HybridSearchTool
+
+
+def _search_tool(law_result=None):
+    tool = HybridSearchTool.__new__(HybridSearchTool)  # citation patterns only, no DB / LLM
+    tool.law_identifier = MagicMock()
+    tool.law_identifier.run.return_value = law_result
+    return tool
+
+
+CIVIL = ToolResult(success=True, data={"best_match": {
+    "source_id": "civil", "official_title": "نظام المعاملات المدنية", "confidence": 0.95}})
+
+
+def test_only_pure_article_requests_are_detected():
+    with patch.object(article_lookup, "_search_tool", return_value=_search_tool()):
+        request = detect_article_request("ما نص المادة 368 من نظام المعاملات المدنية؟")
+        assert (request.articles, request.law_query) == ([368], "المعاملات المدنية")
+        assert detect_article_request("نص المادة الثامنة والستون بعد الثلاثمائة من نظام المعاملات المدنية").articles == [368]
+        assert detect_article_request("اعرض المواد من 5 إلى 7 من نظام الإثبات").articles == [5, 6, 7]
+
+        assert detect_article_request("اشرح لي المادة 77 من قانون الإجراءات") is None
+        assert detect_article_request("هل تنطبق المادة 77 من نظام العمل على فصلي من العمل؟") is None
+        assert detect_article_request("ما هي شروط عقد الهبة؟") is None
+
+
+@pytest.mark.asyncio
+async def test_gatekeeper_routes_article_request_without_llm():
+    classify = AsyncMock()
+    with patch.object(article_lookup, "_search_tool", return_value=_search_tool()), \
+         patch("agents.graph.nodes.gatekeeper._classify_with_llm", classify):
+        result = await gatekeeper_node({"input": "ما نص المادة 368 من نظام المعاملات المدنية"})
+
+    assert result == {"intent": "ARTICLE_LOOKUP", "next_agent": "article_lookup"}
+    classify.assert_not_called()
+
+
+@pytest.mark.asyncio
+async def test_article_node_answers_from_index_or_hands_over_to_judge():
+    article = {"id": "c368", "content": "المادة 368\nالهبة عقد ...", "article_no": 368,
+               "sequence_number": 410, "hierarchy_path": "الباب الثالث / المادة 368"}
+    neighbours = [{**article, "id": "c367", "sequence_number": 409, "hierarchy_path": "المادة 367", "content": "نص 367"},
+                  article,
+                  {**article, "id": "c369", "sequence_number": 411, "hierarchy_path": "المادة 369", "content": "نص 369"}]
+    index, fetcher = MagicMock(), MagicMock()
+    index.lookup.return_value = [article]
+    fetcher.windows.return_value = [neighbours]
+    state = {"input": "ما نص المادة 368 من نظام المعاملات المدنية",
+             "context": {"user_context": {"country_id": "sa"}}}
+
+    with patch.object(article_lookup, "_search_tool", return_value=_search_tool(CIVIL)) as tool, \
+         patch.object(article_lookup, "get_article_index", return_value=index), \
+         patch.object(article_lookup, "get_neighborhood_fetcher", return_value=fetcher):
+        result = await article_lookup_node(state)
+
+        assert tool.return_value.law_identifier.run.call_args.kwargs["country_id"] == "sa"
+        index.lookup.assert_called_once_with("civil", [368])
+        fetcher.windows.assert_called_once_with(["c368"])
+        assert result["next_agent"] == "end"
+        assert result["hcf_details"]["verification_status"] == "VERIFIED_SOURCE"
+        response = result["final_response"]
+        assert "الهبة عقد" in response and "نص 367" in response and "نص 369" in response
+        assert [r["id"] for r in result["research_results"]] == ["c368", "c367", "c369"]
+
+        assert result["hcf_details"]["citations"] == ["المادة 368", "نظام المعاملات المدنية"]
+
+        index.lookup.return_value = []
+        assert (await article_lookup_node(state))["next_agent"] == "judge"
+
+        # Only some of the requested articles indexed: no partial VERIFIED_SOURCE answer
+        index.lookup.return_value = [article]
+        request = article_lookup.ArticleRequest(articles=[368, 369], law_query="المعاملات المدنية")
+        with patch.object(article_lookup, "detect_article_request", return_value=request):
+            assert (await article_lookup_node(state))["next_agent"] == "judge"
+
+    weak = ToolResult(success=False, error="لم أجد تطابق قوي")
+    with patch.object(article_lookup, "_search_tool", return_value=_search_tool(weak)):
+        assert (await article_lookup_node(state))["next_agent"] == "judge"
@@ -0,0 +1,101 @@
+import pytest
+from unittest.mock import AsyncMock, MagicMock, patch
+from agents.knowledge.article_index import ArticleIndex
+from agents.knowledge.reindexer import plan_rechunk, split_articles
+from agents.tools.base_tool import BaseTool, ToolResult
+from agents.tools.hybrid_search_tool import HybridSearchTool
+from agents.utils.legal_patterns import parse_article_number
+
+
+def test_article_numbers_parsed_from_digit_and_spelled_headings():
+    assert parse_article_number("المادة الثامنة والستون بعد الثلاثمائة") == 368
+    assert parse_article_number("المادة الحادية عشرة: يسري هذا النظام") == 11
+    assert parse_article_number("المادة (٧٧)") == 77
+    assert parse_article_number("المادة السابقة") is None
+
+    law = "نظام المعاملات المدنية\n\nالمادة الأولى:\nيسمى هذا النظام\n\nالمادة الثانية والعشرون\nنص\n\nالمادة 23\nنص"
+    chunks = split_articles(law)
+    assert [c.article_no for c in chunks] == [None, 1, 22, 23]
+    assert chunks[1].hierarchy_path == "المادة الأولى"
+
+
+@pytest.mark.asyncio
+async def test_rechunk_and_backfill_write_article_numbers():
+    chunks = split_articles("المادة 1\nنص\n\nالمادة 2\nنص")
+    existing = [{"id": f"r{c.sequence_number}", "sequence_number": c.sequence_number,
+                 "hierarchy_path": c.hierarchy_path, "content": c.content, "article_no": None} for c in chunks]
+    plan = plan_rechunk(existing, chunks)
+    assert plan.changed == 0
+    assert [(r["id"], r["article_no"]) for r in plan.rows] == [("r1", 1), ("r2", 2)]
+
+    db = MagicMock()
+    page = [
+        {"id": "a", "content": "المادة الخامسة\nنص", "hierarchy_path": None, "article_no": None},
+        {"id": "b", "content": "تكملة النص", "hierarchy_path": "الباب الأول / المادة 6", "article_no": 6},
+        {"id": "c", "content": "تمهيد", "hierarchy_path": None, "article_no": None},
+    ]
+    db.table.return_value.select.return_value.order.return_value.limit.return_value.execute.return_value.data = page
+    db.table.return_value.select.return_value.gt.return_value.order.return_value.limit.return_value.execute.return_value.data = []
+
+    stats = await ArticleIndex(db=db).backfill()
+
+    db.rpc.assert_called_once_with("bulk_update_chunk_articles", {"p_rows": [{"id": "a", "article_no": 5}]})
+    assert stats == {"scanned": 3, "updated": 1}
+
+
+@pytest.mark.asyncio
+async def test_known_law_article_query_seeks_index_without_text_search():
+    tool = HybridSearchTool.__new__(HybridSearchTool)
+    BaseTool.__init__(tool, "hybrid", "test")
+    tool.law_identifier = MagicMock()
+    tool.law_identifier.run.return_value = ToolResult(success=True, data={"best_match": {
+        "source_id": "civil", "official_title": "نظام المعاملات المدنية", "confidence": 0.95}})
+
+    index = MagicMock()
+    index.lookup.return_value = [{"id": "c368", "content": "المادة 368\nنص", "source_id": "civil",
+                                  "article_no": 368, "sequence_number": 410, "hierarchy_path": "المادة 368"}]
+    scout = AsyncMock()
+
+    with patch("agents.tools.hybrid_search_tool.get_article_index", return_value=index), \
+         patch.object(tool, "_adaptive_scout_phase", scout):
+        result = await tool.run("ما نص المادة 368", law_filter="المعاملات المدنية")
+
+    index.lookup.assert_called_once_with("civil", [368])
+    scout.assert_not_called()
+    assert result.metadata["search_method"] == "ARTICLE_INDEX"
+    assert [r["id"] for r in result.data] == ["c368"]
+
+    # Nothing indexed for that article → the text search path still runs
+    index.lookup.return_value = []
+    scout.return_value = ([], {}, False)
+    with patch("agents.tools.hybrid_search_tool.get_article_index", return_value=index), \
+         patch.object(tool, "_adaptive_scout_phase", scout):
+        await tool.run("ما نص المادة 368", law_filter="المعاملات المدنية")
+    scout.assert_awaited_once()
+
+
+@pytest.mark.asyncio
+async def test_articles_missing_from_the_index_go_to_the_text_search():
+    tool = HybridSearchTool.__new__(HybridSearchTool)
+    BaseTool.__init__(tool, "hybrid", "test")
+    tool.law_identifier = MagicMock()
+    tool.law_identifier.run.return_value = ToolResult(success=True, data={"best_match": {
+        "source_id": "civil", "official_title": "نظام المعاملات المدنية", "confidence": 0.95}})
+
+    index = MagicMock()
+    index.lookup.return_value = [{"id": "c368", "content": "المادة 368\nنص", "source_id": "civil",
+                                  "article_no": 368, "sequence_number": 410, "hierarchy_path": "المادة 368"}]
+    scout = AsyncMock(return_value=(["الهبة"], {}, True))
+    sniper = AsyncMock(return_value=[{"id": "c369", "content": "المادة 369\nنص"},
+                                     {"id": "c368", "content": "المادة 368\nنص"}])
+
+    with patch("agents.tools.hybrid_search_tool.get_article_index", return_value=index), \
+         patch.object(tool, "_adaptive_scout_phase", scout), \
+         patch.object(tool, "_precision_sniper_phase", sniper), \
+         patch.object(tool, "_apply_diversity_filter", side_effect=lambda ranked_results, **_: ranked_results):
+        result = await tool.run("ما نص المادة 368 والمادة 369", law_filter="المعاملات المدنية")
+
+    # Only the missing article is searched by text; the index hit comes first, once
+    assert sniper.call_args.kwargs["query_entities"]["articles"] == [369]
+    assert [r["id"] for r in result.data] == ["c368", "c369"]
+    assert result.metadata["search_method"] == "ARTICLE_INDEX+TEXT"
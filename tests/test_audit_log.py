@@ -0,0 +1,106 @@
+import asyncio
+import json
+import pytest
+from api.services.audit_log import AuditWriter, build_audit_event
+
+USER = {"id": "lawyer_1", "full_name": "أحمد", "role": "lawyer"}
+
+
+def _event(i):
+    return build_audit_event("update", "tasks", f"t{i}", USER,
+                             old_values={"status": "pending"}, new_values={"status": "done"})
+
+
+class FlakyDB:
+    """Records inserted batches; raises while `down` is set"""
+
+    def __init__(self):
+        self.down = False
+        self.batches = []
+
+    def table(self, name):
+        db = self
+
+        class _Query:
+            def upsert(self, rows, **kwargs):
+                self.rows = list(rows)
+                return self
+
+            def execute(self):
+                if db.down:
+                    raise ConnectionError("db unavailable")
+                db.batches.append(self.rows)
+
+        return _Query()
+
+
+def test_event_diff_and_assistant_office():
+    event = _event(1)
+    assert event["changes"] == {"status": {"old": "pending", "new": "done"}}
+    assert event["lawyer_id"] == "lawyer_1" and event["id"]
+
+    assistant = {"id": "a1", "role": "assistant", "office_id": "lawyer_9"}
+    assert build_audit_event("create", "cases", "c1", assistant, new_values={"x": 1})["lawyer_id"] == "lawyer_9"
+    assert build_audit_event("create", "cases", "c1", assistant, new_values={"x": 1})["changes"] is None
+
+
+@pytest.mark.asyncio
+async def test_enqueue_batches_on_size_and_interval(tmp_path):
+    db = FlakyDB()
+    writer = AuditWriter(db=db, batch_size=3, flush_interval=0.05, spool_path=str(tmp_path / "spool.jsonl"))
+    await writer.start()
+    try:
+        for i in range(7):
+            writer.enqueue(_event(i))
+        await asyncio.sleep(0.2)
+    finally:
+        await writer.stop()
+
+    assert [len(b) for b in db.batches] == [3, 3, 1]
+    assert [r["record_id"] for b in db.batches for r in b] == [f"t{i}" for i in range(7)]
+    assert not (tmp_path / "spool.jsonl").exists()
+
+
+@pytest.mark.asyncio
+async def test_outage_spools_and_replays_on_restart(tmp_path):
+    spool = tmp_path / "spool.jsonl"
+    db = FlakyDB()
+    db.down = True
+
+    writer = AuditWriter(db=db, batch_size=10, flush_interval=0.05, spool_path=str(spool), retry_interval=60)
+    await writer.start()
+    for i in range(4):
+        writer.enqueue(_event(i))
+    await writer.stop()
+    writer.enqueue(_event(4))  # after shutdown: straight to the spool
+
+    assert db.batches == []
+    assert [json.loads(line)["record_id"] for line in spool.read_text().splitlines()] == [f"t{i}" for i in range(5)]
+
+    db.down = False
+    restarted = AuditWriter(db=db, batch_size=10, spool_path=str(spool))
+    await restarted.start()
+    await restarted.stop()
+
+    assert [r["record_id"] for b in db.batches for r in b] == [f"t{i}" for i in range(5)]
+    assert not spool.exists() and restarted.stats["replayed"] == 5
+
+
+@pytest.mark.asyncio
+async def test_only_one_process_replays_a_shared_spool(tmp_path):
+    spool = tmp_path / "spool.jsonl"
+    offline = AuditWriter(db=FlakyDB(), spool_path=str(spool))
+    for i in range(3):
+        offline.enqueue(_event(i))
+
+    db = FlakyDB()
+    first, second = (AuditWriter(db=db, batch_size=10, spool_path=str(spool)) for _ in range(2))
+    # Another worker process is in the middle of a replay
+    with first._file_lock(".replay.lock") as acquired:
+        assert acquired
+        assert await second.replay_spool() == 0
+        assert spool.exists() and db.batches == []
+
+    assert await second.replay_spool() == 3
+    assert await first.replay_spool() == 0
+    assert [r["record_id"] for b in db.batches for r in b] == ["t0", "t1", "t2"]
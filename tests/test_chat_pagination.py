@@ -0,0 +1,67 @@
+import sys
+import pytest
+from unittest.mock import patch, MagicMock
+from api.utils.errors import ValidationError
+from api.utils.pagination import encode_cursor, decode_cursor, cursor_timestamp, cursor_uuid
+from api.routers.chat import search_chats
+
+USER = {"id": "lawyer_1"}
+MESSAGE_ID = "9b2f6c1e-3d4a-4f5b-8c7d-1e2f3a4b5c6d"
+
+
+def _rows(n):
+    # Newest first, as returned by the keyset query
+    return [{"id": f"m{i}", "created_at": f"2026-01-01T00:00:{i:02d}", "score": 1.0 / (i + 1)} for i in range(n, 0, -1)]
+
+
+def test_cursor_round_trip_and_rejects_garbage():
+    cursor = encode_cursor("2026-01-01T00:00:00+00:00", "m1")
+    assert decode_cursor(cursor, 2) == ["2026-01-01T00:00:00+00:00", "m1"]
+    assert decode_cursor(None, 2) is None
+
+    with pytest.raises(ValidationError):
+        decode_cursor("%%%not-base64", 2)
+    with pytest.raises(ValidationError):
+        decode_cursor(encode_cursor("only-one"), 2)
+
+    # Values that end up in a PostgREST filter string are validated
+    assert cursor_timestamp("2026-01-01T00:00:00+00:00") == "2026-01-01T00:00:00+00:00"
+    with pytest.raises(ValidationError):
+        cursor_timestamp('2026-01-01",session_id.neq.x')
+    with pytest.raises(ValidationError):
+        cursor_uuid("m1),or(id.gt.0")
+
+
+@pytest.mark.skipif(sys.version_info < (3, 12), reason="chat_service uses PEP 701 f-strings")
+def test_messages_page_is_chronological_with_cursor():
+    from api.services.chat_service import ChatService
+
+    db = MagicMock()
+    query = db.table.return_value.select.return_value.eq.return_value
+    query.order.return_value.order.return_value.limit.return_value.execute.return_value.data = _rows(4)
+
+    service = ChatService()
+    with patch.object(service, "_get_db", return_value=db):
+        rows, next_cursor = service.fetch_messages_page("s1", limit=3)
+
+    assert [r["id"] for r in rows] == ["m2", "m3", "m4"]
+    assert decode_cursor(next_cursor, 2) == ["2026-01-01T00:00:02", "m2"]
+    query.order.return_value.order.return_value.limit.assert_called_once_with(4)
+
+
+@pytest.mark.asyncio
+async def test_search_uses_ranked_rpc_with_keyset_cursor():
+    db = MagicMock()
+    db.rpc.return_value.execute.return_value.data = _rows(3)
+
+    with patch("api.routers.chat.get_supabase_client", return_value=db):
+        page = await search_chats(q="عقد", limit=2, cursor=encode_cursor(0.9, MESSAGE_ID), current_user=USER)
+
+    # Follow-up page: no session search, cursor forwarded to the RPC
+    db.rpc.assert_called_once()
+    name, params = db.rpc.call_args.args
+    assert name == "search_chat_messages"
+    assert (params["p_cursor_score"], params["p_cursor_id"], params["p_limit"]) == (0.9, MESSAGE_ID, 3)
+    assert page["sessions"] == []
+    assert len(page["messages"]) == 2
+    assert decode_cursor(page["next_cursor"], 2) == [page["messages"][-1]["score"], "m2"]
@@ -0,0 +1,97 @@
+from unittest.mock import MagicMock, patch
+from agents.knowledge.chunk_neighborhood import ChunkNeighborhoodFetcher
+
+# Two sources: s1 has pages 1..5, s2 has pages 1..2
+CHUNKS = [
+    {"id": f"{src}-{seq}", "source_id": src, "sequence_number": seq,
+     "content": f"{src} page {seq}", "ai_summary": None, "hierarchy_path": None}
+    for src, pages in (("s1", 5), ("s2", 2)) for seq in range(1, pages + 1)
+]
+
+
+class FakeDB:
+    """Evaluates fetch_chunk_windows over CHUNKS and counts round trips"""
+
+    def __init__(self):
+        self.calls = []
+
+    def rpc(self, name, params):
+        assert name == "fetch_chunk_windows"
+        self.calls.append(params)
+        rows = []
+        for i, anchor in enumerate(params["p_anchors"]):
+            if "chunk_id" in anchor:
+                center = next((c for c in CHUNKS if c["id"] == anchor["chunk_id"]), None)
+                if center is None:
+                    continue
+                src, seq = center["source_id"], center["sequence_number"]
+            else:
+                src, seq = anchor["source_id"], anchor["sequence_number"]
+            for c in CHUNKS:
+                if c["source_id"] == src and abs(c["sequence_number"] - seq) <= params["p_radius"]:
+                    rows.append({**c, "anchor_index": i, "center_sequence": seq})
+        return MagicMock(execute=MagicMock(return_value=MagicMock(data=rows)))
+
+
+def test_many_windows_in_one_round_trip_then_cached():
+    db = FakeDB()
+    fetcher = ChunkNeighborhoodFetcher(db=db)
+
+    windows = fetcher.windows(["s1-3", ("s1", 1), "s2-2", "missing"])
+    assert len(db.calls) == 1
+    assert [[c["sequence_number"] for c in w] for w in windows] == [[2, 3, 4], [1, 2], [1, 2], []]
+
+    # Boundary positions (s1 page 0, s2 page 3) are cached as missing: no refetch
+    again = fetcher.windows(["s2-2", ("s1", 1), ("s1", 2), "s1-3"])
+    assert len(db.calls) == 1
+    assert [c["id"] for c in again[2]] == ["s1-1", "s1-2", "s1-3"]
+
+    fetcher.invalidate_source("s1")
+    fetcher.windows(["s1-3", "s2-2"])
+    assert len(db.calls) == 2 and db.calls[1]["p_anchors"] == [{"chunk_id": "s1-3"}]
+
+
+def test_expired_chunks_drop_their_position():
+    fetcher = ChunkNeighborhoodFetcher(db=FakeDB(), ttl_seconds=60)
+    fetcher.windows(["s2-1"])
+    assert set(fetcher._positions) == {"s2-1", "s2-2"}
+
+    with patch("agents.knowledge.chunk_neighborhood.time.monotonic", return_value=float("inf")):
+        assert fetcher._get(("s2", 1)) is None
+    assert set(fetcher._positions) == {"s2-2"}
+
+
+def test_read_tool_expansion_uses_prefetched_window():
+    from agents.tools.read_tool import ReadDocumentTool
+
+    fetcher = ChunkNeighborhoodFetcher(db=FakeDB())
+    fetcher.windows(["s1-2", "s1-4"])  # deep research prefetch
+
+    fake_db = MagicMock()
+    with patch("agents.tools.read_tool.get_neighborhood_fetcher", return_value=fetcher), \
+         patch("agents.tools.read_tool.db", fake_db):
+        result = ReadDocumentTool().run(doc_id="s1-4", expand_context=True)
+
+    assert result.success
+    content = result.data["content"]
+    assert "s1 page 3" in content and "s1 page 4" in content and "s1 page 5" in content
+    assert content.index("s1 page 3") < content.index("s1 page 4") < content.index("s1 page 5")
+    assert len(fetcher._db.calls) == 1
+    fake_db.client.from_.assert_not_called()
+
+
+def test_related_document_siblings_come_from_window():
+    from agents.tools.fetch_tools import GetRelatedDocumentTool
+
+    fetcher = ChunkNeighborhoodFetcher(db=FakeDB())
+    fake_db = MagicMock()
+    fake_db.legal_sources.select.return_value.eq.return_value.execute.return_value.data = [{"id": "s2", "title": "قانون"}]
+
+    with patch("agents.tools.fetch_tools.get_neighborhood_fetcher", return_value=fetcher), \
+         patch("agents.tools.fetch_tools.db", fake_db):
+        result = GetRelatedDocumentTool().run(chunk_id="s2-1", include_siblings=True)
+
+    assert result.success
+    assert [c["id"] for c in result.data["siblings"]] == ["s2-1", "s2-2"]
+    fake_db.legal_sources.select.return_value.eq.assert_called_once_with("id", "s2")
+    fake_db.document_chunks.select.assert_not_called()
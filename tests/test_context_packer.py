@@ -0,0 +1,60 @@
+import json
+import pytest
+from unittest.mock import patch
+from agents.core import context_packer
+from agents.core.context_packer import pack_passages, pack_json, count_tokens, get_packing_stats
+
+ARTICLE = "يجوز للواهب أن يرجع في الهبة إذا قبل الموهوب له ذلك أو أجازه القضاء بشرط وجود عذر مقبول"
+
+
+@pytest.fixture(autouse=True)
+def offline_tokenizer():
+    # Deterministic, network-free token counts
+    with patch.object(context_packer, "_encoding", None), patch.object(context_packer, "_encoding_loaded", True):
+        yield
+
+
+def test_ranks_by_score_and_respects_budget():
+    passages = [
+        {"id": i, "content": f"المادة {i} " + " ".join(f"بند{i}x{j}" for j in range(40)), "relevance_score": score}
+        for i, score in [(1, 0.2), (2, 0.9), (3, 0.5), (4, 0.1)]
+    ]
+    budget = 2 * count_tokens("[1] " + passages[0]["content"]) + 80
+    packed = pack_passages(passages, node="test_rank", budget=budget)
+
+    assert packed.tokens <= budget
+    assert packed.text.startswith("[1] المادة 2")
+    assert packed.text.index("المادة 3") < packed.text.index("المادة 1")
+    assert "المادة 4" not in packed.text
+    assert packed.truncated
+    assert (packed.included, packed.dropped) == (3, 1)
+
+
+def test_drops_overlapping_chunks_and_neighbor_expansions():
+    chunk = {"id": "a", "content": ARTICLE}
+    expansion = {"id": "b", "content": "المادة السابقة. " + ARTICLE}
+    same_id = {"id": "a", "content": "نص مختلف تماما عن المادة الأولى في هذا الباب"}
+    other = {"id": "c", "content": "تسقط الدعوى الجنائية بمضي عشر سنين من يوم وقوع الجريمة في مواد الجنايات"}
+
+    packed = pack_passages([chunk, expansion, same_id, other], node="test_dedup", budget=5000)
+
+    assert packed.included == 2
+    assert packed.duplicates == 2
+    assert "تسقط الدعوى" in packed.text
+
+
+def test_truncates_last_passage_and_reports_per_node():
+    packed = pack_passages([{"content": ARTICLE * 40}], node="test_truncate", budget=100)
+    assert packed.truncated and packed.included == 1
+    assert packed.tokens <= 100
+
+    facts = pack_json({"request": "رجوع في هبة", "facts": [ARTICLE] * 50}, node="test_facts", budget=200)
+    assert facts.truncated and count_tokens(facts.text) <= 200
+    # Whole items are dropped: still valid JSON
+    kept = json.loads(facts.text)
+    assert kept["request"] == "رجوع في هبة"
+    assert 0 < len(kept["facts"]) < 50 and set(kept["facts"]) == {ARTICLE}
+
+    stats = get_packing_stats()
+    assert stats["test_truncate"]["last_tokens"] == packed.tokens
+    assert stats["test_facts"]["calls"] == 1
@@ -0,0 +1,175 @@
+import sys
+import pytest
+from unittest.mock import AsyncMock, MagicMock, patch
+from langchain_core.messages import HumanMessage, AIMessage
+from agents.core.conversation_state_manager import ConversationStateManager, ConversationContext
+
+HISTORY = [
+    ("user", "احتاج معلومات سريعه عن الهبه"),
+    ("assistant", "الهبة هي عقد يتصرف بموجبه الواهب..."),
+    ("user", "يوجد ماده ايضا تتكلم عن هذا وهي الماده 368"),
+    ("assistant", "نعم، المادة 368 والمادة 369 من نظام المعاملات المدنية"),
+]
+
+
+def test_fold_matches_history_scan_and_round_trips():
+    manager = ConversationStateManager(max_history_messages=10)
+    messages = [HumanMessage(content=c) if r == "user" else AIMessage(content=c) for r, c in HISTORY]
+    scanned = manager.extract_context_from_history(messages)
+
+    context = None
+    for role, content in HISTORY:
+        context = manager.fold_message(context, content, is_user=(role == "user"))
+        # Stored as JSON on the session between turns
+        context = ConversationContext.from_dict(context.to_dict())
+
+    assert context.active_articles == scanned.active_articles == [368, 369]
+    assert context.active_laws == scanned.active_laws
+    assert set(context.active_topics) == set(scanned.active_topics)
+    assert (context.last_entity_type, context.confidence) == (scanned.last_entity_type, scanned.confidence)
+    assert context.query_history == [HISTORY[0][1], HISTORY[2][1]]
+
+
+def test_history_scan_uses_entities_stored_with_messages():
+    manager = ConversationStateManager()
+    history = [
+        HumanMessage(content="ما حكم الهبة", additional_kwargs={"entities": {"articles": [368], "laws": [], "topics": ["الهبة"]}}),
+        {"role": "assistant", "content": "...", "metadata": {"entities": {"articles": [369], "laws": [], "topics": []}}},
+    ]
+
+    with patch.object(manager, "_extract_all_entities", wraps=manager._extract_all_entities) as extract:
+        context = manager.extract_context_from_history(history, current_query="في أي نظام")
+
+    # Only the new query is scanned
+    extract.assert_called_once_with("في أي نظام")
+    assert context.active_articles == [368, 369]
+    assert context.active_topics == ["الهبة"]
+
+
+@pytest.mark.asyncio
+@pytest.mark.skipif(sys.version_info < (3, 12), reason="chat_service uses PEP 701 f-strings")
+async def test_save_message_stores_entities_and_folds_session_context():
+    from api.services.chat_service import ChatService
+
+    persistence = MagicMock()
+    persistence.write = AsyncMock(return_value={"message": {"id": "m1"}, "context_version": 1})
+    persistence.flush = AsyncMock()
+    snapshot = {
+        "session": {"id": "s1", "lawyer_id": "l1",
+                    "conversation_context": {"active_topics": ["الهبة"], "query_history": ["ما هي الهبة"]}},
+        "recent_messages": [],
+    }
+
+    with patch("api.services.chat_service.get_message_persistence", return_value=persistence), \
+         patch("api.services.chat_service.get_session_context_cache") as cache:
+        cache.return_value.set = AsyncMock()
+        cache.return_value.append_message = MagicMock()
+        assert await ChatService()._save_message(snapshot, "user", "المادة 368", message_id="m1") == {"id": "m1"}
+
+    session_id, role, content, metadata = persistence.write.call_args.args
+    context = persistence.write.call_args.kwargs["context"]
+    assert metadata["entities"]["articles"] == [368]
+    assert context["active_articles"] == [368]
+    assert context["active_topics"] == ["الهبة"]
+    assert snapshot["session"]["conversation_context"] == context
+    assert persistence.write.call_args.kwargs["message_id"] == "m1"
+    assert snapshot["session"]["context_version"] == 1
+
+
+@pytest.mark.asyncio
+@pytest.mark.skipif(sys.version_info < (3, 12), reason="chat_service uses PEP 701 f-strings")
+async def test_save_message_seeds_a_missing_context_from_the_window():
+    from api.services.chat_service import ChatService
+
+    persistence = MagicMock()
+    persistence.write = AsyncMock(return_value={"message": {"id": "m3"}, "context_version": 1})
+    persistence.flush = AsyncMock()
+    # Session created before conversation_context existed
+    snapshot = {
+        "session": {"id": "s1", "lawyer_id": "l1", "conversation_context": None},
+        "recent_messages": [
+            {"id": "m1", "role": "user", "content": "ما هي الهبة", "metadata": {}},
+            {"id": "m2", "role": "assistant", "content": "الهبة عقد... المادة 368", "metadata": {}},
+        ],
+    }
+
+    with patch("api.services.chat_service.get_message_persistence", return_value=persistence), \
+         patch("api.services.chat_service.get_session_context_cache") as cache:
+        cache.return_value.set = AsyncMock()
+        cache.return_value.append_message = MagicMock()
+        await ChatService()._save_message(snapshot, "user", "وما شروطها؟", message_id="m3")
+
+    context = persistence.write.call_args.kwargs["context"]
+    assert context["active_articles"] == [368]
+    assert "الهبة" in context["active_topics"]
+    assert context["query_history"][-2:] == ["ما هي الهبة", "وما شروطها؟"]
+
+
+@pytest.mark.asyncio
+@pytest.mark.skipif(sys.version_info < (3, 12), reason="chat_service uses PEP 701 f-strings")
+async def test_save_message_refolds_onto_a_concurrently_saved_context():
+    from api.services.chat_service import ChatService
+    from api.services.message_persistence import ContextConflict
+
+    persistence = MagicMock()
+    persistence.write = AsyncMock(side_effect=[
+        ContextConflict({"active_topics": ["الوقف"], "query_history": ["ما هو الوقف"]}, 6),
+        {"message": {"id": "m1"}, "context_version": 7},
+    ])
+    persistence.flush = AsyncMock()
+    snapshot = {
+        "session": {"id": "s1", "lawyer_id": "l1", "context_version": 5,
+                    "conversation_context": {"active_topics": ["الهبة"]}},
+        "recent_messages": [],
+    }
+
+    stored = [
+        {"id": "m0", "role": "user", "content": "ما هو الوقف", "created_at": "t0", "metadata": {}},
+        {"id": "m1", "role": "user", "content": "المادة 368", "created_at": "t1", "metadata": {}},
+    ]
+    service = ChatService()
+    with patch("api.services.chat_service.get_message_persistence", return_value=persistence), \
+         patch("api.services.chat_service.get_session_context_cache") as cache, \
+         patch.object(service, "fetch_messages_page", return_value=(stored, None)):
+        cache.return_value.set = AsyncMock()
+        cache.return_value.append_message = MagicMock()
+        await service._save_message(snapshot, "user", "المادة 368", message_id="m1")
+
+    first, second = persistence.write.call_args_list
+    assert (first.kwargs["context_version"], second.kwargs["context_version"]) == (5, 6)
+    # The other turn's context is kept, this message is folded onto it
+    assert second.kwargs["context"]["active_topics"] == ["الوقف"]
+    assert second.kwargs["context"]["active_articles"] == [368]
+    assert snapshot["session"]["context_version"] == 7
+    # The other turn's message is reloaded into the cached window
+    assert [m["id"] for m in snapshot["recent_messages"]] == ["m0", "m1"]
+    cache.return_value.set.assert_awaited_once_with(snapshot)
+
+
+@pytest.mark.asyncio
+@pytest.mark.skipif(sys.version_info < (3, 12), reason="chat_service uses PEP 701 f-strings")
+async def test_save_message_drops_the_snapshot_when_the_window_cannot_be_reloaded():
+    from api.services.chat_service import ChatService
+    from api.services.message_persistence import ContextConflict
+
+    persistence = MagicMock()
+    persistence.write = AsyncMock(side_effect=[
+        ContextConflict({"active_topics": ["الوقف"]}, 6),
+        {"message": {"id": "m1"}, "context_version": 7},
+    ])
+    persistence.flush = AsyncMock()
+    snapshot = {
+        "session": {"id": "s1", "lawyer_id": "l1", "context_version": 5, "conversation_context": {}},
+        "recent_messages": [],
+    }
+
+    service = ChatService()
+    with patch("api.services.chat_service.get_message_persistence", return_value=persistence), \
+         patch("api.services.chat_service.get_session_context_cache") as cache, \
+         patch.object(service, "fetch_messages_page", side_effect=RuntimeError("db down")):
+        cache.return_value.set = AsyncMock()
+        cache.return_value.invalidate = AsyncMock()
+        await service._save_message(snapshot, "user", "المادة 368", message_id="m1")
+
+    cache.return_value.set.assert_not_awaited()
+    cache.return_value.invalidate.assert_awaited_once_with("s1")
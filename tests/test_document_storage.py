@@ -0,0 +1,77 @@
+import hashlib
+import io
+import os
+import pytest
+from unittest.mock import MagicMock
+from fastapi import HTTPException, UploadFile
+from api.services.document_storage import DocumentStorage, stream_upload, resolve_local_path
+
+PDF = b"%PDF-1.7 " + os.urandom(300_000)
+
+
+def _upload(data=PDF):
+    return UploadFile(file=io.BytesIO(data), filename="contract.pdf")
+
+
+class BlobDB:
+    """Supabase double implementing the acquire/release RPCs in memory."""
+
+    def __init__(self):
+        self.blobs = {}
+
+    def rpc(self, name, params):
+        call = MagicMock()
+        if name == "acquire_document_blob":
+            blob = self.blobs.setdefault(params["p_sha256"], {"file_path": params["p_file_path"], "ref_count": 0})
+            blob["ref_count"] += 1
+            call.execute.return_value.data = [dict(blob)]
+        else:
+            blob = self.blobs[params["p_sha256"]]
+            blob["ref_count"] -= 1
+            call.execute.return_value.data = blob["ref_count"]
+        return call
+
+
+@pytest.fixture(autouse=True)
+def in_tmp_dir(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+
+
+@pytest.mark.asyncio
+async def test_stream_hashes_incrementally_and_enforces_limits():
+    streamed = await stream_upload(_upload(), max_bytes=10 * 1024 * 1024, chunk_size=64 * 1024)
+    assert streamed.sha256 == hashlib.sha256(PDF).hexdigest()
+    assert streamed.size == len(PDF)
+    assert open(streamed.temp_path, "rb").read() == PDF
+
+    with pytest.raises(HTTPException) as too_big:
+        await stream_upload(_upload(), max_bytes=100_000, chunk_size=64 * 1024)
+    with pytest.raises(HTTPException) as over_quota:
+        await stream_upload(_upload(), max_bytes=10 * 1024 * 1024, quota_bytes=200_000, chunk_size=64 * 1024)
+
+    assert (too_big.value.status_code, over_quota.value.status_code) == (413, 403)
+    # Rejected uploads leave nothing behind
+    assert os.listdir("uploads/documents/tmp") == [os.path.basename(streamed.temp_path)]
+
+
+@pytest.mark.asyncio
+async def test_duplicates_share_one_blob_until_last_release():
+    storage = DocumentStorage(db=BlobDB())
+
+    first = await storage.commit(await stream_upload(_upload(), max_bytes=10 ** 7), "pdf")
+    second = await storage.commit(await stream_upload(_upload(), max_bytes=10 ** 7), "pdf")
+
+    assert not first["deduplicated"] and second["deduplicated"]
+    assert first["file_url"] == second["file_url"]
+    assert resolve_local_path(first["file_url"]) == first["file_path"]
+    assert os.listdir("uploads/documents/tmp") == []
+
+    assert await storage.release(first["sha256"], first["file_path"]) == 1
+    assert os.path.exists(first["file_path"])
+    assert await storage.release(first["sha256"], first["file_path"]) == 0
+    assert not os.path.exists(first["file_path"])
+
+
+def test_resolves_legacy_urls():
+    assert resolve_local_path("/uploads/documents/abc.pdf") == os.path.join("uploads", "documents", "abc.pdf")
+    assert resolve_local_path("/uploads/documents/../../etc/passwd") == os.path.join("uploads", "documents", "passwd")
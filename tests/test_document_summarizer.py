@@ -0,0 +1,141 @@
+import asyncio
+import pytest
+from unittest.mock import MagicMock
+from api.services.summarization_service import DocumentSummarizer, split_on_boundaries
+
+
+class FakeLLM:
+    def __init__(self, fail_on=None):
+        self.fail_on = fail_on
+        self.chunk_calls = []
+        self.reduce_calls = []
+        self.in_flight = 0
+        self.max_in_flight = 0
+
+    async def summarize_chunk(self, text, chunk_number, total_chunks, is_final):
+        self.in_flight += 1
+        self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        await asyncio.sleep(0.01)
+        self.in_flight -= 1
+        if chunk_number == self.fail_on:
+            return {"success": False, "summary": None, "error": "503"}
+        self.chunk_calls.append(chunk_number)
+        return {"success": True, "summary": f"s{chunk_number}", "error": None}
+
+    async def reduce_summaries(self, summaries, is_final=False):
+        self.reduce_calls.append((tuple(summaries), is_final))
+        return {"success": True, "summary": "(" + "+".join(summaries) + ")", "error": None}
+
+
+class MemorySummarizer(DocumentSummarizer):
+    def __init__(self, store, **kwargs):
+        super().__init__(db=object(), **kwargs)
+        self.store = store
+        self.updates = []
+
+    async def _load_partials(self, document_id):
+        return dict(self.store)
+
+    async def _save_partial(self, document_id, level, index, content_hash, summary):
+        self.store[(level, index)] = {"content_hash": content_hash, "summary": summary}
+
+    async def _update_document(self, document_id, data):
+        self.updates.append(data)
+
+
+def _document(articles=10, words=40):
+    return "\n".join(f"المادة {n}\n" + " ".join(["نص"] * words) for n in range(1, articles + 1))
+
+
+def test_split_keeps_articles_whole():
+    chunks = split_on_boundaries(_document(articles=10, words=40), max_words=100)
+
+    assert len(chunks) == 5
+    for chunk in chunks:
+        assert chunk.startswith("المادة")
+        assert chunk.count("المادة") == 2
+
+    long_paragraph = "جملة طويلة. " * 150
+    assert all(len(c.split()) <= 100 for c in split_on_boundaries(long_paragraph, max_words=100))
+
+
+@pytest.mark.asyncio
+async def test_map_runs_concurrently_and_reduces_in_a_tree():
+    llm = FakeLLM()
+    summarizer = MemorySummarizer({}, llm=llm, parallelism=3, fanout=2, max_words=50)
+
+    summary = await summarizer.summarize("doc", _document(articles=5))
+
+    assert summary == "(((s1+s2)+(s3+s4))+s5)"
+    assert 1 < llm.max_in_flight <= 3
+    assert sorted(llm.chunk_calls) == [1, 2, 3, 4, 5]
+    assert [final for _, final in llm.reduce_calls].count(True) == 1
+    assert summarizer.updates[-1] == {"chunk_number": 5, "total_chunks": 5}
+
+
+@pytest.mark.asyncio
+async def test_resumes_from_stored_partials():
+    store = {}
+    failing = MemorySummarizer(store, llm=FakeLLM(fail_on=4), parallelism=2, fanout=2, max_words=50)
+    with pytest.raises(RuntimeError):
+        await failing.summarize("doc", _document(articles=5))
+
+    llm = FakeLLM()
+    resumed = MemorySummarizer(store, llm=llm, parallelism=2, fanout=2, max_words=50)
+    summary = await resumed.summarize("doc", _document(articles=5))
+
+    assert llm.chunk_calls == [4]
+    assert summary == "(((s1+s2)+(s3+s4))+s5)"
+    assert resumed.updates[0] == {"chunk_number": 4, "total_chunks": 5}
+
+
+@pytest.mark.asyncio
+async def test_job_runs_only_in_the_process_holding_the_lease():
+    leases = {}
+
+    class LeasedSummarizer(MemorySummarizer):
+        def __init__(self, owner, **kwargs):
+            super().__init__({}, **kwargs)
+            self.db = MagicMock()
+            self.owner = owner
+
+        async def _claim(self, document_id):
+            return leases.setdefault(document_id, self.owner) == self.owner
+
+        async def _run(self, query):
+            return type("Result", (), {"data": [{"id": "doc", "raw_text": _document(articles=3)}]})()
+
+    workers = [LeasedSummarizer(f"worker-{i}", llm=FakeLLM(), max_words=50) for i in range(3)]
+    await asyncio.gather(*(w.run("doc") for w in workers))
+
+    ran = [w for w in workers if w.llm.chunk_calls]
+    assert [w.owner for w in ran] == ["worker-0"]
+    assert ran[0].updates[-1]["summary_status"] == "completed"
+
+
+@pytest.mark.asyncio
+async def test_job_stops_writing_once_its_lease_is_lost():
+    claims = []
+
+    class SlowLLM(FakeLLM):
+        async def summarize_chunk(self, text, chunk_number, total_chunks, is_final):
+            await asyncio.sleep(0.2)
+            return await super().summarize_chunk(text, chunk_number, total_chunks, is_final)
+
+    class LosingSummarizer(MemorySummarizer):
+        async def _claim(self, document_id):
+            claims.append(document_id)
+            return len(claims) == 1  # Renewal fails: another process took the lease over
+
+        async def _run(self, query):
+            return type("Result", (), {"data": [{"id": "doc", "raw_text": _document(articles=3)}]})()
+
+    llm = SlowLLM()
+    summarizer = LosingSummarizer({}, llm=llm, max_words=50, lease_seconds=0.03)
+    summarizer.db = MagicMock()
+    await summarizer.run("doc")
+
+    assert len(claims) == 2
+    assert llm.chunk_calls == []
+    assert not summarizer.store
+    assert not any("summary_status" in update for update in summarizer.updates)
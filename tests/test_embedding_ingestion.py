@@ -0,0 +1,108 @@
+import asyncio
+import pytest
+from agents.knowledge.ingestion import EmbeddingIngestionEngine, embedding_hash
+
+MODEL = "bge-m3-test"
+
+
+class FakeEmbedder:
+    def __init__(self, delay=0.01):
+        self.delay = delay
+        self.batches = []
+        self.in_flight = 0
+        self.max_in_flight = 0
+
+    async def __call__(self, texts):
+        self.in_flight += 1
+        self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        await asyncio.sleep(self.delay)
+        self.in_flight -= 1
+        self.batches.append(list(texts))
+        return [[float(len(t)), 1.0] for t in texts]
+
+
+class MemoryEngine(EmbeddingIngestionEngine):
+    """Engine over in-memory document_chunks / legal_sources"""
+
+    def __init__(self, chunks, flagged=(), **kwargs):
+        kwargs.setdefault("requests_per_second", 0)
+        super().__init__(db=object(), model=MODEL, **kwargs)
+        self.chunks = chunks
+        self.flagged = set(flagged)
+        self.writes = []
+
+    async def _fetch_chunks(self, source_id, after_id, limit):
+        rows = sorted((c for c in self.chunks.values() if not source_id or c["source_id"] == source_id),
+                      key=lambda c: c["id"])
+        return [dict(c) for c in rows if not after_id or c["id"] > after_id][:limit]
+
+    async def _write_embeddings(self, rows):
+        self.writes.append(len(rows))
+        for row in rows:
+            self.chunks[row["id"]].update(embedding=row["embedding"], embedding_hash=row["embedding_hash"])
+
+    async def _fetch_flagged_sources(self):
+        return sorted(self.flagged)
+
+    async def _clear_flag(self, source_id):
+        self.flagged.discard(source_id)
+
+
+def _chunks(count, source_id="law-1"):
+    return {
+        f"{source_id}-{n:04d}": {"id": f"{source_id}-{n:04d}", "source_id": source_id,
+                                 "content": f"المادة {n} نص", "embedding_hash": None}
+        for n in range(count)
+    }
+
+
+@pytest.mark.asyncio
+async def test_batches_concurrently_and_writes_in_bulk():
+    embedder = FakeEmbedder()
+    engine = MemoryEngine(_chunks(250), embed_fn=embedder, batch_size=32, concurrency=3, write_batch_size=100)
+
+    stats = await engine.reindex("law-1", page_size=1000)
+
+    assert stats.embedded == 250 and stats.failed == 0
+    assert stats.requests == 8
+    assert max(len(b) for b in embedder.batches) == 32
+    assert 1 < embedder.max_in_flight <= 3
+    assert engine.writes == [100, 100, 50]
+    assert stats.chunks_per_second > 0
+    assert all(c["embedding"] for c in engine.chunks.values())
+
+
+@pytest.mark.asyncio
+async def test_skips_chunks_with_unchanged_content_hash():
+    chunks = _chunks(20)
+    embedder = FakeEmbedder(delay=0)
+    engine = MemoryEngine(chunks, embed_fn=embedder, batch_size=8)
+    await engine.reindex()
+
+    chunks["law-1-0003"]["content"] = "المادة 3 نص معدّل"
+    chunks["law-1-0011"]["content"] = "المادة 11 نص معدّل"
+    embedder.batches.clear()
+    stats = await engine.reindex(page_size=7)
+
+    assert (stats.scanned, stats.embedded, stats.skipped) == (20, 2, 18)
+    assert sorted(t for b in embedder.batches for t in b) == ["المادة 11 نص معدّل", "المادة 3 نص معدّل"]
+    assert chunks["law-1-0003"]["embedding_hash"] == embedding_hash("المادة 3 نص معدّل", MODEL)
+
+
+@pytest.mark.asyncio
+async def test_flagged_sources_cleared_only_when_fully_embedded():
+    chunks = {**_chunks(10, "law-1"), **_chunks(10, "law-2")}
+
+    async def embed(texts):
+        if any("law-2" in t for t in texts):
+            raise RuntimeError("503 Service Unavailable")
+        return [[1.0] for _ in texts]
+
+    chunks["law-2-0005"]["content"] = "law-2 broken chunk"
+    engine = MemoryEngine(chunks, flagged={"law-1", "law-2"}, embed_fn=embed, batch_size=4, max_attempts=1)
+
+    results = await engine.process_flagged()
+
+    assert results["law-1"].embedded == 10
+    assert results["law-2"].failed == 4 and results["law-2"].embedded == 6
+    assert engine.flagged == {"law-2"}
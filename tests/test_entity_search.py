@@ -0,0 +1,64 @@
+import pytest
+from unittest.mock import MagicMock, patch
+from agents.storage.entity_search import EntitySearch
+
+USER = {"id": "lawyer_1", "role": "lawyer"}
+
+
+def _db(rows):
+    db = MagicMock()
+    db.rpc.return_value.execute.return_value.data = rows
+    return db
+
+
+def test_search_groups_ranked_rows_per_entity():
+    db = _db([
+        {"entity": "clients", "id": "c1", "score": 1.0, "record": {"id": "c1", "full_name": "أحمد علي"}},
+        {"entity": "clients", "id": "c2", "score": 0.55, "record": {"id": "c2", "full_name": "احمد على"}},
+        {"entity": "cases", "id": "k1", "score": 0.6, "record": {"id": "k1", "clients": {"full_name": "أحمد علي"}}},
+    ])
+
+    results = EntitySearch(db).search("lawyer_1", "  احمد  ", entities=["clients", "cases"], limit=5)
+
+    name, params = db.rpc.call_args.args
+    assert name == "search_entities"
+    assert params["p_query"] == "احمد" and params["p_limit"] == 5
+    assert params["p_entities"] == ["clients", "cases"]
+    assert [r["id"] for r in results["clients"]] == ["c1", "c2"]
+    assert results["clients"][1]["search_score"] == 0.55
+    assert results["cases"][0]["clients"]["full_name"] == "أحمد علي"
+
+
+def test_blank_query_and_unknown_entity():
+    db = _db([])
+    assert EntitySearch(db).search("lawyer_1", "   ") == {"clients": [], "cases": [], "police_records": []}
+    db.rpc.assert_not_called()
+
+    with pytest.raises(ValueError):
+        EntitySearch(db).search("lawyer_1", "x", entities=["users"])
+
+
+@pytest.mark.asyncio
+async def test_storages_and_police_endpoint_use_entity_search():
+    from agents.storage.client_storage import ClientStorage
+    from agents.storage.case_storage import CaseStorage
+    from api.routers.police_records import get_police_records
+
+    db = _db([{"entity": "police_records", "id": "p1", "score": 0.7,
+               "record": {"id": "p1", "case": {"case_number": "12/2026"}}}])
+
+    with patch("api.routers.police_records.get_supabase_client", return_value=db):
+        records = await get_police_records(search="محضر", current_user=USER)
+    assert records == [{"id": "p1", "case": {"case_number": "12/2026"}, "search_score": 0.7}]
+    db.table.assert_not_called()
+
+    fake = EntitySearch(_db([]))
+    with patch("agents.storage.entity_search.entity_search", fake):
+        with patch.object(fake, "search", wraps=fake.search) as search:
+            ClientStorage.__new__(ClientStorage).search_clients("lawyer_1", "موسسه")
+            storage = CaseStorage.__new__(CaseStorage)
+            storage.use_supabase = True
+            storage.search_cases("lawyer_1", "ايجار", limit=3)
+
+    assert search.call_args_list[0].kwargs == {"entities": ["clients"], "limit": 20}
+    assert search.call_args_list[1].kwargs == {"entities": ["cases"], "limit": 3}
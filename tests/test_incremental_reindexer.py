@@ -0,0 +1,135 @@
+import pytest
+from agents.knowledge.ingestion import EmbeddingIngestionEngine
+from agents.knowledge.reindexer import IncrementalReindexer, plan_rechunk, split_articles
+
+
+def _law(articles):
+    return "قانون الإثبات\n\nالباب الأول\n" + "\n\n".join(f"المادة {n}\n{text}" for n, text in articles)
+
+
+ARTICLES = [(n, f"نص المادة رقم {n} كما ورد في القانون") for n in range(1, 9)]
+
+
+class MemoryReindexer(IncrementalReindexer):
+    """Reindexer over an in-memory legal source + document_chunks"""
+
+    def __init__(self, content, flagged=True):
+        self.embedded = []
+
+        async def embed(texts):
+            self.embedded.extend(texts)
+            return [[1.0] for _ in texts]
+
+        engine = EmbeddingIngestionEngine(db=object(), embed_fn=embed, model="test", requests_per_second=0)
+        engine._write_embeddings = self._write_embeddings
+        engine._fetch_flagged_sources = self._fetch_flagged_sources
+        engine._clear_flag = self._clear_flag
+        super().__init__(db=object(), engine=engine)
+        self.content = content
+        self.flagged = flagged
+        self.rows = {}
+
+    async def _fetch_content(self, source_id):
+        return self.content
+
+    async def _fetch_existing(self, source_id):
+        return sorted((dict(r) for r in self.rows.values()), key=lambda r: r["sequence_number"])
+
+    async def _apply(self, source_id, plan):
+        for row_id in plan.delete_ids:
+            del self.rows[row_id]
+        for row in plan.rows:
+            update = {k: v for k, v in row.items() if k != "is_new"}
+            self.rows.setdefault(row["id"], {}).update(update)
+        numbers = sorted(r["sequence_number"] for r in self.rows.values())
+        assert numbers == list(range(1, len(numbers) + 1)), "sequence_number must stay contiguous"
+
+    async def _write_embeddings(self, rows):
+        for row in rows:
+            self.rows[row["id"]]["embedding_hash"] = row["embedding_hash"]
+
+    async def _fetch_flagged_sources(self):
+        return ["law"] if self.flagged else []
+
+    async def _clear_flag(self, source_id):
+        self.flagged = False
+
+
+def test_split_on_article_headings_only():
+    chunks = split_articles(_law([(1, "يُستثنى ما ورد في المواد 5 و م.7"), (2, "نص"), (3, "نص")]))
+
+    assert [c.content.split("\n")[0] for c in chunks] == ["قانون الإثبات", "الباب الأول", "المادة 2", "المادة 3"]
+    assert chunks[1].hierarchy_path == "الباب الأول / المادة 1"
+    assert [c.sequence_number for c in chunks] == [1, 2, 3, 4]
+
+
+def test_inserted_article_only_renumbers_following_chunks():
+    old = split_articles(_law(ARTICLES))
+    existing = [{"id": f"row-{c.sequence_number}", "sequence_number": c.sequence_number,
+                 "hierarchy_path": c.hierarchy_path, "content": c.content} for c in old]
+
+    amended = ARTICLES[:4] + [(4.5, "مادة مضافة بالتعديل")] + ARTICLES[4:]
+    amended[2] = (3, "نص المادة رقم 3 بعد تعديله")
+    plan = plan_rechunk(existing, split_articles(_law(amended)))
+
+    assert plan.changed == 2 and plan.unchanged == len(old) - 1
+    assert not plan.delete_ids
+    assert {r["id"] for r in plan.rows if "content" in r} == {"row-4", *[r["id"] for r in plan.rows if r["is_new"]]}
+    renumbered = {r["id"]: r["sequence_number"] for r in plan.rows if "content" not in r}
+    assert renumbered == {f"row-{n}": n + 1 for n in range(6, 10)}
+
+
+@pytest.mark.asyncio
+async def test_reindex_embeds_only_changed_chunks_and_clears_flag():
+    reindexer = MemoryReindexer(_law(ARTICLES))
+    first = await reindexer.reindex_source("law")
+    assert first["changed"] == first["chunks"] == 9
+
+    reindexer.embedded.clear()
+    reindexer.content = _law(ARTICLES[:5] + [(6, "النص الجديد للمادة السادسة")] + ARTICLES[7:])
+    results = await reindexer.process_flagged()
+
+    assert results["law"]["embedding"]["embedded"] == 1
+    assert results["law"]["deleted"] == 1
+    assert reindexer.embedded == ["المادة 6\nالنص الجديد للمادة السادسة"]
+    assert reindexer.flagged is False
+    assert all(r.get("embedding_hash") for r in reindexer.rows.values())
+
+
+@pytest.mark.asyncio
+async def test_existing_chunks_are_read_in_keyset_pages():
+    stored = [{"id": f"c{i:02d}", "sequence_number": 25 - i} for i in range(25)]
+    pages = []
+
+    class Query:
+        def __init__(self):
+            self.after, self.size = None, None
+
+        def select(self, *_):
+            return self
+
+        def eq(self, *_):
+            return self
+
+        def gt(self, _, value):
+            self.after = value
+            return self
+
+        def order(self, *_):
+            return self
+
+        def limit(self, size):
+            self.size = size
+            return self
+
+        def execute(self):
+            rows = [r for r in stored if self.after is None or r["id"] > self.after][:self.size]
+            pages.append(len(rows))
+            return type("Result", (), {"data": rows})()
+
+    db = type("DB", (), {"table": lambda self, _: Query()})()
+    reindexer = IncrementalReindexer(db=db, engine=EmbeddingIngestionEngine(db=db, model="test"))
+    rows = await reindexer._fetch_existing("law", page_size=10)
+
+    assert pages == [10, 10, 5]
+    assert [r["sequence_number"] for r in rows] == list(range(1, 26))
@@ -0,0 +1,81 @@
+import time
+import pytest
+from unittest.mock import patch, AsyncMock
+from jose import jwt
+from api.utils.jwt_verifier import JWTVerifier
+from api.cache.user_cache import UserProfileCache
+
+LOCAL_SECRET = "local_secret_key_with_enough_length_123"
+SUPABASE_SECRET = "supabase_secret_key_with_enough_length_456"
+
+
+def _token(secret, **claims):
+    payload = {"sub": "user_1", "exp": int(time.time()) + 3600, **claims}
+    return jwt.encode(payload, secret, algorithm="HS256")
+
+
+@pytest.fixture
+def verifier():
+    return JWTVerifier(local_secret=LOCAL_SECRET, supabase_secret=SUPABASE_SECRET)
+
+
+@pytest.mark.asyncio
+async def test_internal_token_verified_locally(verifier):
+    claims = await verifier.verify(_token(LOCAL_SECRET))
+    assert claims["sub"] == "user_1"
+
+
+@pytest.mark.asyncio
+async def test_supabase_token_verified_with_audience(verifier):
+    claims = await verifier.verify(_token(SUPABASE_SECRET, aud="authenticated"))
+    assert claims["sub"] == "user_1"
+
+    assert await verifier.verify(_token(SUPABASE_SECRET, aud="other")) is None
+
+
+@pytest.mark.asyncio
+async def test_forged_and_expired_tokens_rejected(verifier):
+    assert await verifier.verify(_token("attacker_secret_with_enough_length_789")) is None
+    assert await verifier.verify(_token(LOCAL_SECRET, exp=int(time.time()) - 10)) is None
+    assert await verifier.verify("not-a-jwt") is None
+
+
+@pytest.mark.asyncio
+async def test_remote_fallback_only_without_key_material():
+    no_supabase_secret = JWTVerifier(local_secret=LOCAL_SECRET)
+    token = _token(SUPABASE_SECRET, aud="authenticated")
+
+    assert await no_supabase_secret.verify(token) is None
+    assert no_supabase_secret.has_key_material(token) is False
+
+    with_secret = JWTVerifier(local_secret=LOCAL_SECRET, supabase_secret=SUPABASE_SECRET)
+    assert with_secret.has_key_material(_token("attacker_secret_with_enough_length_789")) is True
+
+
+@pytest.fixture
+def redis_off():
+    redis = AsyncMock()
+    redis.get.return_value = None
+    redis.get_versioned.return_value = (None, None)
+    with patch('api.cache.user_cache.get_cache', return_value=redis):
+        yield redis
+
+
+@pytest.mark.asyncio
+async def test_user_cache_is_bounded(redis_off):
+    cache = UserProfileCache(max_size=2, local_ttl=60)
+    for i in range(3):
+        await cache.set(f"u{i}", {"id": f"u{i}"})
+
+    assert await cache.get("u0") is None
+    assert await cache.get("u2") == {"id": "u2"}
+    assert cache.get_stats()["evictions"] == 1
+
+
+@pytest.mark.asyncio
+async def test_user_cache_invalidate(redis_off):
+    cache = UserProfileCache(max_size=10, local_ttl=60)
+    await cache.set("u1", {"id": "u1"})
+    cache.invalidate("u1")
+
+    assert await cache.get("u1") is None
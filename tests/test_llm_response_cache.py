@@ -0,0 +1,102 @@
+import pytest
+from unittest.mock import AsyncMock, MagicMock, patch
+from langchain_core.messages import AIMessage, SystemMessage, HumanMessage
+from agents.core.llm_response_cache import LLMResponseCache, cached_ainvoke
+
+VECTORS = {
+    "كم موكل عندي؟": [1.0, 0.0, 0.0],
+    "كم عدد موكليني؟": [0.99, 0.05, 0.0],
+    "ما عقوبة السرقة؟": [0.0, 1.0, 0.0],
+}
+
+
+def _llm(answer="ADMIN_QUERY", model="model-a"):
+    llm = MagicMock()
+    llm.model_name = model
+    llm.ainvoke = AsyncMock(return_value=AIMessage(content=answer))
+    return llm
+
+
+def _cache(**kwargs):
+    return LLMResponseCache(embed_fn=AsyncMock(side_effect=lambda t: VECTORS[t]), **kwargs)
+
+
+def _messages(text):
+    return [SystemMessage(content="classify"), HumanMessage(content=text)]
+
+
+@pytest.mark.asyncio
+async def test_exact_hit_skips_llm_and_is_keyed_by_model():
+    cache, llm = _cache(), _llm()
+
+    first = await cached_ainvoke(llm, _messages("ما عقوبة السرقة؟"), "scout_keywords", cache=cache)
+    second = await cached_ainvoke(llm, _messages("ما عقوبة السرقة؟"), "scout_keywords", cache=cache)
+    assert first.content == second.content == "ADMIN_QUERY"
+    assert llm.ainvoke.await_count == 1
+
+    other_model = _llm(model="model-b")
+    await cached_ainvoke(other_model, _messages("ما عقوبة السرقة؟"), "scout_keywords", cache=cache)
+    assert other_model.ainvoke.await_count == 1
+
+    stats = cache.get_stats()["call_sites"]["scout_keywords"]
+    assert (stats["exact_hits"], stats["misses"]) == (1, 2)
+
+
+@pytest.mark.asyncio
+async def test_semantic_hit_only_for_classification_sites():
+    cache, llm = _cache(), _llm()
+
+    await cached_ainvoke(llm, _messages("كم موكل عندي؟"), "gatekeeper_classification",
+                         semantic_text="كم موكل عندي؟", cache=cache)
+    near = await cached_ainvoke(llm, _messages("كم عدد موكليني؟"), "gatekeeper_classification",
+                                semantic_text="كم عدد موكليني؟", cache=cache)
+    assert near.content == "ADMIN_QUERY"
+    assert llm.ainvoke.await_count == 1
+    assert cache.get_stats()["call_sites"]["gatekeeper_classification"]["semantic_hits"] == 1
+
+    await cached_ainvoke(llm, _messages("ما عقوبة السرقة؟"), "gatekeeper_classification",
+                         semantic_text="ما عقوبة السرقة؟", cache=cache)
+    assert llm.ainvoke.await_count == 2
+
+    # Non-classification site: near duplicates still go to the LLM
+    await cached_ainvoke(llm, _messages("كم موكل عندي؟"), "scout_keywords",
+                         semantic_text="كم موكل عندي؟", cache=cache)
+    await cached_ainvoke(llm, _messages("كم عدد موكليني؟"), "scout_keywords",
+                         semantic_text="كم عدد موكليني؟", cache=cache)
+    assert llm.ainvoke.await_count == 4
+
+
+@pytest.mark.asyncio
+async def test_ttl_opt_in_and_rejected_responses():
+    cache, llm = _cache(), _llm(answer="not json")
+
+    await cached_ainvoke(llm, _messages("x"), "unregistered_site", cache=cache)
+    await cached_ainvoke(llm, _messages("x"), "unregistered_site", cache=cache)
+    assert llm.ainvoke.await_count == 2
+
+    await cached_ainvoke(llm, _messages("x"), "research_planning", accept=lambda t: "{" in t, cache=cache)
+    await cached_ainvoke(llm, _messages("x"), "research_planning", accept=lambda t: "{" in t, cache=cache)
+    assert llm.ainvoke.await_count == 4
+
+    with patch("agents.core.llm_response_cache.time.monotonic", return_value=0.0):
+        await cached_ainvoke(llm, _messages("y"), "scout_keywords", cache=cache)
+    with patch("agents.core.llm_response_cache.time.monotonic", return_value=10 ** 9):
+        await cached_ainvoke(llm, _messages("y"), "scout_keywords", cache=cache)
+    assert llm.ainvoke.await_count == 6
+
+
+@pytest.mark.asyncio
+async def test_gatekeeper_does_not_cache_unknown_intents():
+    from agents.graph.nodes.gatekeeper import _classify_with_llm
+
+    cache, llm = _cache(), _llm(answer="I think this is legal")
+    with patch("agents.graph.nodes.gatekeeper.get_llm", return_value=llm), \
+         patch("agents.core.llm_response_cache.get_llm_response_cache", return_value=cache):
+        assert await _classify_with_llm("ما عقوبة السرقة؟") == "LEGAL_QUERY"
+        assert await _classify_with_llm("ما عقوبة السرقة؟") == "LEGAL_QUERY"
+        assert llm.ainvoke.await_count == 2
+
+        llm.ainvoke.return_value = AIMessage(content="LEGAL_QUERY")
+        await _classify_with_llm("كم موكل عندي؟")
+        await _classify_with_llm("كم موكل عندي؟")
+        assert llm.ainvoke.await_count == 3
@@ -0,0 +1,96 @@
+import uuid
+import pytest
+from unittest.mock import patch
+from agents.core.llm_router import LLMRouter, Endpoint, RouterCallbackHandler, build_endpoints, CAPABILITY_JSON, CAPABILITY_LITE
+
+
+def _router(**kwargs):
+    return LLMRouter(
+        [Endpoint("fast"), Endpoint("slow"), Endpoint("mini", capabilities={CAPABILITY_LITE})],
+        **kwargs
+    )
+
+
+def test_prefers_lower_latency_endpoint():
+    router = _router()
+    router.on_start(router.endpoints["fast"])
+    router.on_success(router.endpoints["fast"], 0.2)
+    router.on_start(router.endpoints["slow"])
+    router.on_success(router.endpoints["slow"], 5.0)
+    router.on_start(router.endpoints["mini"])
+    router.on_success(router.endpoints["mini"], 1.0)
+
+    picks = [router.select().model for _ in range(300)]
+
+    assert picks.count("slow") < picks.count("fast")
+    # Power of two choices never picks the worst of any pair
+    assert picks.count("slow") == 0
+
+
+def test_capability_routing_with_fallback():
+    router = _router()
+    assert {router.select(CAPABILITY_LITE).model for _ in range(20)} == {"mini"}
+
+    router.endpoints["mini"].ejected_until = float("inf")
+    assert router.select(CAPABILITY_LITE).model in {"fast", "slow"}
+
+
+def test_ejection_and_half_open_recovery():
+    router = _router(failure_threshold=2, ejection_seconds=60)
+    slow = router.endpoints["slow"]
+    for _ in range(2):
+        router.on_start(slow)
+        router.on_failure(slow, RuntimeError("503"))
+
+    assert all(router.select().model != "slow" for _ in range(50))
+
+    # Ejection window elapsed: exactly one probe is let through
+    slow.ejected_until = 1.0
+    with patch.object(router, "_rng") as rng:
+        rng.sample.side_effect = lambda c, k: sorted(c, key=lambda e: e.model != "slow")[:k]
+        assert router.select().model == "slow"
+        assert router.select().model != "slow"
+
+    router.on_start(slow)
+    router.on_success(slow, 0.5)
+    assert router.get_stats()["endpoints"][1]["state"] == "healthy"
+
+
+def test_callback_handler_tracks_outstanding_and_errors():
+    router = _router()
+    endpoint = router.endpoints["fast"]
+    handler = RouterCallbackHandler(router, endpoint)
+
+    ok, failed = uuid.uuid4(), uuid.uuid4()
+    handler.on_chat_model_start({}, [], run_id=ok)
+    handler.on_chat_model_start({}, [], run_id=failed)
+    assert endpoint.outstanding == 2
+
+    handler.on_llm_end(None, run_id=ok)
+    handler.on_llm_error(RuntimeError("timeout"), run_id=failed)
+
+    assert endpoint.outstanding == 0
+    assert endpoint.errors == 1
+    assert endpoint.ewma_latency is not None
+
+
+def test_track_context_manager_records_failure():
+    router = _router()
+    endpoint = router.endpoints["fast"]
+    with pytest.raises(ValueError):
+        with router.track(endpoint):
+            raise ValueError("bad gateway")
+
+    assert (endpoint.errors, endpoint.outstanding, endpoint.consecutive_failures) == (1, 0, 1)
+
+
+def test_lite_model_outside_the_pool_only_serves_lite_requests():
+    with patch("agents.core.llm_router.settings") as settings, \
+         patch.dict("os.environ", {"LITE_MODEL_NAME": "tiny"}):
+        settings.openwebui_models = "big1,big2"
+        settings.lite_model_name = "tiny"
+        router = LLMRouter(build_endpoints())
+
+    assert {router.select().model for _ in range(200)} == {"big1", "big2"}
+    assert {router.select(CAPABILITY_JSON).model for _ in range(50)} <= {"big1", "big2"}
+    assert router.select(CAPABILITY_LITE).model == "tiny"
@@ -0,0 +1,100 @@
+import asyncio
+import pytest
+from unittest.mock import MagicMock, patch
+from api.services.message_persistence import (
+    ContextConflict, MessagePersistenceService, TurnLog, reply_id, turn_state
+)
+
+
+@pytest.mark.asyncio
+async def test_write_is_atomic_and_retries_with_the_same_id():
+    db = MagicMock()
+    db.rpc.return_value.execute.side_effect = [
+        Exception("connection reset"),
+        MagicMock(data={"success": True, "duplicate": True, "message": {"id": "m1"}}),
+    ]
+    service = MessagePersistenceService()
+
+    with patch("api.services.message_persistence.get_supabase_client", return_value=db):
+        result = await service.write("s1", "user", "المادة 368", {"entities": {}},
+                                     context={"active_articles": [368]}, message_id="m1")
+
+    assert result["message"] == {"id": "m1"}
+    first, second = [c.args for c in db.rpc.call_args_list]
+    assert first == second
+    name, params = first
+    assert name == "atomic_step_transaction"
+    assert (params["p_message_id"], params["p_context"], params["p_agent_state"]) == ("m1", {"active_articles": [368]}, None)
+    assert (service.stats["retries"], service.stats["duplicates"]) == (1, 1)
+
+
+@pytest.mark.asyncio
+async def test_stale_context_version_raises_conflict_without_retry():
+    db = MagicMock()
+    db.rpc.return_value.execute.return_value = MagicMock(
+        data={"success": False, "conflict": True, "context": {"active_articles": [5]}, "context_version": 4}
+    )
+    service = MessagePersistenceService()
+
+    with patch("api.services.message_persistence.get_supabase_client", return_value=db):
+        with pytest.raises(ContextConflict) as conflict:
+            await service.write("s1", "user", "المادة 368", {}, context={"active_articles": [368]},
+                                message_id="m1", context_version=3)
+
+    assert (conflict.value.context, conflict.value.version) == ({"active_articles": [5]}, 4)
+    db.rpc.assert_called_once()
+    assert db.rpc.call_args.args[1]["p_context_version"] == 3
+    assert (service.stats["conflicts"], service.stats["retries"]) == (1, 0)
+
+
+@pytest.mark.asyncio
+async def test_deferred_writes_are_flushed_in_order_and_failures_replayed():
+    service = MessagePersistenceService()
+    done = []
+    attempts = []
+
+    async def slow_write():
+        await asyncio.sleep(0.01)
+        done.append("user")
+
+    async def flaky_write():
+        attempts.append(1)
+        if len(attempts) == 1:
+            raise RuntimeError("db down")
+        done.append("replayed")
+
+    service.defer("s1", slow_write)
+    service.defer("s1", flaky_write)
+    assert done == []  # the caller did not wait
+
+    await service.flush("s1")
+    assert done == ["user", "replayed"]
+    assert (service.stats["failures"], service.stats["replayed"]) == (1, 1)
+    assert service.get_stats()["pending"] == service.get_stats()["failed"] == 0
+
+    async def failing_write():
+        raise RuntimeError("db down")
+
+    service.defer("s1", failing_write)
+    with pytest.raises(RuntimeError):
+        await service.flush("s1")  # the reply must not be stored without it
+
+
+def test_turn_log_and_state_are_taken_from_the_final_state():
+    final_state = {
+        "intent": "LEGAL_TASK",
+        "conversation_stage": "COMPLETED",
+        "next_agent": "end",
+        "council_opinions": {"strategist": "رأي", "auditor": "تدقيق"},
+        "hcf_details": {"selected_path": "DIRECT"},
+        "chat_history": ["..."],
+    }
+    log = TurnLog()
+    log.capture(final_state)
+
+    metadata = log.to_metadata()
+    assert [entry["agent"] for entry in metadata["council_log"]] == ["strategist", "auditor"]
+    assert metadata["hcf_log"] == [{"selected_path": "DIRECT"}]
+    assert turn_state(final_state) == {"intent": "LEGAL_TASK", "conversation_stage": "COMPLETED", "next_agent": "end"}
+    message_id = "5f0c1a9e-8a4e-4c1e-9d43-0d6f1b7a2c11"
+    assert reply_id(message_id) == reply_id(message_id) != message_id
@@ -0,0 +1,99 @@
+import pytest
+from unittest.mock import patch
+from api.services import ocr_service
+from api.services.ocr_service import OCRService, StubOCRBackend
+
+
+class DictCache:
+    def __init__(self):
+        self.data = {}
+
+    async def get(self, key, tags=None):
+        return self.data.get(key)
+
+    async def set(self, key, value, ttl=None, tags=None):
+        self.data[key] = value
+        return True
+
+
+class TrackingBackend(StubOCRBackend):
+    def __init__(self):
+        super().__init__(delay=0.01)
+        self.in_flight = 0
+        self.max_in_flight = 0
+
+    async def ocr_page(self, data, mime_type):
+        self.in_flight += 1
+        self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        try:
+            return await super().ocr_page(data, mime_type)
+        finally:
+            self.in_flight -= 1
+
+
+def _pages(count):
+    return [(n, f"page-{n}".encode(), "image/png") for n in range(1, count + 1)]
+
+
+@pytest.fixture
+def fake_pdf():
+    pages = _pages(10)
+
+    def iter_pages(file_path, dpi=150):
+        yield from pages
+
+    cache = DictCache()
+    with patch.object(ocr_service, "iter_pages", iter_pages), \
+         patch.object(ocr_service, "count_pages", return_value=len(pages)), \
+         patch.object(ocr_service, "get_cache", return_value=cache):
+        yield cache
+
+
+@pytest.mark.asyncio
+async def test_pages_run_concurrently_within_bound_and_keep_order(fake_pdf):
+    backend = TrackingBackend()
+    service = OCRService(backend=backend, concurrency=3)
+    progress = []
+
+    async def on_progress(done, total):
+        progress.append((done, total))
+
+    result = await service.extract_text_from_file("case.pdf", on_progress=on_progress)
+
+    assert result["success"] and result["pages"] == 10
+    assert 1 < backend.max_in_flight <= 3
+    assert progress[-1] == (10, 10) and len(progress) == 10
+    expected = [await StubOCRBackend().ocr_page(data, "image/png") for _, data, _ in _pages(10)]
+    assert result["text"] == "\n\n".join(expected)
+
+
+@pytest.mark.asyncio
+async def test_page_results_cached_by_content_hash(fake_pdf):
+    backend = StubOCRBackend()
+    service = OCRService(backend=backend, concurrency=2)
+
+    first = await service.extract_text_from_file("case.pdf")
+    second = await service.extract_text_from_file("case_copy.pdf")
+
+    assert backend.calls == 10
+    assert second["cached_pages"] == 10
+    assert first["text"] == second["text"]
+
+
+@pytest.mark.asyncio
+async def test_failed_page_does_not_fail_document(fake_pdf):
+    backend = StubOCRBackend()
+    original = backend.ocr_page
+
+    async def flaky(data, mime_type):
+        if data == b"page-4":
+            raise RuntimeError("503")
+        return await original(data, mime_type)
+
+    backend.ocr_page = flaky
+    result = await OCRService(backend=backend, concurrency=4).extract_text_from_file("case.pdf")
+
+    assert result["success"]
+    assert result["pages"] == 10
+    assert len(result["text"].split("\n\n")) == 9
+    assert result["failed_pages"] == [4]
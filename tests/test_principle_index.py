@@ -0,0 +1,75 @@
+import threading
+import pytest
+from unittest.mock import MagicMock, patch
+from agents.knowledge.ingestion import embedding_hash
+from agents.knowledge.principle_index import TemplateEmbeddingEngine
+from agents.tools.lookup_tools import LookupPrincipleTool
+
+
+@pytest.mark.asyncio
+async def test_backfill_embeds_changed_templates_in_bulk():
+    templates = [
+        {"id": "t1", "template_text": "البينة على من ادعى", "embedding_hash": None},
+        {"id": "t2", "template_text": "الأصل براءة الذمة", "embedding_hash": embedding_hash("الأصل براءة الذمة", "m")},
+        {"id": "t3", "template_text": "الضرر يزال", "embedding_hash": "stale"},
+    ]
+    db = MagicMock()
+    db.table.return_value.select.return_value.order.return_value.limit.return_value.execute.return_value.data = templates
+    calls = []
+
+    async def embed(texts):
+        calls.append(texts)
+        return [[0.1, 0.2] for _ in texts]
+
+    engine = TemplateEmbeddingEngine(db=db, embed_fn=embed, model="m", requests_per_second=1000)
+    stats = await engine.backfill()
+
+    assert calls == [["البينة على من ادعى", "الضرر يزال"]]
+    name, params = db.rpc.call_args.args
+    assert name == "bulk_update_template_embeddings"
+    assert [row["id"] for row in params["p_rows"]] == ["t1", "t3"]
+    assert (stats.embedded, stats.skipped) == (2, 1)
+
+
+def test_lookup_uses_vector_rpc_with_float_array_and_falls_back():
+    fake_db = MagicMock()
+    fake_db.client.rpc.return_value.execute.return_value.data = [
+        {"id": "t1", "template_text": "البينة على من ادعى", "principle_type": "فقهي", "similarity": 0.81}
+    ]
+    tool = LookupPrincipleTool()
+
+    with patch("agents.tools.lookup_tools.db", fake_db), \
+         patch("agents.tools.lookup_tools.create_query_embedding", return_value=[0.5, -0.25]):
+        result = tool.run("عبء الإثبات", limit=3, principle_type="فقهي", min_confidence=0.7)
+
+        name, params = fake_db.client.rpc.call_args.args
+        assert name == "match_thought_templates"
+        assert params["query_embedding"] == [0.5, -0.25]
+        assert (params["p_principle_type"], params["p_min_confidence"], params["match_count"]) == ("فقهي", 0.7, 3)
+        assert result.data[0]["similarity"] == 0.81
+
+        fake_db.client.rpc.return_value.execute.return_value.data = []
+        with patch.object(tool, "_keyword_search_principles", return_value=[{"id": "k1"}]) as keyword:
+            assert tool.run("عبء الإثبات").data == [{"id": "k1"}]
+        keyword.assert_called_once()
+
+
+@pytest.mark.asyncio
+async def test_search_many_is_concurrent_and_deduplicated():
+    tool = LookupPrincipleTool()
+    barrier = threading.Barrier(2, timeout=5)
+    hits = {
+        "q1": [{"id": "a", "similarity": 0.6}, {"id": "b", "similarity": 0.7}],
+        "q2": [{"id": "a", "similarity": 0.9}],
+    }
+
+    def vector(query, limit, principle_type, min_confidence, embedding):
+        barrier.wait()  # both lookups must be in flight at once
+        return hits[query]
+
+    with patch("agents.tools.lookup_tools.create_embeddings", return_value=[[1.0], [2.0]]) as embed, \
+         patch.object(tool, "_vector_search_principles", side_effect=vector):
+        results = await tool.search_many(["q1", "q2", "q1"], limit=2)
+
+    embed.assert_called_once_with(["q1", "q2"])
+    assert [(r["id"], r["similarity"]) for r in results] == [("a", 0.9), ("b", 0.7)]
@@ -0,0 +1,64 @@
+import numpy as np
+import pytest
+from unittest.mock import MagicMock, patch
+from agents.knowledge.quantization import CompactIndex, QuantizedBackfill, binary_quantize, hamming_distance
+from agents.tools.vector_tools import VectorSearchTool
+
+
+def _corpus(count=5000, dim=256, seed=0):
+    rng = np.random.default_rng(seed)
+    centers = rng.normal(size=(64, dim))
+    vectors = centers[rng.integers(0, 64, count)] + rng.normal(size=(count, dim))
+    queries = vectors[rng.choice(count, 40, replace=False)] + 0.5 * rng.normal(size=(40, dim))
+    return vectors.astype(np.float32), queries.astype(np.float32)
+
+
+def _recall(index, vectors, queries, k=10, **kwargs):
+    normed = vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+    total = 0
+    for q in queries:
+        exact = set(np.argsort(-(normed @ (q / np.linalg.norm(q))))[:k].tolist())
+        total += len(exact & {i for i, _ in index.search(q, k, **kwargs)})
+    return total / (k * len(queries))
+
+
+def test_binary_codes_follow_pgvector_sign_rule():
+    vectors = np.array([[0.5, -1.0, 0.0, 2.0, -0.1, 0.3, 0.0, 1.0, 4.0]])
+    assert binary_quantize(vectors).tolist() == [[0b10010101, 0b10000000]]
+
+    a, b = np.ones((1, 16)), np.ones((1, 16))
+    b[0, [2, 5, 11]] = -1
+    assert hamming_distance(binary_quantize(a)[0], binary_quantize(b)).tolist() == [3]
+
+
+def test_rescoring_candidates_recovers_recall():
+    vectors, queries = _corpus()
+    binary = CompactIndex(vectors, "binary")
+    half = CompactIndex(vectors, "half")
+
+    raw = _recall(binary, vectors, queries, candidate_multiplier=1, rescore=False)
+    rescored = _recall(binary, vectors, queries, candidate_multiplier=8)
+
+    assert binary.bytes_per_vector == 32 and half.bytes_per_vector == 512
+    assert rescored >= 0.9 and rescored > raw
+    assert _recall(half, vectors, queries, candidate_multiplier=1) >= 0.98
+    assert _recall(CompactIndex(vectors, "int8"), vectors, queries, candidate_multiplier=2) >= 0.95
+
+
+@pytest.mark.asyncio
+async def test_backfill_batches_and_quantized_backend_rpc():
+    db = MagicMock()
+    db.rpc.return_value.execute.side_effect = [MagicMock(data=500), MagicMock(data=500), MagicMock(data=120)]
+    assert await QuantizedBackfill(db=db, batch_size=500).run() == {"rows": 1120, "batches": 3}
+
+    fake_db = MagicMock()
+    fake_db.client.rpc.return_value.execute.return_value.data = [
+        {"id": "c1", "content": "نص", "similarity": 0.8, "metadata": {"country_id": "eg"}}
+    ]
+    with patch("agents.tools.vector_tools.db", fake_db):
+        result = VectorSearchTool(backend="quantized").run([0.1] * 8, match_count=5, filter={"country_id": "eg"})
+
+    name, params = fake_db.client.rpc.call_args[0]
+    assert name == "match_documents_quantized"
+    assert params["match_count"] == 5 and params["p_first_stage"] == "binary"
+    assert result.success and result.data[0]["id"] == "c1"
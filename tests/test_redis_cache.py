@@ -0,0 +1,163 @@
+import fnmatch
+import pytest
+import redis
+from unittest.mock import patch
+from api.cache.redis_client import RedisCache, CircuitBreaker
+from api.cache.keys import CacheKeys
+
+
+class FakeAsyncRedis:
+    """Minimal in-memory stand-in for redis.asyncio.Redis"""
+
+    def __init__(self):
+        self.data = {}
+        self.commands = []
+
+    async def get(self, key):
+        self.commands.append("GET")
+        return self.data.get(key)
+
+    async def mget(self, keys):
+        self.commands.append("MGET")
+        return [self.data.get(k) for k in keys]
+
+    async def set(self, key, value):
+        self.commands.append("SET")
+        self.data[key] = value
+
+    async def setex(self, key, ttl, value):
+        self.commands.append("SETEX")
+        self.data[key] = value
+
+    async def incr(self, key):
+        self.data[key] = str(int(self.data.get(key) or 0) + 1).encode()
+
+    async def unlink(self, *keys):
+        self.commands.append("UNLINK")
+        return sum(1 for k in keys if self.data.pop(k, None) is not None)
+
+    async def scan_iter(self, match=None, count=None):
+        for key in list(self.data):
+            if fnmatch.fnmatch(key, match):
+                yield key
+
+    def pipeline(self, transaction=False):
+        return FakePipeline(self)
+
+
+class FakePipeline:
+    def __init__(self, client):
+        self.client = client
+        self.queued = []
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        return False
+
+    def __getattr__(self, name):
+        return lambda *args: self.queued.append((name, args))
+
+    async def execute(self):
+        self.client.commands.append("EXEC")
+        for name, args in self.queued:
+            await getattr(self.client, name)(*args)
+
+
+@pytest.fixture
+def cache():
+    with patch.dict('os.environ', {'REDIS_ENABLED': 'False'}):
+        instance = RedisCache()
+    instance.enabled = True
+    instance.client = FakeAsyncRedis()
+    return instance
+
+
+@pytest.mark.asyncio
+async def test_tag_bump_invalidates_all_tagged_keys(cache):
+    tags = [CacheKeys.lawyer_tag("l1")]
+    await cache.set("user:l1:stats", {"cases": 3}, ttl=60, tags=tags)
+    await cache.set("subscription:l1:snapshot", {"id": "s1"}, ttl=60, tags=tags)
+    assert await cache.get("user:l1:stats", tags=tags) == {"cases": 3}
+
+    await cache.invalidate_tag(CacheKeys.lawyer_tag("l1"))
+
+    assert await cache.get("user:l1:stats", tags=tags) is None
+    assert await cache.get("subscription:l1:snapshot", tags=tags) is None
+
+
+@pytest.mark.asyncio
+async def test_invalidation_between_read_and_set_is_not_stored_as_fresh(cache):
+    tags = [CacheKeys.lawyer_tag("l1")]
+    value, versions = await cache.get_versioned("user:l1:stats", tags=tags)
+    assert (value, versions) == (None, {CacheKeys.lawyer_tag("l1"): 0})
+
+    # DB read happens here; a write invalidates the tag before the cache fill
+    await cache.invalidate_tag(CacheKeys.lawyer_tag("l1"))
+    await cache.set("user:l1:stats", {"cases": 3}, ttl=60, tags=tags, versions=versions)
+    await cache.set_many({"user:l1:profile": {"id": "l1"}}, ttl=60,
+                         tags={"user:l1:profile": tags}, versions=versions)
+
+    assert await cache.get("user:l1:stats", tags=tags) is None
+    assert await cache.get("user:l1:profile", tags=tags) is None
+
+
+@pytest.mark.asyncio
+async def test_set_many_unexpected_error_releases_the_probe(cache):
+    cache.breaker.opened_at = 0.0  # half-open
+    assert cache.breaker.allow() and not cache.breaker.allow()
+    cache.breaker._probe_in_flight = False
+
+    assert await cache.set_many({"k": object()}, ttl=60) is False
+    assert cache.breaker.allow()
+
+
+@pytest.mark.asyncio
+async def test_get_is_single_round_trip_without_ping(cache):
+    await cache.set("k", [1, 2], ttl=60)
+    cache.client.commands.clear()
+
+    assert await cache.get("k") == [1, 2]
+    assert await cache.get("k", tags=["t"]) is None  # stored untagged
+    assert cache.client.commands == ["GET", "MGET"]
+
+
+@pytest.mark.asyncio
+async def test_delete_pattern_uses_scan_and_unlink(cache):
+    await cache.set_many({f"lawyer:l1:tasks:{i}": i for i in range(5)}, ttl=60)
+    await cache.set("lawyer:l2:tasks:0", 0, ttl=60)
+
+    assert await cache.delete_pattern("lawyer:l1:*") == 5
+    assert "lawyer:l2:tasks:0" in cache.client.data
+    assert "KEYS" not in cache.client.commands
+
+
+@pytest.mark.asyncio
+async def test_connection_errors_open_the_circuit(cache):
+    cache.breaker = CircuitBreaker(failure_threshold=2, reset_timeout=60)
+
+    async def broken(*args, **kwargs):
+        raise redis.ConnectionError("down")
+
+    cache.client.get = broken
+    assert await cache.get("a") is None
+    assert await cache.get("b") is None
+
+    assert cache.breaker.state == "open"
+    assert cache.is_available() is False
+    # Open circuit: calls short-circuit without touching the client
+    cache.client.get = None
+    assert await cache.get("c") is None
+
+
+def test_circuit_half_open_allows_single_probe():
+    breaker = CircuitBreaker(failure_threshold=1, reset_timeout=0)
+    breaker.record_failure()
+
+    assert breaker.state == "half-open"
+    assert breaker.allow() is True
+    assert breaker.allow() is False
+
+    breaker.record_success()
+    assert breaker.state == "closed"
@@ -0,0 +1,73 @@
+import sys
+import pytest
+from unittest.mock import AsyncMock, MagicMock, patch
+from fastapi import HTTPException
+from api.cache.keys import CacheKeys
+from api.cache.session_context_cache import SessionContextCache
+from api.cache.invalidation import invalidate_after_profile_update
+
+SNAPSHOT = {
+    "session": {"id": "s1", "lawyer_id": "l1", "conversation_context": None},
+    "user_context": {"id": "l1", "full_name": "أحمد", "country_name_ar": "السعودية", "subscription_status": "active"},
+    "recent_messages": [{"id": f"m{i}", "role": "user", "content": str(i), "metadata": {}} for i in range(3)],
+}
+
+
+@pytest.mark.asyncio
+async def test_append_message_keeps_window_and_owner_tags():
+    redis = AsyncMock()
+    with patch("api.cache.session_context_cache.get_cache", return_value=redis):
+        cache = SessionContextCache()
+        snapshot = {**SNAPSHOT, "recent_messages": list(SNAPSHOT["recent_messages"])}
+        cache.append_message(snapshot, {"id": "m3", "role": "assistant", "content": "3"}, window=3)
+        await cache.set(snapshot)
+
+    key, value = redis.set.call_args.args
+    assert key == CacheKeys.chat_session_context("s1")
+    assert [m["id"] for m in value["recent_messages"]] == ["m1", "m2", "m3"]
+    assert CacheKeys.lawyer_chat_sessions_tag("l1") in redis.set.call_args.kwargs["tags"]
+
+
+@pytest.mark.asyncio
+async def test_snapshot_is_written_back_under_the_versions_it_was_read_with():
+    redis = AsyncMock()
+    versions = {CacheKeys.lawyer_tag("l1"): 2}
+    redis.get_versioned.return_value = ({**SNAPSHOT, "tag_versions": {"stale": 0}}, versions)
+    with patch("api.cache.session_context_cache.get_cache", return_value=redis):
+        cache = SessionContextCache()
+        snapshot = await cache.get("s1", "l1")
+        await cache.set(snapshot)
+
+    # An invalidation during the turn leaves the write-back a MISS
+    assert redis.set.call_args.kwargs["versions"] == versions
+
+
+@pytest.mark.asyncio
+async def test_profile_update_invalidates_chat_session_snapshots():
+    redis = AsyncMock()
+    with patch("api.cache.invalidation.get_cache", return_value=redis):
+        await invalidate_after_profile_update("l1")
+
+    redis.invalidate_tag.assert_awaited_once_with(CacheKeys.lawyer_chat_sessions_tag("l1"))
+    redis.delete.assert_awaited_once_with(CacheKeys.user_profile("l1"), CacheKeys.user_stats("l1"))
+
+
+@pytest.mark.asyncio
+@pytest.mark.skipif(sys.version_info < (3, 12), reason="chat_service uses PEP 701 f-strings")
+async def test_turn_setup_is_a_single_cache_read():
+    from api.services.chat_service import ChatService
+
+    cache = MagicMock()
+    cache.get_versioned = AsyncMock(return_value=(SNAPSHOT, {}))
+    service = ChatService()
+    db = MagicMock()
+
+    with patch("api.services.chat_service.get_session_context_cache", return_value=cache), \
+         patch.object(service, "_get_db", return_value=db):
+        snapshot = await service._load_session_snapshot("s1", {"id": "l1"})
+        assert snapshot["user_context"]["country_name_ar"] == "السعودية"
+        db.table.assert_not_called()
+
+        with pytest.raises(HTTPException) as denied:
+            await service._load_session_snapshot("s1", {"id": "intruder"})
+        assert denied.value.status_code == 403
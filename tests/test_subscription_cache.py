@@ -0,0 +1,120 @@
+import pytest
+from unittest.mock import patch, MagicMock, AsyncMock
+from fastapi import HTTPException
+from api.cache.subscription_cache import SubscriptionCache
+from api.utils.subscription_enforcement import check_subscription_active
+
+SUB_ROW = {
+    "id": "sub_1",
+    "lawyer_id": "lawyer_1",
+    "status": "active",
+    "end_date": "2999-12-31",
+    "words_used_this_month": 100,
+    "extra_words": 0,
+    "package": {"ai_words_monthly": 1000},
+}
+
+
+def _db_returning(rows):
+    db = MagicMock()
+    query = db.table.return_value.select.return_value
+    query.eq.return_value.order.return_value.limit.return_value.execute.return_value.data = rows
+    query.in_.return_value.order.return_value.execute.return_value.data = rows
+    return db
+
+
+@pytest.fixture
+def redis_off():
+    redis = AsyncMock()
+    redis.get.return_value = None
+    redis.get_versioned.return_value = (None, None)
+    redis.get_tag_versions.return_value = None
+    with patch('api.cache.subscription_cache.get_cache', return_value=redis):
+        yield redis
+
+
+@pytest.mark.asyncio
+async def test_second_lookup_served_from_memory(redis_off):
+    cache = SubscriptionCache(local_ttl=60, refresh_interval=300)
+    db = _db_returning([SUB_ROW])
+    with patch('api.cache.subscription_cache.get_supabase_client', return_value=db):
+        first = await cache.get("lawyer_1")
+        second = await cache.get("lawyer_1")
+
+    assert first["id"] == second["id"] == "sub_1"
+    assert cache.stats["db_loads"] == 1
+    assert cache.stats["local_hits"] == 1
+
+
+@pytest.mark.asyncio
+async def test_missing_subscription_is_cached_as_none(redis_off):
+    cache = SubscriptionCache(local_ttl=60, refresh_interval=300)
+    db = _db_returning([])
+    with patch('api.cache.subscription_cache.get_supabase_client', return_value=db):
+        assert await cache.get("lawyer_x") is None
+        assert await cache.get("lawyer_x") is None
+
+    assert cache.stats["db_loads"] == 1
+
+
+@pytest.mark.asyncio
+async def test_db_load_is_stored_under_the_versions_read_before_it(redis_off):
+    versions = {"lawyer:lawyer_1": 4, "subscriptions": 1}
+    redis_off.get_versioned.return_value = (None, versions)
+    cache = SubscriptionCache()
+    with patch('api.cache.subscription_cache.get_supabase_client', return_value=_db_returning([SUB_ROW])):
+        await cache.get("lawyer_1")
+
+    assert redis_off.set.call_args.kwargs["versions"] == versions
+
+
+@pytest.mark.asyncio
+async def test_invalidate_forces_reload(redis_off):
+    cache = SubscriptionCache(local_ttl=60, refresh_interval=300)
+    db = _db_returning([SUB_ROW])
+    with patch('api.cache.subscription_cache.get_supabase_client', return_value=db):
+        await cache.get("lawyer_1")
+        await cache.invalidate("lawyer_1")
+        await cache.get("lawyer_1")
+
+    assert cache.stats["db_loads"] == 2
+
+
+@pytest.mark.asyncio
+async def test_apply_delta_updates_words_without_reload(redis_off):
+    cache = SubscriptionCache(local_ttl=60, refresh_interval=300)
+    db = _db_returning([SUB_ROW])
+    with patch('api.cache.subscription_cache.get_supabase_client', return_value=db):
+        await cache.get("lawyer_1")
+        await cache.apply_delta("lawyer_1", "words_used_this_month", 950)
+        sub = await cache.get("lawyer_1")
+
+    assert sub["words_used_this_month"] == 1050
+    assert cache.stats["db_loads"] == 1
+
+
+@pytest.mark.asyncio
+async def test_refresh_hot_uses_single_query(redis_off):
+    cache = SubscriptionCache(local_ttl=60, refresh_interval=300)
+    cache._set_local("lawyer_1", SUB_ROW)
+    cache._set_local("lawyer_2", SUB_ROW)
+    cache._last_access.update({"lawyer_1": 1e18, "lawyer_2": 1e18})
+    db = _db_returning([SUB_ROW])
+    with patch('api.cache.subscription_cache.get_supabase_client', return_value=db):
+        refreshed = await cache.refresh_hot()
+
+    assert refreshed == 2
+    assert db.table.call_count == 1
+    # lawyer_2 had no row in the batch result -> cached as "no subscription"
+    assert cache._get_local("lawyer_2").get("__none__")
+    assert redis_off.set_many.await_count == 1
+
+
+@pytest.mark.asyncio
+async def test_check_subscription_active_blocks_over_quota():
+    over_quota = {**SUB_ROW, "words_used_this_month": 5000}
+    with patch('api.utils.subscription_enforcement.get_lawyer_subscription', return_value=over_quota):
+        with pytest.raises(HTTPException) as exc:
+            await check_subscription_active(user_id="lawyer_1", require_ai=True)
+
+    assert exc.value.status_code == 403